@@ -1,13 +1,19 @@
 
 import os
+import time
 from Logger import LoggingHandler
 from SubprocessClass import SubprocessClass
 from SftpClass import SftpClass
 from typing import Any, Dict, List
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from lib.pod_stream.pod_file_stream import PodFileStream, retry_window_min, RETRY_WINDOW_MIN
+from lib.transfer_ledger.transfer_ledger import TransferLedger, STARTED, UPLOADED
 
 
 class AIR_STAT:
-    def __init__(self, namespace, script_dir: str, sftp_user: str, sftp_password: str, sftp_hostname: str, file_newer_than_min: int, output_dir: str, dir_lookup, uid, gid):
+    def __init__(self, namespace, script_dir: str, sftp_user: str, sftp_password: str, sftp_hostname: str, file_newer_than_min: int, output_dir: str, dir_lookup, uid, gid,
+                 ledger_path: str = None):
         self._logger = LoggingHandler.get_logger(self.__class__.__name__)
         self.namespace = namespace
         self.script_dir = script_dir
@@ -18,41 +24,68 @@ class AIR_STAT:
         self.gid = gid
         self.subprocess_obj = SubprocessClass()
         self.sftp_connection = SftpClass(sftp_user, sftp_password, sftp_hostname)
+        self.sftp_hostname = sftp_hostname
+        self.ledger_path = ledger_path
 
-    def get_files_from_pod(self, pod_name: str, file_newer_than_min: int, file_path_on_pod: str, filetypes, local_dir: str):
-        try:
-            if not os.path.isdir(local_dir):
-                # Creating the folder if not there
-                os.makedirs(local_dir, exist_ok=True)
-            for filetype in filetypes:
-                cmd = f"""kubectl exec -n {self.namespace} {pod_name} -- bash -c "cd {file_path_on_pod} ;find ./ -type f -name '{filetype}' -mmin -{str(file_newer_than_min)} | tar -zcf - --transform='flags=r;s|^./|{pod_name}_|' -T -" -- | tar -zxvf - --no-overwrite-dir -C {local_dir} """
-                self._logger.info(f"Command :::: {str(cmd)}")
-                out, err = self.subprocess_obj.execute_cmd(cmd)
-                self._logger.info(f"out::: {str(out)}     error : {str(err)}")
-            return True
-        except Exception as err:
-            self._logger.info(f"Exception in get_files() ::: {str(err)}")
-            return False
+    def remote_file_name(self, pod_name: str, file_name: str) -> str:
+        return f"{pod_name}_{file_name}"
 
-    def main(self, pod_name: str):
+    def main(self, pod_name: str) -> bool:
+        """Returns False when the SFTP connection or an upload failed, so the Splunk destination gets rediscovered."""
         try:
+            # creating a sftp connection
             conn = self.sftp_connection.connection()
+
+            # Adding / if not present at the end of path
             for pod_folder_path in self.dir_lookup.keys():
                 if not self.dir_lookup[pod_folder_path]["splunk_backup_dir"].endswith("/"):
                     self.dir_lookup[pod_folder_path]["splunk_backup_dir"] = self.dir_lookup[pod_folder_path][
                                                                            "splunk_backup_dir"] + "/"
-                folder_name = self.dir_lookup[pod_folder_path]["splunk_backup_dir"].split("/")[-2]
-                local_file_path = os.path.join(self.local_dir, folder_name)
-                if self.get_files_from_pod(pod_name, self.file_newer_than_min, pod_folder_path, self.dir_lookup[pod_folder_path]["search_keyword_for_file"], local_file_path):
-                    for file_name in os.listdir(local_file_path):
-                        local_dir_and_filename = os.path.join(local_file_path, file_name)
-                        splunk_dir_and_filename = os.path.join(self.dir_lookup[pod_folder_path]["splunk_backup_dir"], file_name)
-                        file_transfer_status, transfer_error = self.sftp_connection.upload_files(conn, self.uid, self.gid, local_dir_and_filename, splunk_dir_and_filename)
-                        self._logger.info(
-                            f"file_transfer_status: {str(file_transfer_status)}, transfer_error: {str(transfer_error)}, filename: {local_dir_and_filename}")
-                        if file_transfer_status:
-                            os.remove(local_dir_and_filename)
+
+            # Unchanged files already uploaded by an earlier run are skipped without being read
+            ledger = TransferLedger(self.ledger_path) if self.ledger_path else None
+            # A failed upload is recorded as started, and later runs widen the find window to retry it
+            # for up to RETRY_WINDOW_MIN minutes; without a ledger it is retried only while it is still
+            # newer than file_newer_than_min
+            newer_than_min = self.file_newer_than_min
+            if ledger:
+                newer_than_min = retry_window_min(self.file_newer_than_min, ledger.oldest_mtime(
+                    f"{pod_name}:/", STARTED, self.sftp_hostname, time.time() - RETRY_WINDOW_MIN * 60))
+
+            # One exec streams every file type of every folder; files go straight from the tar stream to SFTP
+            pod_stream = PodFileStream(self.namespace, pod_name, self.dir_lookup, newer_than_min, None)
+            uploaded = []
+            failed = 0
+            for pod_folder_path, member, fileobj in pod_stream.files():
+                file_name = self.remote_file_name(pod_name, os.path.basename(member.name))
+                splunk_dir_and_filename = os.path.join(self.dir_lookup[pod_folder_path]["splunk_backup_dir"], file_name)
+                key = (f"{pod_name}:/{member.name}", member.size, int(member.mtime))
+                if ledger and ledger.reached(key, UPLOADED, self.sftp_hostname):
+                    continue
+                file_transfer_status, transfer_error = self.sftp_connection.upload_fileobj(conn, fileobj, splunk_dir_and_filename)
+                self._logger.info(
+                    f"file_transfer_status: {str(file_transfer_status)}, transfer_error: {str(transfer_error)}, filename: {splunk_dir_and_filename}")
+                if file_transfer_status:
+                    uploaded.append(splunk_dir_and_filename)
+                    if ledger:
+                        ledger.record(key, UPLOADED, self.sftp_hostname, splunk_dir_and_filename)
+                else:
+                    failed += 1
+                    if ledger:
+                        ledger.record(key, STARTED, self.sftp_hostname, splunk_dir_and_filename)
+            if ledger:
+                ledger.close()
+            if pod_stream.error:
+                self._logger.error(f"Error while streaming files from {pod_name} ::: {str(pod_stream.error)}")
+
+            # Fixing the ownership of all uploaded files in one step
+            if uploaded:
+                self.sftp_connection.chown_files(conn, self.uid, self.gid, uploaded)
+            if conn is None:
+                return False
             conn.close()
-            self._logger.info("Connection Closed")
+            self._logger.info(f"Connection Closed, {len(uploaded)} files uploaded from {pod_name}")
+            return failed == 0
         except Exception as err:
-            self._logger.info(f"Exception in main() ::: {str(err)}")
\ No newline at end of file
+            self._logger.info(f"Exception in main() ::: {str(err)}")
+            return False
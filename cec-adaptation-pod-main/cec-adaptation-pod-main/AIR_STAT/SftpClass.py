@@ -1,8 +1,13 @@
+import shlex
 import traceback
 
 from Logger import LoggingHandler
 import paramiko
 from paramiko import AutoAddPolicy, SSHClient
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from lib.sftp_broker.sftp_broker import open_brokered_sftp
 
 
 class SftpClass:
@@ -33,6 +38,11 @@ class SftpClass:
         :return: SFTP Connection
         """
         try:
+            # Reusing the node-local broker's authenticated transport when it is running
+            sftp_conn = open_brokered_sftp(self.hostname, self.user, self.passwd)
+            if sftp_conn is not None:
+                return sftp_conn
+
             client = SSHClient()
             client.load_system_host_keys()
             client.set_missing_host_key_policy(AutoAddPolicy())
@@ -83,3 +93,52 @@ class SftpClass:
             self._logger.error(f"Exception in upload_files() ::: {str(err)}")
             self._logger.error(traceback.format_exc())
             return False, f"{type(err).__name__}:{str(err)}"
+
+    def upload_fileobj(self, conn, fileobj, remote_path):
+        """
+        Uploading from a file object (e.g. a member of a streamed tar) without staging it locally.
+        Ownership is fixed afterwards for all files at once with chown_files().
+
+        :param conn: SFTP Connection object.
+        :param fileobj: Readable file object.
+        :param remote_path: Remote file path.
+        :return: True/False based on success condition, Error details if there is any otherwise None
+        """
+        try:
+            if conn is not None:
+                conn.putfo(fileobj, remote_path)
+                return True, None
+            return False, "No SFTP connection"
+        except Exception as err:
+            self._logger.error(f"Exception in upload_fileobj() ::: {str(err)}")
+            return False, f"{type(err).__name__}:{str(err)}"
+
+    def chown_files(self, conn, uid, gid, remote_paths, batch_size=200):
+        """
+        Changing the owner of the uploaded files with one remote chown per batch, falling back to a
+        per-file SFTP chown when the server does not allow command execution.
+
+        :param conn: SFTP Connection object.
+        :param uid: User ID of the folder.
+        :param gid: Group ID of the folder.
+        :param remote_paths: Remote file paths.
+        :return: True if every file got the new owner, otherwise False
+        """
+        success = True
+        for start in range(0, len(remote_paths), batch_size):
+            batch = remote_paths[start:start + batch_size]
+            try:
+                channel = conn.get_channel().get_transport().open_session()
+                channel.exec_command(f"chown {int(uid)}:{int(gid)} " + " ".join(shlex.quote(path) for path in batch))
+                if channel.recv_exit_status() == 0:
+                    self._logger.info(f"{len(batch)} files changed to UID {str(uid)} and GID {str(gid)}")
+                    continue
+            except Exception as err:
+                self._logger.error(f"Exception in chown_files() while running remote chown ::: {str(err)}")
+            for path in batch:
+                try:
+                    conn.chown(path, uid, gid)
+                except Exception as err:
+                    success = False
+                    self._logger.error(f"Exception in chown_files() for {path} ::: {str(err)}")
+        return success
@@ -2,6 +2,10 @@ import traceback
 import logging
 import paramiko
 from paramiko import AutoAddPolicy, SSHClient
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from lib.sftp_broker.sftp_broker import open_brokered_sftp
 
 
 class SftpClass:
@@ -30,6 +34,11 @@ class SftpClass:
         :return: SFTP Connection
         """
         try:
+            # Reusing the node-local broker's authenticated transport when it is running
+            sftp_conn = open_brokered_sftp(self.hostname, self.user, self.passwd)
+            if sftp_conn is not None:
+                return sftp_conn
+
             client = SSHClient()
             client.load_system_host_keys()
             client.set_missing_host_key_policy(AutoAddPolicy())
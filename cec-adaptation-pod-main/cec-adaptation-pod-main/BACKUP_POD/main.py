@@ -9,9 +9,13 @@ import glob
 import subprocess
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from lib.process_check.ProcessCheck import ProcessCheck
+from lib.process_check.ProcessCheck import ProcessCheck, KILL_STALE
 from lib.Namespace import get_application_namespace, get_adaptation_namespace
 
+# A previous run still holding the lock after this long is hung and gets killed;
+# the backup is one large zip upload, three hours is far past a normal run
+STALE_RUN_SECS = 3 * 60 * 60
+
 
 def timestamp() -> str:
     return datetime.now().strftime("%Y%m%d%H%M%S")
@@ -183,7 +187,8 @@ def main(script_dir: str, backup_path: str, backup_filename: str, scripts_path:
 if __name__ == '__main__':
     try:
         pc = ProcessCheck(
-            os.path.join("/", "tmp", os.path.basename(os.path.dirname(os.path.abspath(__file__))) + ".pid"))
+            os.path.join("/", "tmp", os.path.basename(os.path.dirname(os.path.abspath(__file__))) + ".pid"),
+            KILL_STALE, stale_secs=STALE_RUN_SECS)
         pc.start()
         # starting main method
         # Taking the current directory path
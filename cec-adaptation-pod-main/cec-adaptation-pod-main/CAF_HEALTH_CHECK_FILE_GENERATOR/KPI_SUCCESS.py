@@ -32,7 +32,7 @@ from SubprocessClass import SubprocessClass
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 
-import lxml.etree as ET
+from lib.pm_store.pm_store import PmStore
 
 
 class KPI_SUCCESS:
@@ -46,41 +46,30 @@ class KPI_SUCCESS:
         self.pm_bulk_port = 22
         self.pm_bulk_name = None
         self.internal_ip = None
-        self.pm_csv_file = os.path.join(script_dir, "pm_file.csv")
-        self.measCollec_xsl = os.path.join(script_dir, "measCollec.xsl")
+        self.pm_store = PmStore()
 
-    def aggregate_pm_files_into_csv_file(self, pm_file_paths: List[str]):
+    def load_pm_files(self, pm_file_paths: List[str]):
         try:
-            if os.path.exists(self.pm_csv_file):
-                os.remove(self.pm_csv_file)
-
-            logging.info(f"Aggregating {len(pm_file_paths)} PM files into file: {self.pm_csv_file} <- {pm_file_paths}")
-
-            with open(self.pm_csv_file, "a") as fd:
-                for pm_file_path in pm_file_paths:
-                    dom = ET.parse(pm_file_path)
-                    xslt = ET.parse(self.measCollec_xsl)
-                    transform = ET.XSLT(xslt)
-                    new_dom = transform(dom)
-                    print(new_dom, file=fd)
+            logging.info(f"Loading {len(pm_file_paths)} PM files into the PM store <- {pm_file_paths}")
+            self.pm_store = PmStore.from_files(pm_file_paths)
+            logging.info(f"PM store holds {len(self.pm_store)} counters")
         except Exception as err:
-            logging.exception(f"Failed aggregating PM file into csv file ::: {str(err)}")
+            logging.exception(f"Failed loading PM files into the PM store ::: {str(err)}")
             return None
 
-    def get_value_from_csv_file(self, cmd, error_codes_list=[]):
+    def get_value_from_lines(self, lines, error_codes_list=[]):
         try:
             kpi_val = 0
-            out, error = self.subprocess_obj.execute_cmd(cmd)
-            if out is not None:
-                for line in out.splitlines():
-                    logging.info(f"get_value_from_csv_file Line: {str(line)}")
+            if lines:
+                for line in lines:
+                    logging.info(f"get_value_from_lines Line: {str(line)}")
                     value, stat = self.retrieve_kpi_value(line, error_codes_list=error_codes_list)
                     kpi_val = kpi_val + int(value)
-                    logging.info(f"get_value_from_csv_file value: {str(kpi_val)}")
+                    logging.info(f"get_value_from_lines value: {str(kpi_val)}")
                 return kpi_val, True
             return kpi_val, False
         except Exception as err:
-            logging.error(f"Exception in get_value_from_csv_file ::: {str(err)}")
+            logging.error(f"Exception in get_value_from_lines ::: {str(err)}")
 
     @staticmethod
     def success_rate(total_req, error_req):
@@ -89,29 +78,29 @@ class KPI_SUCCESS:
         except Exception as err:
             logging.error(f"Exception in success_rate ::: {str(err)}")
 
-    def grep_values_from_file(self, pm_file, counter_name, filters, error_codes_list=[]):
+    def grep_values_from_store(self, counter_name, filters, error_codes_list=[]):
         try:
             stat = False
             locked = False
             request_data = 0
             if filters:
                 for req in filters:
-                    cmd = f"""grep countername={str(counter_name)} {pm_file} | grep {str(req)} """
-                    logging.info(f"cmd ::: {str(cmd)}")
-                    val, stat = self.get_value_from_csv_file(cmd, error_codes_list=error_codes_list)
+                    patterns = [f"countername={str(counter_name)}", str(req)]
+                    logging.info(f"patterns ::: {str(patterns)}")
+                    val, stat = self.get_value_from_lines(self.pm_store.grep(*patterns), error_codes_list=error_codes_list)
                     if stat:
                         locked = True
                     request_data = request_data + int(val)
             else:
-                cmd = f"""grep countername={str(counter_name)} {pm_file} """
-                logging.info(f"cmd ::: {str(cmd)}")
-                val, stat = self.get_value_from_csv_file(cmd, error_codes_list=error_codes_list)
+                patterns = [f"countername={str(counter_name)}"]
+                logging.info(f"patterns ::: {str(patterns)}")
+                val, stat = self.get_value_from_lines(self.pm_store.grep(*patterns), error_codes_list=error_codes_list)
                 if stat:
                     locked = True
                 request_data = request_data + int(val)
             return request_data, locked
         except Exception as err:
-            logging.error(f"Exception in grep_data_from_file ::: {str(err)}")
+            logging.error(f"Exception in grep_values_from_store ::: {str(err)}")
 
     @staticmethod
     def retrieve_kpi_value(line, error_codes_list=[]):
@@ -155,8 +144,8 @@ class KPI_SUCCESS:
         # Taking path for last 3 updated files
         file_paths = files_newer_that_mins(self.pm_files_local_dir, "*.xml", self.execution_period_mins)
 
-        # Reading Files and creating a self.pm_csv_file
-        self.aggregate_pm_files_into_csv_file(file_paths)
+        # Reading Files into self.pm_store
+        self.load_pm_files(file_paths)
 
         # SUCCESS_KPIs
         try:
@@ -175,11 +164,11 @@ class KPI_SUCCESS:
                     logging.info(f"code ::: {str(error_codes)}")
 
                 # For Total Traffic Request
-                total_request, total_status = self.grep_values_from_file(self.pm_csv_file, config_values[k]['kpi_total'], filters)
+                total_request, total_status = self.grep_values_from_store(config_values[k]['kpi_total'], filters)
                 logging.info(f"{str(k)}_total: {str(total_request)}")
 
                 # For Error Traffic Request
-                error_request, error_status = self.grep_values_from_file(self.pm_csv_file, config_values[k]['kpi_error'], filters, error_codes_list=error_codes)
+                error_request, error_status = self.grep_values_from_store(config_values[k]['kpi_error'], filters, error_codes_list=error_codes)
                 logging.info(f"{str(k)}_error: {str(error_request)}")
 
                 # Success Rate
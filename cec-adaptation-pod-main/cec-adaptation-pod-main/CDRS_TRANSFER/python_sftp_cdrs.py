@@ -8,7 +8,14 @@ import logging
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from lib.process_check.ProcessCheck import ProcessCheck
+from lib.process_check.ProcessCheck import ProcessCheck, KILL_STALE
+from lib.sftp_broker.sftp_broker import open_brokered_sftp
+from lib.transfer_ledger.transfer_ledger import TransferLedger, file_key, upload_resumable, STARTED, UPLOADED, \
+    RENAMED, SOURCE_DELETED
+
+# A previous run still holding the lock after this long is hung and gets killed;
+# three 15-minute cron intervals (a run stops itself after 14 minutes)
+STALE_RUN_SECS = 3 * 15 * 60
 
 
 class SFTPClient:
@@ -31,6 +38,11 @@ class SFTPClient:
                 continue
             try:
                 self._logger.info(f"Trying to connect to {host}...")
+                # Reusing the node-local broker's authenticated transport when it is running
+                self.connection = open_brokered_sftp(host, self.username, self.password, self.port)
+                if self.connection is not None:
+                    self._logger.info(f"Connected to {host} through the SFTP broker")
+                    return
                 self.transport = paramiko.Transport((host, self.port))
                 self.transport.connect(username=self.username, password=self.password)
                 self.connection = paramiko.SFTPClient.from_transport(self.transport)
@@ -40,7 +52,7 @@ class SFTPClient:
                 self._logger.error(f"Connection failed to {host}: {e}")
         raise ConnectionError("Failed to connect to both primary and secondary hosts.")
 
-    def upload_and_rename(self, local_path, extension):
+    def upload_and_rename(self, local_path, extension, ledger: TransferLedger = None, destination: str = ""):
         original_filename = os.path.basename(local_path)
         remote_dir = self.remote_directory_map.get(extension)
         if not remote_dir:
@@ -53,11 +65,28 @@ class SFTPClient:
         self._logger.info(f"remote_final_path: {remote_final_path}")
 
         try:
-            self.connection.put(local_path, remote_tmp_path)
-            self._logger.info(f"Uploaded: {local_path} --> {remote_tmp_path}")
-
-            self.connection.rename(remote_tmp_path, remote_final_path)
-            self._logger.info(f"Renamed remote file: {remote_tmp_path} --> {remote_final_path}")
+            if ledger is None:
+                self.connection.put(local_path, remote_tmp_path)
+                self._logger.info(f"Uploaded: {local_path} --> {remote_tmp_path}")
+
+                self.connection.rename(remote_tmp_path, remote_final_path)
+                self._logger.info(f"Renamed remote file: {remote_tmp_path} --> {remote_final_path}")
+                return True
+
+            key = file_key(local_path)
+            if not ledger.reached(key, UPLOADED, destination):
+                # A "started" upload left a partial .tmp of this exact file; continue it from its size
+                resume = ledger.stage(key, destination) == STARTED
+                ledger.record(key, STARTED, destination, remote_tmp_path)
+                with open(local_path, "rb") as local_file:
+                    upload_resumable(self.connection, local_file, remote_tmp_path, key[1], resume)
+                ledger.record(key, UPLOADED, destination, remote_tmp_path)
+                self._logger.info(f"Uploaded: {local_path} --> {remote_tmp_path}")
+
+            if not ledger.reached(key, RENAMED, destination):
+                self.connection.rename(remote_tmp_path, remote_final_path)
+                ledger.record(key, RENAMED, destination, remote_final_path)
+                self._logger.info(f"Renamed remote file: {remote_tmp_path} --> {remote_final_path}")
             return True
         except Exception as e:
             self._logger.error(f"Upload failed for {local_path}: {str(e)}")
@@ -71,9 +100,10 @@ class SFTPClient:
 
 
 class SFTPUploader:
-    def __init__(self, config_path, namespace, logger):
+    def __init__(self, config_path, namespace, logger, ledger_path: str = None):
         self.namespace = namespace
         self._logger = logger
+        self.ledger = TransferLedger(ledger_path) if ledger_path else None
         with open(config_path, 'r') as f:
             self.config = json.load(f)
 
@@ -96,6 +126,9 @@ class SFTPUploader:
         start_time = time.time()
         max_runtime = 14 * 60  # 14 minutes in seconds
 
+        if self.ledger:
+            self.ledger.prune()
+
         for conn_name, client in self.clients.items():
             try:
                 client.connect()
@@ -117,9 +150,11 @@ class SFTPUploader:
                     for conn_name, client in self.clients.items():
                         if ext in client.file_types and client.connection:
                             self._logger.info(f"[{conn_name}] [{client}] Processing {file_path}")
-                            success = client.upload_and_rename(file_path, ext)
+                            key = file_key(file_path) if self.ledger else None
+                            success = client.upload_and_rename(file_path, ext, self.ledger, conn_name)
                             if success:
-                                self.removeFile(file_path)
+                                if self.removeFile(file_path) and self.ledger:
+                                    self.ledger.record(key, SOURCE_DELETED, conn_name)
                                 self._logger.info(f"Deleted local file: {file_path}")
                             break
 
@@ -133,6 +168,8 @@ class SFTPUploader:
             for client in self.clients.values():
                 client.close()
             self._logger.info("All SFTP connections closed.")
+            if self.ledger:
+                self.ledger.close()
 
 
 def get_namespace():
@@ -152,7 +189,7 @@ def get_namespace():
 
 
 if __name__ == "__main__":
-    pc = ProcessCheck(os.path.join("/", "tmp", os.path.basename(os.path.dirname(os.path.abspath(__file__))) + ".pid"))
+    pc = ProcessCheck(os.path.join("/", "tmp", os.path.basename(os.path.dirname(os.path.abspath(__file__))) + ".pid"), KILL_STALE, stale_secs=STALE_RUN_SECS)
     pc.start()
     script_dir = os.path.dirname(__file__)
     config_file_path = os.path.join(script_dir, 'config.json')
@@ -168,6 +205,6 @@ if __name__ == "__main__":
     namespace = get_namespace()
     logger.info(f"namespace:::: {namespace}")
 
-    uploader = SFTPUploader(config_file_path, namespace, logger)
+    uploader = SFTPUploader(config_file_path, namespace, logger, os.path.join(script_dir, "run", "transfer_ledger.db"))
     uploader.run()
     pc.stop()
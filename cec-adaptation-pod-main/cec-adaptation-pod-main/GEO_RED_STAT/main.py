@@ -10,9 +10,16 @@ import SDP_STAT
 from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from lib.process_check.ProcessCheck import ProcessCheck
+from lib.process_check.ProcessCheck import ProcessCheck, KILL_STALE
+from lib.exec_trace.exec_trace import ExecTraceRun
+from lib.splunk_destination.splunk_destination import SplunkDestinationCache, make_destination
+from lib.transfer_ledger.transfer_ledger import TransferLedger
 from lib.Namespace import get_application_namespace, get_adaptation_namespace
 
+# A previous run still holding the lock after this long is hung and gets killed;
+# three 10-minute cron intervals (file_newer_than_min is 12)
+STALE_RUN_SECS = 3 * 10 * 60
+
 
 def timestamp() -> str:
     return datetime.now().strftime("%Y%m%d%H%M%S")
@@ -136,6 +143,18 @@ def get_uid_gid_from_splunk(splunk_list: List[str], splunk_container: str, splun
         return 0, 0
 
 
+def discover_splunk_destination(splunk_container: str, splunk_user_group: str, dir_lookup, ns: str):
+    """
+    Looking up the Splunk Forwarder IP and the UID/GID of the upload user.
+    The result is cached by SplunkDestinationCache, so this only runs when the cache expired or was invalidated.
+    """
+    splunk_ip = get_splunk_ip(ns)
+    splunk_name_list = get_splunk(ns)
+    uid, gid = get_uid_gid_from_splunk(splunk_name_list, splunk_container, splunk_user_group, ns)
+    dirs = {pod_folder_path: lookup["splunk_backup_dir"] for pod_folder_path, lookup in dir_lookup.items()}
+    return make_destination(splunk_ip, uid, gid, dirs)
+
+
 def available_pods(namespace: str, pod: str, whitelist_enabled: str, whitelist_pod_list: list, blacklistPodList) -> \
 List[str]:
     try:
@@ -169,25 +188,44 @@ List[str]:
 
 
 def execute(namespace, pod_name: str, script_dir, sftp_user, sftp_password, splunk_ip, file_newer_than_min, output_dir,
-            dir_lookup, uid, gid):
+            dir_lookup, uid, gid, ledger_path=None):
     print("In execute() ......")
     sdp_stat_obj = SDP_STAT.SDP_STAT(namespace, script_dir, sftp_user, sftp_password, splunk_ip, file_newer_than_min,
                                      output_dir,
-                                     dir_lookup, uid, gid)
-    sdp_stat_obj.main(pod_name)
+                                     dir_lookup, uid, gid, ledger_path)
+    return sdp_stat_obj.main(pod_name)
+
+
+def upload_succeeded(future) -> bool:
+    try:
+        return future.result() is not False
+    except Exception as err:
+        logger.error(f"Pod upload failed ::: {str(err)}")
+        return False
 
 
 def main(namespace: str, main_pod: str, script_dir: str, output_dir: str, archive_dir: str, log_dir: str,
          whitelist_enabled: str, whitelist_pod_list: list, sftp_user: str, sftp_password: str, dir_lookup,
-         file_newer_than_min, splunk_ip, uid, gid, max_processes: int, blacklistPodList):
+         file_newer_than_min, splunk_ip, uid, gid, max_processes: int, blacklistPodList,
+         splunk_cache: SplunkDestinationCache = None, ledger_path: str = None):
     # Running all air kpi's
 
+    if ledger_path:
+        with TransferLedger(ledger_path) as ledger:
+            ledger.prune()
+
+    futures = []
     with concurrent.futures.ProcessPoolExecutor(max_processes) as exe:
         for pod in available_pods(namespace, main_pod, whitelist_enabled, whitelist_pod_list, blacklistPodList):
-            exe.submit(execute, namespace, pod, script_dir, sftp_user, sftp_password, splunk_ip, file_newer_than_min,
-                       output_dir,
-                       dir_lookup, uid, gid)
+            futures.append(exe.submit(execute, namespace, pod, script_dir, sftp_user, sftp_password, splunk_ip, file_newer_than_min,
+                                      output_dir,
+                                      dir_lookup, uid, gid, ledger_path))
         # exe.map(sdp_stat_obj.main, POD_LIST)
+
+    # Upload errors may mean the forwarder moved or was redeployed; rediscover it on the next run
+    if splunk_cache is not None and not all(upload_succeeded(future) for future in futures):
+        logger.error("Upload errors, Splunk destination will be rediscovered on the next run")
+        splunk_cache.invalidate()
     logger.info("ALL PROCESSES ARE DONE")
 
 
@@ -199,7 +237,8 @@ def wait_to_start(wait_to_start_secs: int):
 if __name__ == '__main__':
     try:
         pc = ProcessCheck(
-            os.path.join("/", "tmp", os.path.basename(os.path.dirname(os.path.abspath(__file__))) + ".pid"))
+            os.path.join("/", "tmp", os.path.basename(os.path.dirname(os.path.abspath(__file__))) + ".pid"),
+            KILL_STALE, stale_secs=STALE_RUN_SECS)
         pc.start()
         # starting main method
         # Taking the current directory path
@@ -209,6 +248,8 @@ if __name__ == '__main__':
         make_dir(LOG_DIR)
         logger_obj = LoggingHandler(SCRIPT_DIR)
         logger = logger_obj.get_logger(__name__)
+        exec_trace_run = ExecTraceRun(os.path.basename(SCRIPT_DIR), os.path.join(LOG_DIR, "exec_trace"))
+        exec_trace_run.start()
         OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
         make_dir(OUTPUT_DIR)
         ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "archive")
@@ -222,15 +263,19 @@ if __name__ == '__main__':
             CONFIG_FILE_PATH)
         APP_NAMESPACE = get_application_namespace()
         ADA_NAMESPACE = get_adaptation_namespace()
-        SPLUNK_IP = get_splunk_ip(ADA_NAMESPACE)
-        SPLUNK_NAME_LIST = get_splunk(ADA_NAMESPACE)
-        UID, GID = get_uid_gid_from_splunk(SPLUNK_NAME_LIST, SPLUNK_CONTAINER, SPLUNK_GROUP_USER, ADA_NAMESPACE)
+        RUN_DIR = os.path.join(SCRIPT_DIR, "run")
+        make_dir(RUN_DIR)
+        SPLUNK_CACHE = SplunkDestinationCache(os.path.join(RUN_DIR, "splunk_destination.json"), config={
+            "container": SPLUNK_CONTAINER, "user_group": SPLUNK_GROUP_USER, "dir_lookup": DIR_LOOKUP, "namespace": ADA_NAMESPACE})
+        SPLUNK_DESTINATION = SPLUNK_CACHE.get(lambda: discover_splunk_destination(SPLUNK_CONTAINER, SPLUNK_GROUP_USER, DIR_LOOKUP, ADA_NAMESPACE))
+        SPLUNK_IP, UID, GID = SPLUNK_DESTINATION["ip"], SPLUNK_DESTINATION["uid"], SPLUNK_DESTINATION["gid"]
         if WAIT:
             wait_to_start(WAIT_TO_START)
 
         main(APP_NAMESPACE, POD, SCRIPT_DIR, OUTPUT_DIR, ARCHIVE_DIR, LOG_DIR, WHITELIST_ENABLED, WHITELIST_PODS_LIST,
              SFTP_USER, SFTP_PASSWORD, DIR_LOOKUP, FILE_NEWER_THAN_MIN, SPLUNK_IP, UID, GID, MAX_PROCESSES,
-             BLACKLIST_POD)
+             BLACKLIST_POD, SPLUNK_CACHE, os.path.join(RUN_DIR, "transfer_ledger.db"))
+        exec_trace_run.finish(logger)
         pc.stop()
     except Exception as ex:
         print("Failed execution", str(ex))
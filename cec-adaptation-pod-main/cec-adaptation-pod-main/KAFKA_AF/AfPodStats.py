@@ -0,0 +1,101 @@
+import re
+import shlex
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from Logger import LoggingHandler
+from SubprocessClass import SubprocessClass
+
+AF_ROUTER_STATS_DIR = "/var/opt/af/named/"
+CHECKZONES = "/opt/af/bin/checkzones.pl"
+
+# Columns summed into AF_ROUTER_ERRORS
+AF_ROUTER_TIMEOUT_COLUMNS = (
+    "UDP:Query:Timeout", "UDP:Iquery:Timeout", "UDP:Status:Timeout", "UDP:Notify:Timeout", "UDP:Update:Timeout",
+    "TCP:Query:Timeout", "TCP:Iquery:Timeout", "TCP:Status:Timeout", "TCP:Notify:Timeout", "TCP:Update:Timeout",
+)
+
+_STATS_MARKER = "@@af_pod_stats@@ file="
+_CHECKZONES_MARKER = "@@af_pod_stats@@ checkzones"
+_ZONE_SYNC_ERROR = re.compile("main|no", re.IGNORECASE)
+
+
+class AfPodStats(NamedTuple):
+    filename: Optional[str]     # Newest AFRouter-* stats file, None if there is none
+    header: List[str]           # Column names of the stats file
+    rows: List[List[str]]       # Last data rows of the stats file, split like the header
+    checkzones: Optional[List[str]]  # checkzones.pl output lines, None if the section is missing
+
+    def column(self, name: str) -> List[str]:
+        """Values of a named column over the tail rows; empty if the file has no such column."""
+        if name not in self.header:
+            return []
+        index = self.header.index(name)
+        return [row[index] for row in self.rows if len(row) > index]
+
+    def column_sum(self, names: Sequence[str]) -> int:
+        """Sum of the integer values of the named columns over the tail rows."""
+        return sum(int(value) for name in names for value in self.column(name) if value.isdigit())
+
+    def zone_sync_errors(self) -> Optional[int]:
+        """checkzones.pl lines whose status (2nd column) reports main or no."""
+        if self.checkzones is None:
+            return None
+        return sum(1 for line in self.checkzones
+                   if len(line.split()) > 1 and _ZONE_SYNC_ERROR.search(line.split()[1]))
+
+
+class AfPodStatsCollector:
+    """Reads the AFRouter statistics tail and the checkzones report of an AF pod with one kubectl exec.
+
+    The in-pod script only selects the newest AFRouter-* file and prints its header and last rows,
+    followed by the checkzones.pl output; columns are picked by header name here, so reading more
+    named columns costs nothing extra per pod.
+    """
+
+    def __init__(self, namespace: str, subprocess_obj: SubprocessClass = None, tail_rows: int = 15):
+        self._logger = LoggingHandler.get_logger(self.__class__.__name__)
+        self.namespace = namespace
+        self.subprocess_obj = subprocess_obj or SubprocessClass()
+        self.tail_rows = tail_rows
+
+    def script(self) -> str:
+        return (f"cd {AF_ROUTER_STATS_DIR} && f=$(ls -1 | grep -i 'AFRouter-.*' | tail -1); "
+                f"echo \"{_STATS_MARKER}$f\"; "
+                f"if [ -n \"$f\" ]; then head -1 \"$f\"; tail -n +2 \"$f\" | tail -n {self.tail_rows}; fi; "
+                f"echo \"{_CHECKZONES_MARKER}\"; {CHECKZONES} 2>/dev/null; true")
+
+    def command(self, af: str, container: str) -> str:
+        return f"kubectl exec -n {self.namespace} {af} -c {container} -- sh -c {shlex.quote(self.script())}"
+
+    @staticmethod
+    def parse(output: str) -> AfPodStats:
+        filename, header, rows, checkzones = None, [], [], None
+        section = None
+        for line in str(output).splitlines():
+            if line.startswith(_STATS_MARKER):
+                filename = line[len(_STATS_MARKER):].strip() or None
+                section = "stats"
+            elif line.startswith(_CHECKZONES_MARKER):
+                checkzones = []
+                section = "checkzones"
+            elif section == "stats":
+                if not header:
+                    header = line.split()
+                elif line.strip():
+                    rows.append(line.split())
+            elif section == "checkzones":
+                checkzones.append(line)
+        return AfPodStats(filename, header, rows, checkzones)
+
+    def collect(self, af: str, container: str) -> Optional[AfPodStats]:
+        """AfPodStats of the pod, or None if the exec returned nothing."""
+        cmd = self.command(af, container)
+        output, error = self.subprocess_obj.execute_cmd(cmd)
+        if not output:
+            self._logger.error(f"Failed collecting AF stats of {af} ::: {cmd} ::: {str(error)}")
+            return None
+        stats = self.parse(output)
+        missing = [name for name in AF_ROUTER_TIMEOUT_COLUMNS if stats.filename and name not in stats.header]
+        if missing:
+            self._logger.error(f"{af} {stats.filename} has no columns {missing}")
+        return stats
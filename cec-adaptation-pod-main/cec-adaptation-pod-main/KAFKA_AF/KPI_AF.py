@@ -29,11 +29,20 @@ from datetime import datetime, timedelta, date
 import time
 import sys
 
+from AfPodStats import AF_ROUTER_TIMEOUT_COLUMNS, AfPodStatsCollector
 from Logger import LoggingHandler
 from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
+from lib.log_window.log_window_counter import LogWindowCounter
+
+# CPM reachability signatures counted over the last 15 minutes of /var/log/warn in one read
+CPM_REACHABILITY_SIGNATURES = LogWindowCounter("/var/log/warn", {
+    "POLARIS_CPM_REACHABILITY": r"No answer received from 10\.201\.186\.253",
+    "RIVERSIDE_CPM_REACHABILITY": r"No answer received from 10\.163\.80\.253",
+    "TITAN_CPM_REACHABILITY": r"No answer received from 10\.201\.38\.253",
+}, window_minutes=15, time_format="%Y-%m-%dT%H:%M:%S")
 
 
 class KPI_AF:
@@ -58,6 +67,7 @@ class KPI_AF:
 
         # Creating an object from subprocess class
         self.subprocess_obj = SubprocessClass()
+        self.af_stats_collector = AfPodStatsCollector(namespace, self.subprocess_obj)
 
         # epoch GMT time
         self.todayUTCMilli = int(time.mktime(self.currentDT.timetuple()) * 1000)
@@ -95,6 +105,15 @@ class KPI_AF:
         except Exception as err:
             self._logger.error("Exception in update_command ::: " + str(err))
 
+    def count_log_signatures(self, af, container, counter: LogWindowCounter):
+        try:
+            counts = counter.count_in_pod(self.subprocess_obj.execute_cmd, self.namespace, af, container,
+                                          logger=self._logger)
+            self._logger.info(f"count_log_signatures() ::: {af} {counter.log_file} ::: {str(counts)}")
+            return counts
+        except Exception as err:
+            self._logger.error("Exception in count_log_signatures ::: " + str(err))
+
     @staticmethod
     def add_kafka_kpi(kafka_data_source_builder: KafkaDataSourceBuilder, kpi: str, value: str, result_status: str):
         if result_status == "NO":
@@ -236,45 +255,23 @@ class KPI_AF:
             except Exception as err:
                 self._logger.error(f"Exception {str(af)} ::: {str(err)}")
 
+            # AFRouter stats tail and checkzones report, read in one exec
+            af_stats = self.af_stats_collector.collect(af, container)
+
             # 1. AF_ROUTER_ERRORS
-            count = 0
-            cmd = """ls -l /var/opt/af/named/ | grep -i "AFRouter-.*" | tail -1 | awk '{print $9}' """
-            filename, error = self.update_command(af, cmd, container)
-
-            if filename:
-                filename = str(filename).strip()
-                self._logger.info(f"AF_ROUTER_ERRORS: {str(filename)}")
-
-                cmd = f"""awk 'NR == 1 {{for (i=1; i<=NF; i++) {{ col[$i] = i }}}} NR > 1 {{print $col["UDP:Query:Timeout"], $col["UDP:Iquery:Timeout"], $col["UDP:Status:Timeout"], $col["UDP:Notify:Timeout"], $col["UDP:Update:Timeout"], $col["TCP:Query:Timeout"], $col["TCP:Iquery:Timeout"], $col["TCP:Status:Timeout"], $col["TCP:Notify:Timeout"], $col["TCP:Update:Timeout"]}}' /var/opt/af/named/{str(filename)} | tail -15 """
-                self._logger.info(f"AF_ROUTER_ERRORS: command - {str(cmd)}")
-                data, error = self.update_command(af, cmd, container)
-                self._logger.info(f"AF_ROUTER_ERRORS: data - {str(data)}")
-                if data:
-                    for line in str(data).splitlines():
-                        self._logger.info(f"AF_ROUTER_ERRORS: line - {str(line)}")
-                        line = str(line).strip()
-                        self._logger.info(f"AF_ROUTER_ERRORS: line after strip - {str(line)}")
-                        uQuery, uIquery, uStatus, uNotify, uUpdate, tQuery, tIquery, tStatus, tNotify, tUpdate = str(
-                            line).split()
-                        count += int(uQuery) + int(uIquery) + int(uNotify) + int(uUpdate) + int(uStatus) + int(
-                            tNotify) + int(tUpdate) + int(tIquery) + int(tQuery) + int(tStatus)
-                        self._logger.info(f"AF_ROUTER_ERRORS: count - {str(count)}")
-                    self._logger.info(f'AF_ROUTER_ERRORS: {str(count)}')
-                    self.add_kafka_kpi(kafka_data_source_builder, "AF_ROUTER_ERRORS", str(count), "OK")
-                else:
-                    self._logger.info(f'AF_ROUTER_ERRORS: {str(count)}')
-                    self.add_kafka_kpi(kafka_data_source_builder, "AF_ROUTER_ERRORS", str(count), "NO")
-            else:
+            if af_stats is None or not af_stats.filename:
                 self._logger.info('AF_ROUTER_ERRORS: No File Found!')
                 self.add_kafka_kpi(kafka_data_source_builder, "AF_ROUTER_ERRORS", "0", "NO")
+            elif af_stats.rows:
+                count = af_stats.column_sum(AF_ROUTER_TIMEOUT_COLUMNS)
+                self._logger.info(f'AF_ROUTER_ERRORS: {str(af_stats.filename)} last {len(af_stats.rows)} rows: {str(count)}')
+                self.add_kafka_kpi(kafka_data_source_builder, "AF_ROUTER_ERRORS", str(count), "OK")
+            else:
+                self._logger.info(f'AF_ROUTER_ERRORS: {str(af_stats.filename)} has no rows')
+                self.add_kafka_kpi(kafka_data_source_builder, "AF_ROUTER_ERRORS", "0", "NO")
 
             # 2. AF_ZONE_SYNC_ERRORS
-            # cmd = """/opt/af/bin/checkzones.pl | awk -F' ' '{print $2}' """
-            cmd = """opt/af/bin/checkzones.pl 2>/dev/null | awk {'print $2'} | sed "s/^ \+//g" | egrep -i 'main|no' | wc -l """
-            col_val, error = self.update_command(af, cmd, container)
-            col_val = str(col_val).strip() if col_val else None
-            # valid_val = ["OK", "Status", ""]
-            # val = tuple(1 for x in str(col_val).splitlines() if x not in valid_val)
+            col_val = af_stats.zone_sync_errors() if af_stats else None
             self._logger.info(f'AF_ZONE_SYNC_ERRORS: {str(col_val)}')
             if col_val is not None:
                 self.add_kafka_kpi(kafka_data_source_builder, "AF_ZONE_SYNC_ERRORS", str(col_val), "OK")
@@ -298,27 +295,26 @@ class KPI_AF:
                 self._logger.info(f'AF_MAIN_CPM_SYNC_ERROR_STATUS: {str(count)}')
                 self.add_kafka_kpi(kafka_data_source_builder, "AF_MAIN_CPM_SYNC_ERROR_STATUS", str(count), "OK")
 
+            # CPM reachability of the last 15 minutes, counted in one read
+            cpm_counts = {}
+            if main_af or passive_af:
+                cpm_counts = self.count_log_signatures(af, container, CPM_REACHABILITY_SIGNATURES) or {}
+
             # 5. POLARIS_CPM_REACHABILITY
             if main_af or passive_af:
-                cmd = """cat /var/log/warn | grep "No answer received from 10.201.186.253" | grep "$(date '+%Y-%m-%dT%H:%M' -d '15 minutes ago')" | wc -l """
-                count, error = self.update_command(af, cmd, container)
-                count = str(count).strip() if count else "0"
+                count = cpm_counts.get("POLARIS_CPM_REACHABILITY", 0)
                 self._logger.info(f'POLARIS_CPM_REACHABILITY: {str(count)}')
                 self.add_kafka_kpi(kafka_data_source_builder, "POLARIS_CPM_REACHABILITY", str(count), "OK")
 
             # 6. RIVERSIDE_CPM_REACHABILITY
             if main_af or passive_af:
-                cmd = """cat /var/log/warn | grep "No answer received from 10.163.80.253" | grep "$(date '+%Y-%m-%dT%H:%M' -d '15 minutes ago')" | wc -l """
-                count, error = self.update_command(af, cmd, container)
-                count = str(count).strip() if count else "0"
+                count = cpm_counts.get("RIVERSIDE_CPM_REACHABILITY", 0)
                 self._logger.info(f'RIVERSIDE_CPM_REACHABILITY: {str(count)}')
                 self.add_kafka_kpi(kafka_data_source_builder, "RIVERSIDE_CPM_REACHABILITY", str(count), "OK")
 
             # 7. TITAN_CPM_REACHABILITY
             if main_af or passive_af:
-                cmd = """cat /var/log/warn | grep "No answer received from 10.201.38.253" | grep "$(date '+%Y-%m-%dT%H:%M' -d '15 minutes ago')" | wc -l """
-                count, error = self.update_command(af, cmd, container)
-                count = str(count).strip() if count else "0"
+                count = cpm_counts.get("TITAN_CPM_REACHABILITY", 0)
                 self._logger.info(f'TITAN_CPM_REACHABILITY: {str(count)}')
                 self.add_kafka_kpi(kafka_data_source_builder, "TITAN_CPM_REACHABILITY", str(count), "OK")
 
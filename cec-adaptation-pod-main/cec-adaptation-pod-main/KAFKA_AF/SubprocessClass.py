@@ -1,8 +1,12 @@
 import subprocess
+import sys
 import os
 import signal
 from Logger import LoggingHandler
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from lib.exec_trace import exec_trace
+
 
 class SubprocessClass:
     def __init__(self):
@@ -11,8 +15,10 @@ class SubprocessClass:
     def execute_cmd(self, cmd):
         result = None
         try:
-            result = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = result.communicate()
+            with exec_trace.traced(cmd) as trace:
+                result = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out, err = result.communicate()
+                exec_trace.end(trace, result.returncode, out, err)
             out = out.decode("utf-8")
             err = err.decode("utf-8")
             if out:
@@ -28,8 +34,10 @@ class SubprocessClass:
     def execute_cmd_with_timeout(self, cmd, timeout):
         result = None
         try:
-            result = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = result.communicate(timeout=timeout)
+            with exec_trace.traced(cmd) as trace:
+                result = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out, err = result.communicate(timeout=timeout)
+                exec_trace.end(trace, result.returncode, out, err)
             out = out.decode("utf-8")
             err = err.decode("utf-8")
             if out:
@@ -52,8 +60,10 @@ class SubprocessClass:
 
     def execute_cmd_without_shell(self, cmd):
         try:
-            result = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = result.communicate()
+            with exec_trace.traced(cmd) as trace:
+                result = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out, err = result.communicate()
+                exec_trace.end(trace, result.returncode, out, err)
             out = out.decode("utf-8")
             err = err.decode("utf-8")
             if out == "":
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for AfPodStats against the output of the awk/egrep pipelines KPI_AF ran per pod before
+"""
+
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import AfPodStats
+from AfPodStats import AF_ROUTER_TIMEOUT_COLUMNS, AfPodStats as Stats, AfPodStatsCollector
+
+# Stats file with the timeout columns spread between other counters, and more rows than the tail
+HEADER = ["Time", "UDP:Query:Timeout", "UDP:Query:Ok", "UDP:Iquery:Timeout", "UDP:Status:Timeout",
+          "UDP:Notify:Timeout", "TCP:Query:Ok", "UDP:Update:Timeout", "TCP:Query:Timeout", "TCP:Iquery:Timeout",
+          "TCP:Status:Timeout", "TCP:Notify:Timeout", "TCP:Update:Timeout"]
+ROWS = [[f"12:{ix:02d}"] + [str((ix * 7 + col * 3) % 11) for col in range(1, len(HEADER))] for ix in range(20)]
+
+CHECKZONES_OUTPUT = [
+    "Zone                Status",
+    "example.com         OK",
+    "  internal.net      main",
+    "roaming.org         NO",
+    "mnp.example         Unknown",
+    "orphan",
+    "",
+    "ims.example         ok-synced",
+]
+
+# Old per-pod commands, run on the fixture to get the expected values
+OLD_AF_ROUTER_ERRORS = ("awk 'NR == 1 {for (i=1; i<=NF; i++) { col[$i] = i }} NR > 1 {print "
+                        + ", ".join(f'$col["{name}"]' for name in AF_ROUTER_TIMEOUT_COLUMNS)
+                        + "}' \"$1\" | tail -15")
+OLD_ZONE_SYNC = "cat \"$1\" | awk {'print $2'} | sed \"s/^ \\+//g\" | egrep -i 'main|no' | wc -l"
+
+
+def run_old(command, path):
+    return subprocess.run(["sh", "-c", command, "sh", path], capture_output=True, text=True, check=True).stdout
+
+
+@unittest.skipUnless(shutil.which("awk") and shutil.which("egrep"), "awk/egrep not available")
+class TestAfPodStats(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.stats_dir = os.path.join(self.work_dir, "named")
+        os.makedirs(self.stats_dir)
+        self.stats_path = os.path.join(self.stats_dir, "AFRouter-20261019")
+        self.write(self.stats_path, [HEADER] + ROWS)
+        # An older file, the in-pod script reads the newest one only
+        self.write(os.path.join(self.stats_dir, "AFRouter-20261018"), [HEADER] + [["99"] * len(HEADER)])
+        self.checkzones_path = os.path.join(self.work_dir, "checkzones.txt")
+        with open(self.checkzones_path, "w") as f:
+            f.write("\n".join(CHECKZONES_OUTPUT) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    @staticmethod
+    def write(path, rows):
+        with open(path, "w") as f:
+            f.write("\n".join(" ".join(row) for row in rows) + "\n")
+
+    def collected(self):
+        """Run the in-pod script locally against the fixture and parse its output"""
+        checkzones = os.path.join(self.work_dir, "checkzones.pl")
+        with open(checkzones, "w") as f:
+            f.write(f"#!/bin/sh\ncat {self.checkzones_path}\n")
+        os.chmod(checkzones, os.stat(checkzones).st_mode | stat.S_IXUSR)
+        with patch.object(AfPodStats, "AF_ROUTER_STATS_DIR", self.stats_dir), \
+                patch.object(AfPodStats, "CHECKZONES", checkzones):
+            script = AfPodStatsCollector("af", subprocess_obj=object()).script()
+        output = subprocess.run(["sh", "-c", script], capture_output=True, text=True, check=True).stdout
+        return AfPodStatsCollector.parse(output)
+
+    def test_af_router_errors_match_old_pipeline(self):
+        old = sum(int(value) for line in run_old(OLD_AF_ROUTER_ERRORS, self.stats_path).splitlines()
+                  for value in line.split())
+        stats = self.collected()
+        self.assertEqual(stats.filename, "AFRouter-20261019")
+        self.assertEqual(stats.header, HEADER)
+        self.assertEqual(stats.rows, ROWS[-15:])
+        self.assertEqual(stats.column_sum(AF_ROUTER_TIMEOUT_COLUMNS), old)
+
+    def test_zone_sync_errors_match_old_pipeline(self):
+        old = int(run_old(OLD_ZONE_SYNC, self.checkzones_path))
+        stats = self.collected()
+        self.assertEqual(stats.checkzones, CHECKZONES_OUTPUT)
+        self.assertEqual(stats.zone_sync_errors(), old)
+        self.assertEqual(old, 3)
+
+
+class TestAfPodStatsParse(unittest.TestCase):
+
+    def test_parse_sections(self):
+        output = ("@@af_pod_stats@@ file=AFRouter-1\n"
+                  "A B C\n"
+                  "1 2 3\n"
+                  "\n"
+                  "4 5 6\n"
+                  "@@af_pod_stats@@ checkzones\n"
+                  "zone1 OK\n"
+                  "zone2 NO\n")
+        stats = AfPodStatsCollector.parse(output)
+        self.assertEqual(stats, Stats("AFRouter-1", ["A", "B", "C"], [["1", "2", "3"], ["4", "5", "6"]],
+                                      ["zone1 OK", "zone2 NO"]))
+        self.assertEqual(stats.zone_sync_errors(), 1)
+
+    def test_parse_no_stats_file(self):
+        """No AFRouter-* file: no header or rows, every column sums to 0"""
+        stats = AfPodStatsCollector.parse("@@af_pod_stats@@ file=\n@@af_pod_stats@@ checkzones\n")
+        self.assertIsNone(stats.filename)
+        self.assertEqual((stats.header, stats.rows, stats.checkzones), ([], [], []))
+        self.assertEqual(stats.column_sum(AF_ROUTER_TIMEOUT_COLUMNS), 0)
+        self.assertEqual(stats.zone_sync_errors(), 0)
+
+    def test_parse_no_checkzones_section(self):
+        """A truncated exec output has no checkzones report, which is unknown rather than 0"""
+        stats = AfPodStatsCollector.parse("@@af_pod_stats@@ file=AFRouter-1\nA\n1\n")
+        self.assertEqual(stats.rows, [["1"]])
+        self.assertIsNone(stats.checkzones)
+        self.assertIsNone(stats.zone_sync_errors())
+
+    def test_column_sum_missing_column(self):
+        """A column the file does not have adds 0 instead of breaking the sum of the others"""
+        stats = Stats("AFRouter-1", ["A", "B"], [["1", "2"], ["3", "4"]], [])
+        self.assertEqual(stats.column("C"), [])
+        self.assertEqual(stats.column_sum(["A", "C"]), 4)
+        self.assertEqual(stats.column_sum(["A", "B", "C"]), 10)
+
+    def test_column_sum_short_and_non_numeric_rows(self):
+        """Rows cut short and non-integer values are skipped"""
+        stats = Stats("AFRouter-1", ["A", "B", "C"], [["1", "2", "3"], ["4"], ["5", "-", "x"], ["6", "7"]], [])
+        self.assertEqual(stats.column("B"), ["2", "-", "7"])
+        self.assertEqual(stats.column("C"), ["3", "x"])
+        self.assertEqual(stats.column_sum(["B", "C"]), 12)
+        self.assertEqual(stats.column_sum(["A"]), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,6 +31,23 @@ from Logger import LoggingHandler
 from SubprocessClass import SubprocessClass
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
+from lib.log_window.log_window_counter import LogWindowCounter
+
+EVENT_LOG = "/var/opt/fds/logs/event.log.0"
+EVENT_LOG_TIME_FORMAT = "%Y%m%d %H:%M"
+
+# Log signatures counted over a window ending now, one in-pod read per declaration
+MASTER_AF_SIGNATURES = LogWindowCounter(EVENT_LOG, {
+    "DomainNameNotExist": "DomainNameNotExist",
+    "AfNotReachable": "AfNotReachable",
+}, window_minutes=60, time_format=EVENT_LOG_TIME_FORMAT)
+EVENT_LOG_SIGNATURES_60_MIN = LogWindowCounter(EVENT_LOG, {
+    "AIR_CHECK_AF_NOT_REACHABLE_COUNT": "AfNotReachable",
+    "SDP_RPC_ERROR_COUNT": "SDP Error",
+}, window_minutes=60, time_format=EVENT_LOG_TIME_FORMAT, ignore_case=True)
+EVENT_LOG_SIGNATURES_15_MIN = LogWindowCounter(EVENT_LOG, {
+    "SUBSCRIBER_NOT_FOUND_COUNT": "subscriber not found",
+}, window_minutes=15, time_format=EVENT_LOG_TIME_FORMAT, ignore_case=True)
 
 
 class KPI_AIR:
@@ -88,36 +105,24 @@ class KPI_AIR:
         except Exception as err:
             self._logger.error("Exception in update_command ::: " + str(err))
 
+    def count_log_signatures(self, air, counter: LogWindowCounter):
+        try:
+            counts = counter.count_in_pod(self.subprocess_obj.execute_cmd, self.namespace, air, self.pod_container,
+                                          logger=self._logger)
+            self._logger.info(f"count_log_signatures() ::: {air} {counter.log_file} ::: {str(counts)}")
+            return counts
+        except Exception as err:
+            self._logger.error("Error in count_log_signatures() ::: " + str(err))
+
     def air_check_master_af(self, air):
         try:
-            # Getting 1 hour back datetime from current datetime in given format.
-            from_cmd = """date +%Y%m%d" "%H:%M -d "-1 hour" """
-            from_output, error = self.update_command(air, from_cmd)
-            # from_output = from_output.decode("utf-8")
-
-            # Getting current datetime in given format.
-            now_cmd = """date +%Y%m%d" "%H:%M """
-            now_output, error = self.update_command(air, now_cmd)
-            # now_output = now_output.decode("utf-8")
-
-            # Looking in log file for "DomainNameNotExist" count from current time to 1 hour back.
-            dn_cmd = f"""sed -n "/{from_output}/,/{now_output}/p" /var/opt/fds/logs/event.log.0 | grep "DomainNameNotExist" | wc -l """
-            dn_output, error = self.update_command(air, dn_cmd)
-            # dn_output = dn_output.decode("utf-8")
-
-            # Looking in log file for "AfNotReachable" count from current time to 1 hour back.
-            af_cmd = f"""sed -n "/{from_output}/,/{now_output}/p" /var/opt/fds/logs/event.log.0 | grep "AfNotReachable" | wc -l """
-            af_output, error = self.update_command(air, af_cmd)
-            # af_output = af_output.decode("utf-8")
-
-            # Calculating the sum of "DomainNameNotExist" count and "AfNotReachable" count.
-            cmd = f"echo {dn_output} echo {af_output}"
-            tdnaf_cmd = """%s | awk '{print $1+$2}' """ % cmd
-            tdnaf_output, error = self.update_command(air, tdnaf_cmd)
-            # tdnaf_output = tdnaf_output.decode("utf-8")
+            # Counting "DomainNameNotExist" and "AfNotReachable" from current time to 1 hour back in one read.
+            counts = self.count_log_signatures(air, MASTER_AF_SIGNATURES)
+            if counts is None:
+                return None
 
             # Returning the sum.
-            return tdnaf_output.replace("\n", "")
+            return str(counts["DomainNameNotExist"] + counts["AfNotReachable"])
         except Exception as err:
             self._logger.error("Error in air_check_master_af() ::: " + str(err))
 
@@ -184,11 +189,12 @@ class KPI_AIR:
             #     self._logger.error(f'AIR_CHECK_DOMAIN_NAME_NOT_EXIST_COUNT: {str(err)}')
             #     self.add_kafka_kpi(kafka_data_source_builder, "AIR_CHECK_DOMAIN_NAME_NOT_EXIST_COUNT", "None")
 
+            # Event log signatures of the last hour, counted in one read
+            event_log_counts = self.count_log_signatures(air, EVENT_LOG_SIGNATURES_60_MIN) or {}
+
             # AIR_CHECK_AF_NOT_REACHABLE_COUNT
             try:
-                p = """grep "$(date +'%Y%m%d %H:' -d '60 min ago')" /var/opt/fds/logs/event.log.0 |grep -i "AfNotReachable" | wc -l """
-                count, error = self.update_command(air, p)
-                count = str(count).strip() if count else None
+                count = event_log_counts.get("AIR_CHECK_AF_NOT_REACHABLE_COUNT")
                 self._logger.info('AIR_CHECK_AF_NOT_REACHABLE_COUNT: ' + str(count))
                 self.add_kafka_kpi(kafka_data_source_builder, "AIR_CHECK_AF_NOT_REACHABLE_COUNT", str(count))
             except Exception as err:
@@ -203,16 +209,13 @@ class KPI_AIR:
             self.add_kafka_kpi(kafka_data_source_builder, "CHECK_PROCESS", str(count))
 
             # SDP_RPC_ERROR_COUNT
-            p = """grep -i "SDP Error"  /var/opt/fds/logs/event.log.0 | fgrep "`date "+%Y%m%d %H"`" | wc -l """
-            count, error = self.update_command(air, p)
-            count = str(count).strip() if count else None
+            count = event_log_counts.get("SDP_RPC_ERROR_COUNT")
             self._logger.info(f'SDP_RPC_ERROR_COUNT: {str(count)}')
             self.add_kafka_kpi(kafka_data_source_builder, "SDP_RPC_ERROR_COUNT", str(count))
 
             # SUBSCRIBER_NOT_FOUND_COUNT
-            p = """grep "`date -d -15min +'%Y%m%d %H:%M'`" /var/opt/fds/logs/event.log.0 |grep -i "subscriber not found" | wc -l """
-            count, error = self.update_command(air, p)
-            count = str(count).strip() if count else None
+            counts = self.count_log_signatures(air, EVENT_LOG_SIGNATURES_15_MIN) or {}
+            count = counts.get("SUBSCRIBER_NOT_FOUND_COUNT")
             self._logger.info(f'SUBSCRIBER_NOT_FOUND_COUNT: {str(count)}')
             self.add_kafka_kpi(kafka_data_source_builder, "SUBSCRIBER_NOT_FOUND_COUNT", str(count))
 
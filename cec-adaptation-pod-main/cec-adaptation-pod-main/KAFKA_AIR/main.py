@@ -13,6 +13,7 @@ from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from lib.process_check.ProcessCheck import ProcessCheck
+from lib.exec_trace.exec_trace import ExecTraceRun
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
 from KAFKA_SENDER.main import process as kafka_process
 from lib.Namespace import get_application_namespace
@@ -193,7 +194,6 @@ def execute(pod, kafka_data_source_template, hostname, namespace, main_pod, scri
     kafka_data_source_builder = KafkaDataSourceBuilder(kafka_data_source_template)
     exit_code = kpi_air_obj.main((pod, kafka_data_source_builder, percentage))
     kafka_data_source_file_path = make_kafka_data_source_file_path(pod)
-    kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
     STATUS_FILE_PATH = os.path.join(ARCHIVE_DIR, f'{HOSTNAME}_{pod}_KPI.status.{TIMESTAMP}')
     kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), kafka_config_file_path,
                   STATUS_FILE_PATH, is_test_mode)
@@ -203,7 +203,6 @@ def execute_for_non_running_pods(pod, kafka_data_source_template, namespace, kaf
     kafka_data_source_builder = KafkaDataSourceBuilder(kafka_data_source_template)
     exit_code = send_kpi_for_down_pod(pod, namespace, kafka_data_source_builder, percentage)
     kafka_data_source_file_path = make_kafka_data_source_file_path(pod)
-    kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
     STATUS_FILE_PATH = os.path.join(ARCHIVE_DIR, f'{HOSTNAME}_{pod}_KPI.status.{TIMESTAMP}')
     kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), kafka_config_file_path,
                   STATUS_FILE_PATH, is_test_mode)
@@ -240,6 +239,8 @@ if __name__ == '__main__':
         make_dir(LOG_DIR)
         logger_obj = LoggingHandler(SCRIPT_DIR)
         logger = logger_obj.get_logger(__name__)
+        exec_trace_run = ExecTraceRun(os.path.basename(SCRIPT_DIR), os.path.join(LOG_DIR, "exec_trace"))
+        exec_trace_run.start()
         OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
         make_dir(OUTPUT_DIR)
         ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "archive")
@@ -258,6 +259,7 @@ if __name__ == '__main__':
         main(HOSTNAME, APP_NAMESPACE, POD, KAFKA_DATA_SOURCE_TEMPLATE, SCRIPT_DIR, OUTPUT_DIR, ARCHIVE_DIR, LOG_DIR,
              KAFKA_CONFIG_FILE_PATH, WHITELIST_ENABLED, WHITELIST_PODS_LIST, IS_TEST_MODE, MAX_PROCESSES, POD_CONTAINER,
              BLACKLIST_POD)
+        exec_trace_run.finish(logger)
         pc.stop()
     except Exception as ex:
         print("Failed execution", str(ex))
\ No newline at end of file
@@ -182,7 +182,6 @@ def main(namespace: str, pod: str, perf_data_files_local_dir, execution_period_m
         kpi_caf_obj.main(pod, namespace, hostname, ip, kafka_data_source_builder, ALARM_KPI_CONFIG, LATENCY_KPI_CONFIG,
                          SCRIPT_KPI_CONFIG, SUCCESS_KPI_CONFIG, COUNTER_KPI_CONFIG)
         kafka_data_source_file_path = make_kafka_data_source_file_path(pod, hostname)
-        kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
         kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), KAFKA_CONFIG_FILE_PATH,
                       STATUS_FILE_PATH, is_test_mode)
 
@@ -34,8 +34,7 @@ from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from lib.kpi_csv_aggregator.aggregator2 import Aggregator2, KpiAndValue, KpiDef, fs, Oper, CntType
-
-import lxml.etree as ET
+from lib.pm_store.pm_store import PmStore
 
 
 class KPI_CSA:
@@ -74,8 +73,7 @@ class KPI_CSA:
         self.pm_bulk_port = 22
         self.pm_bulk_name = None
         self.internal_ip = None
-        self.pm_csv_file = os.path.join(script_dir, "pm_file.csv")
-        self.measCollec_xsl = os.path.join(script_dir, "measCollec.xsl")
+        self.pm_store = PmStore()
 
     def format_kpi_value(self, value: float) -> str:
         if type(value) == int or value.is_integer():
@@ -161,31 +159,19 @@ class KPI_CSA:
         except Exception as e:
             logging.error("Exception in write_kpi ::: " + str(e))
 
-    def aggregate_pm_files_into_csv_file(self, csa, pm_file_paths: List[str]):
+    def load_pm_files(self, csa, pm_file_paths: List[str]):
         try:
-            if os.path.exists(self.pm_csv_file):
-                os.remove(self.pm_csv_file)
-
-            logging.info(f"Aggregating {len(pm_file_paths)} PM files into file: {self.pm_csv_file} <- {pm_file_paths}")
-
-            with open(self.pm_csv_file, "a") as fd:
-                for pm_file_path in pm_file_paths:
-                    dom = ET.parse(pm_file_path)
-                    xslt = ET.parse(self.measCollec_xsl)
-                    transform = ET.XSLT(xslt)
-                    new_dom = transform(dom)
-                    print(new_dom, file=fd)
+            logging.info(f"Loading {len(pm_file_paths)} PM files into the PM store <- {pm_file_paths}")
+            self.pm_store = PmStore.from_files(pm_file_paths)
+            logging.info(f"PM store holds {len(self.pm_store)} counters")
         except Exception as err:
-            logging.exception(f"Failed aggregating PM file into csv file")
+            logging.exception(f"Failed loading PM files into the PM store")
             return None
 
     def write_pm_kpis(self, interval_mins: int):
         logging.info(banner("Calculating KPIs"))
 
-        with open(self.pm_csv_file, 'r') as f:
-            data_lines = f.readlines()
-
-        agg = Aggregator2(interval_mins, data_lines)
+        agg = Aggregator2(interval_mins, store=self.pm_store)
 
         logging.info(f'Interval: {interval_mins} minutes')
 
@@ -648,5 +634,5 @@ class KPI_CSA:
         self.write_pod_status_kpi()
 
         file_paths = files_newer_that_mins(self.pm_files_local_dir, "*.xml", self.execution_period_mins)
-        self.aggregate_pm_files_into_csv_file(csa, file_paths)
+        self.load_pm_files(csa, file_paths)
         self.write_pm_kpis(self.execution_period_mins)
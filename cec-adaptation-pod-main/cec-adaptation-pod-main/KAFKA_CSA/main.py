@@ -109,7 +109,6 @@ def main(hostname: str, namespace: str, pod: str, perf_data_files_local_dir, exe
         kpi_csa_obj = KPI_CSA(SCRIPT_DIR, hostname, namespace, execution_period_mins, perf_data_files_local_dir, kafka_data_source_builder, is_test_mode)
         kpi_csa_obj.main(pod)
         kafka_data_source_file_path = make_kafka_data_source_file_path(pod)
-        kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
         kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), KAFKA_CONFIG_FILE_PATH, STATUS_FILE_PATH, is_test_mode)
 
     delete_files_older_than_days(ARCHIVE_DIR, 7)
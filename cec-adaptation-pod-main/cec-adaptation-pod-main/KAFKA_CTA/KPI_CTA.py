@@ -33,11 +33,10 @@ from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from lib.kpi_csv_aggregator.aggregator import Aggregator, KpiAndValue, KpiDef, fs, Oper, CntType
+from lib.pm_store.pm_store import PmStore
 
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
 
-import lxml.etree as ET
-import gzip
 
 
 class KPI_CTA:
@@ -76,8 +75,7 @@ class KPI_CTA:
         self.pm_bulk_name = None
         self.internal_ip = None
         self.GP = 300
-        self.pm_csv_file = os.path.join(script_dir, f"{namespace}_pm_file.csv")
-        self.measCollec_xsl = os.path.join(script_dir, "measCollec.xsl")
+        self.pm_store = PmStore()
 
     @staticmethod
     def format_kpi_value(value: float) -> str:
@@ -162,23 +160,13 @@ class KPI_CTA:
         except Exception as e:
             logging.error("Exception in write_kpi ::: " + str(e))
 
-    def aggregate_pm_files_into_csv_file(self, pm_bulk, pm_file_paths: List[str]):
+    def load_pm_files(self, pm_bulk, pm_file_paths: List[str]):
         try:
-            if os.path.exists(self.pm_csv_file):
-                os.remove(self.pm_csv_file)
-
-            logging.info(f"Aggregating {len(pm_file_paths)} PM files into file: {self.pm_csv_file} <- {pm_file_paths}")
-
-            with open(self.pm_csv_file, "a") as fd:
-                for pm_file_path in pm_file_paths:
-                    input_file_data = gzip.open(pm_file_path, 'r')
-                    dom = ET.parse(input_file_data)
-                    xslt = ET.parse(self.measCollec_xsl)
-                    transform = ET.XSLT(xslt)
-                    new_dom = transform(dom)
-                    print(new_dom, file=fd)
+            logging.info(f"Loading {len(pm_file_paths)} PM files of {self.namespace} into the PM store <- {pm_file_paths}")
+            self.pm_store = PmStore.from_files(pm_file_paths)
+            logging.info(f"PM store holds {len(self.pm_store)} counters")
         except Exception as err:
-            logging.exception(f"Failed aggregating PM file into csv file {str(err)}")
+            logging.exception(f"Failed loading PM files into the PM store {str(err)}")
             return None
 
     def write_pm_kpis(self, kafka_data_source_builder: KafkaDataSourceBuilder, interval_mins: int):
@@ -384,7 +372,7 @@ class KPI_CTA:
         #
         # PARSE DATA FILE
         #
-        agg.aggregate_counters(self.pm_csv_file)
+        agg.aggregate_store(self.pm_store)
 
         #
         # CALCULATE Simple KPIs and WRITE to Kafka file
@@ -659,5 +647,5 @@ class KPI_CTA:
         self.dsc_hostname_peer_kpi(kafka_data_source_builder, dsc_ip, dsc_user, dsc_pass)
 
         file_paths = files_newer_that_mins(self.pm_files_local_dir, "*.xml.*", self.execution_period_mins)
-        self.aggregate_pm_files_into_csv_file(pm_bulk, file_paths)
+        self.load_pm_files(pm_bulk, file_paths)
         self.write_pm_kpis(kafka_data_source_builder, self.execution_period_mins)
\ No newline at end of file
@@ -130,7 +130,6 @@ def main(hostname: str, namespace: str, pod: str, perf_data_files_local_dir, exe
     for pod in available_pods(namespace, pod):
         kpi_cta_obj.main(pod, kafka_data_source_builder, dsc_ip, dsc_user, dsc_pass)
         kafka_data_source_file_path = make_kafka_data_source_file_path(pod)
-        kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
         kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), KAFKA_CONFIG_FILE_PATH,
                       STATUS_FILE_PATH, is_test_mode)
 
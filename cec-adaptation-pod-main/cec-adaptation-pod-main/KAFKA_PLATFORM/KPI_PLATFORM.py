@@ -34,6 +34,9 @@ from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
 
 
 class KPI_PLATFORM:
+    # Upper bounds (%) of the node utilization histogram buckets; the last bucket runs to 100
+    UTILIZATION_BUCKETS = (50, 70, 80, 90)
+
     def __init__(self, hostname: str, script_dir: str, output_dir: str, archive_dir: str, log_dir: str):
         self.yesterdayYMD = datetime.strftime(datetime.now() - timedelta(1), '%Y-%m-%d')
         self.yesterdayYYMMDD = datetime.strftime(datetime.now() - timedelta(1), '%y-%m-%d')
@@ -85,33 +88,58 @@ class KPI_PLATFORM:
         kafka_data_source_builder.set_message_field("src_modified_dt", self.todayUTCMilli)
         kafka_data_source_builder.set_message_field("local_modified_dt", self.localNowMilli)
 
+    @classmethod
+    def bucket_labels(cls):
+        bounds = (0,) + cls.UTILIZATION_BUCKETS + (100,)
+        return [f"{lower}_{upper}" for lower, upper in zip(bounds, bounds[1:])]
+
+    @classmethod
+    def bucket_label(cls, percentage: int) -> str:
+        lower = 0
+        for upper in cls.UTILIZATION_BUCKETS:
+            if percentage < upper:
+                return f"{lower}_{upper}"
+            lower = upper
+        return f"{lower}_100"
+
+    def count_nodes(self, cem_dict, max_threshold_value):
+        """Threshold counters and utilization histograms for master and worker nodes in one pass."""
+        labels = self.bucket_labels()
+        counters = {}
+        histograms = {}
+        for node_type in ("master_node", "worker_node"):
+            for resource in ("cpu", "mem"):
+                counters[(node_type, resource)] = 0
+                histograms[(node_type, resource)] = dict.fromkeys(labels, 0)
+
+        for key, node in cem_dict.items():
+            if key == "cluster_name":
+                continue
+            try:
+                if node["node_type"] not in ("master_node", "worker_node"):
+                    continue
+                for resource in ("cpu", "mem"):
+                    percentage = node[f"{resource}_usage_percentage"]
+                    if percentage >= max_threshold_value:
+                        counters[(node["node_type"], resource)] += 1
+                    histograms[(node["node_type"], resource)][self.bucket_label(percentage)] += 1
+            except Exception as err:
+                self._logger.error(f"Exception while reading CEM_DICT ::: {str(err)}")
+        return counters, histograms
+
     def main(self, args_val):
         cmd = ""
-        wn_cpu_usage_counter = 0
-        wn_mem_usage_counter = 0
-        mn_cpu_usage_counter = 0
-        mn_mem_usage_counter = 0
         try:
             cem_dict = args_val[0]
             kafka_data_source_builder = args_val[1]
             max_threshold_value = args_val[2]
             self._logger.info(f" {str(args_val)}")
 
-            for key in cem_dict.keys():
-                try:
-                    if cem_dict[key]["node_type"] == "master_node":
-                        if cem_dict[key]["cpu_usage_percentage"] >= max_threshold_value:
-                            mn_cpu_usage_counter += 1
-                        if cem_dict[key]["mem_usage_percentage"] >= max_threshold_value:
-                            mn_mem_usage_counter += 1
-
-                    if cem_dict[key]["node_type"] == "worker_node":
-                        if cem_dict[key]["cpu_usage_percentage"] >= max_threshold_value:
-                            wn_cpu_usage_counter += 1
-                        if cem_dict[key]["mem_usage_percentage"] >= max_threshold_value:
-                            wn_mem_usage_counter += 1
-                except Exception as err:
-                    self._logger.error(f"Exception while reading CEM_DICT ::: {str(err)}")
+            counters, histograms = self.count_nodes(cem_dict, max_threshold_value)
+            mn_cpu_usage_counter = counters[("master_node", "cpu")]
+            mn_mem_usage_counter = counters[("master_node", "mem")]
+            wn_cpu_usage_counter = counters[("worker_node", "cpu")]
+            wn_mem_usage_counter = counters[("worker_node", "mem")]
 
             cluster_name = str(cem_dict["cluster_name"]).upper()
 
@@ -151,6 +179,15 @@ class KPI_PLATFORM:
             self._logger.info(f'{kpi_name}: {str(wn_mem_usage_counter)}')
             self.add_kafka_kpi(kafka_data_source_builder, kpi_name, str(wn_mem_usage_counter))
 
+            # Platform node utilization histograms, e.g. PLATFORM_NODE_CPU_UTIL_80_90_<CLUSTER>
+            for (node_type, resource), histogram in histograms.items():
+                role = "MASTER" if node_type == "master_node" else "NODE"
+                resource_name = "CPU" if resource == "cpu" else "MEMORY"
+                for bucket, count in histogram.items():
+                    kpi_name = f"PLATFORM_{role}_{resource_name}_UTIL_{bucket}_{cluster_name}"
+                    self.add_kafka_kpi(kafka_data_source_builder, kpi_name, str(count))
+            self._logger.info(f'Node utilization histograms: {str(histograms)}')
+
             self._logger.info("ALL KPI's Done")
         except Exception as err:
             self._logger.error(f"Exception in main ::: {str(cmd)} ::: {str(err)}")
@@ -0,0 +1,104 @@
+import json
+from typing import Dict, Optional
+
+from Logger import LoggingHandler
+from SubprocessClass import SubprocessClass
+
+MASTER_ROLE_LABELS = ("node-role.kubernetes.io/control-plane", "node-role.kubernetes.io/master")
+WORKER_ROLE_LABELS = ("node-role.kubernetes.io/worker",)
+
+_CPU_SUFFIXES = {"n": 1e-9, "u": 1e-6, "m": 1e-3}
+_MEMORY_SUFFIXES = {
+    "Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40, "Pi": 2 ** 50, "Ei": 2 ** 60,
+    "k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9, "T": 10 ** 12, "P": 10 ** 15, "E": 10 ** 18,
+}
+
+
+def parse_cpu(quantity: str) -> float:
+    """Kubernetes CPU quantity ("250m", "123456789n", "4") to cores."""
+    quantity = str(quantity).strip()
+    if quantity and quantity[-1] in _CPU_SUFFIXES:
+        return float(quantity[:-1]) * _CPU_SUFFIXES[quantity[-1]]
+    return float(quantity)
+
+
+def parse_memory(quantity: str) -> float:
+    """Kubernetes memory quantity ("8048204Ki", "16Gi", "1e9") to bytes."""
+    quantity = str(quantity).strip()
+    for suffix in sorted(_MEMORY_SUFFIXES, key=len, reverse=True):
+        if quantity.endswith(suffix):
+            return float(quantity[:-len(suffix)]) * _MEMORY_SUFFIXES[suffix]
+    return float(quantity)
+
+
+def node_type(node_name: str, labels: Dict) -> Optional[str]:
+    """master_node / worker_node from the node role labels, falling back to the mn/wn naming convention."""
+    if any(label in labels for label in MASTER_ROLE_LABELS):
+        return "master_node"
+    if any(label in labels for label in WORKER_ROLE_LABELS):
+        return "worker_node"
+    if "mn" in node_name:
+        return "master_node"
+    if "wn" in node_name:
+        return "worker_node"
+    return None
+
+
+class NodeMetricsCollector:
+    """Collects node utilization as structured JSON instead of parsing `kubectl top nodes` text.
+
+    The node list (roles and allocatable capacity) and the metrics API usage are read with one
+    `kubectl get --raw` each; the percentages are computed against allocatable like `kubectl top`.
+    """
+    NODES_CMD = "kubectl get --raw /api/v1/nodes"
+    METRICS_CMD = "kubectl get --raw /apis/metrics.k8s.io/v1beta1/nodes"
+
+    def __init__(self, subprocess_obj: SubprocessClass = None):
+        self._logger = LoggingHandler.get_logger(self.__class__.__name__)
+        self.subprocess_obj = subprocess_obj or SubprocessClass()
+
+    def get_json(self, cmd: str) -> Optional[Dict]:
+        output, error = self.subprocess_obj.execute_cmd(cmd)
+        if error or not output:
+            self._logger.error(f"Failed fetching {cmd} ::: {str(error)}")
+            return None
+        try:
+            return json.loads(output)
+        except ValueError as err:
+            self._logger.error(f"Failed parsing output of {cmd} ::: {str(err)}")
+            return None
+
+    def collect(self) -> Dict:
+        """Return {"cluster_name": ..., <node>: {"node_type", "cpu_usage_percentage", "mem_usage_percentage"}}."""
+        nodes = self.get_json(self.NODES_CMD)
+        metrics = self.get_json(self.METRICS_CMD)
+        if not nodes or not metrics:
+            return {}
+        return self.build_cem_dict(nodes, metrics)
+
+    def build_cem_dict(self, nodes: Dict, metrics: Dict) -> Dict:
+        allocatable = {}
+        labels = {}
+        for item in nodes.get("items", []):
+            name = item["metadata"]["name"]
+            labels[name] = item["metadata"].get("labels", {})
+            allocatable[name] = item.get("status", {}).get("allocatable", {})
+
+        cem_dict = {}
+        for item in metrics.get("items", []):
+            node_name = item["metadata"]["name"]
+            try:
+                usage = item["usage"]
+                capacity = allocatable.get(node_name)
+                if not capacity:
+                    self._logger.error(f"No allocatable capacity for node {node_name}")
+                    continue
+                cem_dict["cluster_name"] = node_name.split("-")[-2]
+                cem_dict[node_name] = {
+                    "node_type": node_type(node_name, labels.get(node_name, {})) or "",
+                    "cpu_usage_percentage": int(parse_cpu(usage["cpu"]) * 100 / parse_cpu(capacity["cpu"])),
+                    "mem_usage_percentage": int(parse_memory(usage["memory"]) * 100 / parse_memory(capacity["memory"])),
+                }
+            except Exception as err:
+                self._logger.error(f"Error while reading metrics of node {node_name} ::: {str(err)}")
+        return cem_dict
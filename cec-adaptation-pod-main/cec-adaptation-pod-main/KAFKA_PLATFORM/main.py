@@ -8,9 +8,11 @@ from typing import Dict
 
 from Logger import LoggingHandler
 from KPI_PLATFORM import KPI_PLATFORM
+from NodeMetrics import NodeMetricsCollector
 from SubprocessClass import SubprocessClass
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from lib.process_check.ProcessCheck import ProcessCheck
+from lib.exec_trace.exec_trace import ExecTraceRun
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
 from KAFKA_SENDER.main import process as kafka_process
 
@@ -63,42 +65,14 @@ def fetch_hostname():
 
 def available_pods() -> Dict:
     try:
-        cem_dict = {}
-        val_dict = {
-            "node_type": "",
-            "cpu_usage_percentage": 0,
-            "mem_usage_percentage": 0
-        }
-        cmd = f'kubectl top nodes --no-headers --use-protocol-buffers'
-        pods, error = subprocess_obj.execute_cmd(cmd)
-
-        if error:
-            logger.error(f'Failed fetching pods, cmd: {cmd}')
+        cem_dict = NodeMetricsCollector(subprocess_obj).collect()
+        if not cem_dict:
+            logger.error(f'No node metrics are found')
             return {}
-
-        if not pods:
-            logger.error(f'No pods are found')
-            return {}
-
-        for pod in pods.splitlines():
-            try:
-                node_name, cpu_usage, cpu_usage_percentage, mem_usage, mem_usage_percentage = pod.split(maxsplit=4)
-                if node_name != "" or node_name is not None:
-                    cluster_name = str(node_name).split("-")[-2]
-                    cem_dict.update({"cluster_name": cluster_name})
-                    if "mn" in node_name:
-                        val_dict["node_type"] = "master_node"
-                    elif "wn" in node_name:
-                        val_dict["node_type"] = "worker_node"
-                    val_dict["cpu_usage_percentage"] = int(str(cpu_usage_percentage).replace("%", ""))
-                    val_dict["mem_usage_percentage"] = int(str(mem_usage_percentage).replace("%", ""))
-                    cem_dict.update({str(node_name): val_dict})
-            except Exception as errr:
-                logger.error(f"Error while reading pods .... {str(errr)}")
-        logger.info(f'Available pods: {cem_dict}')
+        logger.info(f'Available nodes: {cem_dict}')
         return cem_dict
     except Exception as err:
-        logger.exception(f"Failed fetching pods : {str(err)}")
+        logger.exception(f"Failed fetching node metrics : {str(err)}")
 
 def make_kafka_data_source_file_path() -> str:
     today_timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -110,7 +84,6 @@ def execute(cem_dict, kafka_data_source_template, hostname, script_dir, output_d
     kafka_data_source_builder = KafkaDataSourceBuilder(kafka_data_source_template)
     kpi_platform_obj.main((cem_dict, kafka_data_source_builder, max_threshold_value))
     kafka_data_source_file_path = make_kafka_data_source_file_path()
-    kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
     kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), kafka_config_file_path, STATUS_FILE_PATH, is_test_mode)
 
 def main(hostname: str, kafka_data_source_template, script_dir: str, output_dir: str, archive_dir: str, log_dir: str, status_file_path: str, kafka_config_file_path: str, is_test_mode: bool, max_processes: int, max_threshold_value: int):
@@ -131,6 +104,8 @@ if __name__ == '__main__':
         make_dir(LOG_DIR)
         logger_obj = LoggingHandler(SCRIPT_DIR)
         logger = logger_obj.get_logger(__name__)
+        exec_trace_run = ExecTraceRun(os.path.basename(SCRIPT_DIR), os.path.join(LOG_DIR, "exec_trace"))
+        exec_trace_run.start()
         OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
         make_dir(OUTPUT_DIR)
         ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "archive")
@@ -146,6 +121,7 @@ if __name__ == '__main__':
         if WAIT:
             wait_to_start(WAIT_TO_START_SECS)
         main(HOSTNAME, KAFKA_DATA_SOURCE_TEMPLATE, SCRIPT_DIR, OUTPUT_DIR, ARCHIVE_DIR, LOG_DIR, STATUS_FILE_PATH, KAFKA_CONFIG_FILE_PATH, IS_TEST_MODE, MAX_PROCESSES, MAX_THRESHOLD_VALUE)
+        exec_trace_run.finish(logger)
         pc.stop()
     except Exception as ex:
         print("Failed execution", str(ex))
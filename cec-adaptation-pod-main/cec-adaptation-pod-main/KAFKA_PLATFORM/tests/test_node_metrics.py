@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the platform node metrics: quantity parsing, the CEM dict and the utilization histograms
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from NodeMetrics import NodeMetricsCollector, parse_cpu, parse_memory, node_type
+from KPI_PLATFORM import KPI_PLATFORM
+
+
+def node(name, cpu, memory, labels=None):
+    return {"metadata": {"name": name, "labels": labels or {}},
+            "status": {"allocatable": {"cpu": cpu, "memory": memory}}}
+
+
+def usage(name, cpu, memory):
+    return {"metadata": {"name": name}, "usage": {"cpu": cpu, "memory": memory}}
+
+
+NODES = {"items": [
+    node("ccd-c1-mn1", "4", "16Gi", {"node-role.kubernetes.io/control-plane": ""}),
+    node("ccd-c1-wn1", "16", "64Gi", {"node-role.kubernetes.io/worker": ""}),
+    node("ccd-c1-wn2", "16000m", "67108864Ki"),
+]}
+METRICS = {"items": [
+    usage("ccd-c1-mn1", "3600m", "4Gi"),
+    usage("ccd-c1-wn1", "4000000000n", "48Gi"),
+    usage("ccd-c1-wn2", "13", "62914560Ki"),
+]}
+
+
+class FakeSubprocess:
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def execute_cmd(self, cmd):
+        return self.outputs.get(cmd, (None, "not found"))
+
+
+class TestQuantities(unittest.TestCase):
+
+    def test_parse_cpu(self):
+        self.assertEqual(parse_cpu("4"), 4.0)
+        self.assertEqual(parse_cpu("250m"), 0.25)
+        self.assertAlmostEqual(parse_cpu("123456789n"), 0.123456789)
+        self.assertAlmostEqual(parse_cpu("1500u"), 0.0015)
+        self.assertEqual(parse_cpu(" 2.5 "), 2.5)
+
+    def test_parse_memory(self):
+        self.assertEqual(parse_memory("8048204Ki"), 8048204 * 1024)
+        self.assertEqual(parse_memory("16Gi"), 16 * 2 ** 30)
+        self.assertEqual(parse_memory("500M"), 500 * 10 ** 6)
+        self.assertEqual(parse_memory("1e9"), 1e9)
+        self.assertEqual(parse_memory("1024"), 1024.0)
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_cpu("")
+        with self.assertRaises(ValueError):
+            parse_memory("16Xi")
+
+    def test_node_type(self):
+        self.assertEqual(node_type("ccd-c1-node1", {"node-role.kubernetes.io/master": ""}), "master_node")
+        self.assertEqual(node_type("ccd-c1-mn1", {"node-role.kubernetes.io/worker": ""}), "worker_node")
+        self.assertEqual(node_type("ccd-c1-wn1", {}), "worker_node")
+        self.assertIsNone(node_type("ccd-c1-node1", {}))
+
+
+class TestNodeMetricsCollector(unittest.TestCase):
+
+    def collector(self, nodes=NODES, metrics=METRICS):
+        return NodeMetricsCollector(FakeSubprocess({
+            NodeMetricsCollector.NODES_CMD: (json.dumps(nodes), None),
+            NodeMetricsCollector.METRICS_CMD: (json.dumps(metrics), None),
+        }))
+
+    def test_build_cem_dict(self):
+        """Percentages against allocatable, like kubectl top; roles from labels, then node names"""
+        self.assertEqual(self.collector().collect(), {
+            "cluster_name": "c1",
+            "ccd-c1-mn1": {"node_type": "master_node", "cpu_usage_percentage": 90, "mem_usage_percentage": 25},
+            "ccd-c1-wn1": {"node_type": "worker_node", "cpu_usage_percentage": 25, "mem_usage_percentage": 75},
+            "ccd-c1-wn2": {"node_type": "worker_node", "cpu_usage_percentage": 81, "mem_usage_percentage": 93},
+        })
+
+    def test_node_without_allocatable_skipped(self):
+        metrics = {"items": METRICS["items"] + [usage("ccd-c1-wn3", "1", "1Gi")]}
+        self.assertNotIn("ccd-c1-wn3", self.collector().build_cem_dict(NODES, metrics))
+
+    def test_bad_usage_skipped(self):
+        metrics = {"items": [usage("ccd-c1-mn1", "lots", "4Gi"), METRICS["items"][1]]}
+        self.assertEqual(sorted(self.collector().build_cem_dict(NODES, metrics)), ["ccd-c1-wn1", "cluster_name"])
+
+    def test_metrics_api_unavailable(self):
+        collector = NodeMetricsCollector(FakeSubprocess({NodeMetricsCollector.NODES_CMD: (json.dumps(NODES), None)}))
+        self.assertEqual(collector.collect(), {})
+
+    def test_invalid_json(self):
+        """Output that is not JSON, e.g. a kubectl warning, is logged and treated as no data"""
+        collector = NodeMetricsCollector(FakeSubprocess({
+            NodeMetricsCollector.NODES_CMD: ("Unable to connect to the server", None),
+            NodeMetricsCollector.METRICS_CMD: (json.dumps(METRICS), None),
+        }))
+        self.assertIsNone(collector.get_json(NodeMetricsCollector.NODES_CMD))
+        self.assertEqual(collector.collect(), {})
+
+
+class TestCountNodes(unittest.TestCase):
+
+    def setUp(self):
+        self.kpi_platform = KPI_PLATFORM("node1", "/script", "/output", "/archive", "/log")
+
+    def test_bucket_label(self):
+        self.assertEqual(KPI_PLATFORM.bucket_labels(), ["0_50", "50_70", "70_80", "80_90", "90_100"])
+        self.assertEqual([KPI_PLATFORM.bucket_label(p) for p in (0, 49, 50, 79, 80, 90, 100)],
+                         ["0_50", "0_50", "50_70", "70_80", "80_90", "90_100", "90_100"])
+
+    def test_counters_and_histograms(self):
+        cem_dict = NodeMetricsCollector(FakeSubprocess({})).build_cem_dict(NODES, METRICS)
+        counters, histograms = self.kpi_platform.count_nodes(cem_dict, 80)
+
+        self.assertEqual(counters, {("master_node", "cpu"): 1, ("master_node", "mem"): 0,
+                                    ("worker_node", "cpu"): 1, ("worker_node", "mem"): 1})
+        self.assertEqual(histograms[("master_node", "cpu")], {"0_50": 0, "50_70": 0, "70_80": 0, "80_90": 0, "90_100": 1})
+        self.assertEqual(histograms[("master_node", "mem")], {"0_50": 1, "50_70": 0, "70_80": 0, "80_90": 0, "90_100": 0})
+        self.assertEqual(histograms[("worker_node", "cpu")], {"0_50": 1, "50_70": 0, "70_80": 0, "80_90": 1, "90_100": 0})
+        self.assertEqual(histograms[("worker_node", "mem")], {"0_50": 0, "50_70": 0, "70_80": 1, "80_90": 0, "90_100": 1})
+
+    def test_unknown_and_broken_nodes_skipped(self):
+        cem_dict = {
+            "cluster_name": "c1",
+            "ccd-c1-node1": {"node_type": "", "cpu_usage_percentage": 99, "mem_usage_percentage": 99},
+            "ccd-c1-wn1": {"node_type": "worker_node"},
+            "ccd-c1-wn2": {"node_type": "worker_node", "cpu_usage_percentage": 60, "mem_usage_percentage": 10},
+        }
+        counters, histograms = self.kpi_platform.count_nodes(cem_dict, 80)
+        self.assertEqual(set(counters.values()), {0})
+        self.assertEqual(sum(histograms[("worker_node", "cpu")].values()), 1)
+        self.assertEqual(histograms[("worker_node", "cpu")]["50_70"], 1)
+        self.assertEqual(sum(histograms[("master_node", "cpu")].values()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
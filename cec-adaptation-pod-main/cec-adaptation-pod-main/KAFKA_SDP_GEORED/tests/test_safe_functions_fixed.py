@@ -271,8 +271,8 @@ class TestSafeFunctions(unittest.TestCase):
                 
             self.assertIn('concurrent.futures', main_source, 
                          "main.py should import concurrent.futures")
-            self.assertIn('ProcessPoolExecutor', main_source, 
-                         "main.py should use ProcessPoolExecutor")
+            self.assertIn('ThreadPoolExecutor', main_source, 
+                         "main.py should use ThreadPoolExecutor")
                          
             print("✅ Concurrent futures support test passed")
         except Exception as e:
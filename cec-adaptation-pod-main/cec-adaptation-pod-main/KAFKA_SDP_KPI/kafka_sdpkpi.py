@@ -1,197 +1,137 @@
-#!/usr/bin/python
-
-import json
-# import requests
-from time import sleep
-import os, fnmatch
-import glob
-import sys, getopt
-import subprocess
-import socket
-import random
-from datetime import datetime
-
-
-#from kafka import KafkaProducer
-from kafka import SimpleProducer, KafkaClient
-
-#kafka_ip_pol = "10.253.130.118,10.253.130.114,10.253.130.117,10.253.130.116,10.253.130.119"
-#kafka_ip_titan = "10.255.129.151,10.255.129.152,10.255.129.147,10.255.129.148,10.255.129.149"
-kafka_ip_pol = "5.232.36.216"
-kafka_ip_titan = "5.232.36.216"
-
-#kafka_port = "9093"
-kafka_port = "9092"
-
-message_topic = "validation.svc_ss_incoming_msgs"
-#message_topic = "test-topic"
-
-def publish_message(client, value):
-    status = "SUCCESS"
-    try:
-        client.send_messages(message_topic,value.encode("UTF-8"))
-        print("Message published successfully.")
-
-    except Exception as e:
-        print("Exception in publishing message")
-        print(str(e))
-        status = "FAIL"
-
-    return status
-
-
-def create_kafka_client(in_ip):
-    client = None
-    try:
-        kafka = KafkaClient(in_ip+":"+kafka_port)
-        client = SimpleProducer(kafka)
-    except Exception as e:
-        print("Exception connecting Kafka")
-        print(str(e))
-
-    finally:
-        return client
-
-
-def executecmd(cmd):
-    result = subprocess.Popen(cmd, shell=True,stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    result.wait()
-    return result
-
-
-
-if __name__ == '__main__':
-
-    try:
-       opts, args = getopt.getopt(sys.argv[1:],"d:p:")
-    except getopt.GetoptError:
-       print "usage:  kafka_sdpkpi.py -d -p"
-       sys.exit(2)
-    for opt, arg in opts:
-       if opt == '-h':
-          print "usage:  kafka_sdpkpi.py -d -p"
-          sys.exit()
-       elif opt == "-d":
-          kafka_ip = arg
-       elif opt == "-p":
-          kafka_port = arg
-
-    #print kafka_ip, "  ", kafka_port
-
-    # read all files
-    filename_mask = "*.txt"
-    files = []
-    json_messages = []
-    host_name = socket.gethostname()
-    ips_pol = kafka_ip_pol.split(',')
-    ips_titan = kafka_ip_titan.split(',')
-
-    print(ips_pol)
-    print(ips_titan)
-
-    kafka_client_pol = []
-    kafka_client_titan = []
-
-
-    src_file = '/home/resolveSDP/output/%s_KPI.txt' % host_name
-    files.append(src_file)
-
-    for file in files:
-       with open(file) as fp:
-          lines = fp.readlines()
-
-       for line in lines:
-          #print line
-          fields = line.rstrip().split(",")
-          kpi_source = '%s > %s > %s' % (host_name,"KPI_SDP.py", fields[5]) 
-          kpi_info = host_name + ' ' + socket.gethostbyname(host_name)
-
-          kpi_result = "UNDEFINED"
-          kpi_value = fields[2].strip()
-          if len(kpi_value) == 0 or kpi_value == "NODATA":
-             kpi_result = "NO-DATA"
-             kpi_value = "0"
-
-          message = { 
-                "category": "UNDEFINED", 
-                "config_item": host_name,
-                "kpi_info": kpi_info,
-                "kpi_last_updated_date": fields[4],
-                "kpi_name": fields[1],
-                "kpi_result": kpi_result,
-                "kpi_source": kpi_source,
-                "kpi_value": kpi_value,
-                "platform": "UNDEFINED",
-                "source_owner": "Tier2_CC",
-                "src_modified_dt": int(fields[6]),
-                "local_modified_dt": int(fields[7]),
-                "ref_id": str(random.randint(1,10000000))
-          }
-
-          json_messages.append(json.dumps(message))
-
-          #message['ref_id'] = str(random.randint(1,10000000))
-          #json_messages_titan.append(json.dumps(message))
-
-
-    #print json_messages
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    archiveFile="/home/resolveSDP/archive/%s_KPI.status.%s" % (host_name,timestamp)
-    fileWriter = open(archiveFile, "w")
-
-    if len(json_messages) > 0:
-        for ip in ips_pol:
-            client_pol = create_kafka_client(ip)
-            kafka_client_pol.append(client_pol)
-
-        for ip in ips_titan:
-            #kafka_ip = ip
-            client_titan = create_kafka_client(ip)
-            kafka_client_titan.append(client_titan)
-
-        final_status = 'SUCCESS'
-        for message in json_messages:
-            final_status = 'SUCCESS'
-            print message
-            result = ''
-
-            # Polaris
-            for client in kafka_client_pol:
-               if not client is None:
-                   result = publish_message(client, message)
-                   if 'FAIL' == result:
-                       print("Polaris FAIL")
-                       final_status = 'FAIL'
-                   else:
-                       print("Polaris successful")
-               else:
-                   print("Polaris FAIL")
-                   final_status = 'FAIL'
-
-            # Titan
-            for client in kafka_client_titan:
-               if not client is None:
-                   result = publish_message(client, message)
-                   if 'FAIL' == result:
-                       print("Titan FAIL")
-                       final_status = 'FAIL'
-                   else:
-                       print("Titan successful")
-               else:
-                   print("Titan FAIL")
-                   final_status = 'FAIL'
-
-
-            fileWriter.write(str(message) + ".%s\n" % final_status)
-
-        for client in kafka_client_pol:
-           if client is not None:
-               client.stop()
-
-        for client in kafka_client_titan:
-           if client is not None:
-               client.stop()
-
-    fileWriter.close()
-    subprocess.call("mv %s /home/resolveSDP/archive/%s_KPI.txt.%s" % (src_file,host_name,timestamp), shell=True)
-[root@VCCSDPBL04A resolveSDP]#
+#!/usr/bin/python3
+"""
+Publishes the SDP KPI file of this host (<kpi_source>/<host>_KPI.txt) to the Polaris and Titan Kafka
+clusters, writes the status of every message to <archive_path>/<host>_KPI.status.<timestamp> and
+archives the KPI file next to it.
+
+Each cluster gets one producer bootstrapped from all of its brokers, which takes the whole file as one
+batch behind the cluster's circuit breaker (KAFKA_SENDER publish_to_cluster): the producer partitions
+and batches the records, an unreachable cluster costs at most one timeout per run instead of one per
+broker and message, and the records it did not acknowledge are spooled under spool/ and replayed
+once it is back.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import sys
+from datetime import datetime
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from KAFKA_SENDER.main import load_outage_options, publish_to_cluster, final_status, SUCCESS_STATUS, USE_KAFKA_PYTHON_2
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(SCRIPT_DIR, 'config.json')
+
+
+def load_config(config_file_path: str):
+    with open(config_file_path, 'r') as f:
+        j = json.load(f)
+
+    kafka_config = j['kafka_config']
+    kafka_clusters = [('Polaris', kafka_config['polaris_ips']), ('Titan', kafka_config['titan_ips'])]
+    kafka_port = kafka_config['port']
+    message_topic = kafka_config['topic']
+    timeout_secs = kafka_config.get('timeout_secs', 3)
+    outage_options = load_outage_options(kafka_config, os.path.join(SCRIPT_DIR, 'spool'))
+
+    return kafka_clusters, kafka_port, message_topic, timeout_secs, outage_options, j['input_paths']
+
+
+def build_messages(kpi_file_path: str, host_name: str) -> List[str]:
+    host_ip = socket.gethostbyname(host_name)
+    messages = []
+
+    with open(kpi_file_path) as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            fields = line.rstrip().split(",")
+            kpi_source = '%s > %s > %s' % (host_name, "KPI_SDP.py", fields[5])
+            kpi_info = host_name + ' ' + host_ip
+
+            kpi_result = "UNDEFINED"
+            kpi_value = fields[2].strip()
+            if len(kpi_value) == 0 or kpi_value == "NODATA":
+                kpi_result = "NO-DATA"
+                kpi_value = "0"
+
+            message = {
+                "category": "UNDEFINED",
+                "config_item": host_name,
+                "kpi_info": kpi_info,
+                "kpi_last_updated_date": fields[4],
+                "kpi_name": fields[1],
+                "kpi_result": kpi_result,
+                "kpi_source": kpi_source,
+                "kpi_value": kpi_value,
+                "platform": "UNDEFINED",
+                "source_owner": "Tier2_CC",
+                "src_modified_dt": int(fields[6]),
+                "local_modified_dt": int(fields[7]),
+                "ref_id": str(random.randint(1, 10000000))
+            }
+            messages.append(json.dumps(message))
+
+    return messages
+
+
+def publish(messages: List[str], kafka_clusters, kafka_port, message_topic, timeout_secs, outage_options,
+            is_test_mode: bool) -> List[str]:
+    """Final status per message: SUCCESS when every cluster acknowledged it, SPOOLED when one still has to."""
+    statuses_by_cluster = [publish_to_cluster(cluster_name, server_ips, messages, kafka_port, message_topic,
+                                              timeout_secs, outage_options, is_test_mode)
+                           for cluster_name, server_ips in kafka_clusters]
+
+    return [final_status(list(statuses)) for statuses in zip(*statuses_by_cluster)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Publish the SDP KPI file of this host to Kafka")
+    parser.add_argument('-d', '--kafka-ips', help='Comma separated broker IPs, used for both clusters instead of config.json')
+    parser.add_argument('-p', '--kafka-port', help='Broker port instead of config.json')
+    parser.add_argument('-c', '--config', default=CONFIG_FILE_PATH, help='Configuration file path')
+    parser.add_argument('-t', '--test', action='store_true', default=False, help='Run script in test mode')
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    args = parse_args()
+    if USE_KAFKA_PYTHON_2:
+        # Without kafka3 KAFKA_SENDER only has a placeholder KafkaProducer for its Python 2 sender;
+        # publish_to_cluster would get no client and spool every message without an error
+        logging.error("kafka3 cannot be imported, install requirements.txt; KPI file not published")
+        sys.exit(1)
+
+    kafka_clusters, kafka_port, message_topic, timeout_secs, outage_options, input_paths = load_config(args.config)
+    if args.kafka_ips:
+        kafka_clusters = [(cluster_name, args.kafka_ips.split(',')) for cluster_name, _ in kafka_clusters]
+    if args.kafka_port:
+        kafka_port = args.kafka_port
+
+    host_name = socket.gethostname()
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    src_file = os.path.join(input_paths['kpi_source'], '%s_KPI.txt' % host_name)
+    archive_dir = input_paths['archive_path']
+
+    for cluster_name, server_ips in kafka_clusters:
+        logging.info(f"{cluster_name} brokers: {server_ips}")
+
+    messages = build_messages(src_file, host_name)
+
+    with open(os.path.join(archive_dir, '%s_KPI.status.%s' % (host_name, timestamp)), 'w') as status_file_writer:
+        if len(messages) > 0:
+            statuses = publish(messages, kafka_clusters, kafka_port, message_topic, timeout_secs, outage_options, args.test)
+            for message, status in zip(messages, statuses):
+                status_file_writer.write(message + ".%s\n" % status)
+            logging.info(f"{statuses.count(SUCCESS_STATUS)} of {len(messages)} KPI messages published to every cluster")
+
+    os.replace(src_file, os.path.join(archive_dir, '%s_KPI.txt.%s' % (host_name, timestamp)))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ import sys
 import os
 import tempfile
 import json
+import shutil
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to the path to import the module
@@ -50,5 +51,129 @@ class TestKafkaSDPKPI(unittest.TestCase):
             self.assertIn('module_name', config)
             self.assertEqual(config['module_name'], 'KAFKA_SDP_KPI')
 
+
+KPI_LINES = [
+    "1,SDP_CCR_SUCCESS_RATE,99.5,3,2024-01-15 10:00,SDP_KPI_1,1705312800,1705312860",
+    "",
+    "2,SDP_CCR_ATTEMPTS,NODATA,3,2024-01-15 10:00,SDP_KPI_2,1705312800,1705312860",
+    "3,SDP_CCR_FAILURES, ,3,2024-01-15 10:00,SDP_KPI_3,1705312800,1705312860",
+]
+
+
+class _Future:
+    def get(self, timeout=None):
+        return None
+
+
+class FakeKafkaProducer:
+    """kafka3 KafkaProducer stand-in: brokers in `unreachable` fail every send."""
+    unreachable = set()
+    sent = []
+
+    def __init__(self, bootstrap_servers, **kwargs):
+        self.bootstrap_servers = bootstrap_servers
+
+    def send(self, topic, value):
+        if set(self.bootstrap_servers) & self.unreachable:
+            raise TimeoutError("Failed to update metadata")
+        self.sent.append((tuple(self.bootstrap_servers), topic, value.decode("UTF-8")))
+        return _Future()
+
+    def close(self):
+        pass
+
+
+class TestKafkaSDPKPIPublish(unittest.TestCase):
+    """build_messages, publish and main against a fake producer"""
+
+    def setUp(self):
+        import kafka_sdpkpi
+        from KAFKA_SENDER import main as kafka_sender
+        self.kafka_sdpkpi = kafka_sdpkpi
+        self.work_dir = tempfile.mkdtemp()
+        self.kpi_file = os.path.join(self.work_dir, "sdp1_KPI.txt")
+        with open(self.kpi_file, "w") as f:
+            f.write("\n".join(KPI_LINES) + "\n")
+        FakeKafkaProducer.unreachable = set()
+        FakeKafkaProducer.sent = []
+        for patcher in (patch.object(kafka_sender, "KafkaProducer", FakeKafkaProducer),
+                        patch.object(kafka_sdpkpi.socket, "gethostbyname", lambda name: "10.1.2.3")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.outage_options = kafka_sdpkpi.load_outage_options({}, os.path.join(self.work_dir, "spool"))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_build_messages(self):
+        messages = [json.loads(message) for message in self.kafka_sdpkpi.build_messages(self.kpi_file, "sdp1")]
+        self.assertEqual(len(messages), 3)
+        first = dict(messages[0])
+        self.assertTrue(first.pop("ref_id").isdigit())
+        self.assertEqual(first, {
+            "category": "UNDEFINED", "config_item": "sdp1", "kpi_info": "sdp1 10.1.2.3",
+            "kpi_last_updated_date": "2024-01-15 10:00", "kpi_name": "SDP_CCR_SUCCESS_RATE", "kpi_result": "UNDEFINED",
+            "kpi_source": "sdp1 > KPI_SDP.py > SDP_KPI_1", "kpi_value": "99.5", "platform": "UNDEFINED",
+            "source_owner": "Tier2_CC", "src_modified_dt": 1705312800, "local_modified_dt": 1705312860})
+        self.assertEqual([(m["kpi_result"], m["kpi_value"]) for m in messages[1:]], [("NO-DATA", "0"), ("NO-DATA", "0")])
+
+    def test_publish_every_cluster(self):
+        messages = self.kafka_sdpkpi.build_messages(self.kpi_file, "sdp1")
+        clusters = [("Polaris", ["10.0.0.1", "10.0.0.2"]), ("Titan", ["10.0.1.1"])]
+        statuses = self.kafka_sdpkpi.publish(messages, clusters, 9092, "kpi", 3, self.outage_options, False)
+        self.assertEqual(statuses, ["SUCCESS"] * 3)
+        # One producer per cluster, bootstrapped from all of its brokers
+        self.assertEqual(sorted({servers for servers, _, _ in FakeKafkaProducer.sent}),
+                         [("10.0.0.1:9092", "10.0.0.2:9092"), ("10.0.1.1:9092",)])
+        self.assertEqual([value for _, _, value in FakeKafkaProducer.sent], messages + messages)
+
+    def test_publish_unreachable_cluster_spools(self):
+        """Messages a cluster did not acknowledge are spooled for it and reported SPOOLED"""
+        FakeKafkaProducer.unreachable = {"10.0.1.1:9092"}
+        messages = self.kafka_sdpkpi.build_messages(self.kpi_file, "sdp1")
+        clusters = [("Polaris", ["10.0.0.1"]), ("Titan", ["10.0.1.1"])]
+        statuses = self.kafka_sdpkpi.publish(messages, clusters, 9092, "kpi", 3, self.outage_options, False)
+        self.assertEqual(statuses, ["SPOOLED"] * 3)
+        self.assertTrue(os.listdir(os.path.join(self.work_dir, "spool", "Titan")))
+
+    def test_publish_test_mode(self):
+        messages = self.kafka_sdpkpi.build_messages(self.kpi_file, "sdp1")
+        statuses = self.kafka_sdpkpi.publish(messages, [("Polaris", ["10.0.0.1"])], 9092, "kpi", 3,
+                                             self.outage_options, True)
+        self.assertEqual(statuses, ["SUCCESS"] * 3)
+        self.assertEqual(FakeKafkaProducer.sent, [])
+
+    def run_main(self):
+        archive_dir = os.path.join(self.work_dir, "archive")
+        os.makedirs(archive_dir)
+        config_path = os.path.join(self.work_dir, "config.json")
+        with open(config_path, "w") as f:
+            json.dump({"kafka_config": {"polaris_ips": ["10.0.0.1"], "titan_ips": ["10.0.1.1"], "port": "9092",
+                                        "topic": "kpi", "spool_dir": os.path.join(self.work_dir, "spool")},
+                       "input_paths": {"kpi_source": self.work_dir, "archive_path": archive_dir}}, f)
+        with patch.object(sys, "argv", ["kafka_sdpkpi.py", "-c", config_path]), \
+                patch.object(self.kafka_sdpkpi.socket, "gethostname", lambda: "sdp1"):
+            self.kafka_sdpkpi.main()
+        return archive_dir
+
+    def test_main_publishes_and_archives(self):
+        with patch.object(self.kafka_sdpkpi, "USE_KAFKA_PYTHON_2", False):
+            archive_dir = self.run_main()
+        archived = sorted(os.listdir(archive_dir))
+        self.assertEqual([name.rsplit(".", 1)[0] for name in archived], ["sdp1_KPI.status", "sdp1_KPI.txt"])
+        with open(os.path.join(archive_dir, archived[0])) as f:
+            self.assertEqual([line.rsplit(".", 1)[1] for line in f.read().splitlines()], ["SUCCESS"] * 3)
+        self.assertFalse(os.path.exists(self.kpi_file))
+
+    def test_main_fails_without_kafka3(self):
+        """Without kafka3 main exits before publishing anything, and the KPI file stays for the next run"""
+        with patch.object(self.kafka_sdpkpi, "USE_KAFKA_PYTHON_2", True):
+            with self.assertRaises(SystemExit) as raised:
+                self.run_main()
+        self.assertEqual(raised.exception.code, 1)
+        self.assertTrue(os.path.exists(self.kpi_file))
+        self.assertEqual(os.listdir(os.path.join(self.work_dir, "archive")), [])
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -32,6 +32,18 @@ from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
+from lib.log_window.log_window_counter import LogWindowCounter
+
+# Error signatures counted over the last 15 minutes, one in-pod read per log file
+DATABASE_LOCK_ERROR_SIGNATURES = LogWindowCounter("/var/opt/fds/logs/cPSCTrafficHandler.log.0", {
+    "DATABASE_LOCK_ERRORS": "DATABASE_LOCK_CONTENTION",
+}, window_minutes=15, ignore_case=True)
+DATABASE_LOCK_TIMEOUT_SIGNATURES = LogWindowCounter("/var/opt/fds/logs/EventLogFile.txt.0", {
+    "DATABASE_LOCK_TIMEOUTS": "timeout event due to account lock",
+}, window_minutes=15, ignore_case=True)
+REJECTION_SIGNATURES = LogWindowCounter("/var/opt/fds/logs/cPSCCIPDiameter.log.0", {
+    "REJECTION_COUNT_FROM_LOGS": "reject",
+}, window_minutes=15, ignore_case=True)
 
 
 class KPI_SDP:
@@ -89,6 +101,15 @@ class KPI_SDP:
         except Exception as err:
             self._logger.error("Exception in update_command ::: " + str(err))
 
+    def count_log_signatures(self, sdp, counter: LogWindowCounter):
+        try:
+            counts = counter.count_in_pod(self.subprocess_obj.execute_cmd, self.namespace, sdp, self.pod_container,
+                                          logger=self._logger)
+            self._logger.info(f"{sdp}: {counter.log_file} counts: {str(counts)}")
+            return counts
+        except Exception as err:
+            self._logger.error("Exception in count_log_signatures ::: " + str(err))
+
     def GetCIP_PeerStat(self, sdp, thread_counter, user, passwd, host):
         try:
             # CIP/Member1
@@ -214,16 +235,14 @@ END"""
                 self.add_kafka_kpi(kafka_data_source_builder, "CIP_LINK_DOWN_COUNT", "0")
 
             # DATABASE_LOCK_ERRORS
-            cmd = """grep -i "DATABASE_LOCK_CONTENTION" /var/opt/fds/logs/cPSCTrafficHandler.log.0 | grep "`date +"%Y%m%d"`"|awk -F" " -v y=`date -d '15 min ago' +"%H%M%S"` '{split($2,a,":"); x=a[1]a[2]a[3] ;if(x > y ){print $0}}'| wc -l """
-            count, error = self.update_command(sdp, cmd)
-            count = str(count).strip() if count else None
+            counts = self.count_log_signatures(sdp, DATABASE_LOCK_ERROR_SIGNATURES)
+            count = counts["DATABASE_LOCK_ERRORS"] if counts else None
             self._logger.info(f'DATABASE_LOCK_ERRORS: {str(count)}')
             self.add_kafka_kpi(kafka_data_source_builder, "DATABASE_LOCK_ERRORS", str(count))
 
             # DATABASE_LOCK_TIMEOUTS
-            cmd = """grep -i "timeout event due to account lock" /var/opt/fds/logs/EventLogFile.txt.0 | grep "`date +"%Y%m%d"`"|awk -F" " -v y=`date -d '15 min ago' +"%H%M%S"` '{split($2,a,":"); x=a[1]a[2]a[3] ;if(x > y ){print $0}}' | wc -l """
-            count, error = self.update_command(sdp, cmd)
-            count = str(count).strip() if count else None
+            counts = self.count_log_signatures(sdp, DATABASE_LOCK_TIMEOUT_SIGNATURES)
+            count = counts["DATABASE_LOCK_TIMEOUTS"] if counts else None
             self._logger.info(f'DATABASE_LOCK_TIMEOUTS: {str(count)}')
             self.add_kafka_kpi(kafka_data_source_builder, "DATABASE_LOCK_TIMEOUTS", str(count))
 
@@ -375,9 +394,8 @@ END"""
             self.add_kafka_kpi(kafka_data_source_builder, "PROCESSES_DOWN_COUNT", str(count))
 
             # REJECTION_COUNT_FROM_LOGS
-            cmd = """grep -i "reject" /var/opt/fds/logs/cPSCCIPDiameter.log.0 | grep "`date +"%Y%m%d"`"|awk -F" " -v y=`date -d '15 min ago' +"%H%M%S"` '{split($2,a,":"); x=a[1]a[2]a[3] ;if(x > y ){print $0}}' | wc -l """
-            count, error = self.update_command(sdp, cmd)
-            count = str(count).strip() if count else None
+            counts = self.count_log_signatures(sdp, REJECTION_SIGNATURES)
+            count = counts["REJECTION_COUNT_FROM_LOGS"] if counts else None
             self._logger.info(f'REJECTION_COUNT_FROM_LOGS: {str(count)}')
             self.add_kafka_kpi(kafka_data_source_builder, "REJECTION_COUNT_FROM_LOGS", str(count))
 
@@ -13,8 +13,9 @@ from SubprocessClass import SubprocessClass
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from lib.process_check.ProcessCheck import ProcessCheck
+from lib.exec_trace.exec_trace import ExecTraceRun
 from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
-from KAFKA_SENDER.main import process as kafka_process
+from KAFKA_SENDER.main import process as kafka_process, process_all as kafka_process_all
 
 
 def timestamp() -> str:
@@ -134,29 +135,50 @@ def make_kafka_data_source_file_path(pod) -> str:
     return kafka_file_path
 
 
-def execute(pod, counter, kafka_data_source_template, hostname, namespace, main_pod, script_dir, output_dir,
-            archive_dir, log_dir, kafka_config_file_path, is_test_mode, pod_container):
+def collect(pod, counter, kafka_data_source_template, hostname, namespace, main_pod, script_dir, output_dir,
+            archive_dir, log_dir, pod_container):
+    """KPI data source of one pod; its execs run one after another on the calling thread."""
     kpi_sdp_obj = KPI_SDP(hostname, namespace, main_pod, script_dir, output_dir,
                           archive_dir, log_dir, pod_container)
-    kafka_data_source_builder = KafkaDataSourceBuilder(kafka_data_source_template)
+    # set_message_field fills in the template, and the pod threads share kafka_data_source_template
+    kafka_data_source_builder = KafkaDataSourceBuilder(dict(kafka_data_source_template))
     kpi_sdp_obj.main((pod, counter, kafka_data_source_builder))
-    kafka_data_source_file_path = make_kafka_data_source_file_path(pod)
-    kafka_data_source_builder.write_to_file(kafka_data_source_file_path)
-    STATUS_FILE_PATH = os.path.join(ARCHIVE_DIR, f'{HOSTNAME}_{pod}_KPI.status.{TIMESTAMP}')
-    kafka_process(kafka_data_source_file_path, kafka_data_source_builder.data_source(), kafka_config_file_path,
-                  STATUS_FILE_PATH, is_test_mode)
+    return kafka_data_source_builder.data_source()
+
+
+def make_status_file_path(pod) -> str:
+    return os.path.join(ARCHIVE_DIR, f'{HOSTNAME}_{pod}_KPI.status.{TIMESTAMP}')
+
+
+def execute(pod, counter, kafka_data_source_template, hostname, namespace, main_pod, script_dir, output_dir,
+            archive_dir, log_dir, kafka_config_file_path, is_test_mode, pod_container):
+    data_source = collect(pod, counter, kafka_data_source_template, hostname, namespace, main_pod, script_dir,
+                          output_dir, archive_dir, log_dir, pod_container)
+    kafka_process(make_kafka_data_source_file_path(pod), data_source, kafka_config_file_path,
+                  make_status_file_path(pod), is_test_mode)
 
 
 def main(hostname: str, namespace: str, main_pod: str, kafka_data_source_template, script_dir: str, output_dir: str,
          archive_dir: str, log_dir: str, kafka_config_file_path: str, whitelist_enabled: str, whitelist_pod_list: list,
          is_test_mode: bool, max_processes: int, pod_container: str, blacklist_pod_list):
-    # Running all air kpi's
-    counter = 0
-    with concurrent.futures.ProcessPoolExecutor(max_processes) as exe:
-        for pod in available_pods(namespace, main_pod, whitelist_enabled, whitelist_pod_list, blacklist_pod_list):
-            exe.submit(execute, pod, counter, kafka_data_source_template, hostname, namespace, main_pod, script_dir,
-                       output_dir, archive_dir, log_dir, kafka_config_file_path, is_test_mode, pod_container)
-            counter += 1
+    # The pods are collected on threads: a pod spends its time waiting on kubectl exec, so with a thread
+    # per pod (up to max_processes) the cycle takes as long as the slowest pod. Their data sources are
+    # then published together, one batch per Kafka cluster.
+    pods = available_pods(namespace, main_pod, whitelist_enabled, whitelist_pod_list, blacklist_pod_list)
+    data_sources = []
+    with concurrent.futures.ThreadPoolExecutor(max(1, min(len(pods), max_processes))) as exe:
+        futures = [(pod, exe.submit(collect, pod, counter, kafka_data_source_template, hostname, namespace, main_pod,
+                                    script_dir, output_dir, archive_dir, log_dir, pod_container))
+                   for counter, pod in enumerate(pods)]
+        for pod, future in futures:
+            try:
+                data_sources.append((make_kafka_data_source_file_path(pod), future.result(), make_status_file_path(pod)))
+            except Exception as err:
+                logger.exception(f"Failed collecting KPIs, pod: {pod}: {str(err)}")
+    logger.info(f"KPIs collected from {len(data_sources)} of {len(pods)} pods")
+
+    if data_sources:
+        kafka_process_all(data_sources, kafka_config_file_path, is_test_mode)
     logger.info("ALL PROCESSES ARE DONE")
 
 
@@ -173,6 +195,8 @@ if __name__ == '__main__':
         make_dir(LOG_DIR)
         logger_obj = LoggingHandler(SCRIPT_DIR)
         logger = logger_obj.get_logger(__name__)
+        exec_trace_run = ExecTraceRun(os.path.basename(SCRIPT_DIR), os.path.join(LOG_DIR, "exec_trace"))
+        exec_trace_run.start()
         OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
         make_dir(OUTPUT_DIR)
         ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "archive")
@@ -190,6 +214,7 @@ if __name__ == '__main__':
         main(HOSTNAME, NAMESPACE, POD, KAFKA_DATA_SOURCE_TEMPLATE, SCRIPT_DIR, OUTPUT_DIR, ARCHIVE_DIR, LOG_DIR,
              KAFKA_CONFIG_FILE_PATH, WHITELIST_ENABLED, WHITELIST_PODS_LIST, IS_TEST_MODE, MAX_PROCESSES, POD_CONTAINER,
              BLACKLIST_POD)
+        exec_trace_run.finish(logger)
         pc.stop()
     except Exception as ex:
         print("Failed execution", str(ex))
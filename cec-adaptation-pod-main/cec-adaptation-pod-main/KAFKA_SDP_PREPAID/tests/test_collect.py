@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for collect and main: the pods are collected on threads and published in one batch, with KPI_SDP stubbed
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+TEMPLATE = {
+    "category": "CORE - IN",
+    "@table": ["kpi_name", "kpi_value", "kpi_result"],
+    "config_item": None,
+}
+PODS = ["csdp1-1", "csdp2-1", "csdp3-1"]
+
+
+class StubKPI_SDP:
+    """KPI_SDP stand-in: one record per pod, and a pod named *bad* failing like a broken kubectl exec."""
+    lock = threading.Lock()
+    running = 0
+    most_running = 0
+
+    def __init__(self, hostname, namespace, pod, script_dir, output_dir, archive_dir, log_dir, pod_container):
+        pass
+
+    def main(self, args_val):
+        pod, counter, kafka_data_source_builder = args_val
+        with StubKPI_SDP.lock:
+            StubKPI_SDP.running += 1
+            StubKPI_SDP.most_running = max(StubKPI_SDP.most_running, StubKPI_SDP.running)
+        time.sleep(0.05)
+        with StubKPI_SDP.lock:
+            StubKPI_SDP.running -= 1
+        if "bad" in pod:
+            raise OSError(f"kubectl exec {pod} failed")
+        kafka_data_source_builder.set_message_field("config_item", pod.upper())
+        kafka_data_source_builder.add_data_record(["CIP_LINK_DOWN_COUNT", str(counter), "OK"])
+
+
+class TestCollect(unittest.TestCase):
+
+    def setUp(self):
+        StubKPI_SDP.most_running = 0
+        self.logger = MagicMock()
+        self.published = []
+        for patcher in (patch.object(main, "KPI_SDP", StubKPI_SDP),
+                        patch.object(main, "logger", self.logger, create=True),
+                        patch.object(main, "ARCHIVE_DIR", "/archive", create=True),
+                        patch.object(main, "HOSTNAME", "node1", create=True),
+                        patch.object(main, "TIMESTAMP", "20240115100000", create=True),
+                        patch.object(main, "kafka_process_all",
+                                     lambda data_sources, *args: self.published.append((data_sources, args)))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_main(self, pods, max_processes=32):
+        with patch.object(main, "available_pods", return_value=pods):
+            main.main("node1", "ns", "sdp", TEMPLATE, "/script", "/output", "/archive", "/log",
+                      "/kafka.json", "false", [], True, max_processes, "sdp", [])
+
+    def test_collect(self):
+        ds = main.collect("csdp1-1", 0, TEMPLATE, "node1", "ns", "sdp", "/script", "/output", "/archive", "/log", "sdp")
+        self.assertEqual(ds.message["config_item"], "CSDP1-1")
+        self.assertEqual(ds.table, [["CIP_LINK_DOWN_COUNT", "0", "OK"]])
+        self.assertIsNone(TEMPLATE["config_item"])
+
+    def test_every_pod_in_one_batch(self):
+        """Every pod's data source reaches a single kafka_process_all call, with its own message"""
+        self.run_main(PODS)
+        self.assertEqual(len(self.published), 1)
+        data_sources, args = self.published[0]
+        self.assertEqual(args, ("/kafka.json", True))
+        self.assertEqual([ds.message["config_item"] for _, ds, _ in data_sources], ["CSDP1-1", "CSDP2-1", "CSDP3-1"])
+        self.assertEqual([ds.table[0][1] for _, ds, _ in data_sources], ["0", "1", "2"])
+        for (ds_path, _, status_path), pod in zip(data_sources, PODS):
+            self.assertTrue(os.path.basename(ds_path).startswith(f"node1_{pod}_KPI.txt."))
+            self.assertEqual(status_path, os.path.join("/archive", f"node1_{pod}_KPI.status.20240115100000"))
+
+    def test_pods_on_threads(self):
+        """Pods are collected concurrently, at most max_processes at a time"""
+        self.run_main(PODS, max_processes=2)
+        self.assertEqual(StubKPI_SDP.most_running, 2)
+        self.assertEqual(len(self.published[0][0]), 3)
+
+    def test_failing_pod_skipped(self):
+        """A pod that raises is logged, and the other pods are still published"""
+        self.run_main(["csdp1-1", "csdp-bad-1", "csdp3-1"])
+        data_sources, _ = self.published[0]
+        self.assertEqual([ds.message["config_item"] for _, ds, _ in data_sources], ["CSDP1-1", "CSDP3-1"])
+        self.logger.exception.assert_called_once()
+        self.assertIn("csdp-bad-1", self.logger.exception.call_args[0][0])
+
+    def test_no_pods(self):
+        self.run_main([])
+        self.assertEqual(self.published, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
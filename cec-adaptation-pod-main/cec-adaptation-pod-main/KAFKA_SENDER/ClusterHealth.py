@@ -0,0 +1,219 @@
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+CLOSED = "closed"        # cluster healthy, publish
+OPEN = "open"            # cluster failed failure_threshold batches in a row, spool without trying
+HALF_OPEN = "half-open"  # open_secs have passed, the next batch is the probe
+
+
+@contextmanager
+def _locked(lock_path, blocking=True):
+    """flock on lock_path; yields False instead of waiting when blocking is False and the lock is held."""
+    with open(lock_path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ClusterCircuitBreaker:
+    """
+    Health of one Kafka cluster across runs and processes, kept in <cluster_dir>/circuit.json.
+
+    Every published batch reports its outcome: a batch with no record acknowledged is a failure, any
+    acknowledgement closes the circuit. After failure_threshold failed batches in a row the circuit
+    opens, and for open_secs publishing to the cluster is skipped (the records go to the spool), so a
+    dead cluster stops costing timeout_secs per run. After that one batch probes the cluster again.
+    """
+
+    def __init__(self, cluster_name, cluster_dir, failure_threshold=3, open_secs=300):
+        self.cluster_name = cluster_name
+        self.state_path = os.path.join(cluster_dir, "circuit.json")
+        self.lock_path = os.path.join(cluster_dir, ".lock")
+        self.failure_threshold = failure_threshold
+        self.open_secs = open_secs
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"failures": 0, "opened_at": None}
+
+    def _write(self, state: Dict):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def state(self) -> str:
+        opened_at = self._read()["opened_at"]
+        if opened_at is None:
+            return CLOSED
+        return OPEN if time.time() - opened_at < self.open_secs else HALF_OPEN
+
+    def allow(self) -> bool:
+        state = self.state()
+        if state == OPEN:
+            logging.warning(f"Circuit open, not publishing to kafka, cluster: {self.cluster_name}")
+        elif state == HALF_OPEN:
+            logging.info(f"Circuit half-open, probing kafka, cluster: {self.cluster_name}")
+        return state != OPEN
+
+    def record(self, success: bool):
+        with _locked(self.lock_path):
+            state = self._read()
+            if success:
+                if state["opened_at"] is not None:
+                    logging.info(f"Circuit closed, kafka reachable again, cluster: {self.cluster_name}")
+                state = {"failures": 0, "opened_at": None}
+            else:
+                state["failures"] += 1
+                # A failed probe re-opens the circuit for another open_secs
+                if state["failures"] >= self.failure_threshold:
+                    if state["opened_at"] is None:
+                        logging.error(f"Circuit opened after {state['failures']} failed batches, cluster: {self.cluster_name}")
+                    state["opened_at"] = time.time()
+            self._write(state)
+
+
+class RecordSpool:
+    """
+    Bounded on-disk queue of the records a cluster did not acknowledge, in <cluster_dir>/*.spool.
+
+    Every run that spools writes its own segment file (JSON lines of topic and message), so the KPI
+    worker processes never share a file; when the segments exceed max_bytes the oldest are dropped.
+    replay() publishes the oldest segments in batches once the cluster is back; one process at a time.
+    Pruning and replay's write-back of a partly replayed segment both hold .lock, and the write-back
+    skips a segment that was pruned meanwhile, so dropped records never come back.
+    """
+
+    _last_stamp = 0
+
+    def __init__(self, cluster_name, cluster_dir, max_bytes=50 * 1024 * 1024):
+        self.cluster_name = cluster_name
+        self.cluster_dir = cluster_dir
+        self.lock_path = os.path.join(cluster_dir, ".lock")
+        self.replay_lock_path = os.path.join(cluster_dir, ".replay.lock")
+        self.max_bytes = max_bytes
+
+    def segments(self) -> List[str]:
+        # <epoch ns>_<unique>.spool, so the name order is the spool order
+        return sorted(os.path.join(self.cluster_dir, f) for f in os.listdir(self.cluster_dir) if f.endswith(".spool"))
+
+    def _write_segment(self, path, records: List[Dict]):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, path)
+
+    def append(self, message_topic, messages: List[str]):
+        if not messages:
+            return
+        # Strictly increasing within the process, so appends in the same clock tick keep their order
+        stamp = RecordSpool._last_stamp = max(time.time_ns(), RecordSpool._last_stamp + 1)
+        path = os.path.join(self.cluster_dir, f"{stamp:020d}_{uuid.uuid4().hex[:8]}.spool")
+        self._write_segment(path, [{"topic": message_topic, "message": message} for message in messages])
+        logging.warning(f"{len(messages)} messages spooled for a later run, cluster: {self.cluster_name}")
+        self._prune()
+
+    def _prune(self):
+        with _locked(self.lock_path):
+            segments = self.segments()
+            sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in segments]
+            total = sum(sizes)
+            for path, size in zip(segments, sizes):
+                if total <= self.max_bytes:
+                    break
+                dropped = self._count(path)
+                self._remove(path)
+                total -= size
+                logging.error(f"Spool over {self.max_bytes} bytes, {dropped} oldest messages dropped, cluster: {self.cluster_name}")
+
+    def _rewrite(self, path, records: List[Dict]):
+        """Write back the records of a partly replayed segment, unless _prune dropped it meanwhile."""
+        with _locked(self.lock_path):
+            if not os.path.exists(path):
+                logging.error(f"Spool segment pruned during replay, {len(records)} messages dropped, "
+                              f"cluster: {self.cluster_name}")
+                return
+            self._write_segment(path, records)
+
+    @staticmethod
+    def _count(path) -> int:
+        try:
+            with open(path) as f:
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _load(path) -> Optional[List[Dict]]:
+        try:
+            with open(path) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            # dropped by _prune meanwhile
+            return None
+
+    def replay(self, publish, batch_size=500, max_batches=20) -> Optional[bool]:
+        """
+        Publish spooled records oldest first, batch_size at a time, at most max_batches per run.
+        publish(topic, messages) returns the status per message, True for acknowledged. A segment is
+        removed once all of its records are acknowledged; on the first batch with failures the rest of
+        that segment is kept and replay stops. Returns None when there was nothing to replay (or
+        another process is replaying), else whether every replayed batch was acknowledged.
+        """
+        with _locked(self.replay_lock_path, blocking=False) as acquired:
+            if not acquired:
+                return None
+            segments = self.segments()
+            if not segments:
+                return None
+            batches = replayed = 0
+            for path in segments:
+                records = self._load(path)
+                if records is None:
+                    continue
+                while records and batches < max_batches:
+                    batch, records = records[:batch_size], records[batch_size:]
+                    batches += 1
+                    acked = [False] * len(batch)
+                    # One publish per topic; a spool normally holds a single topic
+                    for topic in dict.fromkeys(record["topic"] for record in batch):
+                        indexes = [ix for ix, record in enumerate(batch) if record["topic"] == topic]
+                        statuses = publish(topic, [batch[ix]["message"] for ix in indexes])
+                        for ix, ok in zip(indexes, statuses):
+                            acked[ix] = ok
+                    failed = [record for record, ok in zip(batch, acked) if not ok]
+                    replayed += len(batch) - len(failed)
+                    if failed:
+                        self._rewrite(path, failed + records)
+                        logging.error(f"Spool replay stopped, {len(failed)} of {len(batch)} messages "
+                                      f"not acknowledged, cluster: {self.cluster_name}")
+                        return False
+                if records:
+                    self._rewrite(path, records)
+                    break
+                self._remove(path)
+            logging.info(f"{replayed} spooled messages replayed to kafka, cluster: {self.cluster_name}")
+            return True
@@ -9,6 +9,33 @@ class DataSource:
         self.table = list()
 
 
+def write_json_file(ds, file_path):
+    """Compact JSON document of a data source, as read back by load_data_source and kafkaPython2.py."""
+    document = {}
+    document['message'] = ds.message
+    table = [content[:-1] + ["NOT-SENT-TO-ONE-CONSOLE"] if len(content) > 3 else content for content in ds.table]
+    document['table'] = table
+
+    with open(file_path, 'w') as f:
+        json.dump(document, f, separators=(',', ':'))
+
+
+def write_tabular_file(ds, file_path):
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+    m = ds.message
+
+    with open(file_path, 'w') as f:
+        for kpi_name, value, *_ in ds.table:
+            f.write(m["config_item"] + ',' + kpi_name + ',' + value + ',' + timestamp + '\n')
+
+
+def write_data_source(ds, file_path):
+    """Archive copy of a data source: JSON at file_path, the tabular form at file_path.csv."""
+    write_json_file(ds, file_path)
+    write_tabular_file(ds, file_path + '.csv')
+
+
 class KafkaDataSourceBuilder:
     def __init__(self, message):
         self.ds = DataSource()
@@ -27,26 +54,13 @@ class KafkaDataSourceBuilder:
         return self.ds
 
     def write_to_file(self, file_path):
-        self.write_to_json_file(file_path)
-        self.write_to_tabular_file(file_path + '.csv')
+        write_data_source(self.ds, file_path)
 
     def write_to_json_file(self, file_path):
-        document = {}
-        document['message'] = self.ds.message
-        table = [content[:-1] + ["NOT-SENT-TO-ONE-CONSOLE"] if len(content) > 3 else content for content in self.ds.table]
-        document['table'] = table
-
-        with open(file_path, 'w') as f:
-            json.dump(document, f, indent=2)
+        write_json_file(self.ds, file_path)
 
     def write_to_tabular_file(self, file_path):
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-
-        m = self.ds.message
-
-        with open(file_path, 'w') as f:
-            for kpi_name, value, *_ in self.ds.table:
-                f.write(m["config_item"] + ',' + kpi_name + ',' + value + ',' + timestamp + '\n')
+        write_tabular_file(self.ds, file_path)
 
 # import json
 # from datetime import datetime
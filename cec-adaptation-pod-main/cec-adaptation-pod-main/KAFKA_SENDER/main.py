@@ -7,11 +7,13 @@ import os
 import random
 import socket
 import subprocess
+import time
 from collections import OrderedDict
 from datetime import datetime
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Tuple
 
-from KAFKA_SENDER.KafkaDataSourceBuilder import DataSource, TABLE_KEY
+from KAFKA_SENDER.KafkaDataSourceBuilder import DataSource, TABLE_KEY, write_data_source
+from KAFKA_SENDER.ClusterHealth import ClusterCircuitBreaker, RecordSpool
 
 SCRIPT_HOME = os.path.dirname(os.path.realpath(__file__))
 
@@ -32,6 +34,8 @@ except ModuleNotFoundError:
 
 SUCCESS_STATUS = 'SUCCESS'
 FAIL_STATUS = 'FAIL'
+SPOOLED_STATUS = 'SPOOLED'
+RANDOM_VALUE = '{random}'
 
 
 def load_config(config_file_path: str):
@@ -47,8 +51,48 @@ def load_config(config_file_path: str):
     kafka_port = j['kafka']['port']
     message_topic = j['kafka']['message_topic']
     timeout_secs = j['kafka']['timeout_secs']
+    # Archive copy of each data source handed over in process; the records are published from memory
+    archive_data_source = j['kafka'].get('archive_data_source', True)
+    outage_options = load_outage_options(j['kafka'], os.path.join(SCRIPT_HOME, 'spool'))
+    topic_options = load_topic_options(j['kafka'], message_topic)
+
+    return kafka_clusters, kafka_port, message_topic, timeout_secs, archive_data_source, outage_options, topic_options
+
+
+def load_topic_options(kafka_config: Dict[str, Any], message_topic: str) -> Dict[str, Any]:
+    """
+    Encoding of the records of a topic, from "kafka" -> "topics" -> <topic>, defaults from "kafka":
+    compression_type : producer-side codec, "gzip" or "lz4" (gzip when lz4 is not installed); none by default
+    envelope         : one record per data source (build_envelope) instead of one per KPI row, for
+                       consumers that unpack it
+    """
+    topic_config = kafka_config.get('topics', {}).get(message_topic, {})
+    return {
+        'compression_type': resolve_compression(topic_config.get('compression_type', kafka_config.get('compression_type'))),
+        'envelope': topic_config.get('envelope', kafka_config.get('envelope', False)),
+    }
+
+
+def resolve_compression(compression_type):
+    if compression_type == 'lz4':
+        try:
+            import lz4.frame  # noqa: F401  (the codec the producer uses)
+        except ImportError:
+            logging.warning("lz4 compression requested but the lz4 package is not installed, using gzip")
+            return 'gzip'
+    return compression_type
+
 
-    return kafka_clusters, kafka_port, message_topic, timeout_secs
+def load_outage_options(kafka_config: Dict[str, Any], default_spool_dir: str) -> Dict[str, Any]:
+    """Circuit breaker and spool settings of publish_to_cluster, from the "kafka" section of a config."""
+    return {
+        'spool_dir': kafka_config.get('spool_dir', default_spool_dir),
+        'spool_max_mb': kafka_config.get('spool_max_mb', 50),
+        'spool_replay_batch_size': kafka_config.get('spool_replay_batch_size', 500),
+        'spool_replay_max_batches': kafka_config.get('spool_replay_max_batches', 20),
+        'circuit_failure_threshold': kafka_config.get('circuit_failure_threshold', 3),
+        'circuit_open_secs': kafka_config.get('circuit_open_secs', 300),
+    }
 
 
 def load_data_source(file_path: str) -> DataSource:
@@ -64,7 +108,7 @@ def load_data_source(file_path: str) -> DataSource:
     return data_source
 
 
-def create_kafka_client(kafka_ips: List[str], kafka_port, timeout_secs, is_test_mode: bool):
+def create_kafka_client(kafka_ips: List[str], kafka_port, timeout_secs, is_test_mode: bool, compression_type=None):
     bootstrap_servers: List[str] = []
 
     for ip in kafka_ips:
@@ -77,8 +121,10 @@ def create_kafka_client(kafka_ips: List[str], kafka_port, timeout_secs, is_test_
     client = None
 
     try:
-        client = KafkaProducer(bootstrap_servers=bootstrap_servers, client_id="remote-producer-tier2_cc_kpi_feed",  api_version=(1, 0, 0), request_timeout_ms=timeout_secs * 1000)
-        logging.info(f"Kafka client created, servers: {bootstrap_servers}")
+        # max_block_ms bounds send() when the cluster metadata cannot be fetched (default 60s)
+        client = KafkaProducer(bootstrap_servers=bootstrap_servers, client_id="remote-producer-tier2_cc_kpi_feed",  api_version=(1, 0, 0), request_timeout_ms=timeout_secs * 1000,
+                               max_block_ms=timeout_secs * 1000, compression_type=compression_type)
+        logging.info(f"Kafka client created, servers: {bootstrap_servers}{f', compression: {compression_type}' if compression_type else ''}")
     except Exception as e:
         logging.exception(f"Failed connecting to Kafka, servers: {bootstrap_servers}")
     finally:
@@ -108,20 +154,190 @@ def publish_message(cluster_name, client: KafkaProducer, message, message_topic,
     return status
 
 
+def publish_batch(cluster_name, client: KafkaProducer, messages: List[str], message_topic, timeout_secs, is_test_mode: bool) -> List[str]:
+    """
+    Publish messages to one cluster as a single batch: every record is handed to the producer first,
+    which partitions and batches them, then the acknowledgements are collected against one deadline of
+    timeout_secs. A send that fails (no metadata from the cluster) stops the batch, so an unreachable
+    cluster costs one timeout per batch rather than one per message. Returns the status per message.
+    """
+    if is_test_mode:
+        logging.info(f"{len(messages)} messages not published, as running in test mode, cluster: {cluster_name}")
+        return [SUCCESS_STATUS] * len(messages)
+
+    if not client:
+        logging.info(f"Skip publishing {len(messages)} messages to kafka as no connection established, cluster: {cluster_name}")
+        return [FAIL_STATUS] * len(messages)
+
+    statuses = [FAIL_STATUS] * len(messages)
+    futures = []
+    for message in messages:
+        try:
+            futures.append(client.send(message_topic, message.encode("UTF-8")))
+        except Exception:
+            logging.exception(f"Exception sending message to kafka, {len(messages) - len(futures)} messages not sent, cluster: {cluster_name}")
+            break
+
+    deadline = time.monotonic() + timeout_secs
+    first_error = None
+    for ix, future in enumerate(futures):
+        try:
+            # Once the deadline has passed, the records still in flight fail without waiting
+            future.get(timeout=max(deadline - time.monotonic(), 0))
+            statuses[ix] = SUCCESS_STATUS
+        except Exception as e:
+            first_error = first_error or e
+
+    published = statuses.count(SUCCESS_STATUS)
+    if first_error is not None:
+        logging.error(f"{len(futures) - published} messages not acknowledged by kafka, cluster: {cluster_name}, first error: {first_error!r}")
+    logging.info(f"{published} of {len(messages)} messages published to kafka, cluster: {cluster_name}")
+    return statuses
+
+
+def publish_to_cluster(cluster_name, server_ips: List[str], messages: List[str], kafka_port, message_topic, timeout_secs,
+                       outage_options: Dict[str, Any], is_test_mode: bool, compression_type=None) -> List[str]:
+    """
+    Publish messages to one cluster behind its circuit breaker (ClusterHealth). Messages the cluster does
+    not acknowledge, and all of them while the circuit is open, go to the cluster's spool and are reported
+    as SPOOLED; when the cluster acknowledges a batch, the spool is replayed first. Returns the status per
+    message.
+    """
+    if not messages:
+        return []
+    if is_test_mode:
+        return publish_batch(cluster_name, None, messages, message_topic, timeout_secs, is_test_mode)
+
+    cluster_dir = os.path.join(outage_options['spool_dir'], cluster_name)
+    os.makedirs(cluster_dir, exist_ok=True)
+    breaker = ClusterCircuitBreaker(cluster_name, cluster_dir, outage_options['circuit_failure_threshold'],
+                                    outage_options['circuit_open_secs'])
+    spool = RecordSpool(cluster_name, cluster_dir, outage_options['spool_max_mb'] * 1024 * 1024)
+
+    if breaker.allow():
+        client = create_kafka_client(server_ips, kafka_port, timeout_secs, is_test_mode, compression_type)
+        statuses = publish_batch(cluster_name, client, messages, message_topic, timeout_secs, is_test_mode)
+        reachable = SUCCESS_STATUS in statuses
+        breaker.record(reachable)
+        if reachable:
+            spool.replay(lambda topic, batch: [status == SUCCESS_STATUS for status in
+                                               publish_batch(cluster_name, client, batch, topic, timeout_secs, is_test_mode)],
+                         outage_options['spool_replay_batch_size'], outage_options['spool_replay_max_batches'])
+        if client is not None:
+            logging.info(f'Closing {cluster_name}')
+            client.close()
+    else:
+        statuses = [FAIL_STATUS] * len(messages)
+
+    failed = [message for message, status in zip(messages, statuses) if status != SUCCESS_STATUS]
+    try:
+        spool.append(message_topic, failed)
+    except OSError:
+        logging.exception(f"Failed spooling {len(failed)} messages, cluster: {cluster_name}")
+        return statuses
+    return [SUCCESS_STATUS if status == SUCCESS_STATUS else SPOOLED_STATUS for status in statuses]
+
+
+def final_status(statuses: List[str]) -> str:
+    """Status of a message over all clusters: FAIL if lost anywhere, SPOOLED if a cluster still has to get it."""
+    if FAIL_STATUS in statuses:
+        return FAIL_STATUS
+    return SPOOLED_STATUS if SPOOLED_STATUS in statuses else SUCCESS_STATUS
+
+
 def translate_value(value: Any):
-    if value == '{random}':
+    if value == RANDOM_VALUE:
         return str(random.randint(1, 10000000))
     else:
         return value
 
 
+def message_layout(message: Dict[str, Any]):
+    """
+    (template, columns, random_keys) of a message template: the message fields in order, the @table
+    column index of the fields set from each row, and the fields given a new {random} value per row.
+    """
+    template: Dict[str, Any] = dict()
+    columns: Dict[str, int] = dict()
+    for key, value in message.items():
+        if key == TABLE_KEY:
+            for col_ix, col_name in enumerate(value):
+                template[col_name] = None
+                columns[col_name] = col_ix
+        else:
+            template[key] = value
+            columns.pop(key, None)
+    random_keys = [key for key, value in template.items() if key not in columns and value == RANDOM_VALUE]
+    return template, columns, random_keys
+
+
+def build_message_structs(ds: DataSource):
+    """
+    (row, message fields) for every record of the data source that is to be sent. The message template
+    is resolved once per data source; per row only the @table columns and the {random} fields are set.
+    """
+    template, columns, random_keys = message_layout(ds.message)
+
+    for row in ds.table:
+        if len(row) > 3 and row[-1]:
+            logging.info(f"Skipping KPI record {row[:3]} due to is_dummy_message=True")
+            continue
+
+        msg_struct = template.copy()
+        for col_name, col_ix in columns.items():
+            msg_struct[col_name] = row[col_ix]
+        for key in random_keys:
+            msg_struct[key] = translate_value(RANDOM_VALUE)
+
+        yield row, msg_struct
+
+
+def build_messages(ds: DataSource):
+    """(row, message) for every record of the data source that is to be sent, one JSON message per row."""
+    for row, msg_struct in build_message_structs(ds):
+        yield row, json.dumps(msg_struct)
+
+
+def build_envelope(message: Dict[str, Any], msg_structs: List[Dict[str, Any]]) -> str:
+    """
+    One record for all the messages of a data source: the fields shared by every message once in
+    "header", the per-row fields (@table columns and {random} fields) as "columns" and "rows". Each
+    row zipped with columns and merged over header gives back the message sent in row mode.
+    """
+    template, columns, random_keys = message_layout(message)
+    row_keys = list(columns) + random_keys
+    return json.dumps({
+        'envelope_version': 1,
+        'header': {key: value for key, value in template.items() if key not in row_keys},
+        'columns': row_keys,
+        'rows': [[msg_struct[key] for key in row_keys] for msg_struct in msg_structs],
+    })
+
+
 def process(data_source_file_path: str, ds: DataSource, config_file_path: str, status_file_path: str, is_test_mode: bool):
+    """
+    Publish the records of ds. The KPI modules hand over the DataSource of their KafkaDataSourceBuilder
+    in process; data_source_file_path is where its archive copy is written (kafka.archive_data_source),
+    and the file the Python 2 sender reads.
+    """
+    process_all([(data_source_file_path, ds, status_file_path)], config_file_path, is_test_mode)
+
+
+def process_all(data_sources: List[Tuple[str, DataSource, str]], config_file_path: str, is_test_mode: bool):
+    """
+    Publish several data sources, (data_source_file_path, ds, status_file_path) each as in process, in one
+    batch per cluster: a KPI run collecting one data source per pod makes one producer and one round of
+    acknowledgements per cluster instead of one per pod. Every data source keeps its own status file.
+    """
     if USE_KAFKA_PYTHON_2:
         logging.info("Using Kafka Python 2")
-        subprocess.call(f'{SCRIPT_HOME}/kafkaPython2.py {data_source_file_path} {config_file_path} {"-t" if is_test_mode else ""}', shell=True)
+        for data_source_file_path, ds, status_file_path in data_sources:
+            if not os.path.isfile(data_source_file_path):
+                write_data_source(ds, data_source_file_path)
+            subprocess.call(f'{SCRIPT_HOME}/kafkaPython2.py {data_source_file_path} {config_file_path} {"-t" if is_test_mode else ""}', shell=True)
         return
 
-    kafka_clusters, kafka_port, message_topic, timeout_secs = load_config(config_file_path)
+    kafka_clusters, kafka_port, message_topic, timeout_secs, archive_data_source, outage_options, topic_options = load_config(config_file_path)
 
     local_hostname = socket.gethostname()
     local_ip = socket.gethostbyname(local_hostname)
@@ -129,51 +345,47 @@ def process(data_source_file_path: str, ds: DataSource, config_file_path: str, s
     logging.info(f"Starting kafka script {'in test mode' if is_test_mode else ''}")
     logging.info(f"local host: {local_hostname}, ip: {local_ip}")
 
-    if len(ds.table) == 0:
-        logging.error("Data source has no records")
-        return
-
-    status_file_writer = open(status_file_path, "w")
-
-    kafka_client_by_cluster_name = OrderedDict()
-    for (cluster_name, server_ips) in kafka_clusters:
-        kafka_client_by_cluster_name[cluster_name] = create_kafka_client(server_ips, kafka_port, timeout_secs, is_test_mode)
-
-    msg_struct: Dict[str, Any] = dict()
-
-    for rec_ix, row in enumerate(ds.table):
-        is_dummy_message = False
+    # (status_file_path, messages, first record, record count) per data source, records of all of them
+    spans = []
+    records: List[str] = []
+    for data_source_file_path, ds, status_file_path in data_sources:
+        # A data source loaded from its file (command line use) is on disk already
+        if archive_data_source and not os.path.isfile(data_source_file_path):
+            write_data_source(ds, data_source_file_path)
 
-        if len(row) > 3:
-            is_dummy_message = ds.table[rec_ix].pop(-1)
-
-        if is_dummy_message:
-            logging.info(f"Skipping KPI record {row[:3]} due to is_dummy_message=True")
+        if len(ds.table) == 0:
+            logging.error(f"Data source has no records, data source: {data_source_file_path}")
             continue
 
-        for key, value in ds.message.items():
-            if key == TABLE_KEY:
-                for col_ix, col_name in enumerate(value):
-                    msg_struct[col_name] = ds.table[rec_ix][col_ix]
-            else:
-                msg_struct[key] = translate_value(value)
-
-        message: str = json.dumps(msg_struct)
-
-        statuses = []
-        for cluster_name, client in kafka_client_by_cluster_name.items():
-            statuses.append(publish_message(cluster_name, client, message, message_topic, timeout_secs, is_test_mode))
-
-        final_status = FAIL_STATUS if FAIL_STATUS in statuses else SUCCESS_STATUS
-
-        status_file_writer.write(f"{message}.{final_status}\n")
-
-    for cluster_name, client in kafka_client_by_cluster_name.items():
-        if client is not None:
-            logging.info(f'Closing {cluster_name}')
-            client.close()
+        msg_structs = [msg_struct for row, msg_struct in build_message_structs(ds)]
+        messages = [json.dumps(msg_struct) for msg_struct in msg_structs]
+        # The status file keeps one line per row message; in envelope mode they share the status of the envelope
+        if topic_options['envelope'] and messages:
+            ds_records = [build_envelope(ds.message, msg_structs)]
+            logging.info(f"{len(messages)} messages packed into one envelope record, topic: {message_topic}")
+        else:
+            ds_records = messages
+        spans.append((status_file_path, messages, len(records), len(ds_records)))
+        records.extend(ds_records)
+
+    if not spans:
+        return
 
-    status_file_writer.close()
+    # One batch per cluster: an unreachable cluster costs at most one timeout_secs, or none while its circuit is open
+    statuses_by_cluster = OrderedDict()
+    for (cluster_name, server_ips) in kafka_clusters:
+        statuses_by_cluster[cluster_name] = publish_to_cluster(cluster_name, server_ips, records, kafka_port, message_topic,
+                                                               timeout_secs, outage_options, is_test_mode,
+                                                               topic_options['compression_type'])
+
+    for status_file_path, messages, first, count in spans:
+        cluster_statuses = [statuses[first:first + count] for statuses in statuses_by_cluster.values()]
+        if count != len(messages):
+            cluster_statuses = [statuses * len(messages) for statuses in cluster_statuses]
+        with open(status_file_path, "w") as status_file_writer:
+            for ix, message in enumerate(messages):
+                status = final_status([statuses[ix] for statuses in cluster_statuses])
+                status_file_writer.write(f"{message}.{status}\n")
 
 
 def setup_logging(app_dir, config_file_path):
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the Kafka cluster circuit breaker and record spool
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from KAFKA_SENDER import ClusterHealth
+from KAFKA_SENDER.ClusterHealth import ClusterCircuitBreaker, RecordSpool, CLOSED, OPEN, HALF_OPEN
+
+
+class TestClusterCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.cluster_dir = tempfile.mkdtemp()
+        self.now = 1000000.0
+        patcher = patch.object(ClusterHealth.time, "time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.cluster_dir, ignore_errors=True)
+
+    def breaker(self):
+        return ClusterCircuitBreaker("polaris_cluster", self.cluster_dir, failure_threshold=3, open_secs=300)
+
+    def test_closed_until_threshold(self):
+        breaker = self.breaker()
+        self.assertEqual(breaker.state(), CLOSED)
+        for _ in range(2):
+            breaker.record(False)
+        self.assertEqual(breaker.state(), CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_success_resets_failures(self):
+        breaker = self.breaker()
+        breaker.record(False)
+        breaker.record(False)
+        breaker.record(True)
+        breaker.record(False)
+        breaker.record(False)
+        self.assertEqual(breaker.state(), CLOSED)
+
+    def test_open_half_open_closed(self):
+        """closed -> open after failure_threshold failed batches -> half-open after open_secs -> closed on success"""
+        breaker = self.breaker()
+        for _ in range(3):
+            breaker.record(False)
+        self.assertEqual(breaker.state(), OPEN)
+        self.assertFalse(breaker.allow())
+
+        self.now += 299
+        self.assertEqual(breaker.state(), OPEN)
+        self.now += 2
+        self.assertEqual(breaker.state(), HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+        breaker.record(True)
+        self.assertEqual(breaker.state(), CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """A failed half-open probe opens the circuit for another open_secs"""
+        breaker = self.breaker()
+        for _ in range(3):
+            breaker.record(False)
+        self.now += 301
+        self.assertEqual(breaker.state(), HALF_OPEN)
+        breaker.record(False)
+        self.assertEqual(breaker.state(), OPEN)
+        self.now += 299
+        self.assertEqual(breaker.state(), OPEN)
+
+    def test_state_shared_across_instances(self):
+        """State lives in circuit.json, so every run and worker process sees it"""
+        for _ in range(3):
+            self.breaker().record(False)
+        self.assertEqual(self.breaker().state(), OPEN)
+        with open(os.path.join(self.cluster_dir, "circuit.json")) as f:
+            self.assertEqual(json.load(f), {"failures": 3, "opened_at": self.now})
+
+    def test_unreadable_state_is_closed(self):
+        with open(os.path.join(self.cluster_dir, "circuit.json"), "w") as f:
+            f.write("{")
+        self.assertEqual(self.breaker().state(), CLOSED)
+
+
+class TestRecordSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.cluster_dir = tempfile.mkdtemp()
+        self.published = []
+
+    def tearDown(self):
+        shutil.rmtree(self.cluster_dir, ignore_errors=True)
+
+    def spool(self, max_bytes=50 * 1024 * 1024):
+        return RecordSpool("titan_cluster", self.cluster_dir, max_bytes)
+
+    def spooled(self, spool):
+        return [record for path in spool.segments() for record in RecordSpool._load(path)]
+
+    def publish_ok(self, topic, messages):
+        self.published.append((topic, list(messages)))
+        return [True] * len(messages)
+
+    def test_append_segments(self):
+        """Every append is a segment of its own, read back in order"""
+        spool = self.spool()
+        spool.append("kpi", ["m1", "m2"])
+        spool.append("kpi", ["m3"])
+        spool.append("kpi", [])
+        self.assertEqual(len(spool.segments()), 2)
+        self.assertEqual([record["message"] for record in self.spooled(spool)], ["m1", "m2", "m3"])
+
+    def test_replay_publishes_and_removes(self):
+        spool = self.spool()
+        spool.append("kpi", [f"m{ix}" for ix in range(5)])
+        spool.append("other", ["o1"])
+        self.assertTrue(spool.replay(self.publish_ok, batch_size=2))
+        self.assertEqual(self.published, [("kpi", ["m0", "m1"]), ("kpi", ["m2", "m3"]), ("kpi", ["m4"]),
+                                          ("other", ["o1"])])
+        self.assertEqual(spool.segments(), [])
+
+    def test_replay_nothing(self):
+        self.assertIsNone(self.spool().replay(self.publish_ok))
+
+    def test_replay_keeps_failed_records(self):
+        """On a batch with failures the unacknowledged and the remaining records stay spooled"""
+        spool = self.spool()
+        spool.append("kpi", [f"m{ix}" for ix in range(6)])
+
+        def publish(topic, messages):
+            return [message != "m1" for message in messages]
+
+        self.assertFalse(spool.replay(publish, batch_size=3))
+        self.assertEqual([record["message"] for record in self.spooled(spool)], ["m1", "m3", "m4", "m5"])
+
+        self.assertTrue(spool.replay(self.publish_ok, batch_size=3))
+        self.assertEqual(self.spooled(spool), [])
+
+    def test_replay_max_batches(self):
+        """At most max_batches batches per run; the rest waits for the next run"""
+        spool = self.spool()
+        spool.append("kpi", [f"m{ix}" for ix in range(10)])
+        self.assertTrue(spool.replay(self.publish_ok, batch_size=2, max_batches=2))
+        self.assertEqual([record["message"] for record in self.spooled(spool)], ["m4", "m5", "m6", "m7", "m8", "m9"])
+
+    def test_replay_locked(self):
+        """Another process replaying: nothing is published"""
+        spool = self.spool()
+        spool.append("kpi", ["m1"])
+        with ClusterHealth._locked(spool.replay_lock_path):
+            self.assertIsNone(spool.replay(self.publish_ok))
+        self.assertEqual(self.published, [])
+
+    def test_prune_drops_oldest(self):
+        """Over max_bytes the oldest segments are dropped"""
+        spool = self.spool()
+        for ix in range(3):
+            spool.append("kpi", [f"old{ix}" * 10])
+        segment_size = os.path.getsize(spool.segments()[0])
+
+        spool = self.spool(max_bytes=segment_size * 2)
+        spool.append("kpi", ["new0" * 10])
+        self.assertEqual([record["message"] for record in self.spooled(spool)], ["old2" * 10, "new0" * 10])
+
+    def test_prune_during_replay(self):
+        """A segment pruned by a concurrent append while it is replayed is not written back"""
+        spool = self.spool()
+        spool.append("kpi", [f"old{ix}" for ix in range(4)])
+        replayed_segment = spool.segments()[0]
+        max_bytes = os.path.getsize(replayed_segment)
+
+        def publish(topic, messages):
+            # Another worker spools meanwhile, and its prune drops the segment being replayed
+            self.spool(max_bytes=max_bytes).append("kpi", ["new0", "new1"])
+            return [False] * len(messages)
+
+        self.assertFalse(spool.replay(publish, batch_size=2))
+        self.assertNotIn(replayed_segment, spool.segments())
+        self.assertEqual([record["message"] for record in self.spooled(spool)], ["new0", "new1"])
+        self.assertLessEqual(sum(os.path.getsize(path) for path in spool.segments()), max_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
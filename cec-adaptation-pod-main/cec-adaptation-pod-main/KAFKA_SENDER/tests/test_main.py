@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Tests for the Kafka sender: topic options, the envelope record and process against a fake producer
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from KAFKA_SENDER import main as sender
+from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder, TABLE_KEY
+
+MESSAGE = {
+    "category": "KPI",
+    "config_item": "sdp1",
+    "kpi_info": None,
+    "src_modified_dt": 1705312800000,
+    "ref_id": "{random}",
+    TABLE_KEY: ["kpi_name", "kpi_value", "kpi_last_updated_date"],
+    "source_owner": "Tier2_CC",
+}
+TABLE = [
+    ["SDP_CCR_SUCCESS_RATE", "99.5", "2024-01-15 10:00"],
+    ["SDP_CCR_ATTEMPTS", "1200", "2024-01-15 10:00"],
+    ["SDP_DUMMY", "0", "2024-01-15 10:00", True],
+]
+
+
+class _Future:
+    def get(self, timeout=None):
+        return None
+
+
+class FakeKafkaProducer:
+    """kafka3 KafkaProducer stand-in recording (bootstrap servers, topic, record, compression) per send."""
+    sent = []
+
+    def __init__(self, bootstrap_servers, compression_type=None, **kwargs):
+        self.bootstrap_servers = bootstrap_servers
+        self.compression_type = compression_type
+
+    def send(self, topic, value):
+        self.sent.append((tuple(self.bootstrap_servers), topic, value.decode("UTF-8"), self.compression_type))
+        return _Future()
+
+    def close(self):
+        pass
+
+
+def data_source(table=TABLE):
+    builder = KafkaDataSourceBuilder(dict(MESSAGE))
+    for row in table:
+        builder.add_data_record(list(row))
+    return builder.data_source()
+
+
+def strip_random(sent):
+    """Sent records (or status file text) with the {random} ref_id values blanked, as they differ per publish"""
+    if isinstance(sent, str):
+        return re.sub(r'"ref_id": "[^"]*"', '"ref_id": ""', sent)
+    records = []
+    for servers, topic, value, compression in sent:
+        record = json.loads(value)
+        if "rows" in record:
+            ref_id = record["columns"].index("ref_id")
+            for row in record["rows"]:
+                row[ref_id] = ""
+        else:
+            record["ref_id"] = ""
+        records.append((servers, topic, record, compression))
+    return records
+
+
+class TestTopicOptions(unittest.TestCase):
+
+    def test_lz4_falls_back_to_gzip(self):
+        with patch.dict(sys.modules, {"lz4": None, "lz4.frame": None}):
+            self.assertEqual(sender.resolve_compression("lz4"), "gzip")
+
+    def test_lz4_installed(self):
+        lz4 = types.ModuleType("lz4")
+        lz4.frame = types.ModuleType("lz4.frame")
+        with patch.dict(sys.modules, {"lz4": lz4, "lz4.frame": lz4.frame}):
+            self.assertEqual(sender.resolve_compression("lz4"), "lz4")
+
+    def test_other_codecs_unchanged(self):
+        self.assertEqual(sender.resolve_compression("gzip"), "gzip")
+        self.assertIsNone(sender.resolve_compression(None))
+
+    def test_topic_overrides_global(self):
+        kafka_config = {"compression_type": "gzip", "envelope": False,
+                        "topics": {"kpi": {"envelope": True}, "raw": {"compression_type": None}}}
+        self.assertEqual(sender.load_topic_options(kafka_config, "kpi"), {"compression_type": "gzip", "envelope": True})
+        self.assertEqual(sender.load_topic_options(kafka_config, "raw"), {"compression_type": None, "envelope": False})
+        self.assertEqual(sender.load_topic_options(kafka_config, "other"), {"compression_type": "gzip", "envelope": False})
+        self.assertEqual(sender.load_topic_options({}, "kpi"), {"compression_type": None, "envelope": False})
+
+
+class TestBuildEnvelope(unittest.TestCase):
+
+    def test_payload_shape(self):
+        ds = data_source()
+        msg_structs = [msg_struct for _, msg_struct in sender.build_message_structs(ds)]
+        envelope = json.loads(sender.build_envelope(ds.message, msg_structs))
+
+        self.assertEqual(envelope["envelope_version"], 1)
+        self.assertEqual(envelope["header"], {"category": "KPI", "config_item": "sdp1", "kpi_info": None,
+                                              "src_modified_dt": 1705312800000, "source_owner": "Tier2_CC"})
+        self.assertEqual(envelope["columns"], ["kpi_name", "kpi_value", "kpi_last_updated_date", "ref_id"])
+        # The dummy record is not sent
+        self.assertEqual([row[:3] for row in envelope["rows"]], [row[:3] for row in TABLE[:2]])
+
+    def test_rows_give_back_the_row_messages(self):
+        """Each row zipped with columns and merged over header is the message sent in row mode"""
+        ds = data_source()
+        msg_structs = [msg_struct for _, msg_struct in sender.build_message_structs(ds)]
+        envelope = json.loads(sender.build_envelope(ds.message, msg_structs))
+        unpacked = [dict(envelope["header"], **dict(zip(envelope["columns"], row))) for row in envelope["rows"]]
+        self.assertEqual(unpacked, [json.loads(json.dumps(msg_struct)) for msg_struct in msg_structs])
+
+
+class TestProcess(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        FakeKafkaProducer.sent = []
+        for patcher in (patch.object(sender, "KafkaProducer", FakeKafkaProducer),
+                        patch.object(sender, "USE_KAFKA_PYTHON_2", False),
+                        patch.object(sender.socket, "gethostbyname", lambda name: "127.0.0.1")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def config(self, **kafka_options):
+        kafka = {"clusters": [{"name": "polaris", "addresses": ["10.0.0.1"]}, {"name": "titan", "addresses": ["10.0.1.1"]}],
+                 "port": 9092, "message_topic": "kpi", "timeout_secs": 3, "archive_data_source": False,
+                 "spool_dir": os.path.join(self.work_dir, "spool")}
+        kafka.update(kafka_options)
+        path = os.path.join(self.work_dir, "config.json")
+        with open(path, "w") as f:
+            json.dump({"kafka": kafka}, f)
+        return path
+
+    def process(self, config_path, ds=None):
+        status_path = os.path.join(self.work_dir, "kpi.status")
+        sender.process(os.path.join(self.work_dir, "kpi.json"), ds or data_source(), config_path, status_path, False)
+        with open(status_path) as f:
+            return [line.rsplit(".", 1) for line in f.read().splitlines()]
+
+    def published_from_memory_and_archive(self, config_path):
+        """Records sent for the in-memory data source, then for the archive copy process wrote of it"""
+        ds_path = os.path.join(self.work_dir, "kpi.json")
+        status_path = os.path.join(self.work_dir, "kpi.status")
+        sender.process(ds_path, data_source(), config_path, status_path, False)
+        from_memory, FakeKafkaProducer.sent = FakeKafkaProducer.sent, []
+        with open(status_path) as f:
+            memory_status = f.read()
+
+        sender.process(ds_path, sender.load_data_source(ds_path), config_path, status_path, False)
+        with open(status_path) as f:
+            self.assertEqual(strip_random(f.read()), strip_random(memory_status))
+        return from_memory, FakeKafkaProducer.sent
+
+    def records(self, cluster="10.0.0.1:9092"):
+        return [json.loads(value) for servers, _, value, _ in FakeKafkaProducer.sent if servers == (cluster,)]
+
+    def test_row_records(self):
+        statuses = self.process(self.config())
+        self.assertEqual([status for _, status in statuses], ["SUCCESS", "SUCCESS"])
+        self.assertEqual([record["kpi_name"] for record in self.records()], ["SDP_CCR_SUCCESS_RATE", "SDP_CCR_ATTEMPTS"])
+        self.assertEqual(self.records("10.0.1.1:9092"), self.records())
+        self.assertEqual([json.loads(message) for message, _ in statuses], self.records())
+
+    def test_topic_envelope_overrides_global(self):
+        """envelope of the topic wins over the global option: one record, one status line per row"""
+        statuses = self.process(self.config(envelope=False, topics={"kpi": {"envelope": True}}))
+        records = self.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["envelope_version"], 1)
+        self.assertEqual(len(records[0]["rows"]), 2)
+        self.assertEqual([status for _, status in statuses], ["SUCCESS", "SUCCESS"])
+
+    def test_topic_rows_override_global_envelope(self):
+        self.process(self.config(envelope=True, topics={"kpi": {"envelope": False}}))
+        self.assertEqual(len(self.records()), 2)
+        self.assertNotIn("envelope_version", self.records()[0])
+
+    def test_compression_per_topic(self):
+        with patch.dict(sys.modules, {"lz4": None, "lz4.frame": None}):
+            self.process(self.config(topics={"kpi": {"compression_type": "lz4"}}))
+        self.assertEqual({compression for *_, compression in FakeKafkaProducer.sent}, {"gzip"})
+
+    def test_archive_publishes_the_same_messages(self):
+        """Publishing the compact archive file sends what the in-memory handoff sent, dummy record skipped"""
+        from_memory, from_archive = self.published_from_memory_and_archive(self.config(archive_data_source=True))
+        self.assertEqual(len(from_memory), 4)
+        self.assertEqual(strip_random(from_archive), strip_random(from_memory))
+        with open(os.path.join(self.work_dir, "kpi.json.csv")) as f:
+            self.assertEqual([line.split(",")[:3] for line in f.read().splitlines()],
+                             [["sdp1", row[0], row[1]] for row in TABLE])
+
+    def test_archive_publishes_the_same_envelope(self):
+        from_memory, from_archive = self.published_from_memory_and_archive(
+            self.config(archive_data_source=True, envelope=True))
+        self.assertEqual(len(from_memory), 2)
+        self.assertEqual(strip_random(from_archive), strip_random(from_memory))
+
+    def test_no_records(self):
+        status_path = os.path.join(self.work_dir, "kpi.status")
+        sender.process(os.path.join(self.work_dir, "kpi.json"), data_source([]), self.config(), status_path, False)
+        self.assertEqual(FakeKafkaProducer.sent, [])
+        self.assertFalse(os.path.exists(status_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,32 +1,57 @@
 import logging
 import os.path
-from typing import Tuple
-
-import paramiko as paramiko
+import sys
+from typing import Dict, Tuple
 
 from kubernetes import Container, exec_kube, cont_str, select_containers
 from proc2 import eval_value, convert_xml_gz_to_xml
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from lib.sftp_broker.sftp_broker import open_sftp
+from lib.splunk_destination.splunk_destination import SplunkDestinationCache, make_destination, SFTP_PORT
+from lib.transfer_ledger.transfer_ledger import TransferLedger, file_key, upload_resumable, STARTED, UPLOADED, RENAMED
+
 def forward_files(src_file_paths: [], forward_structs: [], output_path: str):
-    for fwd_struct in forward_structs:
-        type = fwd_struct["TYPE"]
-
-        if type == 'POD':
-            container_pattern = fwd_struct["CONTAINER_PATTERN"]
-            pod_pattern = fwd_struct["POD_PATTERN"]
-            namespace_pattern = fwd_struct["NAMESPACE_PATTERN"]
-            hostname = eval_value(fwd_struct["HOSTNAME"])
-            username = fwd_struct["USERNAME"]
-            password = fwd_struct["PASSWORD"]
-            dest_folder = fwd_struct["DESTINATION_FOLDER"]
-            file_retention_days = fwd_struct['FILE_RETENTION_DAYS']
-            logging.info(f"Forwarding files to host: {hostname}, type: {type}, cont: {container_pattern}, pos: {pod_pattern}, ns: {namespace_pattern}")
-
-            for cont in select_containers(container_pattern, pod_pattern, namespace_pattern):
-                forward(src_file_paths, dest_folder, file_retention_days, cont, hostname, username, password, output_path)
-
-        else:
-            logging.error(f"Unexpected forwarder type {type}")
+    with TransferLedger(os.path.join(os.path.dirname(output_path), "run", "transfer_ledger.db")) as ledger:
+        ledger.prune()
+        for fwd_struct in forward_structs:
+            forward_struct(src_file_paths, fwd_struct, output_path, ledger)
+
+
+def forward_struct(src_file_paths: [], fwd_struct: Dict, output_path: str, ledger: TransferLedger):
+    type = fwd_struct["TYPE"]
+
+    if type == 'POD':
+        container_pattern = fwd_struct["CONTAINER_PATTERN"]
+        pod_pattern = fwd_struct["POD_PATTERN"]
+        namespace_pattern = fwd_struct["NAMESPACE_PATTERN"]
+        username = fwd_struct["USERNAME"]
+        password = fwd_struct["PASSWORD"]
+        dest_folder = fwd_struct["DESTINATION_FOLDER"]
+        file_retention_days = fwd_struct['FILE_RETENTION_DAYS']
+        logging.info(f"Forwarding files, type: {type}, cont: {container_pattern}, pos: {pod_pattern}, ns: {namespace_pattern}")
+
+        for cont in select_containers(container_pattern, pod_pattern, namespace_pattern):
+            # Hostname and the getent lookup of the upload user are cached per destination container,
+            # and rediscovered when the configured HOSTNAME, PORT or user changes
+            cache_path = os.path.join(os.path.dirname(output_path), "run", f"splunk_destination_{cont.pod}_{cont.name}.json")
+            config = {"hostname": fwd_struct["HOSTNAME"], "port": fwd_struct.get("PORT", SFTP_PORT), "username": username,
+                      "destination_folder": dest_folder}
+            splunk_cache = SplunkDestinationCache(cache_path, config=config)
+            destination = splunk_cache.get(lambda: discover_destination(fwd_struct, username, dest_folder, cont))
+            logging.info(f"Forwarding files to host: {destination['ip']}, cont: {cont_str(cont)}")
+
+            if not forward(src_file_paths, dest_folder, file_retention_days, cont, destination, username, password, output_path, ledger):
+                splunk_cache.invalidate()
+
+    else:
+        logging.error(f"Unexpected forwarder type {type}")
+
+def discover_destination(fwd_struct: Dict, username: str, dest_folder: str, cont: Container) -> Dict:
+    hostname = eval_value(fwd_struct["HOSTNAME"])
+    uid, gid = user_and_group_id(username, cont)
+    return make_destination(hostname, uid, gid, {"destination_folder": dest_folder}, fwd_struct.get("PORT", SFTP_PORT))
+
 
 def user_and_group_id(username: str, cont: Container) -> Tuple[int, int]:
     logging.info(f"Fetching UID and GID from container: {cont_str(cont)}")
@@ -57,47 +82,71 @@ def delete_old_files(cont: Container, folder: str, file_retention_days: int):
         logging.error(f"Failed deleting old files in folder: {folder}, cont: {cont_str(cont)}, error: {err}")
 
 
-def forward(src_file_paths: [], dest_folder: str, file_retention_days, cont: Container, hostname, username, password, output_path: str):
-    uid, gid = user_and_group_id(username, cont)
+def forward(src_file_paths: [], dest_folder: str, file_retention_days, cont: Container, destination: Dict, username, password, output_path: str,
+            ledger: TransferLedger = None) -> bool:
+    """Returns False if the connection or any transfer failed, so the cached destination gets rediscovered."""
+    hostname, uid, gid = destination["ip"], destination["uid"], destination["gid"]
+    ledger_destination = f"{hostname}:{dest_folder}"
+    succeeded = True
 
     delete_old_files(cont, dest_folder, file_retention_days)
 
-    with paramiko.SSHClient() as ssh:
-        logging.info(f"SFTP: {username}@{hostname}")
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(hostname, username=username, password=password)
-        with ssh.open_sftp() as sftp:
-            for src_file_path in src_file_paths:
+    logging.info(f"SFTP: {username}@{hostname}")
+    try:
+        sftp = open_sftp(hostname, username, password, destination.get("port", SFTP_PORT))
+    except Exception as ex:
+        logging.exception(f"Failed connecting to {hostname}")
+        return False
+    with sftp:
+        for src_file_path in src_file_paths:
+            try:
+                key = file_key(src_file_path)
+                if ledger and ledger.reached(key, RENAMED, ledger_destination):
+                    logging.info(f"Already forwarded to {hostname}, skipping file: {os.path.basename(src_file_path)}")
+                    continue
+
+                # Covert XML.GZ to .XML
+                xml_file_with_path = convert_xml_gz_to_xml(src_file_path, output_path)
+                filename = os.path.basename(xml_file_with_path)
+
+                dest_file_path = os.path.join(dest_folder, filename)
+                dest_file_path_tmp = os.path.join(dest_file_path + '.tmp')
+
+                logging.info(f"Transferring file: {src_file_path}  and New xml path : {xml_file_with_path} --> {dest_file_path_tmp}")
                 try:
-                    # Covert XML.GZ to .XML
-                    xml_file_with_path = convert_xml_gz_to_xml(src_file_path, output_path)
-                    filename = os.path.basename(xml_file_with_path)
-
-                    dest_file_path = os.path.join(dest_folder, filename)
-                    dest_file_path_tmp = os.path.join(dest_file_path + '.tmp')
-
-                    logging.info(f"Transferring file: {src_file_path}  and New xml path : {xml_file_with_path} --> {dest_file_path_tmp}")
-                    try:
-                        sftp.mkdir(dest_folder)
-                        logging.info(f"Directory created: {dest_folder}")
-                    except IOError:
-                        pass
+                    sftp.mkdir(dest_folder)
+                    logging.info(f"Directory created: {dest_folder}")
+                except IOError:
+                    pass
 
+                if ledger is None:
                     sftp.put(xml_file_with_path, dest_file_path_tmp)
+                elif not ledger.reached(key, UPLOADED, ledger_destination):
+                    # A "started" upload left a partial .tmp of this exact file; continue it from its size
+                    resume = ledger.stage(key, ledger_destination) == STARTED
+                    ledger.record(key, STARTED, ledger_destination, dest_file_path_tmp)
+                    with open(xml_file_with_path, "rb") as xml_file:
+                        upload_resumable(sftp, xml_file, dest_file_path_tmp, os.path.getsize(xml_file_with_path), resume)
+                    ledger.record(key, UPLOADED, ledger_destination, dest_file_path_tmp)
+
+                logging.info(f"Setting file owner: {dest_file_path_tmp}, UID: {uid}, GID: {gid}")
+                sftp.chown(dest_file_path_tmp, uid, gid)
+
+                logging.info(f"Renaming file: {dest_file_path_tmp} --> {filename}")
+                try:
+                    sftp.rename(dest_file_path_tmp, dest_file_path)
+                except Exception as ex:
+                    logging.info(f"File already exists on destination, file: {os.path.basename(src_file_path)}")
+                    sftp.remove(dest_file_path_tmp)
+                if ledger:
+                    ledger.record(key, RENAMED, ledger_destination, dest_file_path)
 
-                    logging.info(f"Setting file owner: {dest_file_path_tmp}, UID: {uid}, GID: {gid}")
-                    sftp.chown(dest_file_path_tmp, uid, gid)
-
-                    logging.info(f"Renaming file: {dest_file_path_tmp} --> {filename}")
-                    try:
-                        sftp.rename(dest_file_path_tmp, dest_file_path)
-                    except Exception as ex:
-                        logging.info(f"File already exists on destination, file: {os.path.basename(src_file_path)}")
-                        sftp.remove(dest_file_path_tmp)
+                logging.info(f"File {filename} uploaded to: {hostname}:/{dest_folder}, file UID: {uid}, GID: {gid}")
 
-                    logging.info(f"File {filename} uploaded to: {hostname}:/{dest_folder}, file UID: {uid}, GID: {gid}")
+                # os.remove(xml_file_with_path)
+            except Exception as ex:
+                logging.exception(f"Failed transferring file {os.path.basename(src_file_path)}")
+                succeeded = False
 
-                    # os.remove(xml_file_with_path)
-                except Exception as ex:
-                    logging.exception(f"Failed transferring file {os.path.basename(src_file_path)}")
+    return succeeded
 
@@ -1,56 +1,93 @@
 import logging
 import os.path
-
-import paramiko as paramiko
+import sys
+from typing import Tuple
 
 from proc2 import eval_value, convert_xml_gz_to_xml
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from lib.sftp_broker.sftp_broker import open_sftp
+from lib.transfer_ledger.transfer_ledger import TransferLedger, file_key, upload_resumable, STARTED, UPLOADED, RENAMED
+
+
+def ledger_path(output_path: str) -> str:
+    return os.path.join(os.path.dirname(output_path), "run", "transfer_ledger.db")
+
 
 def forward_files(src_file_paths: [], forward_structs: [], output_path: str, application_name_pattern: str):
-    for fwd_struct in forward_structs:
-        hostname = eval_value(fwd_struct["HOSTNAME"])
-        username = fwd_struct["USERNAME"]
-        password = fwd_struct["PASSWORD"]
-        dest_folder = fwd_struct["DESTINATION_FOLDER"][application_name_pattern]
-        logging.info(f"Forwarding files to host: {hostname}")
-
-        forward(src_file_paths, dest_folder, hostname, username, password, output_path)
-
-
-def forward(src_file_paths: [], dest_folder: str, hostname, username, password, output_path: str):
-    with paramiko.SSHClient() as ssh:
-        logging.info(f"SFTP: {username}@{hostname}")
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(hostname, username=username, password=password)
-        with ssh.open_sftp() as sftp:
-            for src_file_path in src_file_paths:
-                try:
-                    # Covert XML.GZ to .XML
-                    xml_file_with_path = convert_xml_gz_to_xml(src_file_path, output_path)
-                    filename = os.path.basename(xml_file_with_path)
-
-                    dest_file_path = os.path.join(dest_folder, filename)
-                    dest_file_path_tmp = os.path.join(dest_file_path + '.tmp')
-
-                    logging.info(
-                        f"Transferring file: {src_file_path}  and New xml path : {xml_file_with_path} --> {dest_file_path_tmp}")
-                    try:
-                        sftp.mkdir(dest_folder)
-                        logging.info(f"Directory created: {dest_folder}")
-                    except IOError:
-                        pass
-
-                    sftp.put(xml_file_with_path, dest_file_path_tmp)
-
-                    logging.info(f"Renaming file: {dest_file_path_tmp} --> {filename}")
-                    try:
-                        sftp.rename(dest_file_path_tmp, dest_file_path)
-                    except Exception as ex:
-                        logging.info(f"File already exists on destination, file: {os.path.basename(src_file_path)}")
-                        sftp.remove(dest_file_path_tmp)
-
-                    logging.info(f"File {filename} uploaded to: {hostname}:/{dest_folder}")
-
-                    # os.remove(xml_file_with_path)
-                except Exception as ex:
-                    logging.exception(f"Failed transferring file {os.path.basename(src_file_path)}")
+    with TransferLedger(ledger_path(output_path)) as ledger:
+        ledger.prune()
+        for fwd_struct in forward_structs:
+            hostname = eval_value(fwd_struct["HOSTNAME"])
+            username = fwd_struct["USERNAME"]
+            password = fwd_struct["PASSWORD"]
+            dest_folder = fwd_struct["DESTINATION_FOLDER"][application_name_pattern]
+            logging.info(f"Forwarding files to host: {hostname}")
+
+            forward(src_file_paths, dest_folder, hostname, username, password, output_path, ledger)
+
+
+def forward(src_file_paths: [], dest_folder: str, hostname, username, password, output_path: str, ledger: TransferLedger = None):
+    logging.info(f"SFTP: {username}@{hostname}")
+    with open_sftp(hostname, username, password) as sftp:
+        for src_file_path in src_file_paths:
+            try:
+                key = file_key(src_file_path)
+                if ledger and ledger.reached(key, RENAMED, ledger_destination(hostname, dest_folder)):
+                    logging.info(f"Already forwarded to {hostname}, skipping file: {os.path.basename(src_file_path)}")
+                    continue
+
+                # Covert XML.GZ to .XML
+                xml_file_with_path = convert_xml_gz_to_xml(src_file_path, output_path)
+                filename = os.path.basename(xml_file_with_path)
+
+                logging.info(f"Transferring file: {src_file_path}  and New xml path : {xml_file_with_path}")
+                with open(xml_file_with_path, "rb") as fileobj:
+                    upload_fileobj(sftp, fileobj, dest_folder, filename, hostname, ledger, key, os.path.getsize(xml_file_with_path))
+
+                # os.remove(xml_file_with_path)
+            except Exception as ex:
+                logging.exception(f"Failed transferring file {os.path.basename(src_file_path)}")
+
+
+def ledger_destination(hostname: str, dest_folder: str) -> str:
+    return f"{hostname}:{dest_folder}"
+
+
+def upload_fileobj(sftp, fileobj, dest_folder: str, filename: str, hostname: str,
+                   ledger: TransferLedger = None, key: Tuple[str, int, int] = None, size: int = None):
+    """
+    Upload to <filename>.tmp and rename it into place, so readers never see a partial file.
+
+    With a ledger, the stages reached for key are skipped and an interrupted upload of
+    the same file resumes at the size of its .tmp; size is the number of bytes to send.
+    """
+    destination = ledger_destination(hostname, dest_folder)
+    dest_file_path = os.path.join(dest_folder, filename)
+    dest_file_path_tmp = os.path.join(dest_file_path + '.tmp')
+
+    logging.info(f"Transferring file: {filename} --> {dest_file_path_tmp}")
+    try:
+        sftp.mkdir(dest_folder)
+        logging.info(f"Directory created: {dest_folder}")
+    except IOError:
+        pass
+
+    if ledger is None:
+        sftp.putfo(fileobj, dest_file_path_tmp)
+    elif not ledger.reached(key, UPLOADED, destination):
+        resume = ledger.stage(key, destination) == STARTED
+        ledger.record(key, STARTED, destination, dest_file_path_tmp)
+        upload_resumable(sftp, fileobj, dest_file_path_tmp, size, resume)
+        ledger.record(key, UPLOADED, destination, dest_file_path_tmp)
+
+    logging.info(f"Renaming file: {dest_file_path_tmp} --> {filename}")
+    try:
+        sftp.rename(dest_file_path_tmp, dest_file_path)
+    except Exception as ex:
+        logging.info(f"File already exists on destination, file: {filename}")
+        sftp.remove(dest_file_path_tmp)
+    if ledger:
+        ledger.record(key, RENAMED, destination, dest_file_path)
+
+    logging.info(f"File {filename} uploaded to: {hostname}:/{dest_folder}")
@@ -1,7 +1,8 @@
 import logging
 import os
 import re
-from typing import NamedTuple, List, Tuple, Optional
+import subprocess
+from typing import NamedTuple, List, Tuple, Optional, IO
 
 from proc2 import execute, eval_value, sftp_transfer
 
@@ -21,6 +22,13 @@ def exec_kube(cmd, cont: Container) -> Tuple[str, str, int]:
     return execute(cmd)
 
 
+def exec_kube_stream(cmd, cont: Container, stderr: IO) -> subprocess.Popen:
+    """Like exec_kube, but stdout is left as a binary pipe for the caller to stream."""
+    cmd = f"""{kubectl_cmd()} exec {cont.pod} -c {cont.name} -n {cont.namespace} -- {cmd}"""
+    logging.info(f'Execute (stream): "{cmd}"')
+    return subprocess.Popen(cmd, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+
+
 def pod_get_cmd(ns: str) -> str:
     namespace_option = f"-n {ns}" if ns else ""
     return f'{kubectl_cmd()} get pod {namespace_option} --no-headers -o custom-columns="containers:spec.containers[*].name, name:metadata.name, name:metadata.namespace"'
@@ -11,6 +11,7 @@ import time
 from proc2 import eval_value
 from forwarder import forward_files
 from collector import collect_files
+from relay import relay_files
 
 HOSTNAME_UNDEFINED = "hostname_undefined"
 
@@ -55,8 +56,9 @@ def load_config(config_file_path):
     APPLICATION_NAME_PATTERN = eval_value(j['APPLICATION_NAME_PATTERN'])
     NUMBER_OF_LAST_UPDATED_FILES = j['NUMBER_OF_LAST_UPDATED_FILES']
     FORWARD_STRUCTS = j['FORWARD_STRUCTS']
+    RELAY = j.get('RELAY')
 
-    return WAIT_TO_START_SECS, SOURCE_FOLDER, NUMBER_OF_LAST_UPDATED_FILES, FORWARD_STRUCTS, APPLICATION_NAME_PATTERN
+    return WAIT_TO_START_SECS, SOURCE_FOLDER, NUMBER_OF_LAST_UPDATED_FILES, FORWARD_STRUCTS, APPLICATION_NAME_PATTERN, RELAY
 
 
 def wait_to_start(wait_to_start_secs):
@@ -71,7 +73,7 @@ if __name__ == "__main__":
         wait, config_file_path = parse_args()
         app_name = os.path.basename(config_file_path).replace("config-", "").replace(".json", "")
         setup_logging(SCRIPT_HOME, app_name, 'config/logger-config.json')
-        wait_to_start_secs, source_folder, number_of_last_updated_files, forward_structs, application_name_pattern = load_config(
+        wait_to_start_secs, source_folder, number_of_last_updated_files, forward_structs, application_name_pattern, relay_struct = load_config(
             config_file_path)
 
         if wait:
@@ -89,10 +91,14 @@ if __name__ == "__main__":
 
         # hostname = hostname(namespace_pattern, dest_folder)
 
-        file_paths = collect_files(source_folder, number_of_last_updated_files)
+        if relay_struct:
+            # Stream straight from the pod to the destinations, without the local copy
+            relay_files(relay_struct, forward_structs, output_path, application_name_pattern, number_of_last_updated_files)
+        else:
+            file_paths = collect_files(source_folder, number_of_last_updated_files)
 
-        if file_paths:
-            forward_files(file_paths, forward_structs, output_path, application_name_pattern)
+            if file_paths:
+                forward_files(file_paths, forward_structs, output_path, application_name_pattern)
 
         logging.info("--- Application End ---")
     except Exception as ex:
@@ -0,0 +1,148 @@
+"""
+Relay mode: streams files from a pod straight to the SFTP destinations.
+
+Instead of copying the files to the local SOURCE_FOLDER, re-reading them and
+gunzipping a local copy of every .xml.gz, one kubectl exec tars the newest files
+to stdout, each entry is decompressed from the exec pipe and uploaded to every
+destination of FORWARD_STRUCTS. Entries are held in memory; only entries larger
+than SPILL_BUFFER_BYTES spill to a temporary file in the output folder, one
+entry at a time. Files already relayed to a destination, according to the
+transfer ledger, are skipped without being read.
+
+Enabled by a "RELAY" section in the configuration:
+    "RELAY": {
+      "CONTAINER_PATTERN": "eric-pm-bulk-reporter",
+      "POD_PATTERN": "eric-pm-bulk-reporter-.*",
+      "NAMESPACE_PATTERN": ".*",
+      "SOURCE_FOLDER": "/PM_counters",
+      "SPILL_BUFFER_BYTES": 67108864
+    }
+"""
+import gzip
+import logging
+import os.path
+import shlex
+import shutil
+import tarfile
+import tempfile
+from contextlib import ExitStack
+from typing import IO, Iterator, List, Tuple
+
+from forwarder import upload_fileobj, ledger_path, ledger_destination
+from kubernetes import Container, cont_str, exec_kube_stream, select_containers
+from proc2 import eval_value
+from lib.sftp_broker.sftp_broker import open_sftp
+from lib.transfer_ledger.transfer_ledger import TransferLedger, RENAMED
+
+DEFAULT_SPILL_BUFFER_BYTES = 64 * 1024 * 1024
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+def relay_cmd(source_folder: str, number_of_last_updated_files: int) -> str:
+    # Same selection as collect_files: the newest regular files of the folder
+    script = f"cd {shlex.quote(source_folder)} && ls -1tp | grep -v / | head -n {int(number_of_last_updated_files)} | tar -zcf - -T -"
+    return f"sh -c {shlex.quote(script)}"
+
+
+def destination_name(member_name: str) -> str:
+    filename = os.path.basename(member_name)
+    return filename[:-len(".gz")] if filename.endswith(".gz") else filename
+
+
+def stream_files(cont: Container, source_folder: str, number_of_last_updated_files: int) -> Iterator[Tuple[tarfile.TarInfo, IO[bytes]]]:
+    """Yield (tar member, file object) per streamed file; the file object is only valid until the next item."""
+    with tempfile.TemporaryFile() as stderr:
+        proc = exec_kube_stream(relay_cmd(source_folder, number_of_last_updated_files), cont, stderr)
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|gz") as archive:
+                for member in archive:
+                    if member.isfile():
+                        yield member, archive.extractfile(member)
+        except tarfile.TarError as err:
+            logging.error(f"Failed reading file stream from pod {cont_str(cont)}, error: {err}")
+        finally:
+            proc.stdout.close()
+            if proc.wait():
+                stderr.seek(0)
+                logging.error(f"Failed streaming files from pod {cont_str(cont)}, error: {stderr.read().decode('utf-8', 'replace')}")
+
+
+def open_destinations(stack: ExitStack, forward_structs: [], application_name_pattern: str) -> List[Tuple[str, object, str]]:
+    destinations = []
+    for fwd_struct in forward_structs:
+        hostname = eval_value(fwd_struct["HOSTNAME"])
+        username = fwd_struct["USERNAME"]
+        try:
+            dest_folder = fwd_struct["DESTINATION_FOLDER"][application_name_pattern]
+            logging.info(f"SFTP: {username}@{hostname}")
+            sftp = stack.enter_context(open_sftp(hostname, username, fwd_struct["PASSWORD"]))
+            destinations.append((hostname, sftp, dest_folder))
+        except Exception as ex:
+            logging.exception(f"Failed connecting to destination host: {hostname}")
+    return destinations
+
+
+def relay_container(cont: Container, source_folder: str, number_of_last_updated_files: int, destinations: [],
+                    spill_folder: str, spill_buffer_bytes: int, ledger: TransferLedger) -> List[str]:
+    relayed = []
+    for member, fileobj in stream_files(cont, source_folder, number_of_last_updated_files):
+        member_name = member.name
+        filename = destination_name(member_name)
+        key = (f"{cont_str(cont)}:{os.path.join(source_folder, member_name)}", member.size, int(member.mtime))
+        pending = [(hostname, sftp, dest_folder) for hostname, sftp, dest_folder in destinations
+                   if not ledger.reached(key, RENAMED, ledger_destination(hostname, dest_folder))]
+        if not pending:
+            logging.info(f"Already relayed, skipping file: {member_name}")
+            continue
+        try:
+            if member_name.endswith(".gz"):
+                fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+            # The exec pipe can be read once, the buffer is replayed for every destination
+            with tempfile.SpooledTemporaryFile(max_size=spill_buffer_bytes, dir=spill_folder) as buffer:
+                shutil.copyfileobj(fileobj, buffer, COPY_BUFFER_BYTES)
+                size = buffer.tell()
+                uploaded = False
+                for hostname, sftp, dest_folder in pending:
+                    buffer.seek(0)
+                    try:
+                        upload_fileobj(sftp, buffer, dest_folder, filename, hostname, ledger, key, size)
+                        uploaded = True
+                    except Exception as ex:
+                        logging.exception(f"Failed transferring file {filename} to {hostname}")
+            if uploaded:
+                relayed.append(filename)
+        except Exception as ex:
+            logging.exception(f"Failed relaying file {member_name} from pod {cont_str(cont)}")
+    return relayed
+
+
+def relay_files(relay_struct: dict, forward_structs: [], output_path: str, application_name_pattern: str,
+                number_of_last_updated_files: int) -> List[str]:
+    container_pattern = relay_struct["CONTAINER_PATTERN"]
+    pod_pattern = relay_struct["POD_PATTERN"]
+    namespace_pattern = relay_struct["NAMESPACE_PATTERN"]
+    source_folder = relay_struct["SOURCE_FOLDER"]
+    spill_buffer_bytes = relay_struct.get("SPILL_BUFFER_BYTES", DEFAULT_SPILL_BUFFER_BYTES)
+    logging.info(f"Relaying files from cont: {container_pattern}, pod: {pod_pattern}, ns: {namespace_pattern}, folder: {source_folder}")
+
+    containers = select_containers(container_pattern, pod_pattern, namespace_pattern)
+    if not containers:
+        logging.error("No containers to relay files from")
+        return []
+
+    relayed = []
+    with ExitStack() as stack:
+        ledger = stack.enter_context(TransferLedger(ledger_path(output_path)))
+        ledger.prune()
+        destinations = open_destinations(stack, forward_structs, application_name_pattern)
+        if not destinations:
+            logging.error("No destination reachable, nothing relayed")
+            return []
+
+        for cont in containers:
+            relayed.extend(relay_container(cont, source_folder, number_of_last_updated_files, destinations,
+                                           output_path, spill_buffer_bytes, ledger))
+
+    logging.info(f"Files relayed: {relayed}")
+    return relayed
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for relay mode, streaming an in-memory tar of the pod files to fake SFTP destinations
+"""
+
+import gzip
+import io
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import relay
+from kubernetes import Container
+from relay import relay_cmd, destination_name, relay_container
+from lib.transfer_ledger.transfer_ledger import TransferLedger
+
+CONTAINER = Container("eric-pm-bulk-reporter", "eric-pm-bulk-reporter-0", "pm")
+MTIME = 1760000000
+
+
+class _RemoteFile(io.FileIO):
+    def set_pipelined(self, pipelined=True):
+        pass
+
+
+class LocalSftp:
+    """The SFTP calls of upload_fileobj, served from a local directory."""
+
+    def __init__(self, root, fail=False):
+        self.root = root
+        self.fail = fail
+
+    def _path(self, path):
+        return os.path.join(self.root, path.lstrip("/"))
+
+    def mkdir(self, path):
+        os.mkdir(self._path(path))
+
+    def open(self, path, mode):
+        if self.fail:
+            raise IOError("Connection lost")
+        return _RemoteFile(self._path(path), mode.replace("b", ""))
+
+    def stat(self, path):
+        return os.stat(self._path(path))
+
+    def rename(self, old_path, new_path):
+        os.rename(self._path(old_path), self._path(new_path))
+
+    def remove(self, path):
+        os.remove(self._path(path))
+
+
+class _Exec:
+    """Stands in for the kubectl exec Popen, its stdout the tar stream."""
+
+    def __init__(self, data):
+        self.stdout = io.BytesIO(data)
+
+    def wait(self):
+        return 0
+
+
+def tar_gz(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = MTIME
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class TestRelayCmd(unittest.TestCase):
+
+    def test_relay_cmd_quoting(self):
+        """The source folder is quoted inside the script, and the script as a whole for the exec"""
+        cmd = relay_cmd("/PM counters/it's", "5")
+        self.assertTrue(cmd.startswith("sh -c "))
+        script = shlex.split(cmd)[2]
+        self.assertEqual(shlex.split(script)[:2], ["cd", "/PM counters/it's"])
+        self.assertIn("head -n 5 |", script)
+
+    def test_relay_cmd_runs(self):
+        """Run locally, the command tars the newest regular files of the folder"""
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir, True)
+        source = os.path.join(work_dir, "PM $counters")
+        os.makedirs(os.path.join(source, "subdir"))
+        for ix, name in enumerate(["a.xml", "b.xml.gz", "c.xml"]):
+            with open(os.path.join(source, name), "w") as f:
+                f.write(name)
+            os.utime(os.path.join(source, name), (MTIME + ix, MTIME + ix))
+
+        data = subprocess.run(relay_cmd(source, 2), shell=True, capture_output=True, check=True).stdout
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+            self.assertEqual(sorted(archive.getnames()), ["b.xml.gz", "c.xml"])
+
+    def test_destination_name(self):
+        self.assertEqual(destination_name("A20261019.xml.gz"), "A20261019.xml")
+        self.assertEqual(destination_name("./sub/A20261019.xml.gz"), "A20261019.xml")
+        self.assertEqual(destination_name("A20261019.xml"), "A20261019.xml")
+        self.assertEqual(destination_name("gz"), "gz")
+
+
+class TestRelayContainer(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.ledger = TransferLedger(os.path.join(self.work_dir, "transfer_ledger.db"))
+        self.ledger.__enter__()
+        self.remote = {}
+        for hostname in ("splunk1", "splunk2"):
+            self.remote[hostname] = os.path.join(self.work_dir, hostname)
+            os.makedirs(self.remote[hostname])
+
+    def tearDown(self):
+        self.ledger.__exit__(None, None, None)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def destinations(self, failing=()):
+        return [(hostname, LocalSftp(root, fail=hostname in failing), "/pm")
+                for hostname, root in self.remote.items()]
+
+    def relay(self, files, destinations, spill_buffer_bytes=1024):
+        data = tar_gz(files)
+        with patch.object(relay, "exec_kube_stream", lambda cmd, cont, stderr: _Exec(data)):
+            return relay_container(CONTAINER, "/PM_counters", 10, destinations, self.work_dir,
+                                   spill_buffer_bytes, self.ledger)
+
+    def remote_file(self, hostname, filename):
+        with open(os.path.join(self.remote[hostname], "pm", filename), "rb") as f:
+            return f.read()
+
+    def test_spill_buffer_replayed_to_every_destination(self):
+        """An entry larger than the spill buffer spills to disk and reaches both destinations whole"""
+        large = os.urandom(64 * 1024)
+        relayed = self.relay([("large.xml", large), ("small.xml", b"<pm/>")], self.destinations(),
+                             spill_buffer_bytes=4096)
+        self.assertEqual(relayed, ["large.xml", "small.xml"])
+        for hostname in self.remote:
+            self.assertEqual(self.remote_file(hostname, "large.xml"), large)
+            self.assertEqual(self.remote_file(hostname, "small.xml"), b"<pm/>")
+            self.assertEqual(sorted(os.listdir(os.path.join(self.remote[hostname], "pm"))), ["large.xml", "small.xml"])
+
+    def test_gzip_entries_uploaded_decompressed(self):
+        content = b"<measCollecFile/>" * 100
+        relayed = self.relay([("A20261019.xml.gz", gzip.compress(content))], self.destinations())
+        self.assertEqual(relayed, ["A20261019.xml"])
+        for hostname in self.remote:
+            self.assertEqual(self.remote_file(hostname, "A20261019.xml"), content)
+
+    def test_already_relayed_skipped(self):
+        files = [("a.xml", b"a")]
+        self.assertEqual(self.relay(files, self.destinations()), ["a.xml"])
+        self.assertEqual(self.relay(files, self.destinations(failing=self.remote)), [])
+
+    def test_relayed_only_when_uploaded(self):
+        """A file is reported relayed if at least one destination got it"""
+        files = [("a.xml", b"a")]
+        self.assertEqual(self.relay(files, self.destinations(failing=self.remote)), [])
+        self.assertEqual(self.relay(files, self.destinations(failing=["splunk1"])), ["a.xml"])
+        self.assertEqual(self.remote_file("splunk2", "a.xml"), b"a")
+
+        # splunk1 gets the file on the next run, splunk2 is not sent it again
+        self.assertEqual(self.relay(files, self.destinations(failing=["splunk2"])), ["a.xml"])
+        self.assertEqual(self.remote_file("splunk1", "a.xml"), b"a")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Fake kubectl for the benchmark harness.
+
+Installed as `kubectl` on the PATH of a benchmark run (see fakes.install_shims). Every call
+sleeps the injected latency, is appended to the call log and is then answered from:
+
+    1. the canned responses file: {"exec": [[regex, stdout], ...], "other": [[regex, stdout], ...]},
+       matched against the exec'd command, or against all arguments for the other verbs;
+    2. for `kubectl exec`, running the command locally with the pod's absolute paths
+       (/var, /opt, /tmp, /etc, /home and a bare "cd /") moved under the pod root.
+
+Environment:
+    BENCH_POD_ROOT            dir standing in for the pods' filesystems; <root>/<pod> wins if it exists
+    BENCH_KUBECTL_LATENCY_MS  sleep per call, default 0
+    BENCH_KUBECTL_LOG         JSON-lines call log: {"verb", "pod", "argv", "secs", "rc"}
+    BENCH_KUBECTL_RESPONSES   canned responses file
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+_POD_PATH = re.compile(r"(?<![\w.~/-])/(?=(?:var|opt|tmp|etc|home)\b)")
+_CD_ROOT = re.compile(r"\bcd /(?=[\s;&|]|$)")
+_FLAGS_WITH_VALUE = ("-n", "--namespace", "-c", "--container", "--context", "-o", "--output", "-l", "--selector")
+
+
+def load_responses(path):
+    if not path or not os.path.isfile(path):
+        return {"exec": [], "other": []}
+    with open(path) as f:
+        responses = json.load(f)
+    return {verb: [(re.compile(regex), stdout) for regex, stdout in responses.get(verb, [])]
+            for verb in ("exec", "other")}
+
+
+def canned(responses, text):
+    for regex, stdout in responses:
+        if regex.search(text):
+            return stdout
+    return None
+
+
+def positional(args):
+    """Arguments that are neither flags nor flag values."""
+    words, skip = [], False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in _FLAGS_WITH_VALUE:
+            skip = True
+        elif not arg.startswith("-"):
+            words.append(arg)
+    return words
+
+
+def parse_exec(args):
+    """(pod, command) of `kubectl [opts] exec [opts] pod [opts] -- command...`."""
+    command = []
+    if "--" in args:
+        command = args[args.index("--") + 1:]
+        args = args[:args.index("--")]
+    words = positional(args)
+    return (words[1] if len(words) > 1 else None), command
+
+
+def pod_root(pod):
+    root = os.environ.get("BENCH_POD_ROOT", "/tmp/bench_pod_root")
+    return os.path.join(root, pod) if pod and os.path.isdir(os.path.join(root, pod)) else root
+
+
+def to_pod_paths(arg, root):
+    return _POD_PATH.sub(root.rstrip("/") + "/", _CD_ROOT.sub(f"cd {root}", arg))
+
+
+def run_exec(pod, command, responses):
+    stdout = canned(responses["exec"], " ".join(command))
+    if stdout is not None:
+        sys.stdout.write(stdout)
+        return 0
+    if not command:
+        sys.stderr.write("error: you must specify at least one command for the container\n")
+        return 1
+    root = pod_root(pod)
+    env = dict(os.environ, HOSTNAME=pod or "bench-pod")
+    try:
+        return subprocess.call([to_pod_paths(arg, root) for arg in command], cwd=root, env=env)
+    except OSError as err:
+        sys.stderr.write(f"OCI runtime exec failed: {err}\n")
+        return 126
+
+
+def main(args):
+    started = time.time()
+    time.sleep(float(os.environ.get("BENCH_KUBECTL_LATENCY_MS", "0")) / 1000)
+    responses = load_responses(os.environ.get("BENCH_KUBECTL_RESPONSES"))
+
+    pod = None
+    verb = next(iter(positional(args[:args.index("--")] if "--" in args else args)), "")
+    if verb == "exec":
+        pod, command = parse_exec(args)
+        rc = run_exec(pod, command, responses)
+    else:
+        stdout = canned(responses["other"], " ".join(args))
+        if stdout is None:
+            sys.stderr.write("No resources found\n")
+            rc = 1
+        else:
+            sys.stdout.write(stdout)
+            rc = 0
+
+    log_path = os.environ.get("BENCH_KUBECTL_LOG")
+    if log_path:
+        with open(log_path, "a") as log:
+            log.write(json.dumps({"verb": verb, "pod": pod, "argv": args,
+                                  "secs": round(time.time() - started, 6), "rc": rc}) + "\n")
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
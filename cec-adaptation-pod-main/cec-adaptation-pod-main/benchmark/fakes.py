@@ -0,0 +1,203 @@
+"""
+Local stand-ins for the cluster, Kafka and the SFTP servers used by the benchmark scenarios.
+
+install_shims() puts a fake kubectl (fake_kubectl.py) and pass-through host commands on the
+PATH; FakeKafkaProducer and FakeSftpServer replace the producer and the SFTP connection in
+process, each with an injectable per-operation latency, and count what went through them.
+"""
+import os
+import shlex
+import shutil
+import stat
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+FAKE_KUBECTL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_kubectl.py")
+
+
+def _write_executable(path: str, content: str):
+    with open(path, "w") as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def install_shims(bin_dir: str, pod_root: str, call_log: str, latency_ms: float = 0,
+                  responses_path: Optional[str] = None, host_commands: Dict[str, str] = None) -> Dict[str, str]:
+    """
+    Create the shim bin dir and return the environment to run a scenario with.
+
+    host_commands maps extra command names to the stdout they print (e.g. {"ip": ""} so the
+    director-node check of KPI_CSA does not look at this host). sudo runs its arguments as is.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    _write_executable(os.path.join(bin_dir, "kubectl"),
+                      f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_KUBECTL}" "$@"\n')
+    _write_executable(os.path.join(bin_dir, "sudo"), '#!/bin/sh\nexec "$@"\n')
+    for name, stdout in (host_commands or {}).items():
+        _write_executable(os.path.join(bin_dir, name), f"#!/bin/sh\nprintf '%s' {shlex.quote(stdout)}\n")
+    return {
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "BENCH_POD_ROOT": pod_root,
+        "BENCH_KUBECTL_LOG": call_log,
+        "BENCH_KUBECTL_LATENCY_MS": str(latency_ms),
+        "BENCH_KUBECTL_RESPONSES": responses_path or "",
+    }
+
+
+class _FakeFuture:
+    def __init__(self, latency_secs: float):
+        self.latency_secs = latency_secs
+
+    def get(self, timeout=None):
+        time.sleep(self.latency_secs)
+        return None
+
+
+class FakeKafkaProducer:
+    """
+    In-process KafkaProducer stand-in: send() returns a future whose get() sleeps latency_ms,
+    like a broker acknowledgement. Records every message on the class so the scenario can
+    count them after the code under test has closed its producers.
+    """
+    latency_ms: float = 0
+    sent: List[tuple] = []
+    _lock = threading.Lock()
+
+    def __init__(self, bootstrap_servers=None, **config):
+        self.bootstrap_servers = bootstrap_servers
+        self.config = config
+
+    @classmethod
+    def configure(cls, latency_ms: float):
+        cls.latency_ms = latency_ms
+        cls.sent = []
+
+    def send(self, topic, value=None, key=None, **kwargs):
+        with self._lock:
+            type(self).sent.append((topic, len(value or b"")))
+        return _FakeFuture(self.latency_ms / 1000)
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+class _FakeRemoteFile:
+    def __init__(self, server: "FakeSftpServer", path: str, mode: str):
+        self.server = server
+        self._file = open(path, mode)
+
+    def set_pipelined(self, pipelined=True):
+        pass
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def write(self, data):
+        self.server.account("write", len(data))
+        return self._file.write(data)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FakeSftpServer:
+    """
+    Local SFTP stand-in: remote absolute paths live under root. client() returns an object with
+    the paramiko SFTPClient calls the uploaders use (put, putfo, open, rename, stat, remove,
+    listdir, mkdir, chown, close); every call sleeps latency_ms and is counted.
+    """
+
+    def __init__(self, root: str, latency_ms: float = 0):
+        self.root = root
+        self.latency_ms = latency_ms
+        self.operations = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def account(self, operation: str, nbytes: int = 0):
+        with self._lock:
+            if operation != "write":
+                self.operations += 1
+            self.bytes_written += nbytes
+
+    def local_path(self, remote_path: str) -> str:
+        path = os.path.join(self.root, remote_path.lstrip("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def client(self, *args, **kwargs) -> "FakeSftpClient":
+        return FakeSftpClient(self)
+
+
+class FakeSftpClient:
+    def __init__(self, server: FakeSftpServer):
+        self.server = server
+
+    def _op(self, operation: str):
+        time.sleep(self.server.latency_ms / 1000)
+        self.server.account(operation)
+
+    def put(self, local_path, remote_path, callback=None, confirm=True):
+        self._op("put")
+        shutil.copyfile(local_path, self.server.local_path(remote_path))
+        self.server.account("write", os.path.getsize(local_path))
+        return self.stat(remote_path)
+
+    def putfo(self, fileobj, remote_path, file_size=0, callback=None, confirm=True):
+        self._op("putfo")
+        with open(self.server.local_path(remote_path), "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+            self.server.account("write", f.tell())
+        return self.stat(remote_path)
+
+    def open(self, remote_path, mode="r", bufsize=-1):
+        self._op("open")
+        mode = mode if "b" in mode else mode + "b"
+        return _FakeRemoteFile(self.server, self.server.local_path(remote_path), mode)
+
+    def rename(self, old_path, new_path):
+        self._op("rename")
+        os.rename(self.server.local_path(old_path), self.server.local_path(new_path))
+
+    def posix_rename(self, old_path, new_path):
+        self._op("rename")
+        os.replace(self.server.local_path(old_path), self.server.local_path(new_path))
+
+    def stat(self, remote_path):
+        self._op("stat")
+        return os.stat(self.server.local_path(remote_path))
+
+    def remove(self, remote_path):
+        self._op("remove")
+        os.remove(self.server.local_path(remote_path))
+
+    def listdir(self, remote_path="."):
+        self._op("listdir")
+        return os.listdir(self.server.local_path(remote_path.rstrip("/") + "/."))
+
+    def mkdir(self, remote_path, mode=0o777):
+        self._op("mkdir")
+        os.makedirs(self.server.local_path(remote_path.rstrip("/") + "/."), exist_ok=True)
+
+    def chown(self, remote_path, uid, gid):
+        self._op("chown")
+
+    def chdir(self, remote_path=None):
+        self._op("chdir")
+
+    def close(self):
+        pass
@@ -0,0 +1,189 @@
+"""
+Synthetic, seeded fixtures for the benchmark scenarios.
+
+Every generator takes a random.Random so two runs with the same seed and scale write the same
+bytes; only file mtimes differ (they are "now", as the modules select recent files).
+"""
+import gzip
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+MEAS_COLLEC_NS = "http://www.3gpp.org/ftp/specs/archive/32_series/32.435#measCollec"
+
+# measInfoId -> counters, modelled on the CSA/CAF ROP files the KPI modules read
+CSA_MEAS_INFOS: Dict[str, Sequence[str]] = {
+    "scp_egress": ("envoy_egress_upstream_rq_total", "envoy_egress_upstream_rq", "envoy_egress_upstream_rq_time"),
+    "scp_ingress": ("envoy_ingress_downstream_rq_total", "envoy_ingress_downstream_rq"),
+    "scp_system_metrics": ("scp_load", "scp_cpu", "scp_memory"),
+    "cha-pm-counters-group-RequestName": ("cha_access_rating_diameter_requests_total",
+                                          "cha_access_rating_diameter_requests_errors_total",
+                                          "cha_access_nchf_charging_http_request_average_duration_milliseconds"),
+}
+POOLS = ("cc_create", "cc_update", "cc_release", "iotchf_create", "nchf_sms")
+RESPONSE_CODES = ("200", "201", "204", "400", "404", "410", "500", "503", "504")
+REQUEST_NAMES = ("Ro-CCR-Initial", "Ro-CCR-Update", "Ro-CCR-Termination", "Gy-CCR-Initial", "SCAPv2-Refund")
+
+
+def _meas_obj_ldns(rnd: random.Random, meas_info_id: str, count: int) -> List[str]:
+    ldns = []
+    for _ in range(count):
+        if meas_info_id.startswith("cha-"):
+            ldns.append(f"RequestName={rnd.choice(REQUEST_NAMES)},response-code={rnd.choice(('2001', '4010', '5002', '5030'))}")
+        else:
+            ldns.append(f"pool_name={rnd.choice(POOLS)}_{rnd.randint(1, 4)},envoy_response_code={rnd.choice(RESPONSE_CODES)}")
+    return ldns
+
+
+def write_meas_collec(path: str, rnd: random.Random, values_per_info: int = 200,
+                      meas_infos: Dict[str, Sequence[str]] = None, end_time: datetime = None, compress: bool = False):
+    """One measCollec ROP file with values_per_info measValues in every measInfo."""
+    end_time = end_time or datetime.now()
+    stamp = end_time.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<measCollecFile xmlns="{MEAS_COLLEC_NS}">'
+             f'<fileHeader fileFormatVersion="32.435 V10.0" vendorName="Ericsson" dnPrefix="DC=bench,">'
+             f'<fileSender/><measCollec beginTime="{stamp}"/></fileHeader>'
+             f'<measData><managedElement localDn="ManagedElement=bench-node" swVersion="1.0"/>']
+    for meas_info_id, counters in (meas_infos or CSA_MEAS_INFOS).items():
+        parts.append(f'<measInfo measInfoId="{meas_info_id}"><job jobId="1"/>'
+                     f'<granPeriod duration="PT300S" endTime="{stamp}"/><repPeriod duration="PT300S"/>')
+        parts.extend(f'<measType p="{p}">{counter}</measType>' for p, counter in enumerate(counters, 1))
+        for ldn in _meas_obj_ldns(rnd, meas_info_id, values_per_info):
+            parts.append(f'<measValue measObjLdn="{ldn}">')
+            parts.extend(f'<r p="{p}">{rnd.randint(0, 5000)}</r>' for p in range(1, len(counters) + 1))
+            parts.append('<suspect>false</suspect></measValue>')
+        parts.append('</measInfo>')
+    parts.append(f'</measData><fileFooter><measCollec endTime="{stamp}"/></fileFooter></measCollecFile>\n')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with (gzip.open(path, "wt") if compress else open(path, "w")) as f:
+        f.write("".join(parts))
+
+
+def write_meas_collec_dir(directory: str, rnd: random.Random, files: int, values_per_info: int,
+                          compress: bool = False) -> List[str]:
+    """files consecutive 5-minute ROP files, the newest ending now."""
+    paths = []
+    now = datetime.now()
+    for index in range(files):
+        end_time = now - timedelta(minutes=5 * (files - 1 - index))
+        name = f"A{end_time.strftime('%Y%m%d.%H%M')}+0000-bench_{index}.xml{'.gz' if compress else ''}"
+        path = os.path.join(directory, name)
+        write_meas_collec(path, rnd, values_per_info, end_time=end_time, compress=compress)
+        paths.append(path)
+    return paths
+
+
+def write_sdp_stat_files(pod_root: str, rnd: random.Random, rows: int = 500):
+    """The /tmp/*.stat.0 files KPI_SDP greps: Diameter, DirectDebit, voice, PPAS and SMS Total rows."""
+    tmp = os.path.join(pod_root, "tmp")
+    os.makedirs(tmp, exist_ok=True)
+
+    def numbers(count):
+        return " ".join(str(rnd.randint(0, 900)) for _ in range(count))
+
+    with open(os.path.join(tmp, "PSC-CIPDiameter_8.1_A_1.stat.0"), "w") as f:
+        for _ in range(rows):
+            f.write(f"Diameter {numbers(6)}\nDirectDebit {numbers(5)}\n"
+                    f"FirstInterrogation {numbers(5)}\nFinalReport {numbers(5)}\n")
+    for name in ("PSC-PPASInterface_8.1_A_1.stat.0", "FSC-SMSInterface_8.0_A_1.stat.0"):
+        with open(os.path.join(tmp, name), "w") as f:
+            f.writelines(f"Total {numbers(5)}\n" for _ in range(rows))
+
+
+def write_sdp_pod(pod_root: str, rnd: random.Random, stat_rows: int, log_lines: int, pod: str = "sdp-bench-0"):
+    """
+    The filesystem of an SDP pod as KPI_SDP reads it: /etc/hosts, the stat files, the FDS event
+    logs, the replication and CDR directories, and the FDS tools as scripts with fixed output.
+    """
+    os.makedirs(os.path.join(pod_root, "etc"), exist_ok=True)
+    with open(os.path.join(pod_root, "etc", "hosts"), "w") as f:
+        f.write(f"127.0.0.1 localhost\n10.0.0.5 {pod}\n")
+    write_sdp_stat_files(pod_root, rnd, stat_rows)
+
+    logs = os.path.join(pod_root, "var", "opt", "fds", "logs")
+    for name, signatures in (("cPSCTrafficHandler.log.0", ("DATABASE_LOCK_CONTENTION",)),
+                             ("EventLogFile.txt.0", ("timeout event due to account lock",)),
+                             ("cPSCCIPDiameter.log.0", ("Reject from peer",)),
+                             ("cPSCConfigHandler.log.0", ("Failed to update", "Probably a sync issue"))):
+        write_event_log(os.path.join(logs, name), rnd, log_lines, signatures=signatures)
+
+    for directory, count in (("var/opt/fds/TT/db-log/sdp_db", 4), ("var/opt/fds/CDR/scheduledJobUnsentCdr", 3),
+                             ("var/opt/fds/FI/BN/failedtosendexternal", 2)):
+        os.makedirs(os.path.join(pod_root, directory), exist_ok=True)
+        for index in range(count):
+            open(os.path.join(pod_root, directory, f"sdp.{index}"), "w").close()
+    os.makedirs(os.path.join(pod_root, "home", "resolveSDP"), exist_ok=True)
+    with open(os.path.join(pod_root, "home", "resolveSDP", "lsmon.log"), "w") as f:
+        f.write("LicenseStatus LICENSE_ACTIVE\n" * 10)
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    for path, stdout in (("opt/EABfds/bin/FDSCluster", "Status:    Running\n" * 2),
+                         ("opt/EABfds/bin/FDSpgrep", "fds 1\nfds 2\n"),
+                         ("opt/sdp/TTMonitor/bin/TTRepCheck", f"{today} 10:00:00 OK replication\n")):
+        path = os.path.join(pod_root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(f"#!/bin/sh\nprintf '{stdout}'\n")
+        os.chmod(path, 0o755)
+
+
+def write_event_log(path: str, rnd: random.Random, lines: int, span_minutes: int = 120,
+                    signatures: Sequence[str] = (), signature_ratio: float = 0.01,
+                    time_format: str = "%Y%m%d %H:%M:%S"):
+    """An appended log of `lines` timestamped lines spread over span_minutes up to now."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    start = datetime.now() - timedelta(minutes=span_minutes)
+    step = span_minutes * 60.0 / max(lines, 1)
+    with open(path, "w") as f:
+        for index in range(lines):
+            stamp = (start + timedelta(seconds=index * step)).strftime(time_format)
+            if signatures and rnd.random() < signature_ratio:
+                message = f"ERROR {rnd.choice(signatures)} session={rnd.getrandbits(32):08x}"
+            else:
+                message = f"INFO request handled session={rnd.getrandbits(32):08x} took={rnd.randint(1, 90)}ms"
+            f.write(f"{stamp} {message}\n")
+
+
+def write_cdr_tree(root: str, rnd: random.Random, dirs: int, files_per_dir: int, file_bytes: int,
+                   extensions: Sequence[str] = (".CHAD", ".LOG", ".ERROR")) -> Tuple[int, int]:
+    """CDR files under root/<dir>/, as CDRS_TRANSFER walks them; returns (files, bytes)."""
+    files = total = 0
+    for d in range(dirs):
+        directory = os.path.join(root, f"cdr_{d:03d}")
+        os.makedirs(directory, exist_ok=True)
+        for index in range(files_per_dir):
+            size = max(1, int(file_bytes * rnd.uniform(0.5, 1.5)))
+            with open(os.path.join(directory, f"CDR_{d:03d}_{index:05d}{rnd.choice(extensions)}"), "wb") as f:
+                f.write(rnd.getrandbits(8 * size).to_bytes(size, "little"))
+            files += 1
+            total += size
+    return files, total
+
+
+def write_kafka_data_source(path: str, rnd: random.Random, records: int) -> Dict:
+    """A KAFKA_SENDER data source file (the KafkaDataSourceBuilder JSON layout) with records KPI rows."""
+    document = {
+        "message": {"category": "CORE - IN", "platform": "ERICSSON_BENCH", "source_owner": "Tier2_CC",
+                    "@table": ["kpi_name", "kpi_value", "kpi_result"], "ref_id": "{random}",
+                    "kpi_last_updated_date": datetime.now().strftime("%Y-%m-%d"), "kpi_source": "benchmark",
+                    "config_item": "BENCH", "kpi_info": "BENCH 127.0.0.1", "src_modified_dt": 0, "local_modified_dt": 0},
+        "table": [[f"BENCH_KPI_{index}", str(rnd.randint(0, 100000)), "UNDEFINED"] for index in range(records)],
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f)
+    return document
+
+
+def write_kafka_config(path: str, clusters: int = 2, timeout_secs: int = 3):
+    """KAFKA_SENDER config.json with fake cluster addresses (the producer is replaced in process)."""
+    config = {"kafka": {
+        "clusters": [{"name": f"bench_cluster_{c}", "addresses": [f"kafka-{c}-{n}.bench.local" for n in range(3)]}
+                     for c in range(clusters)],
+        "port": 9093, "message_topic": "bench.kpi", "timeout_secs": timeout_secs,
+        # circuit breaker state and spool stay in the work dir
+        "spool_dir": os.path.join(os.path.dirname(os.path.abspath(path)), "kafka_spool")}}
+    with open(path, "w") as f:
+        json.dump(config, f)
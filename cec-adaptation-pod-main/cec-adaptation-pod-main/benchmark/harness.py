@@ -0,0 +1,107 @@
+"""
+Stage timing for the benchmark scenarios.
+
+A BenchmarkRun records, per named stage: wall time, subprocesses started by this process,
+kubectl calls and the time spent in them (from the fake kubectl call log), and the peak RSS
+of this process and of its reaped children so far.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+_popen_count = 0
+_RealPopen = subprocess.Popen
+
+
+class _CountingPopen(_RealPopen):
+    def __init__(self, *args, **kwargs):
+        global _popen_count
+        _popen_count += 1
+        super().__init__(*args, **kwargs)
+
+
+def count_subprocesses():
+    """Route subprocess.Popen (and so run/call/check_output) through a counter; idempotent."""
+    subprocess.Popen = _CountingPopen
+
+
+def _peak_rss_mb(who) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class BenchmarkRun:
+    def __init__(self, scenario: str, params: Dict, kubectl_log: Optional[str] = None):
+        self.scenario = scenario
+        self.params = params
+        self.kubectl_log = kubectl_log
+        self.stages: List[Dict] = []
+        self.counters: Dict[str, float] = {}
+        self._depth = 0
+
+    def _kubectl_calls(self):
+        if not self.kubectl_log or not os.path.isfile(self.kubectl_log):
+            return []
+        with open(self.kubectl_log) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    @contextmanager
+    def stage(self, name: str):
+        calls_before = len(self._kubectl_calls())
+        popen_before = _popen_count
+        started = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            wall = time.perf_counter() - started
+            calls = self._kubectl_calls()[calls_before:]
+            self.stages.append({
+                "stage": name,
+                "nested": self._depth > 0,
+                "wall_secs": round(wall, 4),
+                "subprocesses": _popen_count - popen_before,
+                "kubectl_calls": len(calls),
+                "kubectl_secs": round(sum(call["secs"] for call in calls), 4),
+                "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+                "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+            })
+
+    def count(self, name: str, value: float):
+        """Scenario-specific totals, e.g. records published or bytes uploaded."""
+        self.counters[name] = value
+
+    def report(self) -> Dict:
+        return {
+            "scenario": self.scenario,
+            "params": self.params,
+            "total_wall_secs": round(sum(stage["wall_secs"] for stage in self.stages if not stage["nested"]), 4),
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+
+
+def format_table(reports: List[Dict]) -> str:
+    header = ("scenario", "stage", "wall s", "procs", "kubectl", "kubectl s", "rss MB", "child MB")
+    rows = [header]
+    for report in reports:
+        if "error" in report:
+            rows.append((report["scenario"], "FAILED", report["error"][:60], "", "", "", "", ""))
+            continue
+        for stage in report["stages"]:
+            name = ("  " if stage["nested"] else "") + stage["stage"]
+            rows.append((report["scenario"], name, f'{stage["wall_secs"]:.3f}', str(stage["subprocesses"]),
+                         str(stage["kubectl_calls"]), f'{stage["kubectl_secs"]:.3f}', f'{stage["peak_rss_mb"]:.1f}',
+                         f'{stage["children_peak_rss_mb"]:.1f}'))
+        counters = ", ".join(f"{name}={value}" for name, value in report["counters"].items())
+        rows.append((report["scenario"], "total", f'{report["total_wall_secs"]:.3f}', "", "", "", "", counters))
+    # The last column holds the scenario counters on the total rows; it is not padded
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header) - 1)] + [0]
+    return "\n".join("  ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)).rstrip() for row in rows)
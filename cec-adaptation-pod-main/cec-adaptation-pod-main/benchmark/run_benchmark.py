@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Runs the benchmark scenarios, each in a fresh Python process in its own work dir, and prints
+per-stage wall time, subprocess and kubectl call counts and peak RSS.
+
+    python benchmark/run_benchmark.py                          # all scenarios, scale 1
+    python benchmark/run_benchmark.py -s kpi_sdp -s kpi_csa --scale 4 --latency-ms 50
+    python benchmark/run_benchmark.py --json results.json      # also write the reports
+
+The fixtures are generated from --seed, so runs with the same arguments do the same work.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from harness import format_table
+from scenarios import SCENARIOS
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_in_process(name: str, scale: int, latency_ms: float, seed: int, keep_work: bool) -> dict:
+    work = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    report_path = os.path.join(work, "report.json")
+    try:
+        result = subprocess.run([sys.executable, os.path.join(BENCHMARK_DIR, "scenarios.py"), name, work, str(scale),
+                                 str(latency_ms), str(seed), report_path],
+                                cwd=work, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0 or not os.path.isfile(report_path):
+            return {"scenario": name, "error": (result.stderr.strip().splitlines() or [f"exit {result.returncode}"])[-1],
+                    "stderr": result.stderr}
+        with open(report_path) as f:
+            report = json.load(f)
+        report["work_dir"] = work if keep_work else None
+        return report
+    finally:
+        if not keep_work:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the KPI, Kafka and CDR transfer paths on local fixtures")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run, may be repeated; default all")
+    parser.add_argument("--scale", type=int, default=1, help="fixture size multiplier")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latency per kubectl call, Kafka acknowledgement and SFTP operation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario")
+    parser.add_argument("--json", help="write the reports to this file")
+    parser.add_argument("--keep-work", action="store_true", help="keep the fixture and log dirs")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    reports = []
+    for name in args.scenario or list(SCENARIOS):
+        for _ in range(args.repeat):
+            reports.append(run_in_process(name, args.scale, args.latency_ms, args.seed, args.keep_work))
+    print(format_table(reports))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 1 if any("error" in report for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Benchmark scenarios. Each runs one module path end to end against fixtures in a work dir and
+records its stages on a BenchmarkRun; run_benchmark.py runs every scenario in its own process.
+
+Scale 1 is roughly one cycle of a small site; the fixture sizes grow linearly with the scale.
+"""
+import json
+import logging
+import os
+import random
+import sys
+from functools import wraps
+
+from fakes import FakeKafkaProducer, FakeSftpServer, install_shims
+from fixtures import (write_cdr_tree, write_kafka_config, write_kafka_data_source, write_meas_collec_dir,
+                      write_sdp_pod)
+from harness import BenchmarkRun, count_subprocesses
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KAFKA_MESSAGE_TEMPLATE = {
+    "category": "CORE - IN", "platform": "ERICSSON_BENCH", "source_owner": "Tier2_CC",
+    "@table": ["kpi_name", "kpi_value", "kpi_result"], "ref_id": "{random}", "kpi_last_updated_date": None,
+    "kpi_source": None, "config_item": None, "kpi_info": None, "src_modified_dt": None, "local_modified_dt": None,
+}
+
+# Answers of the kubectl calls that do not exec into a pod
+CLUSTER_RESPONSES = [
+    [r"get svc", "pm-bulk-reporter   NodePort   10.96.0.10   <none>   22:30022/TCP   30d\n"],
+    [r"get nodes", "node-1   Ready   worker   30d   v1.25.4   10.0.0.21   <none>\n"],
+    [r"get pods", "".join(f"pod-{index}   1/1   Running   0   30d\n" for index in range(20))],
+]
+# Host commands the modules run outside the pods
+HOST_COMMANDS = {
+    "ip": "",   # not a standby director node
+    "sar": "".join(f"12:{m:02d}:01 dev8-0 1.0 2.0 3.0 4.0 5.0 6.0 {m % 15}.0\n" for m in range(60)),
+    "ifconfig": "",
+    "FDSRequestSender": '<PeerInformation fqdn="peer-1">\n<Status>CONNECTED</Status>\n</PeerInformation>\n'
+                        '<PeerInformation fqdn="peer-2">\n<Status>DISCONNECTED</Status>\n</PeerInformation>\n',
+}
+
+
+def _import_from(module_dir: str):
+    """Put a module dir first on sys.path, as its main.py sees it."""
+    sys.path.insert(0, os.path.join(REPO_ROOT, module_dir))
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+
+
+def _stage_method(run: BenchmarkRun, obj, name: str, stage: str):
+    """Record every call of obj.name as a stage, e.g. the PM file loading inside KPI_CSA.main."""
+    method = getattr(obj, name)
+
+    @wraps(method)
+    def staged(*args, **kwargs):
+        with run.stage(stage):
+            return method(*args, **kwargs)
+
+    setattr(obj, name, staged)
+
+
+def setup(work: str, latency_ms: float, seed: int) -> (str, random.Random):
+    """Shim PATH and logging for a scenario process; returns the kubectl call log path."""
+    pod_root = os.path.join(work, "pods")
+    os.makedirs(pod_root, exist_ok=True)
+    responses_path = os.path.join(work, "kubectl_responses.json")
+    with open(responses_path, "w") as f:
+        json.dump({"exec": [], "other": CLUSTER_RESPONSES}, f)
+    call_log = os.path.join(work, "kubectl_calls.jsonl")
+    os.environ.update(install_shims(os.path.join(work, "bin"), pod_root, call_log, latency_ms, responses_path,
+                                    HOST_COMMANDS))
+    logging.basicConfig(level=logging.INFO, filename=os.path.join(work, "scenario.log"),
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    count_subprocesses()
+    return call_log, random.Random(seed)
+
+
+def aggregator2(run: BenchmarkRun, work: str, scale: int, rnd: random.Random):
+    """measCollec ROP files -> PmStore -> Aggregator2 KPIs, and the same KPIs over a full line scan."""
+    sys.path.append(REPO_ROOT)
+    from lib.kpi_csv_aggregator.aggregator2 import Aggregator2, KpiDef, Oper, fs
+    from lib.pm_store.pm_store import PmStore
+
+    with run.stage("fixtures"):
+        paths = write_meas_collec_dir(os.path.join(work, "pm"), rnd, files=3, values_per_info=400 * scale)
+    with run.stage("pm_store.from_files"):
+        store = PmStore.from_files(paths)
+    kpi_defs = [KpiDef("SCP_LOAD", fs(["measInfoId=scp_system_metrics", "countername=scp_load"]), Oper.avg)]
+    for code in ("200", "201", "204", "400", "404", "410", "500", "503", "504"):
+        for pool in ("cc_", "cc_create", "cc_update", "iotchf_"):
+            kpi_defs.append(KpiDef(f"{pool}_{code}", fs(["measInfoId=scp_egress", f"pool_name=.*{pool}.*",
+                                                         "countername=envoy_egress_upstream_rq,",
+                                                         f"envoy_response_code={code}"]), Oper.sum))
+    with run.stage("aggregator2.store"):
+        agg = Aggregator2(15, store=store)
+        by_store = [agg.calc_kpi(kpi_def).value for kpi_def in kpi_defs]
+    with run.stage("aggregator2.line_scan"):
+        agg = Aggregator2(15, data_lines=store.lines())
+        by_lines = [agg.calc_kpi(kpi_def).value for kpi_def in kpi_defs]
+    run.count("counters", len(store))
+    run.count("kpis", len(kpi_defs))
+    run.count("store_matches_scan", by_store == by_lines)
+
+
+def kpi_csa(run: BenchmarkRun, work: str, scale: int, rnd: random.Random):
+    """One KPI_CSA cycle: the kubectl lookups, the PM file load and the KPI calculation."""
+    _import_from("KAFKA_CSA")
+    from KPI_CSA import KPI_CSA
+    from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
+
+    with run.stage("fixtures"):
+        pm_dir = os.path.join(work, "pm")
+        write_meas_collec_dir(pm_dir, rnd, files=3, values_per_info=400 * scale)
+        os.makedirs(os.path.join(work, "pods", "etc"), exist_ok=True)
+        with open(os.path.join(work, "pods", "etc", "hosts"), "w") as f:
+            f.write("127.0.0.1 localhost\n10.0.0.7 pm-bulk-reporter-0\n")
+    builder = KafkaDataSourceBuilder(dict(KAFKA_MESSAGE_TEMPLATE))
+    csa = KPI_CSA(work, "bench-host", "csa", 15, pm_dir, builder, False)
+    _stage_method(run, csa, "load_pm_files", "main.load_pm_files")
+    _stage_method(run, csa, "write_pm_kpis", "main.write_pm_kpis")
+    with run.stage("main"):
+        csa.main("pm-bulk-reporter-0")
+    with run.stage("write_to_file"):
+        builder.write_to_file(os.path.join(work, "bench-host_CSA_KPI.txt"))
+    run.count("kpis", len(builder.data_source().table))
+
+
+def kpi_sdp(run: BenchmarkRun, work: str, scale: int, rnd: random.Random):
+    """One KPI_SDP pod cycle: every kubectl exec, the log window counts and the data source file."""
+    _import_from("KAFKA_SDP_PREPAID")
+    from KPI_SDP import KPI_SDP
+    from KAFKA_SENDER.KafkaDataSourceBuilder import KafkaDataSourceBuilder
+
+    pod = "sdp-bench-0"
+    with run.stage("fixtures"):
+        write_sdp_pod(os.path.join(work, "pods", pod), rnd, stat_rows=500 * scale, log_lines=20000 * scale, pod=pod)
+    builder = KafkaDataSourceBuilder(dict(KAFKA_MESSAGE_TEMPLATE))
+    sdp = KPI_SDP("bench-host", "sdp-ns", "sdp", work, work, work, work, "sdp")
+    _stage_method(run, sdp, "count_log_signatures", "main.count_log_signatures")
+    with run.stage("main"):
+        sdp.main((pod, 0, builder))
+    with run.stage("write_to_file"):
+        builder.write_to_file(os.path.join(work, f"bench-host_{pod}_KPI.txt"))
+    run.count("kpis", len(builder.data_source().table))
+
+
+def kafka_sender(run: BenchmarkRun, work: str, scale: int, rnd: random.Random, latency_ms: float = 0):
+    """KAFKA_SENDER.process of one data source file to two clusters, with acknowledgements delayed latency_ms."""
+    sys.path.append(REPO_ROOT)
+    from KAFKA_SENDER import main as sender
+
+    with run.stage("fixtures"):
+        data_source_path = os.path.join(work, "bench_KPI.txt")
+        write_kafka_data_source(data_source_path, rnd, records=200 * scale)
+        config_path = os.path.join(work, "kafka_config.json")
+        write_kafka_config(config_path)
+    FakeKafkaProducer.configure(latency_ms)
+    sender.KafkaProducer = FakeKafkaProducer
+    sender.USE_KAFKA_PYTHON_2 = False
+    with run.stage("load_data_source"):
+        ds = sender.load_data_source(data_source_path)
+    with run.stage("process"):
+        sender.process(data_source_path, ds, config_path, os.path.join(work, "bench_KPI.status"), False)
+    run.count("records", len(ds.table))
+    run.count("messages_sent", len(FakeKafkaProducer.sent))
+
+
+def cdrs_transfer(run: BenchmarkRun, work: str, scale: int, rnd: random.Random, latency_ms: float = 0):
+    """CDRS_TRANSFER SFTPUploader.run over a CDR tree into a local SFTP stand-in, with the transfer ledger."""
+    _import_from("CDRS_TRANSFER")
+    import python_sftp_cdrs
+
+    namespace = "benchcafgp1"
+    cdr_root = os.path.join(work, "cdrs")
+    with run.stage("fixtures"):
+        files, total_bytes = write_cdr_tree(cdr_root, rnd, dirs=4, files_per_dir=50 * scale, file_bytes=4096)
+        config_path = os.path.join(work, "cdrs_config.json")
+        with open(config_path, "w") as f:
+            json.dump({"root_directory": cdr_root, "sftp_connections": {"CHAD": {
+                namespace: {"primary_host": "sftp-1.bench.local", "secondary_host": "sftp-2.bench.local"},
+                "port": 22, "username": "bench", "password": "bench",
+                "file_types": [".CHAD", ".LOG", ".ERROR"],
+                "remote_directory_map": {".CHAD": "/var/opt/mediation/CHD/", ".LOG": "/var/opt/mediation/CHADLog/",
+                                         ".ERROR": "/var/opt/mediation/Error/"}}}}, f)
+    server = FakeSftpServer(os.path.join(work, "sftp"), latency_ms)
+    python_sftp_cdrs.open_brokered_sftp = server.client
+    uploader = python_sftp_cdrs.SFTPUploader(config_path, namespace, logging.getLogger("CDRS_TRANSFER"),
+                                             os.path.join(work, "ledger.db"))
+    with run.stage("run"):
+        uploader.run()
+    run.count("files", files)
+    run.count("bytes", total_bytes)
+    run.count("sftp_operations", server.operations)
+    run.count("bytes_uploaded", server.bytes_written)
+
+
+SCENARIOS = {
+    "aggregator2": aggregator2,
+    "kpi_csa": kpi_csa,
+    "kpi_sdp": kpi_sdp,
+    "kafka_sender": kafka_sender,
+    "cdrs_transfer": cdrs_transfer,
+}
+# Scenarios whose stand-ins (rather than the fake kubectl) take the injected latency
+IN_PROCESS_LATENCY = ("kafka_sender", "cdrs_transfer")
+
+
+def run_scenario(name: str, work: str, scale: int, latency_ms: float, seed: int) -> dict:
+    call_log, rnd = setup(work, latency_ms, seed)
+    run = BenchmarkRun(name, {"scale": scale, "latency_ms": latency_ms, "seed": seed}, call_log)
+    if name in IN_PROCESS_LATENCY:
+        SCENARIOS[name](run, work, scale, rnd, latency_ms)
+    else:
+        SCENARIOS[name](run, work, scale, rnd)
+    return run.report()
+
+
+if __name__ == "__main__":
+    # python scenarios.py <name> <work dir> <scale> <latency ms> <seed> <report file>
+    scenario_name, work_dir, scale_arg, latency_arg, seed_arg, report_path = sys.argv[1:7]
+    report = run_scenario(scenario_name, work_dir, int(scale_arg), float(latency_arg), int(seed_arg))
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file)
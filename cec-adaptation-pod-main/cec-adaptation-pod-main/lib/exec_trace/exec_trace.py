@@ -0,0 +1,252 @@
+import json
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SPOOL_ENV = "EXEC_TRACE_SPOOL"        # set by ExecTraceRun.start(); inherited by the worker processes
+TIMELINE_ENV = "EXEC_TRACE_TIMELINE"  # "1" writes the Chrome trace timeline without code changes
+
+_KUBECTL_FLAGS_WITH_VALUE = ("-n", "--namespace", "-c", "--container", "--context", "--kubeconfig")
+_LONG_NUMBER = re.compile(r"\d{6,}")
+TIMEOUT = "timeout"  # error marker of a call that hit its communicate() timeout
+_spool_lock = threading.Lock()
+
+
+class ExecCall:
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.started = time.time()
+        self.perf_started = time.perf_counter()
+        self.ended = False
+
+
+def _kubectl_exec_target(tokens):
+    """(pod, namespace) of a `kubectl exec` token list, (None, None) for any other command."""
+    if len(tokens) < 2 or os.path.basename(tokens[0]) != "kubectl" or "exec" not in tokens:
+        return None, None
+    pod = namespace = None
+    skip = None
+    for token in tokens[tokens.index("exec") + 1:]:
+        if token == "--":
+            break
+        if skip:
+            if skip in ("-n", "--namespace"):
+                namespace = token
+            skip = None
+        elif token in _KUBECTL_FLAGS_WITH_VALUE:
+            skip = token
+        elif token.startswith("--namespace="):
+            namespace = token.split("=", 1)[1]
+        elif not token.startswith("-") and pod is None:
+            pod = token
+    return pod, namespace
+
+
+def parse_command(cmd):
+    """
+    (template, pod) of a command as passed to Popen. The template has the pod and namespace of a
+    kubectl exec replaced by {pod} and {ns}, long numbers (dates, epochs) by N, and keeps only the
+    first line of heredocs, so the same exec on every pod of a run shares one template.
+    """
+    text = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+    first_line = text.strip().splitlines()[0] if text.strip() else ""
+    try:
+        tokens = shlex.split(first_line.split("|")[0])
+    except ValueError:
+        tokens = first_line.split()
+    pod, namespace = _kubectl_exec_target(tokens)
+    template = " ".join(first_line.split())
+    if pod:
+        template = re.sub(r"(?<!\S)%s(?!\S)" % re.escape(pod), "{pod}", template, count=1)
+    if namespace:
+        # Also the value of --namespace=<ns>
+        template = re.sub(r"(?<![^\s=])%s(?!\S)" % re.escape(namespace), "{ns}", template, count=1)
+    return _LONG_NUMBER.sub("N", template), pod
+
+
+def begin(cmd) -> Optional[ExecCall]:
+    """Start timing a command; None (and no cost beyond the env lookup) when no run is traced."""
+    if not os.environ.get(SPOOL_ENV):
+        return None
+    return ExecCall(cmd)
+
+
+def end(call: Optional[ExecCall], returncode, out=None, err=None, error=None):
+    """
+    Record a finished command of begin() to the run's spool file, once; error marks a call that
+    timed out (TIMEOUT) or raised (the exception type) and has no returncode.
+    """
+    if call is None or call.ended:
+        return
+    call.ended = True
+    spool_path = os.environ.get(SPOOL_ENV)
+    if not spool_path:
+        return
+    try:
+        template, pod = parse_command(call.cmd)
+        record = {
+            "ts": round(call.started, 6),
+            "secs": round(time.perf_counter() - call.perf_started, 6),
+            "pod": pod,
+            "template": template,
+            "rc": returncode if isinstance(returncode, int) else None,
+            "out_bytes": len(out) if isinstance(out, (bytes, str)) else 0,
+            "err_bytes": len(err) if isinstance(err, (bytes, str)) else 0,
+            "error": error,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        # One short O_APPEND write per record, so the pool workers can share the spool
+        with _spool_lock, open(spool_path, "a") as spool:
+            spool.write(json.dumps(record) + "\n")
+    except Exception:
+        # Tracing must never change the outcome of the command
+        pass
+
+
+@contextmanager
+def traced(cmd):
+    """
+    begin() for the block, which calls end() with the result of the command. A call that times out
+    or raises before that is still recorded when the block exits, with returncode None and an error
+    marker, so the slowest execs (those killed at their timeout) show up in the summary.
+    """
+    call = begin(cmd)
+    error = "no result"
+    try:
+        yield call
+    except BaseException as exc:
+        error = TIMEOUT if isinstance(exc, (subprocess.TimeoutExpired, TimeoutError)) else type(exc).__name__
+        raise
+    finally:
+        end(call, None, error=error)
+
+
+def load_records(spool_path) -> List[Dict]:
+    records = []
+    if not os.path.isfile(spool_path):
+        return records
+    with open(spool_path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def summarize(records: List[Dict], top=10) -> Dict:
+    """Totals, the slowest calls, exec time per pod and per command template."""
+    by_pod = defaultdict(lambda: {"calls": 0, "secs": 0.0})
+    by_template = defaultdict(lambda: {"calls": 0, "secs": 0.0, "max_secs": 0.0})
+    for record in records:
+        pod = by_pod[record["pod"] or "local"]
+        pod["calls"] += 1
+        pod["secs"] += record["secs"]
+        template = by_template[record["template"]]
+        template["calls"] += 1
+        template["secs"] += record["secs"]
+        template["max_secs"] = max(template["max_secs"], record["secs"])
+    return {
+        "calls": len(records),
+        "exec_secs": round(sum(record["secs"] for record in records), 3),
+        "failed": sum(1 for record in records if record["rc"] not in (0, None)),
+        "timeouts": sum(1 for record in records if record.get("error") == TIMEOUT),
+        "errors": sum(1 for record in records if record.get("error") not in (None, TIMEOUT)),
+        "out_bytes": sum(record["out_bytes"] for record in records),
+        "slowest": sorted(records, key=lambda record: record["secs"], reverse=True)[:top],
+        "by_pod": dict(sorted(by_pod.items(), key=lambda item: item[1]["secs"], reverse=True)),
+        "by_template": dict(sorted(by_template.items(), key=lambda item: item[1]["secs"], reverse=True)[:top]),
+    }
+
+
+def write_chrome_trace(records: List[Dict], path):
+    """Chrome trace event file (chrome://tracing, Perfetto): one row per pod, one bar per exec."""
+    rows = {pod: index for index, pod in enumerate(sorted({record["pod"] or "local" for record in records}), 1)}
+    events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": index, "args": {"name": pod}}
+              for pod, index in rows.items()]
+    for record in records:
+        events.append({
+            "name": record["template"][:120], "cat": "exec", "ph": "X", "pid": 1,
+            "tid": rows[record["pod"] or "local"], "ts": int(record["ts"] * 1e6), "dur": int(record["secs"] * 1e6),
+            "args": {"rc": record["rc"], "out_bytes": record["out_bytes"], "err_bytes": record["err_bytes"],
+                     "error": record.get("error"), "os_pid": record["pid"]},
+        })
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class ExecTraceRun:
+    def __init__(self, name, trace_dir, timeline=None, top=10, keep_timelines=96):
+        """
+        name           : run name, the module dir name
+        trace_dir      : where the spool and the timelines are written, e.g. <module>/log/exec_trace
+        timeline       : also write <name>_<timestamp>.trace.json; defaults to $EXEC_TRACE_TIMELINE
+        top            : slowest calls and command templates listed in the summary
+        keep_timelines : timeline files kept in trace_dir, oldest removed first
+        """
+        self.name = name
+        self.trace_dir = trace_dir
+        if timeline is None:
+            timeline = os.environ.get(TIMELINE_ENV, "").lower() in ("1", "true", "yes")
+        self.timeline = timeline
+        self.top = top
+        self.keep_timelines = keep_timelines
+        self.started_at = None
+        self.spool_path = None
+        self.timeline_path = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        os.makedirs(self.trace_dir, exist_ok=True)
+        # Runs of a module do not overlap (ProcessCheck), so the spool left by a run that exited
+        # early is simply replaced
+        self.spool_path = os.path.join(self.trace_dir, f"{self.name}.spool")
+        open(self.spool_path, "w").close()
+        os.environ[SPOOL_ENV] = self.spool_path
+
+    def finish(self, logger=None) -> Dict:
+        """Stop tracing, log the summary and write the timeline; returns the summary."""
+        os.environ.pop(SPOOL_ENV, None)
+        records = load_records(self.spool_path)
+        summary = summarize(records, self.top)
+        if logger is not None:
+            self.log_summary(logger, summary)
+        if self.timeline and records:
+            self.timeline_path = os.path.join(
+                self.trace_dir, f"{self.name}_{self.started_at.strftime('%Y%m%d%H%M%S')}.trace.json")
+            write_chrome_trace(records, self.timeline_path)
+            self._prune_timelines()
+            if logger is not None:
+                logger.info(f"exec trace timeline: {self.timeline_path}")
+        if os.path.isfile(self.spool_path):
+            os.remove(self.spool_path)
+        return summary
+
+    @staticmethod
+    def log_summary(logger, summary: Dict):
+        logger.info(f"exec summary: {summary['calls']} calls, {summary['exec_secs']:.3f}s in exec, "
+                    f"{summary['failed']} non-zero exits, {summary['timeouts']} timeouts, {summary['errors']} errors, "
+                    f"{summary['out_bytes']} bytes of output")
+        for pod, totals in summary["by_pod"].items():
+            logger.info(f"exec per pod: {pod} {totals['calls']} calls {totals['secs']:.3f}s")
+        for template, totals in summary["by_template"].items():
+            logger.info(f"exec per command: {totals['secs']:.3f}s total, {totals['calls']} calls, "
+                        f"max {totals['max_secs']:.3f}s :: {template}")
+        for record in summary["slowest"]:
+            error = f" {record['error']}" if record.get("error") else ""
+            logger.info(f"exec slowest: {record['secs']:.3f}s {record['pod'] or 'local'} rc={record['rc']}{error} "
+                        f"out={record['out_bytes']}B :: {record['template']}")
+
+    def _prune_timelines(self):
+        timelines = sorted(os.path.join(self.trace_dir, f) for f in os.listdir(self.trace_dir)
+                           if f.startswith(self.name + "_") and f.endswith(".trace.json"))
+        for path in timelines[:-self.keep_timelines] if self.keep_timelines else []:
+            os.remove(path)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the exec tracing of the cron modules' kubectl and shell calls
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lib.exec_trace import exec_trace
+from lib.exec_trace.exec_trace import ExecTraceRun, parse_command, load_records, traced, TIMEOUT, SPOOL_ENV
+
+
+class TestParseCommand(unittest.TestCase):
+
+    def test_kubectl_exec_pod_and_namespace(self):
+        template, pod = parse_command("kubectl exec -n chf-apps sdp-1-0 -c sdp -- ls /var/opt")
+        self.assertEqual((template, pod), ("kubectl exec -n {ns} {pod} -c sdp -- ls /var/opt", "sdp-1-0"))
+
+    def test_same_template_on_every_pod(self):
+        templates = {parse_command(f"kubectl exec air-{ix} --namespace=chf-apps -- date")[0] for ix in range(3)}
+        self.assertEqual(templates, {"kubectl exec {pod} --namespace={ns} -- date"})
+        self.assertEqual(parse_command(["kubectl", "exec", "-n", "ns1", "af-0", "--", "sh", "-c", "ls"]),
+                         ("kubectl exec -n {ns} {pod} -- sh -c ls", "af-0"))
+
+    def test_pod_name_inside_other_tokens_kept(self):
+        """Only the standalone pod token is replaced, not the pod name inside a path"""
+        template, pod = parse_command("kubectl exec -n ns sdp -- cat /logs/sdp/out.log")
+        self.assertEqual((template, pod), ("kubectl exec -n {ns} {pod} -- cat /logs/sdp/out.log", "sdp"))
+
+    def test_long_numbers_normalised(self):
+        template, pod = parse_command("ls /var/log/A20240115.1000-20240115.1015_1705312800.xml.gz | wc -l")
+        self.assertEqual(template, "ls /var/log/AN.1000-N.1015_N.xml.gz | wc -l")
+        self.assertIsNone(pod)
+        self.assertEqual(parse_command("sleep 5")[0], "sleep 5")
+
+    def test_heredoc_first_line(self):
+        cmd = "kubectl exec -i -n ns sdp-0 -- bash <<'EOF'\ncd /var/opt\nls -1tr | tail -1\nEOF\n"
+        self.assertEqual(parse_command(cmd), ("kubectl exec -i -n {ns} {pod} -- bash <<'EOF'", "sdp-0"))
+
+    def test_unbalanced_quotes_and_empty(self):
+        self.assertEqual(parse_command("kubectl exec -n ns sdp-0 -- sh -c 'ls"), ("kubectl exec -n {ns} {pod} -- sh -c 'ls", "sdp-0"))
+        self.assertEqual(parse_command(""), ("", None))
+
+
+class TestTraced(unittest.TestCase):
+
+    def setUp(self):
+        self.trace_dir = tempfile.mkdtemp()
+        self.run = ExecTraceRun("MODULE", self.trace_dir, timeline=False)
+        self.run.start()
+        self.addCleanup(os.environ.pop, SPOOL_ENV, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.trace_dir, ignore_errors=True)
+
+    def records(self):
+        return load_records(self.run.spool_path)
+
+    def test_completed_call(self):
+        with traced("echo kpi") as trace:
+            result = subprocess.Popen("echo kpi", shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = result.communicate()
+            exec_trace.end(trace, result.returncode, out, err)
+        records = self.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual((records[0]["template"], records[0]["rc"], records[0]["out_bytes"], records[0]["error"]),
+                         ("echo kpi", 0, 4, None))
+
+    def test_timeout_recorded_once(self):
+        """The call killed at its communicate() timeout is recorded once, as a timeout without returncode"""
+        result = None
+        with self.assertRaises(subprocess.TimeoutExpired):
+            with traced(["sleep", "10"]) as trace:
+                result = subprocess.Popen(["sleep", "10"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out, err = result.communicate(timeout=0.2)
+                exec_trace.end(trace, result.returncode, out, err)
+        result.kill()
+        result.communicate()
+        # A second end() of the same call, e.g. from an outer handler, is ignored
+        exec_trace.end(trace, -9)
+
+        records = self.records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual((records[0]["template"], records[0]["rc"], records[0]["error"]), ("sleep 10", None, TIMEOUT))
+        self.assertGreaterEqual(records[0]["secs"], 0.2)
+
+        summary = self.run.finish()
+        self.assertEqual((summary["calls"], summary["timeouts"], summary["errors"], summary["failed"]), (1, 1, 0, 0))
+
+    def test_raising_call(self):
+        with self.assertRaises(OSError):
+            with traced("missing-binary"):
+                raise FileNotFoundError("missing-binary")
+        self.assertEqual([record["error"] for record in self.records()], ["FileNotFoundError"])
+
+    def test_not_traced(self):
+        """Without a traced run begin() returns None and nothing is written"""
+        self.run.finish()
+        with traced("echo kpi") as trace:
+            self.assertIsNone(trace)
+        self.assertFalse(os.path.exists(self.run.spool_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
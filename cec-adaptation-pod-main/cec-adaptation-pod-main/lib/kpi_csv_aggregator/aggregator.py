@@ -4,6 +4,8 @@ from collections import OrderedDict
 from enum import Enum
 from typing import List, NamedTuple, Tuple, Optional
 
+from lib.pm_store.pm_store import PmStore
+
 
 class Oper(Enum):
     sum = 1
@@ -97,6 +99,12 @@ class Aggregator:
                 for kpi_def in self.values_by_kpi.keys():
                     self.kpi_add_value(kpi_def, line)
 
+    def aggregate_store(self, store: PmStore):
+        """Same as aggregate_counters, reading only the store rows each registered counter can match."""
+        for kpi_def in self.values_by_kpi.keys():
+            for line in store.lines(kpi_def.matches):
+                self.kpi_add_value(kpi_def, line)
+
     def calc_simple_kpi(self, kpi_def: KpiDef) -> Optional[float]:
         values: List[str] = self.values_by_kpi[kpi_def]
 
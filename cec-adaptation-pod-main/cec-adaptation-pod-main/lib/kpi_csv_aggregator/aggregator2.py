@@ -4,6 +4,8 @@ from collections import OrderedDict
 from enum import Enum
 from typing import List, NamedTuple, Tuple, Optional
 
+from lib.pm_store.pm_store import PmStore
+
 
 class Oper(Enum):
     sum = 1
@@ -27,14 +29,17 @@ def fs(list) -> frozenset:
 
 
 class Aggregator2:
-    def __init__(self, interval_mins: int, data_lines: List[str]):
+    def __init__(self, interval_mins: int, data_lines: List[str] = None, store: Optional[PmStore] = None):
+        """Counters come from the CSV data_lines or, when given, from the indexed PM store."""
         self.interval_mins = interval_mins
-        self.data_lines = data_lines
+        self.data_lines = data_lines or []
+        self.store = store
 
 
     def agg(self, kpi_def: KpiDef) -> KpiAndValues:
         values: List[str] = []
-        for line in self.data_lines:
+        lines = self.store.lines(kpi_def.matches) if self.store is not None else self.data_lines
+        for line in lines:
             value = self.kpi_add_value(kpi_def, line)
             if value:
                 values.append(value)
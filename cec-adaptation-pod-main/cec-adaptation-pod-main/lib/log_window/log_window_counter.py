@@ -0,0 +1,292 @@
+"""
+Multi-pattern log-window counter.
+
+Counts any number of named patterns in the lines of a log file whose timestamps
+fall inside a time window, in one sequential read. The window start is found by
+a binary search on line timestamps, so only the window itself is read instead
+of the whole file from the top.
+
+The logs live inside the application pods, so the same file is also the in-pod
+script: LogWindowCounter.pod_command() streams this file to the pod's python
+over kubectl exec stdin and only the counts come back. Keep this module python2
+compatible (no f-strings or annotations) because some pods only ship python2.
+Pods without any python fall back to an awk pass over the whole file.
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+try:
+    from shlex import quote
+except ImportError:  # python2 in the pod
+    from pipes import quote
+
+ARG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+SEEK_BLOCK_SIZE = 64 * 1024
+
+_FORMAT_REGEX = {
+    "%Y": r"\d{4}",
+    "%y": r"\d{2}",
+    "%m": r"\d{2}",
+    "%d": r"\d{2}",
+    "%H": r"\d{2}",
+    "%M": r"\d{2}",
+    "%S": r"\d{2}",
+}
+
+# Fields of a timestamp from most to least significant; the awk fallback compares
+# the digits of a timestamp as a string, so it needs them in this order
+_TIME_FIELD_ORDER = ["%Y", "%m", "%d", "%H", "%M", "%S"]
+_AWK_DIGITS = {"%Y": 4, "%y": 2, "%m": 2, "%d": 2, "%H": 2, "%M": 2, "%S": 2}
+
+# Marks counts made by the awk fallback in the in-pod output
+AWK_FALLBACK_MARKER = "#counted-with-awk"
+
+# The fallback when the pod has no python: the window is found by reading the file
+# from the top. ARGV holds NAME REGEX pairs and then the log file.
+_AWK_COUNTER = """
+BEGIN {
+    n = (ARGC - 2) / 2
+    for (i = 1; i <= n; i++) {
+        name[i] = ARGV[2 * i - 1]
+        pat[i] = ic ? tolower(ARGV[2 * i]) : ARGV[2 * i]
+        delete ARGV[2 * i - 1]
+        delete ARGV[2 * i]
+    }
+}
+match($0, ts) {
+    t = substr($0, RSTART, RLENGTH)
+    gsub(/[^0-9]/, "", t)
+    if (t "" > end "") exit
+    inwin = (t "" >= start "")
+}
+!inwin { next }
+{
+    line = ic ? tolower($0) : $0
+    for (i = 1; i <= n; i++) if (line ~ pat[i]) c[i]++
+}
+END {
+    for (i = 1; i <= n; i++) print name[i], c[i] + 0
+    print marker
+}
+"""
+
+
+def timestamp_regex(time_format):
+    """Build a regex matching timestamps written with the given strptime format."""
+    parts = re.split(r"(%[a-zA-Z])", time_format)
+    return "".join(_FORMAT_REGEX.get(part, re.escape(part)) for part in parts)
+
+
+def awk_timestamp(time_format):
+    """Return (awk regex, digits-only strftime format) for a time format, or None.
+
+    None when the fields are not written most significant first, as the awk
+    fallback compares timestamps as digit strings.
+    """
+    parts = [part for part in re.split(r"(%[a-zA-Z])", time_format) if part]
+    fields = [part.replace("%y", "%Y") for part in parts if part.startswith("%")]
+    if any(field not in _TIME_FIELD_ORDER for field in fields) or fields != _TIME_FIELD_ORDER[:len(fields)]:
+        return None
+    regex = []
+    for part in parts:
+        if part in _AWK_DIGITS:
+            regex.append("[0-9]" * _AWK_DIGITS[part])
+        else:
+            regex.append("".join(char if char.isalnum() else "[%s]" % char for char in part))
+    return "".join(regex), "".join(part for part in parts if part.startswith("%"))
+
+
+class LogWindowCounter:
+    def __init__(self, log_file, patterns, window_minutes, time_format="%Y%m%d %H:%M:%S", ignore_case=False):
+        """
+        log_file       : path of the log inside the pod, e.g. /var/opt/fds/logs/event.log.0
+        patterns       : {name: regex}; a line is counted once for every pattern it matches
+        window_minutes : size of the window ending now
+        time_format    : strptime format of the line timestamps (searched anywhere in the line)
+        ignore_case    : match the patterns case-insensitively (grep -i)
+        """
+        self.log_file = log_file
+        self.patterns = dict(patterns)
+        self.window_minutes = window_minutes
+        self.time_format = time_format
+        self.ignore_case = ignore_case
+
+        flags = re.IGNORECASE if ignore_case else 0
+        self._compiled = [(name, re.compile(regex.encode("utf-8"), flags)) for name, regex in self.patterns.items()]
+        self._timestamp = re.compile(timestamp_regex(time_format).encode("utf-8"))
+
+    def window(self, now=None):
+        """Return the (start, end) datetimes of the window ending at now."""
+        end = now or datetime.now()
+        return end - timedelta(minutes=self.window_minutes), end
+
+    def parse_timestamp(self, line):
+        """Return the first timestamp found in a line, or None for lines without one."""
+        match = self._timestamp.search(line)
+        if match is None:
+            return None
+        try:
+            return datetime.strptime(match.group(0).decode("ascii"), self.time_format)
+        except ValueError:
+            return None
+
+    def _next_stamped_line(self, log, offset):
+        """Return the timestamp of the first complete, stamped line after offset."""
+        log.seek(offset)
+        if offset:
+            log.readline()  # Skip the partial line we landed in
+        while True:
+            line = log.readline()
+            if not line:
+                return None
+            timestamp = self.parse_timestamp(line)
+            if timestamp is not None:
+                return timestamp
+
+    def seek_window_start(self, log, start):
+        """Binary search for an offset at or before the first line stamped >= start.
+
+        Assumes timestamps are non-decreasing, as in an appended log. Lines without
+        a timestamp (stack traces, continuation lines) are skipped while probing.
+        """
+        log.seek(0, os.SEEK_END)
+        low, high = 0, log.tell()
+        while high - low > SEEK_BLOCK_SIZE:
+            middle = (low + high) // 2
+            timestamp = self._next_stamped_line(log, middle)
+            if timestamp is not None and timestamp < start:
+                low = middle
+            else:
+                high = middle
+        log.seek(low)
+        if low:
+            log.readline()
+
+    def count_file(self, start, end):
+        """Count every pattern in the lines stamped between start and end (inclusive).
+
+        Lines without a timestamp belong to the last stamped line before them.
+        Returns {name: count}.
+        """
+        counts = dict((name, 0) for name in self.patterns)
+        with open(self.log_file, "rb") as log:
+            self.seek_window_start(log, start)
+            in_window = False
+            for line in log:
+                timestamp = self.parse_timestamp(line)
+                if timestamp is not None:
+                    if timestamp > end:
+                        break
+                    in_window = timestamp >= start
+                if not in_window:
+                    continue
+                for name, pattern in self._compiled:
+                    if pattern.search(line):
+                        counts[name] += 1
+        return counts
+
+    def awk_fallback(self, start, end):
+        """Build the shell command counting the window with awk, for pods without python."""
+        timestamp = awk_timestamp(self.time_format)
+        if timestamp is None:
+            return 'echo "log_window_counter: no python, and awk cannot compare %s timestamps" >&2; exit 1' % (
+                self.time_format)
+        ts, digits_format = timestamp
+        args = []
+        for name, regex in self.patterns.items():
+            args.extend([name, regex])
+        return ('[ -r %s ] || { echo "log_window_counter: cannot read %s" >&2; exit 1; }; '
+                'exec awk -v ts=%s -v start=%s -v end=%s -v ic=%d -v marker=%s %s %s %s') % (
+            quote(self.log_file), self.log_file, quote(ts), start.strftime(digits_format), end.strftime(digits_format),
+            int(self.ignore_case), AWK_FALLBACK_MARKER, quote(_AWK_COUNTER), " ".join(quote(arg) for arg in args),
+            quote(self.log_file))
+
+    def shell_command(self, now=None):
+        """Build the sh command that counts the window with whichever python is on the PATH.
+
+        The window is computed locally and passed in; the script itself is read from
+        stdin. Without python3 or python the counts come from awk_fallback().
+        """
+        start, end = self.window(now)
+        args = [self.log_file, "--start", start.strftime(ARG_TIME_FORMAT), "--end", end.strftime(ARG_TIME_FORMAT),
+                "--time-format", self.time_format]
+        if self.ignore_case:
+            args.append("--ignore-case")
+        for name, regex in self.patterns.items():
+            args.extend(["--pattern", "%s=%s" % (name, regex)])
+
+        runner = ('python="$(command -v python3 || command -v python)"; '
+                  '[ -n "$python" ] && exec "$python" - "$@"; ' + self.awk_fallback(start, end))
+        return "sh -c %s log_window_counter %s" % (quote(runner), " ".join(quote(arg) for arg in args))
+
+    def pod_command(self, namespace, pod, container, now=None):
+        """Build the kubectl command that runs this counter inside the pod.
+
+        This script is streamed over stdin to the pod's python, so nothing is
+        installed in the pod.
+        """
+        script = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+        return "kubectl exec -i -n %s %s -c %s -- %s < %s" % (
+            namespace, pod, container, self.shell_command(now), quote(script))
+
+    def parse_output(self, output):
+        """Parse the "name count" lines printed by the in-pod run.
+
+        Returns {name: count} with every declared pattern, or None if the run produced no counts.
+        """
+        if not output:
+            return None
+        counts = {}
+        for line in str(output).splitlines():
+            fields = line.strip().rsplit(" ", 1)
+            if len(fields) == 2 and fields[0] in self.patterns and fields[1].isdigit():
+                counts[fields[0]] = int(fields[1])
+        if not counts:
+            return None
+        return dict((name, counts.get(name, 0)) for name in self.patterns)
+
+    def count_in_pod(self, execute_cmd, namespace, pod, container, now=None, logger=None):
+        """Run the counter in the pod with a module's execute_cmd and return {name: count} or None.
+
+        With a logger, a pod that returned no counts is logged as an error and a
+        pod counted by the awk fallback as a warning, both naming the pod.
+        """
+        output, error = execute_cmd(self.pod_command(namespace, pod, container, now))
+        counts = self.parse_output(output)
+        if logger is not None:
+            if counts is None:
+                logger.error("log_window_counter: no counts for %s from pod %s ::: %s" % (self.log_file, pod, error))
+            elif AWK_FALLBACK_MARKER in output:
+                logger.warning("log_window_counter: no python in pod %s, %s counted with awk" % (pod, self.log_file))
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count named patterns in a time window of a log file")
+    parser.add_argument("log_file")
+    parser.add_argument("--start", required=True, help="window start, " + ARG_TIME_FORMAT.replace("%", "%%"))
+    parser.add_argument("--end", required=True, help="window end, " + ARG_TIME_FORMAT.replace("%", "%%"))
+    parser.add_argument("--time-format", default="%Y%m%d %H:%M:%S")
+    parser.add_argument("--pattern", action="append", default=[], help="NAME=REGEX, may be repeated")
+    parser.add_argument("--ignore-case", action="store_true")
+    args = parser.parse_args(argv)
+
+    patterns = dict(pattern.split("=", 1) for pattern in args.pattern)
+    start = datetime.strptime(args.start, ARG_TIME_FORMAT)
+    end = datetime.strptime(args.end, ARG_TIME_FORMAT)
+    counter = LogWindowCounter(args.log_file, patterns, 0, args.time_format, args.ignore_case)
+    try:
+        counts = counter.count_file(start, end)
+    except (IOError, OSError) as err:
+        sys.stderr.write("log_window_counter: %s\n" % err)
+        return 1
+    for name in patterns:
+        sys.stdout.write("%s %d\n" % (name, counts[name]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
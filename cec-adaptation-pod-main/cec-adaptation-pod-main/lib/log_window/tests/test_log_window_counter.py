@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the log-window counter, in-process and through its in-pod shell command
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lib.log_window import log_window_counter
+from lib.log_window.log_window_counter import LogWindowCounter, AWK_FALLBACK_MARKER, awk_timestamp
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class TestLogWindowCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.work_dir, "cPSCCIPDiameter.log.0")
+        lines = []
+        for minute in range(60, -1, -1):
+            stamp = (NOW - timedelta(minutes=minute)).strftime("%Y%m%d %H:%M:%S")
+            lines.append("%s INFO Request REJECTED by peer 10.0.0.%d\n" % (stamp, minute))
+            lines.append("    at stack line for reject %d\n" % minute)
+            lines.append("%s INFO Answer received\n" % stamp)
+        lines.append((NOW + timedelta(minutes=1)).strftime("%Y%m%d %H:%M:%S") + " INFO reject after the window\n")
+        with open(self.log_file, "w") as log:
+            log.writelines(lines)
+        self.counter = LogWindowCounter(self.log_file, {
+            "REJECTION_COUNT_FROM_LOGS": "reject",
+            "ANSWERS": r"Answer received",
+        }, window_minutes=15, ignore_case=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def run_shell_command(self, path):
+        """Run the in-pod command locally, with the script on stdin and the given PATH."""
+        with open(log_window_counter.__file__.replace(".pyc", ".py"), "rb") as script:
+            result = subprocess.run(self.counter.shell_command(NOW), shell=True, stdin=script,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    env={"PATH": path}, executable="/bin/sh")
+        return result.stdout.decode("utf-8"), result.stderr.decode("utf-8")
+
+    def path_with(self, *tools):
+        """A PATH holding sh and only the given tools."""
+        bin_dir = os.path.join(self.work_dir, "bin")
+        os.makedirs(bin_dir, exist_ok=True)
+        for tool in ("sh",) + tools:
+            os.symlink(sys.executable if tool == "python3" else shutil.which(tool), os.path.join(bin_dir, tool))
+        return bin_dir
+
+    def test_count_file(self):
+        """Window lines and their unstamped continuation lines are counted once per pattern"""
+        counts = self.counter.count_file(*self.counter.window(NOW))
+        self.assertEqual(counts, {"REJECTION_COUNT_FROM_LOGS": 32, "ANSWERS": 16})
+
+    def test_python_in_pod(self):
+        output, error = self.run_shell_command(self.path_with("python3", "awk"))
+        self.assertEqual(self.counter.parse_output(output), {"REJECTION_COUNT_FROM_LOGS": 32, "ANSWERS": 16})
+        self.assertNotIn(AWK_FALLBACK_MARKER, output)
+
+    def test_awk_fallback_without_python(self):
+        """Pods without python3 or python get the same counts from awk"""
+        output, error = self.run_shell_command(self.path_with("awk"))
+        self.assertIn(AWK_FALLBACK_MARKER, output)
+        self.assertEqual(self.counter.parse_output(output), self.counter.count_file(*self.counter.window(NOW)))
+
+    def test_awk_fallback_missing_log(self):
+        self.counter.log_file = os.path.join(self.work_dir, "missing.log")
+        output, error = self.run_shell_command(self.path_with("awk"))
+        self.assertEqual(output, "")
+        self.assertIn("cannot read", error)
+
+    def test_awk_timestamp(self):
+        self.assertEqual(awk_timestamp("%Y-%m-%dT%H:%M:%S"),
+                         ("[0-9][0-9][0-9][0-9][-][0-9][0-9][-][0-9][0-9]T[0-9][0-9][:][0-9][0-9][:][0-9][0-9]",
+                          "%Y%m%d%H%M%S"))
+        self.assertIsNone(awk_timestamp("%d/%m/%Y %H:%M"))
+
+    def test_count_in_pod_logs_missing_counts(self):
+        """A pod that returns nothing is logged as an error naming the pod"""
+        logger = MagicMock()
+        counts = self.counter.count_in_pod(lambda cmd: (None, "sh: awk: not found"), "ns", "sdp-0", "sdp",
+                                           now=NOW, logger=logger)
+        self.assertIsNone(counts)
+        self.assertIn("sdp-0", logger.error.call_args[0][0])
+
+    def test_count_in_pod_logs_awk_fallback(self):
+        logger = MagicMock()
+        output = "REJECTION_COUNT_FROM_LOGS 3\nANSWERS 1\n%s\n" % AWK_FALLBACK_MARKER
+        counts = self.counter.count_in_pod(lambda cmd: (output, None), "ns", "sdp-0", "sdp", now=NOW, logger=logger)
+        self.assertEqual(counts, {"REJECTION_COUNT_FROM_LOGS": 3, "ANSWERS": 1})
+        self.assertIn("sdp-0", logger.warning.call_args[0][0])
+        logger.error.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
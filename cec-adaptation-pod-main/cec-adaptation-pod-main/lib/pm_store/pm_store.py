@@ -0,0 +1,175 @@
+import gzip
+import logging
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+GZIP_MAGIC = b"\x1f\x8b"
+MEAS_COLLEC_NS = "{http://www.3gpp.org/ftp/specs/archive/32_series/32.435#measCollec}"
+
+# Literal "measInfoId=<id>" / "countername=<name>" patterns, optionally closed by the field comma
+_LITERAL_FIELD = re.compile(r"^(measInfoId|countername)=([A-Za-z0-9_\-]+)(,?)$")
+# rows() arguments for a literal field pattern: (exact with the comma, prefix without it)
+_LOOKUP_ARG = {"measInfoId": ("meas_info_id", "meas_info_prefix"), "countername": ("counter", "counter_prefix")}
+
+
+class PmRow(NamedTuple):
+    managed_element: str
+    meas_info_id: str
+    labels: str
+    end_time: str
+    counter: str
+    value: str
+
+    @property
+    def line(self) -> str:
+        """The row as the measCollec.xsl text line the KPI modules used to grep."""
+        return (f"measInfoId={self.meas_info_id},{self.managed_element},{self.labels},"
+                f"tl_timestamp={self.end_time},countername={self.counter},countervalue={self.value}")
+
+
+def _tag(element) -> str:
+    return element.tag.replace(MEAS_COLLEC_NS, "")
+
+
+def parse_meas_collec(fileobj) -> Iterator[PmRow]:
+    """
+    Stream the counters of one measCollec (3GPP 32.435) ROP file.
+
+    Yields the same rows, with the same field values, as measCollec.xsl: the managed element is
+    fileHeader@dnPrefix + managedElement@localDn, the labels are measValue@measObjLdn and the
+    counter name is the measType with the p of the result. Elements are cleared once consumed.
+    """
+    dn_prefix = None
+    local_dn = None
+    for event, element in ET.iterparse(fileobj, events=("start", "end")):
+        tag = _tag(element)
+        if event == "start":
+            if tag == "fileHeader" and dn_prefix is None:
+                dn_prefix = element.get("dnPrefix", "")
+            continue
+        if tag == "managedElement" and local_dn is None:
+            local_dn = element.get("localDn", "")
+        elif tag == "measData":
+            local_dn = None
+            element.clear()
+        elif tag == "measInfo":
+            managed_element = (dn_prefix or "") + (local_dn or "")
+            meas_info_id = element.get("measInfoId", "")
+            gran_period = element.find(f"{MEAS_COLLEC_NS}granPeriod")
+            end_time = gran_period.get("endTime", "") if gran_period is not None else ""
+            meas_types = {}
+            for meas_type in element.findall(f"{MEAS_COLLEC_NS}measType"):
+                meas_types[meas_type.get("p")] = meas_types.get(meas_type.get("p"), "") + (meas_type.text or "")
+            for meas_value in element.findall(f"{MEAS_COLLEC_NS}measValue"):
+                labels = meas_value.get("measObjLdn", "")
+                for result in meas_value.findall(f"{MEAS_COLLEC_NS}r"):
+                    yield PmRow(managed_element, meas_info_id, labels, end_time,
+                                meas_types.get(result.get("p"), ""), "".join(result.itertext()))
+            element.clear()
+
+
+class PmStore:
+    """
+    Typed, indexed store of the PM counters of a set of ROP files.
+
+    Every file is parsed once into an SQLite table keyed by (managed element, measInfoId,
+    counter, labels); KPI code then looks counters up through the (measInfoId, counter)
+    indexes instead of converting the files to CSV text and scanning it with regexes or grep.
+    The store is in memory unless a db_path is given; a file already ingested with the same
+    size and mtime is not parsed again.
+
+    Usage:
+        store = PmStore.from_files(file_paths)
+        for line in store.grep("countername=cha_access_rating_diameter_requests_total", "Ro-CCR-Initial"):
+            ...
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER);
+            CREATE TABLE IF NOT EXISTS counters (
+                file TEXT, managed_element TEXT, meas_info_id TEXT, labels TEXT,
+                end_time TEXT, counter TEXT, value TEXT);
+            CREATE INDEX IF NOT EXISTS counters_meas_info ON counters (meas_info_id, counter);
+            CREATE INDEX IF NOT EXISTS counters_counter ON counters (counter);
+        """)
+
+    @classmethod
+    def from_files(cls, file_paths: Iterable[str], db_path: str = ":memory:") -> "PmStore":
+        store = cls(db_path)
+        for file_path in file_paths:
+            store.add_file(file_path)
+        return store
+
+    def add_file(self, file_path: str) -> int:
+        """Parse one ROP file, plain or gzipped, into the store; returns the number of counters added."""
+        try:
+            stat = os.stat(file_path)
+            key = (file_path, stat.st_size, int(stat.st_mtime))
+            if self._conn.execute("SELECT 1 FROM files WHERE path = ? AND size = ? AND mtime = ?", key).fetchone():
+                return 0
+            with open(file_path, "rb") as f:
+                opener = gzip.open if f.read(2) == GZIP_MAGIC else open
+            with opener(file_path, "rb") as f, self._conn:
+                self._conn.execute("DELETE FROM counters WHERE file = ?", (file_path,))
+                cursor = self._conn.executemany(
+                    "INSERT INTO counters VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((file_path,) + tuple(row) for row in parse_meas_collec(f)))
+                self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", key)
+        except (OSError, ET.ParseError) as err:
+            logging.error(f"Failed parsing PM file {file_path} ::: {str(err)}")
+            return 0
+        logging.info(f"PM file {file_path}: {cursor.rowcount} counters")
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM counters").fetchone()[0]
+
+    def rows(self, meas_info_id: Optional[str] = None, counter: Optional[str] = None,
+             meas_info_prefix: Optional[str] = None, counter_prefix: Optional[str] = None) -> List[PmRow]:
+        """Counters by exact measInfoId/counter or by their prefix, in file order."""
+        conditions, params = [], []
+        for column, exact, prefix in (("meas_info_id", meas_info_id, meas_info_prefix),
+                                      ("counter", counter, counter_prefix)):
+            if exact is not None:
+                conditions.append(f"{column} = ?")
+                params.append(exact)
+            if prefix is not None:
+                conditions.append(f"{column} GLOB ?")
+                params.append(prefix + "*")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT managed_element, meas_info_id, labels, end_time, counter, value FROM counters {where} ORDER BY rowid"
+        return [PmRow(*row) for row in self._conn.execute(query, params)]
+
+    @staticmethod
+    def _index_lookup(patterns: Iterable[str]) -> dict:
+        """rows() arguments for the literal measInfoId=/countername= patterns among the given regexes."""
+        lookup = {}
+        for pattern in patterns:
+            literal = _LITERAL_FIELD.match(pattern)
+            if literal:
+                field, value, exact = literal.groups()
+                lookup[_LOOKUP_ARG[field][0 if exact else 1]] = value
+        return lookup
+
+    def lines(self, patterns: Iterable[str] = ()) -> List[str]:
+        """
+        Candidate text lines for a set of regex patterns, narrowed through the indexes.
+
+        Only the literal measInfoId=/countername= patterns are resolved here; callers still
+        apply every pattern to the returned lines, exactly as they did on the CSV lines.
+        """
+        return [row.line for row in self.rows(**self._index_lookup(patterns))]
+
+    def grep(self, *patterns: str) -> List[str]:
+        """Lines matching every pattern, the in-process equivalent of `grep p1 pm_file.csv | grep p2`."""
+        compiled = [re.compile(pattern) for pattern in patterns]
+        return [line for line in self.lines(patterns) if all(regex.search(line) for regex in compiled)]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for PmStore, checked against the text measCollec.xsl makes of the same ROP file
+"""
+
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..')
+sys.path.insert(0, REPO_ROOT)
+from lib.pm_store.pm_store import PmStore, PmRow
+
+MEAS_COLLEC_XSL = os.path.join(REPO_ROOT, 'KAFKA_CSA', 'measCollec.xsl')
+
+ROP_FILE = """<?xml version="1.0" encoding="UTF-8"?>
+<measCollecFile xmlns="http://www.3gpp.org/ftp/specs/archive/32_series/32.435#measCollec">
+  <fileHeader fileFormatVersion="32.435 V10.0" vendorName="Ericsson" dnPrefix="SubNetwork=CCPC,">
+    <fileSender/>
+    <measCollec beginTime="2024-01-15T10:00:00+00:00"/>
+  </fileHeader>
+  <measData>
+    <managedElement localDn="ManagedElement=ccpc-1" swVersion="1.2"/>
+    <measInfo measInfoId="cha_access_rating">
+      <job jobId="job1"/>
+      <granPeriod duration="PT300S" endTime="2024-01-15T10:05:00+00:00"/>
+      <repPeriod duration="PT300S"/>
+      <measType p="1">cha_access_rating_diameter_requests_total</measType>
+      <measType p="2">cha_access_rating_diameter_failures_total</measType>
+      <measValue measObjLdn="service=Ro-CCR-Initial,peer=ocs-1">
+        <r p="1">120</r>
+        <r p="2">3</r>
+      </measValue>
+      <measValue measObjLdn="service=Ro-CCR-Update,peer=ocs-1">
+        <r p="2">0</r>
+        <r p="1">480</r>
+      </measValue>
+    </measInfo>
+    <measInfo measInfoId="scp_egress">
+      <granPeriod duration="PT300S" endTime="2024-01-15T10:05:00+00:00"/>
+      <measType p="1">envoy_egress_upstream_rq</measType>
+      <measValue measObjLdn="cluster=nrf">
+        <r p="1">57</r>
+      </measValue>
+    </measInfo>
+    <measInfo measInfoId="cha_access_rating_extra">
+      <granPeriod duration="PT300S" endTime="2024-01-15T10:05:00+00:00"/>
+      <measType p="1">cha_access_rating_diameter_requests_total</measType>
+      <measValue measObjLdn="service=Ro-CCR-Initial,peer=ocs-2">
+        <r p="1">9</r>
+      </measValue>
+    </measInfo>
+  </measData>
+  <fileFooter>
+    <measCollec endTime="2024-01-15T10:05:00+00:00"/>
+  </fileFooter>
+</measCollecFile>
+"""
+
+
+def xsl_lines(file_path):
+    """The lines measCollec.xsl writes for file_path, as the KPI modules did before PmStore."""
+    from lxml import etree
+    transform = etree.XSLT(etree.parse(MEAS_COLLEC_XSL))
+    return str(transform(etree.parse(file_path))).splitlines()
+
+
+class TestPmStore(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.rop_file = os.path.join(self.work_dir, "A20240115.1000+0000-1005+0000_ccpc-1.xml")
+        with open(self.rop_file, "w") as f:
+            f.write(ROP_FILE)
+        self.store = PmStore.from_files([self.rop_file])
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def expected_lines(self):
+        try:
+            return xsl_lines(self.rop_file)
+        except ImportError:
+            self.skipTest("lxml is not installed")
+
+    def test_lines_match_xsl(self):
+        """lines() returns the measCollec.xsl lines, in the same order"""
+        self.assertEqual(self.store.lines(), self.expected_lines())
+        self.assertEqual(len(self.store), 6)
+
+    def test_grep_matches_xsl(self):
+        """grep() returns the xsl lines matching every pattern, as grep p1 | grep p2 did"""
+        expected_lines = self.expected_lines()
+        for patterns in (("countername=cha_access_rating_diameter_requests_total", "Ro-CCR-Initial"),
+                         ("measInfoId=cha_access_rating,", "countername=cha_access_rating_diameter_requests_total"),
+                         ("measInfoId=cha_access_rating",),
+                         ("countername=envoy_egress", "cluster=nrf"),
+                         ("countervalue=0$",)):
+            expected = [line for line in expected_lines if all(re.search(pattern, line) for pattern in patterns)]
+            self.assertEqual(self.store.grep(*patterns), expected, patterns)
+
+    def test_literal_patterns_use_index(self):
+        """Exact (comma) and prefix measInfoId patterns narrow the candidate lines"""
+        self.assertEqual(len(self.store.lines(["measInfoId=cha_access_rating,"])), 4)
+        self.assertEqual(len(self.store.lines(["measInfoId=cha_access_rating"])), 5)
+        self.assertEqual(len(self.store.lines(["countername=envoy_egress_upstream_rq,"])), 1)
+
+    def test_rows(self):
+        """Typed rows carry the same fields as the xsl line"""
+        rows = self.store.rows(meas_info_id="scp_egress", counter="envoy_egress_upstream_rq")
+        self.assertEqual(rows, [PmRow("SubNetwork=CCPC,ManagedElement=ccpc-1", "scp_egress", "cluster=nrf",
+                                      "2024-01-15T10:05:00+00:00", "envoy_egress_upstream_rq", "57")])
+
+    def test_gzipped_file_parsed_once(self):
+        """A gzipped ROP file gives the same rows; a file already in the store is not parsed again"""
+        gz_file = self.rop_file + ".gz"
+        with open(self.rop_file, "rb") as src, gzip.open(gz_file, "wb") as dst:
+            dst.write(src.read())
+        store = PmStore.from_files([gz_file, gz_file])
+        try:
+            self.assertEqual(store.lines(), self.store.lines())
+            self.assertEqual(store.add_file(gz_file), 0)
+        finally:
+            store.close()
+
+    def test_invalid_file(self):
+        """A truncated file is logged and skipped"""
+        bad_file = os.path.join(self.work_dir, "bad.xml")
+        with open(bad_file, "w") as f:
+            f.write(ROP_FILE[:400])
+        store = PmStore()
+        try:
+            self.assertEqual(store.add_file(bad_file), 0)
+            self.assertEqual(len(store), 0)
+            self.assertEqual(store.add_file(os.path.join(self.work_dir, "missing.xml")), 0)
+        finally:
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
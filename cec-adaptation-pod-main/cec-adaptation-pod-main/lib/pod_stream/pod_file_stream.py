@@ -0,0 +1,105 @@
+import fnmatch
+import os
+import shlex
+import subprocess
+import tarfile
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, IO
+
+# How long a file whose upload failed keeps the find window of later runs open for its retry
+RETRY_WINDOW_MIN = 60
+
+
+def retry_window_min(file_newer_than_min: int, oldest_failed_mtime: Optional[float], now: float = None) -> int:
+    """
+    -mmin window of a run: file_newer_than_min, widened to still cover the oldest file whose
+    upload failed in an earlier run. Callers only pass failures younger than RETRY_WINDOW_MIN.
+    The age is rounded up, plus a minute for the time until find runs in the pod.
+    """
+    if oldest_failed_mtime is None:
+        return file_newer_than_min
+    age_secs = (time.time() if now is None else now) - oldest_failed_mtime
+    return max(file_newer_than_min, int(age_secs // 60) + 2)
+
+
+class PodFileStream:
+    """
+    Streams all recent files of a dir_lookup out of a pod with a single kubectl exec.
+
+    One find covers every directory and file pattern of the lookup, tar writes the
+    matches to stdout and the archive is read member by member from the exec pipe,
+    so nothing is staged on local disk.
+
+    dir_lookup is the *_STAT config section:
+        {"var/opt/fds/statistics/": {"search_keyword_for_file": ["*.stat"], "splunk_backup_dir": "/var/log/splunk/cEC/SDP/"}}
+    """
+
+    def __init__(self, namespace: str, pod_name: str, dir_lookup: Dict, file_newer_than_min: int,
+                 container: Optional[str] = None):
+        self.namespace = namespace
+        self.pod_name = pod_name
+        self.dir_lookup = dir_lookup
+        self.file_newer_than_min = file_newer_than_min
+        self.container = container
+        self.error = None
+
+    @staticmethod
+    def _dir(path: str) -> str:
+        return path.strip("/") + "/"
+
+    def search_roots(self) -> List[str]:
+        """Lookup directories without the ones nested in another lookup directory (find would list them twice)."""
+        dirs = sorted(set(self._dir(path) for path in self.dir_lookup))
+        return [path for path in dirs if not any(path != other and path.startswith(other) for other in dirs)]
+
+    def find_script(self) -> str:
+        """In-pod shell script: one find over every lookup directory and pattern, piped to tar."""
+        clauses = []
+        for path, lookup in self.dir_lookup.items():
+            names = " -o ".join(f"-name {shlex.quote(pattern)}" for pattern in lookup["search_keyword_for_file"])
+            clauses.append(f"\\( -path {shlex.quote(self._dir(path) + '*')} \\( {names} \\) \\)")
+        roots = " ".join(shlex.quote(root) for root in self.search_roots())
+        return (f"cd / && find {roots} -type f -mmin -{str(self.file_newer_than_min)} \\( {' -o '.join(clauses)} \\) "
+                f"-print0 2>/dev/null | tar -zcf - --null -T -")
+
+    def kubectl_command(self) -> List[str]:
+        cmd = ["kubectl", "exec", "-n", self.namespace, self.pod_name]
+        if self.container:
+            cmd += ["-c", self.container]
+        return cmd + ["--", "bash", "-c", self.find_script()]
+
+    def lookup_for(self, member_path: str) -> Optional[str]:
+        """The dir_lookup key a streamed file belongs to; the most specific directory wins."""
+        file_name = os.path.basename(member_path)
+        for path in sorted(self.dir_lookup, key=lambda p: len(self._dir(p)), reverse=True):
+            if member_path.startswith(self._dir(path)) and any(
+                    fnmatch.fnmatch(file_name, pattern) for pattern in self.dir_lookup[path]["search_keyword_for_file"]):
+                return path
+        return None
+
+    def files(self) -> Iterator[Tuple[str, tarfile.TarInfo, IO[bytes]]]:
+        """
+        Yield (dir_lookup key, tar member, file object) for every streamed file.
+
+        The file object reads straight from the exec pipe and is only valid until the
+        next item is requested. After the loop, self.error holds the exec error, if any.
+        """
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(self.kubectl_command(), stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                with tarfile.open(fileobj=proc.stdout, mode="r|gz") as archive:
+                    for member in archive:
+                        if not member.isfile():
+                            continue
+                        lookup = self.lookup_for(member.name)
+                        if lookup is not None:
+                            yield lookup, member, archive.extractfile(member)
+            except tarfile.TarError as err:
+                self.error = f"TarError: {str(err)}"
+            finally:
+                proc.stdout.close()
+                if proc.wait() != 0:
+                    stderr.seek(0)
+                    self.error = stderr.read().decode("utf-8", "replace").strip() or self.error or \
+                        f"kubectl exec exited with {proc.returncode}"
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-exec pod file stream
+"""
+
+import io
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lib.pod_stream.pod_file_stream import PodFileStream, retry_window_min
+
+DIR_LOOKUP = {
+    "var/opt/fds/statistics/": {"search_keyword_for_file": ["*_System.*.stat", "*.stat.tmp"],
+                                "splunk_backup_dir": "/var/log/splunk/cEC/SDP/"},
+    "/var/opt/fds/statistics/Usage": {"search_keyword_for_file": ["TrafficUsageStatistics_*.stat"],
+                                      "splunk_backup_dir": "/var/log/splunk/cEC/SDP_USAGE/"},
+    "tmp/": {"search_keyword_for_file": ["*.stat.0"], "splunk_backup_dir": "/var/log/splunk/cEC/SDP_TH/"},
+}
+
+
+class TestPodFileStream(unittest.TestCase):
+
+    def stream(self, dir_lookup=DIR_LOOKUP):
+        return PodFileStream("chf-apps", "sdp-0", dir_lookup, 6, "sdp")
+
+    def test_search_roots_drop_nested_dirs(self):
+        self.assertEqual(self.stream().search_roots(), ["tmp/", "var/opt/fds/statistics/"])
+        self.assertEqual(self.stream({"var/opt": {}, "var/optional/": {}, "var/opt/a/b": {}}).search_roots(),
+                         ["var/opt/", "var/optional/"])
+
+    def test_lookup_for_most_specific_dir(self):
+        stream = self.stream()
+        self.assertEqual(stream.lookup_for("var/opt/fds/statistics/Usage/TrafficUsageStatistics_1.stat"),
+                         "/var/opt/fds/statistics/Usage")
+        self.assertEqual(stream.lookup_for("var/opt/fds/statistics/Usage/x.stat.tmp"), "var/opt/fds/statistics/")
+        self.assertEqual(stream.lookup_for("var/opt/fds/statistics/A_System.1.stat"), "var/opt/fds/statistics/")
+        self.assertEqual(stream.lookup_for("tmp/th.stat.0"), "tmp/")
+        self.assertIsNone(stream.lookup_for("tmp/th.stat.1"))
+        self.assertIsNone(stream.lookup_for("var/opt/fds/TrafficUsageStatistics_1.stat"))
+
+    def test_kubectl_command(self):
+        command = self.stream().kubectl_command()
+        self.assertEqual(command[:8], ["kubectl", "exec", "-n", "chf-apps", "sdp-0", "-c", "sdp", "--"])
+        self.assertEqual(command[8:10], ["bash", "-c"])
+        self.assertNotIn("-c", PodFileStream("chf-apps", "air-0", DIR_LOOKUP, 6).kubectl_command()[5:7])
+
+    def test_find_script_quoting(self):
+        """Run locally, the script finds files in directories and with patterns that need quoting"""
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir, True)
+        files = {"stat dir/it's/a b.stat": b"quoted", "stat dir/it's/a b.txt": b"other",
+                 "stat dir/it's/$(touch pwned).stat": b"literal", "stats/x.stat": b"not looked up"}
+        for path, data in files.items():
+            os.makedirs(os.path.join(work_dir, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(work_dir, path), "wb") as f:
+                f.write(data)
+        old = os.path.join(work_dir, "stat dir", "it's", "old.stat")
+        with open(old, "wb") as f:
+            f.write(b"old")
+        os.utime(old, (time.time() - 3600, time.time() - 3600))
+
+        stream = self.stream({"stat dir/it's": {"search_keyword_for_file": ["* b.stat", "$(touch pwned).stat", "old.stat"]}})
+        script = stream.find_script()
+        self.assertTrue(script.startswith("cd / && "))
+        # The in-pod script runs from /, here from the test dir
+        script = f"cd {shlex.quote(work_dir)} && " + script[len("cd / && "):]
+        data = subprocess.run(["bash", "-c", script], capture_output=True, check=True).stdout
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+            self.assertEqual(sorted(archive.getnames()), ["stat dir/it's/$(touch pwned).stat", "stat dir/it's/a b.stat"])
+        self.assertFalse(os.path.exists(os.path.join(work_dir, "pwned")))
+
+    def test_retry_window(self):
+        now = 1000000.0
+        self.assertEqual(retry_window_min(6, None, now), 6)
+        self.assertEqual(retry_window_min(6, now - 60, now), 6)
+        self.assertEqual(retry_window_min(6, now - 10 * 60 - 30, now), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,42 @@
+import fcntl
 import os
 import signal
+import sys
+import time
+
+# Lock policies
+KILL_PREVIOUS = "kill-previous"      # Pidfile mode: kill the previous run's process group (legacy default)
+SKIP_IF_RUNNING = "skip-if-running"  # flock mode: exit if the previous run still holds the lock
+WAIT = "wait"                        # flock mode: wait up to wait_secs for the lock, then exit
+KILL_STALE = "kill-stale"            # flock mode: kill the holder only if it runs longer than stale_secs, else exit
+POLICIES = (KILL_PREVIOUS, SKIP_IF_RUNNING, WAIT, KILL_STALE)
+POLICY_ENV = "PROCESS_CHECK_POLICY"
+
+RUN_HISTORY_LINES = 500
 
 
 class ProcessCheck:
-    def __init__(self, pidfile):
+    def __init__(self, pidfile, policy=None, wait_secs=60, stale_secs=3600):
+        """
+        pidfile    : lock/pid file of the module, e.g. /tmp/SDP_STAT.pid
+        policy     : one of POLICIES; defaults to $PROCESS_CHECK_POLICY or KILL_PREVIOUS
+        wait_secs  : WAIT, how long to wait for the previous run to finish
+        stale_secs : KILL_STALE, age after which the previous run is considered hung
+
+        Every run appends "start_epoch,duration_secs,event" to <pidfile>.runs, where event
+        is completed, skipped, waited or killed_stale, so overlapping schedules show up
+        as durations longer than the cron interval and as skipped runs.
+        """
         self.pid = int(os.getpid())
         self.pidfile = pidfile
+        self.policy = policy or os.environ.get(POLICY_ENV, KILL_PREVIOUS)
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown process check policy {self.policy}, expected one of {POLICIES}")
+        self.wait_secs = wait_secs
+        self.stale_secs = stale_secs
+        self.history_file = pidfile + ".runs"
+        self.started_at = None
+        self._lock_file = None
 
     @staticmethod
     def killPidRunning(pid):
@@ -24,16 +55,78 @@ class ProcessCheck:
             return True
 
     def start(self):
-        if os.path.isfile(self.pidfile) and self.killPidRunning(int(open(self.pidfile, 'r').readlines()[0])):
-            print("%s already exists, killed old process" % self.pidfile)
-        open(self.pidfile, 'w').write(str(self.pid))
+        self.started_at = time.time()
+        if self.policy == KILL_PREVIOUS:
+            if os.path.isfile(self.pidfile) and self.killPidRunning(int(open(self.pidfile, 'r').readlines()[0])):
+                print("%s already exists, killed old process" % self.pidfile)
+            open(self.pidfile, 'w').write(str(self.pid))
+            return
 
-    def stop(self):
-        os.unlink(self.pidfile)
+        self._lock_file = open(self.pidfile, 'a+')
+        if not self._try_lock():
+            self._resolve_conflict()
 
+        # Holding the lock; the file only tells other runs who we are and since when
+        self._lock_file.seek(0)
+        self._lock_file.truncate()
+        self._lock_file.write(f"{self.pid}\n{self.started_at}\n")
+        self._lock_file.flush()
 
+    def _try_lock(self):
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
 
+    def _holder(self):
+        """(pid, start epoch) of the run holding the lock, None if the file is not readable yet."""
+        try:
+            with open(self.pidfile, 'r') as f:
+                pid, started_at = f.read().split()[:2]
+            return int(pid), float(started_at)
+        except (OSError, ValueError):
+            return None
 
+    def _resolve_conflict(self):
+        holder = self._holder()
+        if self.policy == WAIT:
+            deadline = self.started_at + self.wait_secs
+            while time.time() < deadline:
+                time.sleep(1)
+                if self._try_lock():
+                    self.record("waited", time.time() - self.started_at)
+                    return
+        elif self.policy == KILL_STALE and holder and time.time() - holder[1] > self.stale_secs:
+            print(f"Previous run PID {holder[0]} running for {int(time.time() - holder[1])}s, killing it")
+            self.killPidRunning(holder[0])
+            self.record("killed_stale", time.time() - holder[1])
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            return
 
+        running_for = f" for {int(time.time() - holder[1])}s" if holder else ""
+        print(f"{self.pidfile} is locked by a previous run{running_for}, policy {self.policy}, exiting")
+        self.record("skipped", time.time() - holder[1] if holder else 0)
+        self._lock_file.close()
+        sys.exit(0)
 
+    def record(self, event, duration_secs):
+        try:
+            lines = []
+            if os.path.isfile(self.history_file):
+                with open(self.history_file, 'r') as f:
+                    lines = f.readlines()[-(RUN_HISTORY_LINES - 1):]
+            lines.append(f"{int(self.started_at)},{duration_secs:.1f},{event}\n")
+            with open(self.history_file, 'w') as f:
+                f.writelines(lines)
+        except OSError as err:
+            print(f"Failed recording run history in {self.history_file}: {err}")
 
+    def stop(self):
+        self.record("completed", time.time() - self.started_at)
+        if self.policy == KILL_PREVIOUS:
+            os.unlink(self.pidfile)
+            return
+        # The file stays; unlinking it would let the next run lock a new inode while another still waits on this one
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the ProcessCheck lock policies and run history
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+from lib.process_check import ProcessCheck as process_check
+from lib.process_check.ProcessCheck import ProcessCheck, KILL_PREVIOUS, SKIP_IF_RUNNING, WAIT, KILL_STALE
+
+# A previous run: takes the lock with the given policy, says so, holds it for hold_secs and stops
+PREVIOUS_RUN = """
+import sys, time
+sys.path.insert(0, {repo_root!r})
+from lib.process_check.ProcessCheck import ProcessCheck
+pc = ProcessCheck({pidfile!r}, {policy!r})
+pc.start()
+print("started", flush=True)
+time.sleep({hold_secs})
+pc.stop()
+"""
+
+
+class TestProcessCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.pidfile = os.path.join(self.work_dir, "MODULE.pid")
+        self.previous = None
+
+    def tearDown(self):
+        if self.previous and self.previous.poll() is None:
+            self.previous.kill()
+            self.previous.wait()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def start_previous_run(self, policy, hold_secs=60):
+        """Previous run in its own session, so killing its process group spares the test runner."""
+        script = PREVIOUS_RUN.format(repo_root=REPO_ROOT, pidfile=self.pidfile, policy=policy, hold_secs=hold_secs)
+        self.previous = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE,
+                                         universal_newlines=True, start_new_session=True)
+        self.assertEqual(self.previous.stdout.readline().strip(), "started")
+        return self.previous
+
+    def history(self):
+        with open(self.pidfile + ".runs") as f:
+            return [line.strip().split(",") for line in f]
+
+    def test_kill_previous(self):
+        """KILL_PREVIOUS kills the run in the pidfile and removes the pidfile on stop"""
+        previous = self.start_previous_run(KILL_PREVIOUS)
+        pc = ProcessCheck(self.pidfile, KILL_PREVIOUS)
+        pc.start()
+        self.assertIsNotNone(previous.wait(timeout=10))
+        with open(self.pidfile) as f:
+            self.assertEqual(int(f.read()), os.getpid())
+        pc.stop()
+        self.assertFalse(os.path.exists(self.pidfile))
+        self.assertEqual(self.history()[-1][2], "completed")
+
+    def test_skip_if_running(self):
+        """SKIP_IF_RUNNING exits while the previous run holds the lock and leaves it running"""
+        previous = self.start_previous_run(SKIP_IF_RUNNING)
+        with self.assertRaises(SystemExit) as ctx:
+            ProcessCheck(self.pidfile, SKIP_IF_RUNNING).start()
+        self.assertEqual(ctx.exception.code, 0)
+        self.assertIsNone(previous.poll())
+        self.assertEqual(self.history()[-1][2], "skipped")
+
+    def test_skip_if_running_without_conflict(self):
+        """Without a previous run the lock is taken, and released again on stop"""
+        pc = ProcessCheck(self.pidfile, SKIP_IF_RUNNING)
+        pc.start()
+        with open(self.pidfile) as f:
+            self.assertEqual(int(f.read().split()[0]), os.getpid())
+        pc.stop()
+        self.assertTrue(os.path.exists(self.pidfile))
+        pc = ProcessCheck(self.pidfile, SKIP_IF_RUNNING)
+        pc.start()
+        pc.stop()
+        self.assertEqual([run[2] for run in self.history()], ["completed", "completed"])
+
+    def test_wait(self):
+        """WAIT takes the lock once the previous run finishes within wait_secs"""
+        self.start_previous_run(WAIT, hold_secs=1.5)
+        pc = ProcessCheck(self.pidfile, WAIT, wait_secs=10)
+        pc.start()
+        pc.stop()
+        self.assertEqual([run[2] for run in self.history()], ["completed", "waited", "completed"])
+        self.assertGreaterEqual(float(self.history()[1][1]), 1.0)
+
+    def test_wait_timeout(self):
+        """WAIT exits when the previous run still holds the lock after wait_secs"""
+        previous = self.start_previous_run(WAIT)
+        with self.assertRaises(SystemExit):
+            ProcessCheck(self.pidfile, WAIT, wait_secs=1).start()
+        self.assertIsNone(previous.poll())
+        self.assertEqual(self.history()[-1][2], "skipped")
+
+    def test_kill_stale(self):
+        """KILL_STALE kills a previous run older than stale_secs and takes over the lock"""
+        previous = self.start_previous_run(KILL_STALE)
+        time.sleep(1.1)
+        pc = ProcessCheck(self.pidfile, KILL_STALE, stale_secs=1)
+        pc.start()
+        self.assertIsNotNone(previous.wait(timeout=10))
+        pc.stop()
+        self.assertEqual([run[2] for run in self.history()], ["killed_stale", "completed"])
+
+    def test_kill_stale_keeps_recent_run(self):
+        """KILL_STALE exits, like SKIP_IF_RUNNING, while the previous run is younger than stale_secs"""
+        previous = self.start_previous_run(KILL_STALE)
+        with self.assertRaises(SystemExit):
+            ProcessCheck(self.pidfile, KILL_STALE, stale_secs=3600).start()
+        self.assertIsNone(previous.poll())
+        self.assertEqual(self.history()[-1][2], "skipped")
+
+    def test_policy_from_environment(self):
+        with patch.dict(os.environ, {process_check.POLICY_ENV: SKIP_IF_RUNNING}):
+            self.assertEqual(ProcessCheck(self.pidfile).policy, SKIP_IF_RUNNING)
+        with self.assertRaises(ValueError):
+            ProcessCheck(self.pidfile, "kill-everything")
+
+    def test_run_history_bounded(self):
+        """.runs keeps the last RUN_HISTORY_LINES runs as start_epoch,duration_secs,event"""
+        with patch.object(process_check, "RUN_HISTORY_LINES", 3):
+            for _ in range(5):
+                pc = ProcessCheck(self.pidfile, SKIP_IF_RUNNING)
+                pc.start()
+                pc.stop()
+        history = self.history()
+        self.assertEqual(len(history), 3)
+        start_epoch, duration_secs, event = history[-1]
+        self.assertAlmostEqual(int(start_epoch), time.time(), delta=5)
+        self.assertGreaterEqual(float(duration_secs), 0)
+        self.assertEqual(event, "completed")
+
+
+if __name__ == '__main__':
+    unittest.main()
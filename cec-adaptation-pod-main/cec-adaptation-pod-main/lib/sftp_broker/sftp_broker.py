@@ -0,0 +1,317 @@
+"""
+Node-local SFTP connection broker.
+
+The cron modules upload to the same Splunk/TPIM hosts every few minutes and each
+run used to pay the TCP connect, SSH key exchange and authentication again. The
+broker is a long-running process that keeps one authenticated transport per
+destination and hands out SFTP channels over a local unix socket:
+
+    client -> broker : {"host": ..., "port": 22, "username": ..., "password": ...}\\n
+    broker -> client : OK\\n   (or ERR <reason>\\n)
+    afterwards       : raw SFTP protocol, relayed to an "sftp" subsystem channel
+
+Transports are health checked in the background, dropped when dead or idle (no
+open channel for IDLE_TIMEOUT_SECS) and reconnected on the next request. Modules
+call open_brokered_sftp() and fall back to their own direct connection when it
+returns None (broker not running).
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import select
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import paramiko
+
+DEFAULT_SOCKET_PATH = "/tmp/sftp_broker.sock"
+SOCKET_PATH_ENV = "SFTP_BROKER_SOCKET"
+SFTP_PORT = 22
+CONNECT_TIMEOUT_SECS = 30
+HEALTH_CHECK_SECS = 30
+IDLE_TIMEOUT_SECS = 15 * 60
+RELAY_BUFFER_BYTES = 32 * 1024
+MAX_REQUEST_BYTES = 4096
+
+
+class BrokerError(Exception):
+    pass
+
+
+class BrokerSocket(socket.socket):
+    """
+    Client end of a brokered channel, standing in for the paramiko Channel an SFTPClient expects:
+    get_name() for its logger and recv_ready() for SFTPFile, which polls for acknowledgements once
+    more than 100 writes of a large upload are outstanding. settimeout() is the socket's own.
+    """
+
+    def get_name(self) -> str:
+        return "sftp-broker"
+
+    def recv_ready(self) -> bool:
+        readable, _, _ = select.select([self], [], [], 0)
+        return bool(readable)
+
+
+def read_line(sock: socket.socket, limit: int = MAX_REQUEST_BYTES) -> str:
+    """Read one newline terminated line without consuming any byte after it."""
+    line = bytearray()
+    while len(line) < limit:
+        byte = sock.recv(1)
+        if not byte or byte == b"\n":
+            break
+        line += byte
+    return line.decode("utf-8")
+
+
+class TransportPool:
+    """
+    Authenticated transports, one per (host, port, username, password).
+
+    Entries are [transport, last_used, open_channels]; a transport is idle only while none of its
+    channels is open, so a transfer running longer than the idle timeout keeps its transport.
+    """
+
+    def __init__(self, idle_timeout_secs: int = IDLE_TIMEOUT_SECS, health_check_secs: int = HEALTH_CHECK_SECS):
+        self.idle_timeout_secs = idle_timeout_secs
+        self.health_check_secs = health_check_secs
+        self._transports: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+
+    @staticmethod
+    def key(host: str, port: int, username: str, password: str) -> Tuple:
+        return host, int(port), username, hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    def _key_lock(self, key: Tuple) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _connect(self, host: str, port: int, username: str, password: str) -> paramiko.Transport:
+        logging.info(f"Connecting to {username}@{host}:{port}")
+        sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT_SECS)
+        transport = paramiko.Transport(sock)
+        transport.set_keepalive(self.health_check_secs)
+        transport.connect(username=username, password=password)
+        return transport
+
+    def _drop(self, key: Tuple, reason: str):
+        with self._lock:
+            entry = self._transports.pop(key, None)
+        if entry:
+            logging.info(f"Dropping transport to {key[2]}@{key[0]}:{key[1]}: {reason}")
+            entry[0].close()
+
+    def transport(self, host: str, port: int, username: str, password: str) -> paramiko.Transport:
+        key = self.key(host, port, username, password)
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._transports.get(key)
+            if entry and entry[0].is_active():
+                entry[1] = time.time()
+                return entry[0]
+            if entry:
+                self._drop(key, "inactive")
+            transport = self._connect(host, port, username, password)
+            with self._lock:
+                self._transports[key] = [transport, time.time(), 0]
+            return transport
+
+    def _count_channel(self, transport: paramiko.Transport, delta: int):
+        with self._lock:
+            for entry in self._transports.values():
+                if entry[0] is transport:
+                    entry[1] = time.time()
+                    entry[2] += delta
+
+    def release_channel(self, channel: paramiko.Channel):
+        """Mark a channel of open_sftp_channel() closed; its transport can go idle from now on."""
+        self._count_channel(channel.get_transport(), -1)
+
+    def open_sftp_channel(self, host: str, port: int, username: str, password: str) -> paramiko.Channel:
+        """Open an sftp subsystem channel, reconnecting once if the cached transport turned out dead."""
+        for attempt in (1, 2):
+            transport = self.transport(host, port, username, password)
+            try:
+                channel = transport.open_session(timeout=CONNECT_TIMEOUT_SECS)
+                channel.invoke_subsystem("sftp")
+                self._count_channel(transport, 1)
+                return channel
+            except (paramiko.SSHException, EOFError, OSError) as err:
+                self._drop(self.key(host, port, username, password), str(err))
+                if attempt == 2:
+                    raise
+
+    def health_check(self):
+        now = time.time()
+        with self._lock:
+            entries = list(self._transports.items())
+        for key, (transport, last_used, open_channels) in entries:
+            if not transport.is_active():
+                self._drop(key, "inactive")
+            elif not open_channels and now - last_used > self.idle_timeout_secs:
+                self._drop(key, "idle")
+            else:
+                try:
+                    transport.send_ignore()
+                except Exception as err:
+                    self._drop(key, str(err))
+
+    def close(self):
+        with self._lock:
+            keys = list(self._transports)
+        for key in keys:
+            self._drop(key, "shutdown")
+
+
+def relay(sock: socket.socket, channel: paramiko.Channel):
+    """Copy bytes both ways between the local client and the channel until either side closes."""
+    try:
+        while True:
+            readable, _, _ = select.select([sock, channel], [], [])
+            if sock in readable:
+                data = sock.recv(RELAY_BUFFER_BYTES)
+                if not data:
+                    break
+                channel.sendall(data)
+            if channel in readable:
+                data = channel.recv(RELAY_BUFFER_BYTES)
+                if not data:
+                    break
+                sock.sendall(data)
+    finally:
+        channel.close()
+
+
+class SftpBroker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, pool: TransportPool):
+        self.pool = pool
+        super().__init__(socket_path, BrokerRequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def health_check_loop(self):
+        while True:
+            time.sleep(self.pool.health_check_secs)
+            try:
+                self.pool.health_check()
+            except Exception as err:
+                logging.exception(f"Health check failed ::: {str(err)}")
+
+
+class BrokerRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(read_line(self.request))
+            channel = self.server.pool.open_sftp_channel(request["host"], request.get("port", SFTP_PORT),
+                                                         request["username"], request["password"])
+        except Exception as err:
+            logging.error(f"Failed serving SFTP channel ::: {str(err)}")
+            self.request.sendall(f"ERR {type(err).__name__}: {str(err)}\n".encode("utf-8"))
+            return
+        try:
+            self.request.sendall(b"OK\n")
+            relay(self.request, channel)
+        finally:
+            self.server.pool.release_channel(channel)
+
+
+def broker_socket_path(socket_path: str = None) -> str:
+    return socket_path or os.environ.get(SOCKET_PATH_ENV, DEFAULT_SOCKET_PATH)
+
+
+def open_brokered_sftp(host: str, username: str, password: str, port: int = SFTP_PORT,
+                       socket_path: str = None) -> Optional[paramiko.SFTPClient]:
+    """SFTP client over a channel of the node-local broker, or None if the broker is not available."""
+    socket_path = broker_socket_path(socket_path)
+    if not os.path.exists(socket_path):
+        return None
+    sock = BrokerSocket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT_SECS)
+        sock.connect(socket_path)
+        request = {"host": host, "port": int(port), "username": username, "password": password}
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        reply = read_line(sock)
+        if reply != "OK":
+            raise BrokerError(reply or "broker closed the connection")
+        sock.settimeout(None)
+        return paramiko.SFTPClient(sock)
+    except Exception as err:
+        logging.error(f"SFTP broker unavailable for {username}@{host}:{port}, connecting directly ::: {str(err)}")
+        sock.close()
+        return None
+
+
+class DirectSFTPClient(paramiko.SFTPClient):
+    """SFTP client that owns its transport, used when the broker is not running."""
+
+    def close(self):
+        super().close()
+        self.get_channel().get_transport().close()
+
+
+def open_sftp(host: str, username: str, password: str, port: int = SFTP_PORT,
+              socket_path: str = None) -> paramiko.SFTPClient:
+    """SFTP client through the broker when it is running, otherwise over a direct connection."""
+    sftp = open_brokered_sftp(host, username, password, port, socket_path)
+    if sftp is not None:
+        return sftp
+    transport = paramiko.Transport(socket.create_connection((host, int(port)), timeout=CONNECT_TIMEOUT_SECS))
+    try:
+        transport.connect(username=username, password=password)
+        return DirectSFTPClient.from_transport(transport)
+    except Exception:
+        transport.close()
+        raise
+
+
+def broker_running(socket_path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Node-local SFTP connection broker")
+    parser.add_argument("--socket", default=None, help=f"unix socket path (default ${SOCKET_PATH_ENV} or {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--health-check-secs", type=int, default=HEALTH_CHECK_SECS)
+    parser.add_argument("--idle-timeout-secs", type=int, default=IDLE_TIMEOUT_SECS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    socket_path = broker_socket_path(args.socket)
+    if broker_running(socket_path):
+        logging.info(f"Broker already running on {socket_path}")
+        return 0
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Stale socket of a dead broker
+
+    pool = TransportPool(args.idle_timeout_secs, args.health_check_secs)
+    with SftpBroker(socket_path, pool) as server:
+        threading.Thread(target=server.health_check_loop, daemon=True).start()
+        logging.info(f"SFTP broker listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.close()
+            os.remove(socket_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Tests for the SFTP connection broker, against a local paramiko SFTP server
+"""
+
+import io
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import paramiko
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lib.sftp_broker.sftp_broker import SftpBroker, TransportPool, BrokerSocket, open_brokered_sftp, open_sftp
+
+USERNAME = "splunk"
+PASSWORD = "secret"
+
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        if (username, password) == (USERNAME, PASSWORD):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.writefile.fileno()))
+
+
+class _Sftp(paramiko.SFTPServerInterface):
+    """Uploads only, into the root directory of the test."""
+    root = None
+
+    def _path(self, path):
+        return os.path.join(self.root, path.lstrip("/"))
+
+    def open(self, path, flags, attr):
+        handle = _Handle(flags)
+        handle.writefile = handle.readfile = open(self._path(path), "w+b")
+        return handle
+
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.stat(self._path(path)))
+
+    lstat = stat
+
+
+class SftpServer:
+    """SSH server on 127.0.0.1 serving the sftp subsystem, one thread per connection."""
+
+    def __init__(self, root):
+        _Sftp.root = root
+        self.host_key = paramiko.RSAKey.generate(1024)
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.connections = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _Sftp)
+            transport.start_server(server=_Server())
+
+    def close(self):
+        self.listener.close()
+
+
+class TestSftpBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.remote_dir = os.path.join(self.work_dir, "remote")
+        os.makedirs(self.remote_dir)
+        self.server = SftpServer(self.remote_dir)
+        self.socket_path = os.path.join(self.work_dir, "broker.sock")
+        self.pool = TransportPool()
+        self.broker = SftpBroker(self.socket_path, self.pool)
+        threading.Thread(target=self.broker.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.broker.shutdown()
+        self.broker.server_close()
+        self.pool.close()
+        self.server.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_large_upload_through_broker(self):
+        """An upload with more than 100 outstanding writes polls recv_ready() on the broker socket"""
+        data = os.urandom(8 * 1024 * 1024)
+        sftp = open_brokered_sftp("127.0.0.1", USERNAME, PASSWORD, self.server.port, self.socket_path)
+        self.assertIsNotNone(sftp)
+        try:
+            attributes = sftp.putfo(io.BytesIO(data), "/upload.bin")
+        finally:
+            sftp.close()
+
+        self.assertEqual(attributes.st_size, len(data))
+        with open(os.path.join(self.remote_dir, "upload.bin"), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_transport_reused_across_clients(self):
+        """Every client after the first gets a channel of the cached transport"""
+        for ix in range(3):
+            with open_sftp("127.0.0.1", USERNAME, PASSWORD, self.server.port, self.socket_path) as sftp:
+                sftp.putfo(io.BytesIO(b"kpi"), f"/file_{ix}.txt")
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(sorted(os.listdir(self.remote_dir)), ["file_0.txt", "file_1.txt", "file_2.txt"])
+
+    def test_open_channel_keeps_transport_past_idle_timeout(self):
+        """A transfer longer than the idle timeout keeps its transport; it goes idle once the channel closes"""
+        self.pool.idle_timeout_secs = 0.2
+        sftp = open_brokered_sftp("127.0.0.1", USERNAME, PASSWORD, self.server.port, self.socket_path)
+        try:
+            sftp.putfo(io.BytesIO(b"first part"), "/part_1.txt")
+            time.sleep(0.5)
+            self.pool.health_check()
+            self.assertEqual(len(self.pool._transports), 1)
+            sftp.putfo(io.BytesIO(b"second part"), "/part_2.txt")
+        finally:
+            sftp.close()
+        self.assertEqual(self.server.connections, 1)
+
+        deadline = time.time() + 5
+        while self.pool._transports and time.time() < deadline:
+            time.sleep(0.3)
+            self.pool.health_check()
+        self.assertEqual(self.pool._transports, {})
+
+    def test_broker_not_running(self):
+        """Without a broker socket open_brokered_sftp returns None and open_sftp connects directly"""
+        socket_path = os.path.join(self.work_dir, "missing.sock")
+        self.assertIsNone(open_brokered_sftp("127.0.0.1", USERNAME, PASSWORD, self.server.port, socket_path))
+
+        with open_sftp("127.0.0.1", USERNAME, PASSWORD, self.server.port, socket_path) as sftp:
+            sftp.putfo(io.BytesIO(b"kpi"), "/direct.txt")
+        self.assertTrue(os.path.isfile(os.path.join(self.remote_dir, "direct.txt")))
+
+    def test_recv_ready(self):
+        """recv_ready() reports pending data without consuming it"""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(os.path.join(self.work_dir, "pair.sock"))
+        listener.listen(1)
+        sock = BrokerSocket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(os.path.join(self.work_dir, "pair.sock"))
+        peer, _ = listener.accept()
+        try:
+            self.assertFalse(sock.recv_ready())
+            peer.sendall(b"x")
+            sock.settimeout(5)
+            self.assertEqual(sock.recv(1, socket.MSG_PEEK), b"x")
+            self.assertTrue(sock.recv_ready())
+        finally:
+            sock.close()
+            peer.close()
+            listener.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
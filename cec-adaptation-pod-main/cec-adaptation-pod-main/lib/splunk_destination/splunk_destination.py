@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_TTL_SECS = 3600
+SFTP_PORT = 22
+
+
+def make_destination(ip: str, uid, gid, dirs: Dict[str, str], port: int = SFTP_PORT) -> Dict:
+    """Splunk upload destination descriptor: forwarder IP and port, target owner and target dirs."""
+    return {"ip": ip, "port": port, "uid": uid, "gid": gid, "dirs": dirs}
+
+
+def is_complete(destination: Optional[Dict]) -> bool:
+    """Only fully discovered descriptors are cached; failed lookups fall back to 0/"" and are retried next run."""
+    return bool(destination) \
+        and bool(destination.get("ip")) \
+        and isinstance(destination.get("uid"), int) and isinstance(destination.get("gid"), int) \
+        and (destination["uid"], destination["gid"]) != (0, 0)
+
+
+class SplunkDestinationCache:
+    """
+    TTL cache of the Splunk destination descriptor, stored as JSON under the module's run dir.
+
+    Discovering the forwarder IP and the uid/gid of the upload user costs several kubectl calls
+    and a remote getent, which is more than the upload itself on quiet intervals. The descriptor
+    is rediscovered only when it expires, after invalidate() (e.g. following an upload error) or
+    when config, the configuration the descriptor was discovered from, no longer matches.
+    """
+
+    def __init__(self, cache_path: str, ttl_secs: int = DEFAULT_TTL_SECS, config: Any = None):
+        self.cache_path = cache_path
+        self.ttl_secs = ttl_secs
+        self.config = config
+
+    def load(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached.get("fetched_at", 0) > self.ttl_secs:
+            return None
+        if cached.get("config") != self.config:
+            logging.info(f"Splunk destination config changed, not using {self.cache_path}")
+            return None
+        destination = cached.get("destination")
+        return destination if is_complete(destination) else None
+
+    def save(self, destination: Dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": time.time(), "config": self.config, "destination": destination}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def get(self, discover: Callable[[], Dict]) -> Dict:
+        """Return the cached descriptor, or run discover() and cache its result if it is complete."""
+        destination = self.load()
+        if destination is not None:
+            logging.info(f"Using cached Splunk destination from {self.cache_path}: {destination}")
+            return destination
+
+        destination = discover()
+        if is_complete(destination):
+            self.save(destination)
+        else:
+            logging.error(f"Incomplete Splunk destination, not cached: {destination}")
+        return destination
+
+    def invalidate(self):
+        """Force rediscovery on the next get(), e.g. after an upload error."""
+        try:
+            os.remove(self.cache_path)
+            logging.info(f"Splunk destination cache invalidated: {self.cache_path}")
+        except FileNotFoundError:
+            pass
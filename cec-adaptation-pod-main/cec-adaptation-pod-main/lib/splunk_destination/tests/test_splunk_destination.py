@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the Splunk destination cache
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lib.splunk_destination import splunk_destination
+from lib.splunk_destination.splunk_destination import SplunkDestinationCache, make_destination, is_complete
+
+DESTINATION = make_destination("10.0.0.7", 1001, 1002, {"/pod/dir": "/splunk/dir"})
+
+
+class TestSplunkDestination(unittest.TestCase):
+
+    def setUp(self):
+        self.run_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.run_dir, "run", "splunk_destination.json")
+        self.now = 1000000.0
+        patcher = patch.object(splunk_destination.time, "time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.discovered = []
+
+    def tearDown(self):
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    def discover(self, destination=DESTINATION):
+        def discover():
+            self.discovered.append(destination)
+            return destination
+        return discover
+
+    def test_is_complete(self):
+        self.assertTrue(is_complete(DESTINATION))
+        self.assertFalse(is_complete(None))
+        self.assertFalse(is_complete({}))
+        self.assertFalse(is_complete(make_destination("10.0.0.7", 0, 0, {})))
+        self.assertFalse(is_complete(make_destination("", 1001, 1002, {})))
+        self.assertFalse(is_complete(make_destination("10.0.0.7", "1001", 1002, {})))
+        self.assertTrue(is_complete(make_destination("10.0.0.7", 0, 1002, {})))
+
+    def test_cached_until_ttl(self):
+        cache = SplunkDestinationCache(self.cache_path, ttl_secs=60)
+        self.assertEqual(cache.get(self.discover()), DESTINATION)
+        self.now += 60
+        self.assertEqual(cache.get(self.discover()), DESTINATION)
+        self.assertEqual(len(self.discovered), 1)
+
+        self.now += 1
+        cache.get(self.discover())
+        self.assertEqual(len(self.discovered), 2)
+
+    def test_invalidate(self):
+        cache = SplunkDestinationCache(self.cache_path)
+        cache.get(self.discover())
+        cache.invalidate()
+        self.assertFalse(os.path.exists(self.cache_path))
+        cache.get(self.discover())
+        self.assertEqual(len(self.discovered), 2)
+        cache.invalidate()
+        cache.invalidate()
+
+    def test_incomplete_not_cached(self):
+        """A failed lookup (0/0 ids, no IP) is returned but retried on the next run"""
+        cache = SplunkDestinationCache(self.cache_path)
+        for destination in (make_destination("10.0.0.7", 0, 0, {}), make_destination("", 1001, 1002, {})):
+            self.assertEqual(cache.get(self.discover(destination)), destination)
+            self.assertFalse(os.path.exists(self.cache_path))
+        self.assertEqual(cache.get(self.discover()), DESTINATION)
+        self.assertEqual(len(self.discovered), 3)
+
+    def test_incomplete_cache_file_ignored(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, "w") as f:
+            json.dump({"fetched_at": self.now, "config": None, "destination": make_destination("10.0.0.7", 0, 0, {})}, f)
+        self.assertIsNone(SplunkDestinationCache(self.cache_path).load())
+
+    def test_unreadable_cache_file(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, "w") as f:
+            f.write('{"fetched_at": ')
+        self.assertEqual(SplunkDestinationCache(self.cache_path).get(self.discover()), DESTINATION)
+        self.assertEqual(len(self.discovered), 1)
+
+    def test_config_change_rediscovers(self):
+        """A descriptor discovered for another HOSTNAME/PORT is not used"""
+        SplunkDestinationCache(self.cache_path, config={"hostname": "splunk1", "port": 22}).get(self.discover())
+        self.assertIsNotNone(SplunkDestinationCache(self.cache_path, config={"hostname": "splunk1", "port": 22}).load())
+        self.assertIsNone(SplunkDestinationCache(self.cache_path, config={"hostname": "splunk1", "port": 2222}).load())
+        self.assertIsNone(SplunkDestinationCache(self.cache_path).load())
+
+    def test_save_atomic(self):
+        """save() writes a temporary file and renames it over the cache, which readers see whole or not at all"""
+        cache = SplunkDestinationCache(self.cache_path)
+        cache.save(DESTINATION)
+        replaced = []
+        real_replace = os.replace
+
+        def replace(src, dst):
+            # Before the rename the old descriptor is still the one readers load
+            self.assertEqual(SplunkDestinationCache(self.cache_path).load(), DESTINATION)
+            with open(src) as f:
+                replaced.append(json.load(f))
+            real_replace(src, dst)
+
+        updated = make_destination("10.0.0.8", 1001, 1002, {})
+        with patch.object(splunk_destination.os, "replace", replace):
+            cache.save(updated)
+        self.assertEqual(replaced[0]["destination"], updated)
+        self.assertEqual(cache.load(), updated)
+        self.assertEqual(os.listdir(os.path.dirname(self.cache_path)), ["splunk_destination.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Tests for the transfer ledger stages and resumable uploads
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lib.transfer_ledger import transfer_ledger
+from lib.transfer_ledger.transfer_ledger import (TransferLedger, file_key, upload_resumable,
+                                                 STARTED, UPLOADED, RENAMED, SOURCE_DELETED)
+
+
+class FakeSftp:
+    """The SFTPClient calls upload_resumable makes, on a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.opened = []
+
+    def _path(self, remote_path):
+        return os.path.join(self.root, remote_path.lstrip("/"))
+
+    def stat(self, remote_path):
+        return os.stat(self._path(remote_path))
+
+    def open(self, remote_path, mode):
+        self.opened.append((remote_path, mode))
+        return FakeRemoteFile(self._path(remote_path), mode)
+
+
+class FakeRemoteFile(io.FileIO):
+    def __init__(self, path, mode):
+        super().__init__(path, mode.replace("b", ""))
+
+    def set_pipelined(self, pipelined):
+        pass
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FailingReader:
+    """Non-seekable source that breaks off after fail_after bytes, like an exec pipe of a dying pod."""
+
+    def __init__(self, data, fail_after=None):
+        self.data = io.BytesIO(data)
+        self.fail_after = fail_after
+
+    def read(self, size=-1):
+        if self.fail_after is not None and self.data.tell() >= self.fail_after:
+            raise Interrupted()
+        return self.data.read(size)
+
+
+class TestTransferLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.ledger = TransferLedger(os.path.join(self.work_dir, "run", "transfer_ledger.db"))
+        self.local_file = os.path.join(self.work_dir, "A20240115.1000_stat.csv")
+        with open(self.local_file, "wb") as f:
+            f.write(b"x" * 100)
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_stage_transitions(self):
+        """started -> uploaded -> renamed -> source_deleted, each reaching the stages before it"""
+        key = file_key(self.local_file)
+        self.assertIsNone(self.ledger.stage(key, "splunk"))
+        self.assertFalse(self.ledger.reached(key, STARTED, "splunk"))
+
+        self.ledger.record(key, STARTED, "splunk", "/upload/stat.csv.tmp")
+        self.assertEqual(self.ledger.stage(key, "splunk"), STARTED)
+        self.assertTrue(self.ledger.reached(key, STARTED, "splunk"))
+        self.assertFalse(self.ledger.reached(key, UPLOADED, "splunk"))
+
+        for stage in (UPLOADED, RENAMED, SOURCE_DELETED):
+            self.ledger.record(key, stage, "splunk")
+            self.assertEqual(self.ledger.stage(key, "splunk"), stage)
+        self.assertTrue(self.ledger.reached(key, RENAMED, "splunk"))
+        remote_path = self.ledger._db.execute("SELECT remote_path FROM transfers").fetchone()[0]
+        self.assertEqual(remote_path, "/upload/stat.csv.tmp")
+
+    def test_key_per_destination_and_version(self):
+        """Destinations are tracked apart, and a rewritten file starts over"""
+        key = file_key(self.local_file)
+        self.ledger.record(key, RENAMED, "splunk")
+        self.assertIsNone(self.ledger.stage(key, "tpim"))
+
+        with open(self.local_file, "ab") as f:
+            f.write(b"more")
+        self.assertIsNone(self.ledger.stage(file_key(self.local_file), "splunk"))
+
+    def test_shared_between_connections(self):
+        key = file_key(self.local_file)
+        self.ledger.record(key, UPLOADED)
+        with TransferLedger(self.ledger.db_path) as other:
+            self.assertEqual(other.stage(key), UPLOADED)
+
+    def test_oldest_mtime(self):
+        """Oldest file of a pod still at a stage, used to keep failed uploads in the find window"""
+        self.ledger.record(("sdp-1:/tmp/a.stat", 10, 1000), STARTED, "splunk")
+        self.ledger.record(("sdp-1:/tmp/b.stat", 10, 2000), STARTED, "splunk")
+        self.ledger.record(("sdp-1:/tmp/c.stat", 10, 500), UPLOADED, "splunk")
+        self.ledger.record(("sdp-10:/tmp/d.stat", 10, 100), STARTED, "splunk")
+        self.ledger.record(("sdp-1:/tmp/e.stat", 10, 200), STARTED, "tpim")
+        self.assertEqual(self.ledger.oldest_mtime("sdp-1:/", STARTED, "splunk"), 1000)
+        self.assertEqual(self.ledger.oldest_mtime("sdp-1:/", STARTED, "splunk", newer_than=1000), 2000)
+        self.assertIsNone(self.ledger.oldest_mtime("sdp-1:/", STARTED, "splunk", newer_than=2000))
+        self.assertIsNone(self.ledger.oldest_mtime("sdp-2:/", STARTED, "splunk"))
+
+        self.ledger.record(("sdp-1:/tmp/a.stat", 10, 1000), UPLOADED, "splunk")
+        self.assertEqual(self.ledger.oldest_mtime("sdp-1:/", STARTED, "splunk"), 2000)
+
+    def test_prune(self):
+        key = file_key(self.local_file)
+        self.ledger.record(key, SOURCE_DELETED)
+        self.ledger.prune(retention_secs=3600)
+        self.assertEqual(self.ledger.stage(key), SOURCE_DELETED)
+        later = time.time() + 7200
+        with patch.object(transfer_ledger.time, "time", lambda: later):
+            self.ledger.prune(retention_secs=3600)
+        self.assertIsNone(self.ledger.stage(key))
+
+
+class TestUploadResumable(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.sftp = FakeSftp(self.work_dir)
+        self.data = bytes(range(256)) * 40
+        self.remote_path = "/stat.csv.tmp"
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def remote_data(self):
+        with open(self.sftp._path(self.remote_path), "rb") as f:
+            return f.read()
+
+    def write_partial(self, data):
+        with open(self.sftp._path(self.remote_path), "wb") as f:
+            f.write(data)
+
+    def test_fresh_upload(self):
+        sent = upload_resumable(self.sftp, io.BytesIO(self.data), self.remote_path, len(self.data))
+        self.assertEqual(sent, len(self.data))
+        self.assertEqual(self.remote_data(), self.data)
+
+    def test_resume_seekable(self):
+        """A partial remote file is continued from its size"""
+        self.write_partial(self.data[:3000])
+        sent = upload_resumable(self.sftp, io.BytesIO(self.data), self.remote_path, len(self.data))
+        self.assertEqual(sent, len(self.data) - 3000)
+        self.assertEqual(self.sftp.opened, [(self.remote_path, "r+b")])
+        self.assertEqual(self.remote_data(), self.data)
+
+    def test_resume_non_seekable(self):
+        """A pipe is skipped forward by reading"""
+        self.write_partial(self.data[:3000])
+        sent = upload_resumable(self.sftp, FailingReader(self.data), self.remote_path, len(self.data))
+        self.assertEqual(sent, len(self.data) - 3000)
+        self.assertEqual(self.remote_data(), self.data)
+
+    def test_no_resume_overwrites(self):
+        """Without resume a leftover remote file (another version) is overwritten"""
+        self.write_partial(b"y" * 5000)
+        upload_resumable(self.sftp, io.BytesIO(self.data), self.remote_path, len(self.data), resume=False)
+        self.assertEqual(self.remote_data(), self.data)
+
+    def test_remote_larger_than_source(self):
+        """A remote file larger than the source is not a partial upload of it; start over"""
+        self.write_partial(b"y" * (len(self.data) + 10))
+        sent = upload_resumable(self.sftp, io.BytesIO(self.data), self.remote_path, len(self.data))
+        self.assertEqual(sent, len(self.data))
+        self.assertEqual(self.sftp.opened, [(self.remote_path, "wb")])
+        self.assertEqual(self.remote_data(), self.data)
+
+    def test_size_mismatch(self):
+        with self.assertRaises(IOError):
+            upload_resumable(self.sftp, io.BytesIO(self.data[:100]), self.remote_path, len(self.data))
+
+    def test_resume_from_started_after_interruption(self):
+        """A run interrupted mid-upload leaves STARTED; the next run resumes at the partial size"""
+        local_file = os.path.join(self.work_dir, "local.csv")
+        with open(local_file, "wb") as f:
+            f.write(self.data)
+        key = file_key(local_file)
+
+        def run(fileobj):
+            with TransferLedger(os.path.join(self.work_dir, "run", "ledger.db")) as ledger:
+                resume = ledger.stage(key) == STARTED
+                ledger.record(key, STARTED, remote_path=self.remote_path)
+                sent = upload_resumable(self.sftp, fileobj, self.remote_path, key[1], resume)
+                ledger.record(key, UPLOADED)
+                return sent
+
+        with patch.object(transfer_ledger, "COPY_BUFFER_BYTES", 1024):
+            with self.assertRaises(Interrupted):
+                run(FailingReader(self.data, fail_after=4096))
+            self.assertEqual(len(self.remote_data()), 4096)
+
+            sent = run(FailingReader(self.data))
+
+        self.assertEqual(sent, len(self.data) - 4096)
+        self.assertEqual(self.remote_data(), self.data)
+        with TransferLedger(os.path.join(self.work_dir, "run", "ledger.db")) as ledger:
+            self.assertEqual(ledger.stage(key), UPLOADED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+STARTED = "started"
+UPLOADED = "uploaded"
+RENAMED = "renamed"
+SOURCE_DELETED = "source_deleted"
+STAGES = (STARTED, UPLOADED, RENAMED, SOURCE_DELETED)
+
+COPY_BUFFER_BYTES = 1024 * 1024
+DEFAULT_RETENTION_SECS = 7 * 24 * 3600
+
+
+def file_key(path: str) -> Tuple[str, int, int]:
+    """Ledger key of a local file: (path, size, mtime). A rewritten file gets a new key."""
+    stat = os.stat(path)
+    return path, stat.st_size, int(stat.st_mtime)
+
+
+class TransferLedger:
+    """
+    Local record of file transfers, so an interrupted run resumes where it stopped.
+
+    Every file is keyed by (path, size, mtime) and destination, and moves through the
+    stages started -> uploaded -> renamed -> source_deleted. A new run skips the stages
+    already reached, and a "started" upload is resumed at the size of the partial remote
+    file instead of from byte zero. The ledger is a SQLite file under the module's run
+    dir; concurrent writers (e.g. the pod worker processes) wait on the database lock.
+    """
+
+    def __init__(self, db_path: str, timeout_secs: int = 30):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, timeout=timeout_secs)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS transfers ("
+                         "path TEXT NOT NULL, size INTEGER NOT NULL, mtime INTEGER NOT NULL, destination TEXT NOT NULL, "
+                         "stage TEXT NOT NULL, remote_path TEXT, updated_at REAL NOT NULL, "
+                         "PRIMARY KEY (path, size, mtime, destination))")
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def stage(self, key: Tuple[str, int, int], destination: str = "") -> Optional[str]:
+        """Last stage recorded for the file at the destination, None if it was never transferred."""
+        row = self._db.execute("SELECT stage FROM transfers WHERE path=? AND size=? AND mtime=? AND destination=?",
+                               (*key, destination)).fetchone()
+        return row[0] if row else None
+
+    def reached(self, key: Tuple[str, int, int], stage: str, destination: str = "") -> bool:
+        current = self.stage(key, destination)
+        return current is not None and STAGES.index(current) >= STAGES.index(stage)
+
+    def record(self, key: Tuple[str, int, int], stage: str, destination: str = "", remote_path: str = None):
+        self._db.execute("INSERT INTO transfers (path, size, mtime, destination, stage, remote_path, updated_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (path, size, mtime, destination) DO UPDATE SET "
+                         "stage=excluded.stage, remote_path=COALESCE(excluded.remote_path, transfers.remote_path), "
+                         "updated_at=excluded.updated_at", (*key, destination, stage, remote_path, time.time()))
+        self._db.commit()
+
+    def oldest_mtime(self, path_prefix: str, stage: str, destination: str = "", newer_than: float = 0) -> Optional[int]:
+        """Oldest mtime after newer_than of the files under path_prefix whose last stage at the destination is stage."""
+        row = self._db.execute("SELECT MIN(mtime) FROM transfers WHERE substr(path, 1, ?) = ? AND stage=? AND destination=? "
+                               "AND mtime > ?", (len(path_prefix), path_prefix, stage, destination, newer_than)).fetchone()
+        return row[0]
+
+    def prune(self, retention_secs: int = DEFAULT_RETENTION_SECS):
+        """Forget transfers not touched for retention_secs; their sources are gone or long done."""
+        deleted = self._db.execute("DELETE FROM transfers WHERE updated_at < ?", (time.time() - retention_secs,)).rowcount
+        self._db.commit()
+        if deleted:
+            logging.info(f"Pruned {deleted} transfers from {self.db_path}")
+
+
+def remote_size(sftp, remote_path: str) -> int:
+    try:
+        return sftp.stat(remote_path).st_size
+    except IOError:
+        return 0
+
+
+def skip(fileobj, offset: int):
+    try:
+        fileobj.seek(offset, os.SEEK_CUR)
+    except (AttributeError, OSError, ValueError):
+        remaining = offset
+        while remaining:
+            skipped = len(fileobj.read(min(remaining, COPY_BUFFER_BYTES)))
+            if not skipped:
+                break
+            remaining -= skipped
+
+
+def upload_resumable(sftp, fileobj, remote_path: str, size: int, resume: bool = True) -> int:
+    """
+    Upload size bytes of fileobj to remote_path, continuing a partial remote file when resume is set.
+
+    Only resume when the ledger says this exact file was "started" at remote_path, otherwise the
+    partial remote file may belong to another version of it. Non-seekable file objects (exec pipes)
+    are skipped forward by reading. Returns the number of bytes sent in this call.
+    """
+    offset = remote_size(sftp, remote_path) if resume else 0
+    if offset > size:
+        offset = 0
+    if offset:
+        logging.info(f"Resuming upload of {remote_path} at byte {offset} of {size}")
+        skip(fileobj, offset)
+
+    sent = 0
+    if offset < size or not size:
+        with sftp.open(remote_path, "r+b" if offset else "wb") as remote:
+            remote.seek(offset)
+            remote.set_pipelined(True)
+            while True:
+                chunk = fileobj.read(COPY_BUFFER_BYTES)
+                if not chunk:
+                    break
+                remote.write(chunk)
+                sent += len(chunk)
+
+    uploaded = remote_size(sftp, remote_path)
+    if uploaded != size:
+        raise IOError(f"Size mismatch after upload of {remote_path}: {uploaded} != {size}")
+    return sent
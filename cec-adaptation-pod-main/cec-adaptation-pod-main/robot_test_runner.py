@@ -8,6 +8,7 @@ This script provides a comprehensive test execution framework with the following
 - Parallel test execution
 - HTML and XML report generation
 - Test filtering by tags
+- Diff-aware suite selection from git changes (--changed, see test_selection.py)
 - Performance metrics collection
 - Cross-platform compatibility (Windows/Linux)
 """
@@ -19,9 +20,104 @@ import argparse
 import datetime
 import json
 import concurrent.futures
+import math
 import platform
+import re
+import shutil
+import statistics
+import xml.etree.ElementTree as ET
 from pathlib import Path
 
+from test_selection import select_changed
+
+MERGED_SUITE_NAME = "CEC Robot Tests"
+DEFAULT_TEST_SECS = 1.0        # predicted duration of a test without history
+DURATION_HISTORY_RUNS = 5      # previous runs whose output.xml files feed the shard plan
+TEST_CASES_SECTION = re.compile(r'^\*+\s*test\s*cases?\b', re.IGNORECASE | re.MULTILINE)
+
+
+def suite_key(source):
+    """MODULE/tests/<file>.robot of a suite source, the same for a shard's copy of the module."""
+    return "/".join(Path(source).parts[-3:])
+
+
+def parse_test_durations(output_xml):
+    """{(suite key, test name): seconds} of one output.xml, for Robot Framework 7 and older formats."""
+    durations = {}
+    try:
+        root = ET.parse(str(output_xml)).getroot()
+    except (ET.ParseError, OSError):
+        return durations
+    for suite in root.iter('suite'):
+        source = suite.get('source') or ''
+        if not source.endswith('.robot'):
+            continue
+        for test in suite.findall('test'):
+            statuses = test.findall('status')
+            if not statuses:
+                continue
+            status = statuses[-1]
+            try:
+                if status.get('elapsed') is not None:
+                    secs = float(status.get('elapsed'))
+                else:
+                    start = datetime.datetime.strptime(status.get('starttime'), "%Y%m%d %H:%M:%S.%f")
+                    end = datetime.datetime.strptime(status.get('endtime'), "%Y%m%d %H:%M:%S.%f")
+                    secs = (end - start).total_seconds()
+            except (TypeError, ValueError):
+                continue
+            durations[(suite_key(source), test.get('name'))] = secs
+    return durations
+
+
+def load_test_durations(results_dir, max_runs=DURATION_HISTORY_RUNS):
+    """Per-test durations from the output.xml files of the last runs; newer runs win."""
+    durations = {}
+    results_dir = Path(results_dir)
+    if not results_dir.exists():
+        return durations
+    for run_dir in sorted(results_dir.glob('run_*'))[-max_runs:]:
+        for output_xml in sorted(run_dir.rglob('*output*.xml')):
+            durations.update(parse_test_durations(output_xml))
+    return durations
+
+
+def robot_test_pattern(test_name):
+    """--test pattern matching exactly this name (*, ? and [ are glob characters for robot)."""
+    return re.sub(r'([*?\[])', r'[\1]', test_name)
+
+
+def split_tests(tests, parts):
+    """Longest-first split of [(name, secs)] into parts of similar duration, keeping the file order."""
+    bins = [[0.0, index, []] for index in range(parts)]
+    for position, (name, secs) in sorted(enumerate(tests), key=lambda item: -item[1][1]):
+        lightest = min(bins)
+        lightest[0] += secs
+        lightest[2].append((position, name, secs))
+    return [[(name, secs) for _, name, secs in sorted(members)] for _, _, members in bins if members]
+
+
+class RobotShard:
+    """Tests of one suite file, run by one robot process in its own copy of the module."""
+
+    def __init__(self, module, suite_file, tests, predicted_secs, part=1, parts=1):
+        self.module = module
+        self.suite_file = Path(suite_file)
+        self.tests = tests                  # test names, None runs the whole suite
+        self.predicted_secs = predicted_secs
+        self.part = part
+        self.parts = parts
+
+    @property
+    def name(self):
+        name = f"{self.module} {self.suite_file.stem}"
+        return f"{name} [{self.part}/{self.parts}]" if self.parts > 1 else name
+
+    @property
+    def dir_name(self):
+        return re.sub(r'[^A-Za-z0-9_.-]+', '_', self.name).strip('_')
+
+
 class RobotTestRunner:
     def __init__(self, workspace_root):
         self.workspace_root = Path(workspace_root)
@@ -33,8 +129,14 @@ class RobotTestRunner:
             'SDP_STAT'
         ]
         self.results_dir = self.workspace_root / 'robot_test_results'
+        self.selected_suites = None  # suite paths chosen by --changed; None runs every suite
         self.timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         
+    def discover_modules(self):
+        """Modules of the workspace that have Robot suites under tests/."""
+        return sorted(path.parent.parent.name for path in self.workspace_root.glob('*/tests/*.robot')
+                      if path.parent.parent.name != self.results_dir.name)
+
     def setup_results_directory(self):
         """Create results directory structure."""
         self.current_results_dir = self.results_dir / f"run_{self.timestamp}"
@@ -51,7 +153,8 @@ class RobotTestRunner:
           # Check Robot Framework installation
         try:
             result = subprocess.run(['robot', '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-            if result.returncode == 0:
+            # robot --version exits with 251 (INFO_PRINTED) on Robot Framework 3.x and later
+            if result.returncode in (0, 251):
                 print(f"✅ Robot Framework found: {result.stdout.strip()}")
             else:
                 raise subprocess.CalledProcessError(result.returncode, 'robot --version')
@@ -117,7 +220,10 @@ class RobotTestRunner:
         for pattern in patterns:
             test_files.extend(tests_dir.glob(pattern))
             
-        return list(set(test_files))  # Remove duplicates
+        return [path for path in set(test_files) if self.is_selected(path)]  # Remove duplicates
+
+    def is_selected(self, suite):
+        return self.selected_suites is None or Path(suite).resolve() in self.selected_suites
         
     def run_module_tests(self, module, tags=None, exclude_tags=None, parallel=False):
         """Run tests for a specific module."""
@@ -154,7 +260,7 @@ class RobotTestRunner:
             cmd.append(str(test_file))
             
         print(f"   Command: robot --outputdir {module_results_dir} ...")
-          try:
+        try:
             start_time = datetime.datetime.now()
             # For Python 3.6 compatibility, avoid timeout parameter
             result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
@@ -229,49 +335,235 @@ class RobotTestRunner:
         self.generate_summary_report(results, start_time, end_time, total_duration)
         return results
         
-    def run_all_tests_parallel(self, tags=None, exclude_tags=None, modules=None, max_workers=3):
-        """Run tests for all modules in parallel."""
+    def run_all_tests_parallel(self, tags=None, exclude_tags=None, modules=None, max_workers=None):
+        """Run the suites of all modules as load-balanced test shards and merge the results with rebot.
+
+        Shards are sized from the per-test durations of previous runs, so that the heaviest
+        suites are split across workers; max_workers defaults to the CPU count.
+        """
         test_modules = modules if modules else self.target_modules
+        max_workers = max_workers or os.cpu_count() or 1
         results = {}
-        
-        print(f"🚀 Starting parallel test execution for modules: {', '.join(test_modules)}")
-        print(f"   Max workers: {max_workers}")
+
+        print(f"🚀 Starting sharded test execution for modules: {', '.join(test_modules)}")
+        print(f"   Workers: {max_workers}")
         start_time = datetime.datetime.now()
-        
+
+        shards = self.plan_shards(test_modules, tags, exclude_tags, max_workers)
+        predicted_total = sum(shard.predicted_secs for shard in shards)
+        print(f"   Shards: {len(shards)}, predicted test time {predicted_total:.1f}s, "
+              f"ideal wall time {predicted_total / max_workers:.1f}s")
+
+        shard_results = []
+        # Longest shards are submitted first; each worker takes the next shard when it is free
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all test jobs
-            future_to_module = {
-                executor.submit(self.run_module_tests, module, tags, exclude_tags): module 
-                for module in test_modules
+            future_to_shard = {
+                executor.submit(self.run_shard, shard, tags, exclude_tags): shard
+                for shard in shards
             }
-            
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_module):
-                module = future_to_module[future]
+            for future in concurrent.futures.as_completed(future_to_shard):
+                shard = future_to_shard[future]
                 try:
-                    success = future.result()
-                    results[module] = {
-                        'success': success,
-                        'duration': 'N/A (parallel)',
-                        'start_time': start_time.isoformat(),
-                        'end_time': datetime.datetime.now().isoformat()
-                    }
+                    shard_results.append(future.result())
                 except Exception as e:
-                    print(f"❌ {module} generated an exception: {e}")
-                    results[module] = {
-                        'success': False,
-                        'duration': 'N/A (exception)',
-                        'start_time': start_time.isoformat(),
-                        'end_time': datetime.datetime.now().isoformat(),
-                        'error': str(e)
-                    }
-                    
+                    print(f"❌ {shard.name} generated an exception: {e}")
+                    shard_results.append({'shard': shard, 'success': False, 'duration': 0.0,
+                                          'output': None, 'error': str(e)})
+
+        self.merge_shard_outputs([r['output'] for r in sorted(shard_results, key=lambda r: r['shard'].name)
+                                  if r['output']])
+        self.write_shard_plan(shard_results, max_workers)
+
+        for module in test_modules:
+            module_results = [r for r in shard_results if r['shard'].module == module]
+            if not module_results:
+                continue
+            results[module] = {
+                'success': all(r['success'] for r in module_results),
+                'duration': str(datetime.timedelta(seconds=round(sum(r['duration'] for r in module_results)))),
+                'shards': len(module_results),
+                'start_time': start_time.isoformat(),
+                'end_time': datetime.datetime.now().isoformat()
+            }
+            errors = [r['error'] for r in module_results if r.get('error')]
+            if errors:
+                results[module]['error'] = '; '.join(errors)
+
         end_time = datetime.datetime.now()
         total_duration = end_time - start_time
-        
+
         self.generate_summary_report(results, start_time, end_time, total_duration)
         return results
-        
+
+    def get_suite_files(self, module):
+        """Robot files of a module that have test cases (resource files are left out)."""
+        tests_dir = self.workspace_root / module / 'tests'
+        if not tests_dir.exists():
+            return []
+        return [path for path in sorted(tests_dir.glob('*.robot'))
+                if TEST_CASES_SECTION.search(path.read_text(encoding='utf-8', errors='replace'))
+                and self.is_selected(path)]
+
+    def plan_shards(self, modules, tags, exclude_tags, workers):
+        """Split the suites into shards of about total/workers predicted seconds, longest first."""
+        history = load_test_durations(self.results_dir)
+        default_secs = statistics.median(history.values()) if history else DEFAULT_TEST_SECS
+        try:
+            from robot.api import TestSuiteBuilder
+        except ImportError:
+            TestSuiteBuilder = None
+            print("⚠️  robot.api not importable from this Python, sharding by suite only")
+
+        suites = []
+        for module in modules:
+            for suite_file in self.get_suite_files(module):
+                key = suite_key(suite_file)
+                if TestSuiteBuilder is None:
+                    secs = sum(v for (suite, _), v in history.items() if suite == key) or default_secs
+                    suites.append((module, suite_file, None, secs))
+                    continue
+                suite = TestSuiteBuilder().build(str(suite_file))
+                if tags or exclude_tags:
+                    suite.filter(included_tags=tags, excluded_tags=exclude_tags)
+                tests = [(test.name, history.get((key, test.name), default_secs)) for test in suite.all_tests]
+                if tests:
+                    suites.append((module, suite_file, tests, sum(secs for _, secs in tests)))
+
+        target_secs = sum(secs for *_, secs in suites) / max(workers, 1)
+        # Without a private module copy per shard, parallel parts of one suite would share test data
+        self.isolate_shards = self.can_isolate_shards()
+        shards = []
+        for module, suite_file, tests, secs in suites:
+            parts = min(len(tests), math.ceil(secs / target_secs)) if tests and self.isolate_shards and target_secs else 1
+            if parts <= 1:
+                shards.append(RobotShard(module, suite_file, [name for name, _ in tests] if tests else None, secs))
+                continue
+            for part, part_tests in enumerate(split_tests(tests, parts), 1):
+                shards.append(RobotShard(module, suite_file, [name for name, _ in part_tests],
+                                         sum(secs for _, secs in part_tests), part, parts))
+        return sorted(shards, key=lambda shard: shard.predicted_secs, reverse=True)
+
+    def can_isolate_shards(self):
+        """Shards get a private copy of their module next to symlinks of the rest of the workspace."""
+        probe = self.current_results_dir / '.symlink_probe'
+        try:
+            probe.symlink_to(self.workspace_root)
+            probe.unlink()
+            return True
+        except (OSError, NotImplementedError):
+            return False
+
+    def make_shard_workspace(self, module, workspace):
+        """Copy the module and link everything else, so suite setup/teardown of parallel shards of the
+        same suite do not remove each other's test data."""
+        workspace.mkdir(parents=True)
+        for entry in self.workspace_root.iterdir():
+            if entry.name == module:
+                shutil.copytree(str(entry), str(workspace / module), symlinks=True,
+                                ignore=shutil.ignore_patterns('__pycache__', '*.pyc'))
+            elif entry != self.results_dir:
+                (workspace / entry.name).symlink_to(entry)
+
+    def run_shard(self, shard, tags=None, exclude_tags=None):
+        shard_dir = self.current_results_dir / 'shards' / shard.dir_name
+        workspace = shard_dir / 'workspace'
+        isolated = getattr(self, 'isolate_shards', False)
+        if isolated:
+            self.make_shard_workspace(shard.module, workspace)
+            suite_file = workspace / shard.module / 'tests' / shard.suite_file.name
+        else:
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            suite_file = shard.suite_file
+
+        cmd = [
+            'robot',
+            '--outputdir', str(shard_dir),
+            '--name', shard.name,
+            '--output', 'output.xml',
+            '--log', 'NONE',
+            '--report', 'NONE',
+            '--loglevel', 'INFO'
+        ]
+        for tag in tags or []:
+            cmd.extend(['--include', tag])
+        for tag in exclude_tags or []:
+            cmd.extend(['--exclude', tag])
+        if shard.tests is not None:
+            # Test names can be long and many; an argument file keeps the command line short
+            argument_file = shard_dir / 'tests.args'
+            with open(argument_file, 'w', encoding='utf-8') as f:
+                for test in shard.tests:
+                    f.write(f"--test {robot_test_pattern(test)}\n")
+            cmd.extend(['--argumentfile', str(argument_file)])
+        cmd.append(str(suite_file))
+
+        start_time = datetime.datetime.now()
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                                    cwd=str(suite_file.parent))
+        finally:
+            if isolated:
+                shutil.rmtree(str(workspace), ignore_errors=True)
+        duration = (datetime.datetime.now() - start_time).total_seconds()
+
+        with open(shard_dir / "command_output.txt", 'w') as f:
+            f.write(f"Shard: {shard.name}\n")
+            f.write(f"Command: {' '.join(cmd)}\n")
+            f.write(f"Return code: {result.returncode}\n")
+            f.write(f"Duration: {duration:.1f}s (predicted {shard.predicted_secs:.1f}s)\n")
+            f.write(f"STDOUT:\n{result.stdout}\n")
+            f.write(f"STDERR:\n{result.stderr}\n")
+
+        output = shard_dir / 'output.xml'
+        status = "✅" if result.returncode == 0 else "❌"
+        print(f"{status} {shard.name}: {len(shard.tests) if shard.tests is not None else 'all'} tests, "
+              f"{duration:.1f}s (predicted {shard.predicted_secs:.1f}s)")
+        return {
+            'shard': shard,
+            'success': result.returncode == 0,
+            'return_code': result.returncode,
+            'duration': duration,
+            'output': str(output) if output.exists() else None,
+            'error': result.stderr[:200] if result.returncode != 0 and not output.exists() else None
+        }
+
+    def merge_shard_outputs(self, outputs):
+        """Combine the shard outputs into one output.xml, log.html and report.html."""
+        if not outputs:
+            print("❌ No shard outputs to merge")
+            return False
+        cmd = [
+            'rebot',
+            '--name', MERGED_SUITE_NAME,
+            '--outputdir', str(self.current_results_dir),
+            '--output', 'output.xml',
+            '--log', 'log.html',
+            '--report', 'report.html'
+        ] + outputs
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        # rebot returns the number of failed tests like robot; 252 and above are errors
+        if result.returncode >= 252:
+            print(f"❌ rebot failed with return code {result.returncode}: {result.stderr[:200]}")
+            return False
+        print(f"📄 Merged report: {self.current_results_dir / 'report.html'}")
+        return True
+
+    def write_shard_plan(self, shard_results, workers):
+        plan = {
+            'workers': workers,
+            'shards': [{
+                'name': r['shard'].name,
+                'module': r['shard'].module,
+                'suite': suite_key(r['shard'].suite_file),
+                'tests': len(r['shard'].tests) if r['shard'].tests is not None else None,
+                'predicted_secs': round(r['shard'].predicted_secs, 3),
+                'actual_secs': round(r['duration'], 3),
+                'success': r['success']
+            } for r in sorted(shard_results, key=lambda r: r['shard'].predicted_secs, reverse=True)]
+        }
+        with open(self.current_results_dir / "shard_plan.json", 'w') as f:
+            json.dump(plan, f, indent=2)
+
     def generate_summary_report(self, results, start_time, end_time, total_duration):
         """Generate comprehensive summary report."""
         successful_modules = [m for m, r in results.items() if r['success']]
@@ -347,18 +639,23 @@ Examples:
   python robot_test_runner.py --modules KAFKA_UAF SDP_STAT      # Run specific modules
   python robot_test_runner.py --tags smoke                      # Run only smoke tests
   python robot_test_runner.py --parallel --max-workers 2        # Run tests in parallel
+  python robot_test_runner.py --parallel --all-modules          # Shard every module's suites over all CPUs
+  python robot_test_runner.py --changed                         # Only suites affected by uncommitted changes
+  python robot_test_runner.py --parallel --changed origin/main  # ... by changes since the branch point
   python robot_test_runner.py --validate-only                   # Only validate environment
         """
     )
     
     parser.add_argument('--workspace', default='.', help='Workspace root directory (default: current directory)')
-    parser.add_argument('--modules', nargs='+', 
-                       choices=['KAFKA_UAF', 'NFS_DISK_STATUS_CHECK', 'POD_FILE_COLLECTOR', 'POD_FILE_SENDER', 'SDP_STAT'], 
-                       help='Specific modules to test')
+    parser.add_argument('--modules', nargs='+', help='Specific modules to test')
+    parser.add_argument('--all-modules', action='store_true', help='Test every module that has tests/*.robot')
     parser.add_argument('--tags', nargs='+', help='Include tests with these tags')
     parser.add_argument('--exclude-tags', nargs='+', help='Exclude tests with these tags')
     parser.add_argument('--parallel', action='store_true', help='Run tests in parallel')
-    parser.add_argument('--max-workers', type=int, default=3, help='Maximum parallel workers (default: 3)')
+    parser.add_argument('--max-workers', type=int, default=None,
+                       help='Maximum parallel workers; suites are split into shards to keep them busy (default: CPU count)')
+    parser.add_argument('--changed', nargs='?', const='HEAD', metavar='REF',
+                       help='Only run suites affected by git changes: uncommitted ones, or since the merge base with REF')
     parser.add_argument('--validate-only', action='store_true', help='Only validate environment')
     
     args = parser.parse_args()
@@ -366,6 +663,29 @@ Examples:
     # Convert workspace to absolute path
     workspace_root = os.path.abspath(args.workspace)
     runner = RobotTestRunner(workspace_root)
+    if args.all_modules:
+        runner.target_modules = runner.discover_modules()
+    if args.modules:
+        unknown = sorted(set(args.modules) - set(runner.discover_modules()))
+        if unknown:
+            parser.error(f"no Robot suites found for modules: {', '.join(unknown)}")
+        runner.target_modules = args.modules
+    if args.changed:
+        try:
+            selection = select_changed(workspace_root, args.changed)
+        except RuntimeError as e:
+            print(f"❌ Could not list the changed files: {e}")
+            sys.exit(1)
+        print(selection.describe(workspace_root))
+        candidates = args.modules or runner.discover_modules()
+        if selection.run_all:
+            runner.target_modules = candidates
+        else:
+            runner.target_modules = [module for module in selection.modules if module in candidates]
+            runner.selected_suites = {suite.resolve() for suites in selection.suites.values() for suite in suites}
+        if not runner.target_modules:
+            print("✅ No test suites affected by the changes")
+            sys.exit(0)
     
     print("🤖 Robot Framework Test Runner for CEC Adaptation Pod")
     print("=" * 60)
@@ -389,14 +709,14 @@ Examples:
         results = runner.run_all_tests_parallel(
             tags=args.tags,
             exclude_tags=args.exclude_tags,
-            modules=args.modules,
+            modules=runner.target_modules,
             max_workers=args.max_workers
         )
     else:
         results = runner.run_all_tests_sequential(
             tags=args.tags,
             exclude_tags=args.exclude_tags,
-            modules=args.modules
+            modules=runner.target_modules
         )
     
     # Exit with appropriate code
@@ -13,6 +13,8 @@ import datetime
 import json
 from pathlib import Path
 
+from test_selection import select_changed
+
 class TestRunner:
     def __init__(self, workspace_root):
         self.workspace_root = Path(workspace_root)
@@ -171,7 +173,10 @@ class TestRunner:
         
         # Check Robot Framework installation
         try:
-            subprocess.run(['robot', '--version'], capture_output=True, check=True)
+            result = subprocess.run(['robot', '--version'], capture_output=True)
+            # robot --version exits with 251 (INFO_PRINTED) on Robot Framework 3.x and later
+            if result.returncode not in (0, 251):
+                raise subprocess.CalledProcessError(result.returncode, 'robot --version')
             print("✓ Robot Framework found")
         except (FileNotFoundError, subprocess.CalledProcessError):
             print("✗ Robot Framework not found")
@@ -215,6 +220,8 @@ def main():
                        help='Specific modules to test')
     parser.add_argument('--tags', nargs='+', help='Include tests with these tags')
     parser.add_argument('--exclude-tags', nargs='+', help='Exclude tests with these tags')
+    parser.add_argument('--changed', nargs='?', const='HEAD', metavar='REF',
+                       help='Only run modules affected by git changes: uncommitted ones, or since the merge base with REF')
     parser.add_argument('--validate-only', action='store_true', help='Only validate environment')
     
     args = parser.parse_args()
@@ -222,6 +229,23 @@ def main():
     # Convert workspace to absolute path
     workspace_root = os.path.abspath(args.workspace)
     runner = TestRunner(workspace_root)
+    if args.changed:
+        try:
+            selection = select_changed(workspace_root, args.changed)
+        except RuntimeError as e:
+            print(f"Could not list the changed files: {e}")
+            sys.exit(1)
+        print(selection.describe(workspace_root))
+        candidates = args.modules or runner.modules
+        if not selection.run_all:
+            candidates = [module for module in selection.modules if module in candidates]
+        # This runner runs the <module>_tests.robot suite of each module
+        runner.modules = [module for module in candidates
+                          if (Path(workspace_root) / module / 'tests' / f"{module.lower()}_tests.robot").exists()]
+        args.modules = runner.modules
+        if not runner.modules:
+            print("No test suites affected by the changes")
+            sys.exit(0)
     
     # Validate environment
     if not runner.validate_environment():
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests for the duration history and shard planning of the Robot Framework runner
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from robot_test_runner import (RobotTestRunner, parse_test_durations, load_test_durations, split_tests,
+                               robot_test_pattern, DEFAULT_TEST_SECS)
+
+RF7_OUTPUT = """<?xml version="1.0" encoding="UTF-8"?>
+<robot generator="Robot 7.0" rpa="false" schemaversion="5">
+<suite id="s1" name="Tests" source="/shards/MOD_suite_1_2/workspace/MOD/tests/suite.robot">
+<test id="s1-t1" name="Fast Test" line="5">
+<kw name="Log"><status status="PASS" start="2024-01-15T10:00:00.000000" elapsed="0.001"/></kw>
+<status status="PASS" start="2024-01-15T10:00:00.000000" elapsed="1.250"/>
+</test>
+<test id="s1-t2" name="Slow Test" line="9">
+<status status="FAIL" start="2024-01-15T10:00:01.250000" elapsed="30.5">failed</status>
+</test>
+<status status="FAIL" start="2024-01-15T10:00:00.000000" elapsed="31.8"/>
+</suite>
+</robot>
+"""
+
+RF6_OUTPUT = """<?xml version="1.0" encoding="UTF-8"?>
+<robot generator="Robot 6.1" rpa="false" schemaversion="4">
+<suite id="s1" name="Merged">
+<suite id="s1-s1" name="Suite" source="/work/MOD/tests/suite.robot">
+<test id="s1-s1-t1" name="Fast Test" line="5">
+<status status="PASS" starttime="20240115 10:00:00.000" endtime="20240115 10:00:02.500"/>
+</test>
+<test id="s1-s1-t2" name="Broken Status" line="9">
+<status status="PASS" starttime="not a time" endtime="20240115 10:00:02.500"/>
+</test>
+<test id="s1-s1-t3" name="No Status" line="12">
+</test>
+</suite>
+<suite id="s1-s2" name="Resource" source="/work/MOD/tests/data">
+<test id="s1-s2-t1" name="Directory Test" line="1">
+<status status="PASS" starttime="20240115 10:00:00.000" endtime="20240115 10:00:01.000"/>
+</test>
+</suite>
+</suite>
+</robot>
+"""
+
+
+def robot_suite(tests):
+    return "*** Test Cases ***\n" + "".join(f"{name}\n    No Operation\n" for name in tests)
+
+
+class TestDurations(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def write(self, relative, content):
+        path = self.work_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+
+    def test_rf7_elapsed(self):
+        """Robot Framework 7 writes elapsed seconds; a shard's copy of the module keys like the module"""
+        durations = parse_test_durations(self.write("output.xml", RF7_OUTPUT))
+        self.assertEqual(durations, {("MOD/tests/suite.robot", "Fast Test"): 1.25,
+                                     ("MOD/tests/suite.robot", "Slow Test"): 30.5})
+
+    def test_rf6_starttime_endtime(self):
+        """Older versions write start and end times; unparsable and missing statuses are skipped"""
+        durations = parse_test_durations(self.write("output.xml", RF6_OUTPUT))
+        self.assertEqual(durations, {("MOD/tests/suite.robot", "Fast Test"): 2.5})
+
+    def test_unreadable_output(self):
+        self.assertEqual(parse_test_durations(self.write("output.xml", "<robot>")), {})
+        self.assertEqual(parse_test_durations(self.work_dir / "missing.xml"), {})
+
+    def test_load_newer_runs_win(self):
+        self.write("results/run_20240114_100000/MOD/MOD_output.xml", RF6_OUTPUT)
+        self.write("results/run_20240115_100000/output.xml", RF7_OUTPUT)
+        durations = load_test_durations(self.work_dir / "results")
+        self.assertEqual(durations[("MOD/tests/suite.robot", "Fast Test")], 1.25)
+
+        durations = load_test_durations(self.work_dir / "results", max_runs=1)
+        self.assertEqual(len(durations), 2)
+        self.assertEqual(load_test_durations(self.work_dir / "missing"), {})
+
+
+class TestSplitTests(unittest.TestCase):
+
+    def test_balanced_longest_first(self):
+        tests = [("a", 1.0), ("b", 8.0), ("c", 3.0), ("d", 4.0), ("e", 4.0)]
+        parts = split_tests(tests, 2)
+        # b, d, e, c, a each go to the lightest part so far; each part keeps the file order
+        self.assertEqual(parts, [[("b", 8.0), ("c", 3.0)], [("a", 1.0), ("d", 4.0), ("e", 4.0)]])
+
+    def test_more_parts_than_tests(self):
+        self.assertEqual(split_tests([("a", 1.0), ("b", 2.0)], 4), [[("b", 2.0)], [("a", 1.0)]])
+
+    def test_single_part(self):
+        tests = [("a", 1.0), ("b", 2.0)]
+        self.assertEqual(split_tests(tests, 1), [tests])
+
+    def test_robot_test_pattern(self):
+        self.assertEqual(robot_test_pattern("Run * Tests [smoke]?"), "Run [*] Tests [[]smoke][?]")
+
+
+class TestPlanShards(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import robot.api  # noqa: F401
+        except ImportError:
+            self.skipTest("robotframework not installed")
+        self.workspace = Path(tempfile.mkdtemp())
+        tests_dir = self.workspace / "MOD" / "tests"
+        tests_dir.mkdir(parents=True)
+        (tests_dir / "long_tests.robot").write_text(robot_suite(["L1", "L2", "L3", "L4"]))
+        (tests_dir / "short_tests.robot").write_text(robot_suite(["S1", "S2"]))
+        (tests_dir / "resource.robot").write_text("*** Keywords ***\nNothing\n    No Operation\n")
+        self.write_history({"long_tests.robot": {"L1": 10, "L2": 20, "L3": 10, "L4": 0.5},
+                            "short_tests.robot": {"S1": 4, "S2": 4}})
+        self.runner = RobotTestRunner(self.workspace)
+        self.runner.current_results_dir = self.runner.results_dir / "run_20240116_100000"
+        self.runner.current_results_dir.mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+    def write_history(self, durations):
+        run_dir = self.workspace / "robot_test_results" / "run_20240115_100000"
+        run_dir.mkdir(parents=True)
+        suites = "".join(
+            f'<suite name="{Path(suite).stem}" source="/old/MOD/tests/{suite}">'
+            + "".join(f'<test name="{name}"><status status="PASS" elapsed="{secs}"/></test>' for name, secs in tests.items())
+            + "</suite>"
+            for suite, tests in durations.items())
+        (run_dir / "output.xml").write_text(f"<robot><suite name='All'>{suites}</suite></robot>")
+
+    def plan(self, workers):
+        return [(shard.name, shard.tests, shard.predicted_secs) for shard in self.runner.plan_shards(["MOD"], None, None, workers)]
+
+    def test_long_suite_split_by_duration(self):
+        """48.5s over 2 workers: the 40.5s suite is split into two parts of about 20s, longest first"""
+        self.assertEqual(self.plan(2), [
+            ("MOD long_tests [1/2]", ["L2", "L4"], 20.5),
+            ("MOD long_tests [2/2]", ["L1", "L3"], 20.0),
+            ("MOD short_tests", ["S1", "S2"], 8.0),
+        ])
+
+    def test_one_worker_keeps_suites_whole(self):
+        self.assertEqual(self.plan(1), [
+            ("MOD long_tests", ["L1", "L2", "L3", "L4"], 40.5),
+            ("MOD short_tests", ["S1", "S2"], 8.0),
+        ])
+
+    def test_tests_without_history_use_median(self):
+        """A new test is predicted at the median of the known durations"""
+        (self.workspace / "MOD" / "tests" / "new_tests.robot").write_text(robot_suite(["N1", "N2"]))
+        shards = {name: secs for name, _, secs in self.plan(1)}
+        self.assertEqual(shards["MOD new_tests"], 2 * 7.0)
+
+    def test_no_history(self):
+        shutil.rmtree(self.workspace / "robot_test_results" / "run_20240115_100000")
+        shards = {name: secs for name, _, secs in self.plan(1)}
+        self.assertEqual(shards, {"MOD long_tests": 4 * DEFAULT_TEST_SECS, "MOD short_tests": 2 * DEFAULT_TEST_SECS})
+
+    def test_selected_suites_only(self):
+        self.runner.selected_suites = {(self.workspace / "MOD" / "tests" / "short_tests.robot").resolve()}
+        self.assertEqual(self.plan(1), [("MOD short_tests", ["S1", "S2"], 8.0)])
+        self.assertEqual(self.plan(2), [("MOD short_tests [1/2]", ["S1"], 4.0), ("MOD short_tests [2/2]", ["S2"], 4.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
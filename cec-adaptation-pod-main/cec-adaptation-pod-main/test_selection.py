@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Diff-aware test selection for the Robot Framework runners.
+
+Maps changed files (from git) to the module suites that cover them:
+- MODULE/tests/*.robot          the suite itself, or every suite using a changed resource file
+- MODULE/*.py                   the suites whose resource files reference the file, or a file of the
+                                module that imports it (directly or through other module files);
+                                every suite of the module when no suite references it
+- other MODULE files            every suite of the module (configs, test data, ...)
+- lib/<package>/...             fanned out to the module files importing lib.<package>, also through
+                                other lib packages, and mapped as above
+- shared MODULE files           a module imported as a package by other modules (KAFKA_SENDER) also
+                                fans out to the files importing MODULE.<file>, like lib
+- docs and benchmark/           nothing
+- anything else                 every suite (runner scripts, top-level config)
+
+The pytest files (lib/<package>/tests/test_*.py and MODULE/tests/test_*.py) are selected the same
+way: a test file itself, the test files importing a changed module file (or every test file of the
+module when none does), and the tests of every lib package and module a lib change fans out to.
+The Robot runners do not run them; --pytest lists them one per line, to run per tests directory:
+    python test_selection.py --pytest --changed origin/main | xargs -r -n1 dirname | sort -u
+
+Used by run_tests.py and robot_test_runner.py (--changed [REF]); run it directly to see what
+would be selected and why:
+    python test_selection.py --changed origin/main
+"""
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+TEST_CASES_SECTION = re.compile(r'^\*+\s*(Test Cases|Tasks)\b', re.IGNORECASE | re.MULTILINE)
+RESOURCE_SETTING = re.compile(r'^(?:Resource|Variables)\s+(\S+)', re.MULTILINE)
+PY_REFERENCE = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\.py\b')
+LIB_IMPORT = re.compile(r'^\s*(?:from|import)\s+lib\.([A-Za-z_][A-Za-z0-9_]*)', re.MULTILINE)
+PACKAGE_IMPORT = re.compile(r'^\s*(?:from|import)\s+([A-Za-z_][A-Za-z0-9_]*)\.[A-Za-z_]', re.MULTILINE)
+LOCAL_IMPORT = re.compile(r'^\s*(?:from\s+([A-Za-z_][A-Za-z0-9_]*)|import\s+([A-Za-z_][A-Za-z0-9_, ]*))', re.MULTILINE)
+
+IGNORED_SUFFIXES = ('.md', '.txt', '.rst', '.png', '.jpg')
+IGNORED_DIRS = ('benchmark',)
+IGNORED_FILES = ('.gitignore',)
+RESULTS_DIRS = ('robot_test_results', 'test_results')
+
+
+def git_changed_files(workspace_root, ref=None):
+    """
+    Files changed in the working tree (staged, unstaged and untracked) relative to HEAD, or, with
+    ref, since the merge base of ref and HEAD; paths relative to workspace_root.
+    """
+    def git(*args):
+        result = subprocess.run(['git', '-C', str(workspace_root)] + list(args),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+        return [line for line in result.stdout.splitlines() if line.strip()]
+
+    base = git('merge-base', ref, 'HEAD')[0] if ref and ref != 'HEAD' else 'HEAD'
+    changed = git('diff', '--name-only', '--relative', base)
+    changed += git('ls-files', '--others', '--exclude-standard')
+    return sorted(set(changed))
+
+
+def _local_imports(path, local_names):
+    """Names of sibling module files imported by path; regex fallback for files ast cannot parse."""
+    try:
+        source = path.read_text(errors='ignore')
+    except OSError:
+        return set()
+    names = set()
+    try:
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.add(node.module.split('.')[0])
+    except (SyntaxError, ValueError):
+        # Python 2 sources (KAFKA_SDP_KPI) still list their imports one per line
+        for from_name, import_names in LOCAL_IMPORT.findall(source):
+            names.update([from_name] if from_name else [name.strip() for name in import_names.split(',')])
+    return names & local_names
+
+
+class ModuleTests:
+    """The Robot suites of one module and the module files each suite covers."""
+
+    def __init__(self, module_dir):
+        self.module_dir = Path(module_dir)
+        self.name = self.module_dir.name
+        tests_dir = self.module_dir / 'tests'
+        robot_files = sorted(tests_dir.glob('*.robot')) if tests_dir.is_dir() else []
+        self.suites = [path for path in robot_files if TEST_CASES_SECTION.search(path.read_text(errors='ignore'))]
+        self.suite_sources = {suite: self._included_files(suite) for suite in self.suites}
+        self.pytest_files = sorted(tests_dir.glob('test_*.py')) if tests_dir.is_dir() else []
+        self.py_files = {path.stem: path for path in self.module_dir.glob('*.py')}
+        self.importers = defaultdict(set)
+        self.lib_imports = defaultdict(set)
+        self.package_imports = defaultdict(set)
+        for stem, path in self.py_files.items():
+            source = path.read_text(errors='ignore')
+            for imported in _local_imports(path, set(self.py_files) - {stem}):
+                self.importers[imported].add(stem)
+            for package in LIB_IMPORT.findall(source):
+                self.lib_imports[package].add(stem)
+            # Other modules imported as packages (from KAFKA_SENDER.main import ...)
+            for package in PACKAGE_IMPORT.findall(source):
+                if package not in ('lib', self.name):
+                    self.package_imports[package].add(stem)
+
+    def _included_files(self, suite):
+        """The suite and the resource/variable files it pulls in, recursively."""
+        seen, pending = [], [suite]
+        while pending:
+            path = pending.pop()
+            if path in seen or not path.is_file():
+                continue
+            seen.append(path)
+            for target in RESOURCE_SETTING.findall(path.read_text(errors='ignore')):
+                target = target.replace('${CURDIR}', str(path.parent)).replace('${/}', '/')
+                pending.append((path.parent / target).resolve() if not os.path.isabs(target) else Path(target))
+        return seen
+
+    def suites_for_test_file(self, path):
+        path = path.resolve()
+        covering = [suite for suite, sources in self.suite_sources.items()
+                    if path in [source.resolve() for source in sources]]
+        return covering or list(self.suites)
+
+    def _affected(self, stem):
+        """The module file and every module file that (transitively) imports it."""
+        affected, pending = set(), [stem]
+        while pending:
+            name = pending.pop()
+            if name in affected:
+                continue
+            affected.add(name)
+            pending.extend(self.importers.get(name, ()))
+        return affected
+
+    def pytest_for_test_file(self, path):
+        path = path.resolve()
+        covering = [test_file for test_file in self.pytest_files if test_file.resolve() == path]
+        return covering or list(self.pytest_files)
+
+    def pytest_for_py(self, stem):
+        """Test files importing the file or any module file that (transitively) imports it."""
+        affected = self._affected(stem)
+        covering = [test_file for test_file in self.pytest_files
+                    if _local_imports(test_file, set(self.py_files)) & affected]
+        return covering or list(self.pytest_files)
+
+    def suites_for_py(self, stem):
+        """Suites referencing the file or any module file that (transitively) imports it."""
+        affected = self._affected(stem)
+        covering = []
+        for suite, sources in self.suite_sources.items():
+            referenced = set()
+            for source in sources:
+                referenced.update(PY_REFERENCE.findall(source.read_text(errors='ignore')))
+            if referenced & affected:
+                covering.append(suite)
+        return covering or list(self.suites)
+
+
+class TestSelection:
+    """
+    suites    : {module: [suite paths]} in the order the changed files selected them
+    reasons   : {suite path: [changed files that selected it]}
+    run_all   : a changed file could not be mapped to a module, every suite should run
+    unmapped  : the changed files that set run_all
+    uncovered : modules with changed (or lib-dependent) files but no Robot suites
+    ignored   : docs, benchmark and result files
+    pytest    : {pytest file: [changed files that selected it]}, not run by the Robot runners
+    """
+
+    def __init__(self, changed):
+        self.changed = changed
+        self.suites = {}
+        self.reasons = defaultdict(list)
+        self.pytest = {}
+        self.run_all = False
+        self.unmapped = []
+        self.uncovered = []
+        self.ignored = []
+
+    @property
+    def modules(self):
+        return list(self.suites)
+
+    def add(self, module, suites, changed_file):
+        selected = self.suites.setdefault(module, [])
+        for suite in suites:
+            if suite not in selected:
+                selected.append(suite)
+            self.reasons[suite].append(changed_file)
+
+    def add_pytest(self, test_files, changed_file):
+        for test_file in test_files:
+            self.pytest.setdefault(test_file, []).append(changed_file)
+
+    def describe(self, workspace_root):
+        lines = [f"Changed files: {len(self.changed)}"]
+        if self.run_all:
+            lines.append(f"Running every suite; not mapped to a module: {', '.join(self.unmapped)}")
+        for module, suites in self.suites.items():
+            for suite in suites:
+                reasons = sorted(set(self.reasons[suite]))
+                shown = ', '.join(reasons[:3]) + (f" (+{len(reasons) - 3} more)" if len(reasons) > 3 else '')
+                lines.append(f"  {os.path.relpath(suite, workspace_root)}  <- {shown}")
+        if self.uncovered:
+            lines.append(f"Affected modules without Robot suites: {', '.join(self.uncovered)}")
+        if self.pytest:
+            lines.append(f"pytest files, not run by the Robot runners ({len(self.pytest)}):")
+            for test_file, reasons in self.pytest.items():
+                reasons = sorted(set(reasons))
+                shown = ', '.join(reasons[:3]) + (f" (+{len(reasons) - 3} more)" if len(reasons) > 3 else '')
+                lines.append(f"  {os.path.relpath(test_file, workspace_root)}  <- {shown}")
+        if not self.suites and not self.run_all:
+            lines.append("No suites affected")
+        return "\n".join(lines)
+
+
+class TestSelector:
+    def __init__(self, workspace_root):
+        self.workspace_root = Path(workspace_root).resolve()
+        self._modules = {}
+        self._dependents = None
+        self._lib_users = None
+
+    def module_tests(self, name):
+        if name not in self._modules:
+            self._modules[name] = ModuleTests(self.workspace_root / name)
+        return self._modules[name]
+
+    def module_names(self):
+        return sorted(path.name for path in self.workspace_root.iterdir()
+                      if path.is_dir() and not path.name.startswith(('.', '__'))
+                      and path.name not in ('lib',) + IGNORED_DIRS + RESULTS_DIRS)
+
+    def dependents(self):
+        """
+        {package: {(module, file stem)}} for the lib packages ("lib.<package>") and the modules imported
+        as packages by other modules, including the users of the packages that import it.
+        """
+        if self._dependents is None:
+            users = defaultdict(set)
+            for path in (self.workspace_root / 'lib').rglob('*.py'):
+                for package in LIB_IMPORT.findall(path.read_text(errors='ignore')):
+                    users[f'lib.{package}'].add(f'lib.{self._lib_package(path.relative_to(self.workspace_root))}')
+            direct = defaultdict(set)
+            module_names = self.module_names()
+            for module in module_names:
+                tests = self.module_tests(module)
+                imports = [(f'lib.{package}', stems) for package, stems in tests.lib_imports.items()]
+                imports += [(package, stems) for package, stems in tests.package_imports.items()
+                            if package in module_names]
+                for package, stems in imports:
+                    direct[package].update((module, stem) for stem in stems)
+                    users[package].add(module)
+            self._dependents = {}
+            self._lib_users = {}
+            for package in set(direct) | set(users):
+                seen, pending, dependents = set(), [package], set()
+                while pending:
+                    name = pending.pop()
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                    dependents.update(direct.get(name, ()))
+                    pending.extend(users.get(name, ()))
+                self._dependents[package] = dependents
+                self._lib_users[package] = {name for name in seen if name.startswith('lib.') and name != package}
+        return self._dependents
+
+    def lib_users(self, package):
+        """The lib packages importing package, directly or through other lib packages."""
+        self.dependents()
+        return self._lib_users.get(package, set())
+
+    def lib_pytest_files(self, package):
+        tests_dir = self.workspace_root / 'lib' / package[len('lib.'):] / 'tests'
+        return sorted(tests_dir.glob('test_*.py')) if tests_dir.is_dir() else []
+
+    @staticmethod
+    def _lib_package(relative):
+        # lib/<package>/x.py -> <package>; top-level lib/Namespace.py -> Namespace
+        return relative.parts[1] if len(relative.parts) > 2 else Path(relative.parts[1]).stem
+
+    def select(self, changed_files):
+        selection = TestSelection(list(changed_files))
+        for changed in changed_files:
+            relative = Path(changed)
+            parts = relative.parts
+            if (relative.suffix.lower() in IGNORED_SUFFIXES or relative.name in IGNORED_FILES
+                    or (parts and parts[0] in IGNORED_DIRS + RESULTS_DIRS) or '__pycache__' in parts):
+                selection.ignored.append(changed)
+            elif len(parts) > 1 and parts[0] == 'lib':
+                package = f'lib.{self._lib_package(relative)}'
+                if len(parts) > 3 and parts[2] == 'tests':
+                    self._select_lib_test_file(selection, package, relative, changed)
+                else:
+                    selection.add_pytest(self.lib_pytest_files(package), changed)
+                    self._select_dependents(selection, package, changed)
+            elif len(parts) > 1 and (self.workspace_root / parts[0]).is_dir():
+                self._select_module_file(selection, parts[0], relative, changed)
+                if parts[1] != 'tests':
+                    self._select_dependents(selection, parts[0], changed)
+            else:
+                selection.unmapped.append(changed)
+        if selection.unmapped:
+            selection.run_all = True
+            for module in self.module_names():
+                suites = self.module_tests(module).suites
+                if suites:
+                    selection.add(module, suites, 'run all')
+                selection.add_pytest(self.module_tests(module).pytest_files, 'run all')
+            for package in sorted(path.name for path in (self.workspace_root / 'lib').iterdir() if path.is_dir()):
+                selection.add_pytest(self.lib_pytest_files(f'lib.{package}'), 'run all')
+        return selection
+
+    def _select_lib_test_file(self, selection, package, relative, changed):
+        """A lib test file selects itself; other files of the tests dir (fixtures, conftest) every test of the package."""
+        test_files = self.lib_pytest_files(package)
+        path = (self.workspace_root / relative).resolve()
+        selection.add_pytest([test_file for test_file in test_files if test_file.resolve() == path] or test_files, changed)
+
+    def _select_dependents(self, selection, package, changed):
+        for lib_user in sorted(self.lib_users(package)):
+            selection.add_pytest(self.lib_pytest_files(lib_user), changed)
+        for module, stem in sorted(self.dependents().get(package, ())):
+            if module != package:
+                self._select_module_file(selection, module, Path(module) / f"{stem}.py", changed)
+
+    def _select_module_file(self, selection, module, relative, changed):
+        tests = self.module_tests(module)
+        parts = relative.parts
+        if len(parts) > 2 and parts[1] == 'tests':
+            suites = tests.suites_for_test_file(self.workspace_root / relative)
+            test_files = tests.pytest_for_test_file(self.workspace_root / relative) if relative.suffix == '.py' else []
+        elif len(parts) == 2 and relative.suffix == '.py':
+            suites = tests.suites_for_py(relative.stem)
+            test_files = tests.pytest_for_py(relative.stem)
+        else:
+            suites = tests.suites
+            test_files = tests.pytest_files
+        selection.add_pytest(test_files, changed)
+        if not tests.suites:
+            if module not in selection.uncovered:
+                selection.uncovered.append(module)
+            return
+        selection.add(module, suites, changed)
+
+
+def select_changed(workspace_root, ref=None, changed_files=None):
+    """TestSelection for the git changes of workspace_root (or an explicit file list)."""
+    if changed_files is None:
+        changed_files = git_changed_files(workspace_root, ref)
+    return TestSelector(workspace_root).select(changed_files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the Robot suites affected by the changed files")
+    parser.add_argument('--workspace', default=os.path.dirname(os.path.abspath(__file__)), help='Workspace root directory')
+    parser.add_argument('--changed', nargs='?', const='HEAD', default='HEAD', metavar='REF',
+                        help='Compare with the merge base of REF (default: uncommitted changes against HEAD)')
+    parser.add_argument('--pytest', action='store_true',
+                        help='Only print the selected pytest files, one per line (e.g. for python -m pytest)')
+    parser.add_argument('files', nargs='*', help='Changed files relative to the workspace, instead of git')
+    args = parser.parse_args()
+
+    workspace_root = os.path.abspath(args.workspace)
+    selection = select_changed(workspace_root, args.changed, args.files or None)
+    if args.pytest:
+        for test_file in selection.pytest:
+            print(os.path.relpath(test_file, workspace_root))
+    else:
+        print(selection.describe(workspace_root))
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the diff-aware test selection, against a small workspace in a temp dir
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import test_selection
+
+ROBOT_SUITE = """\
+*** Settings ***
+Resource    {resource}
+
+*** Test Cases ***
+Runs
+    Log    {reference}
+"""
+
+WORKSPACE = {
+    "lib/pkg_a/pkg_a.py": "def a():\n    pass\n",
+    "lib/pkg_a/tests/test_pkg_a.py": "from lib.pkg_a.pkg_a import a\n",
+    "lib/pkg_a/tests/fixtures.py": "",
+    "lib/pkg_b/pkg_b.py": "from lib.pkg_a.pkg_a import a\n",
+    "lib/pkg_b/tests/test_pkg_b.py": "from lib.pkg_b.pkg_b import *\n",
+    "lib/pkg_c/pkg_c.py": "",
+    "MOD1/main.py": "import helper\nfrom lib.pkg_b.pkg_b import *\n",
+    "MOD1/helper.py": "X = 1\n",
+    "MOD1/other.py": "import os\n",
+    "MOD1/config/config.json": "{}\n",
+    "MOD1/tests/mod1_resource.robot": "*** Keywords ***\nRun Main\n    Run Process    python    main.py\n",
+    "MOD1/tests/mod1_tests.robot": ROBOT_SUITE.format(resource="mod1_resource.robot", reference="main"),
+    "MOD1/tests/other_tests.robot": ROBOT_SUITE.format(resource="other_resource.robot", reference="other.py"),
+    "MOD1/tests/other_resource.robot": "*** Keywords ***\nNothing\n    No Operation\n",
+    "MOD1/tests/test_main.py": "import main\n",
+    "MOD1/tests/test_other.py": "import other\n",
+    "MOD2/mod2.py": "from MOD1.helper import X\n",
+    "MOD2/tests/test_mod2.py": "import mod2\n",
+    "MOD3/run.py": "",
+    "MOD3/tests/test_mod3.py": "",
+    "README.md": "",
+    "benchmark/run_benchmark.py": "",
+    "run_tests.py": "",
+}
+
+
+class TestTestSelector(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        for path, content in WORKSPACE.items():
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_text(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def select(self, *changed):
+        return test_selection.TestSelector(self.root).select(changed)
+
+    def relative(self, paths):
+        return sorted(str(Path(path).relative_to(self.root)) for path in paths)
+
+    def robot(self, selection):
+        return self.relative(suite for suites in selection.suites.values() for suite in suites)
+
+    def test_suite_and_resource_files(self):
+        self.assertEqual(self.robot(self.select("MOD1/tests/other_tests.robot")), ["MOD1/tests/other_tests.robot"])
+        selection = self.select("MOD1/tests/mod1_resource.robot")
+        self.assertEqual(self.robot(selection), ["MOD1/tests/mod1_tests.robot"])
+        self.assertEqual(selection.pytest, {})
+
+    def test_module_file_through_importer(self):
+        """helper.py is covered by the suite referencing main, which imports it"""
+        selection = self.select("MOD1/helper.py")
+        self.assertEqual(self.robot(selection), ["MOD1/tests/mod1_tests.robot"])
+        # MOD2 imports MOD1.helper as a package; it has pytest files only
+        self.assertEqual(self.relative(selection.pytest), ["MOD1/tests/test_main.py", "MOD2/tests/test_mod2.py"])
+        self.assertEqual(selection.uncovered, ["MOD2"])
+        self.assertFalse(selection.run_all)
+
+    def test_module_file_referenced_directly(self):
+        """Every file of a module imported as a package also selects the importing modules"""
+        selection = self.select("MOD1/other.py")
+        self.assertEqual(self.robot(selection), ["MOD1/tests/other_tests.robot"])
+        self.assertEqual(self.relative(selection.pytest), ["MOD1/tests/test_other.py", "MOD2/tests/test_mod2.py"])
+
+    def test_module_without_importers(self):
+        selection = self.select("MOD3/run.py")
+        self.assertEqual(selection.suites, {})
+        self.assertEqual(self.relative(selection.pytest), ["MOD3/tests/test_mod3.py"])
+        self.assertEqual(selection.uncovered, ["MOD3"])
+
+    def test_other_module_file_selects_module(self):
+        selection = self.select("MOD1/config/config.json")
+        self.assertEqual(self.robot(selection), ["MOD1/tests/mod1_tests.robot", "MOD1/tests/other_tests.robot"])
+        self.assertEqual(self.relative(selection.pytest),
+                         ["MOD1/tests/test_main.py", "MOD1/tests/test_other.py", "MOD2/tests/test_mod2.py"])
+
+    def test_pytest_file(self):
+        selection = self.select("MOD1/tests/test_other.py")
+        self.assertEqual(self.relative(selection.pytest), ["MOD1/tests/test_other.py"])
+        self.assertEqual(self.relative(self.select("MOD3/tests/test_mod3.py").pytest), ["MOD3/tests/test_mod3.py"])
+
+    def test_lib_package_fans_out(self):
+        """lib.pkg_a is imported by lib.pkg_b, which MOD1/main.py imports, and MOD2 imports MOD1"""
+        selection = self.select("lib/pkg_a/pkg_a.py")
+        self.assertEqual(self.robot(selection), ["MOD1/tests/mod1_tests.robot"])
+        self.assertEqual(self.relative(selection.pytest),
+                         ["MOD1/tests/test_main.py", "MOD2/tests/test_mod2.py", "lib/pkg_a/tests/test_pkg_a.py",
+                          "lib/pkg_b/tests/test_pkg_b.py"])
+        self.assertEqual(selection.reasons[self.root / "MOD1/tests/mod1_tests.robot"], ["lib/pkg_a/pkg_a.py"])
+
+    def test_lib_package_without_users(self):
+        selection = self.select("lib/pkg_c/pkg_c.py")
+        self.assertEqual((selection.suites, selection.pytest, selection.run_all), ({}, {}, False))
+
+    def test_lib_test_files(self):
+        """A lib test file selects itself only; a helper of the tests dir every test of the package"""
+        selection = self.select("lib/pkg_a/tests/test_pkg_a.py")
+        self.assertEqual(selection.suites, {})
+        self.assertEqual(self.relative(selection.pytest), ["lib/pkg_a/tests/test_pkg_a.py"])
+        self.assertEqual(self.relative(self.select("lib/pkg_a/tests/fixtures.py").pytest), ["lib/pkg_a/tests/test_pkg_a.py"])
+
+    def test_ignored(self):
+        selection = self.select("README.md", "benchmark/run_benchmark.py", "MOD1/__pycache__/main.cpython-310.pyc")
+        self.assertEqual(len(selection.ignored), 3)
+        self.assertEqual((selection.suites, selection.pytest, selection.run_all), ({}, {}, False))
+
+    def test_unmapped_runs_everything(self):
+        selection = self.select("run_tests.py")
+        self.assertTrue(selection.run_all)
+        self.assertEqual(selection.unmapped, ["run_tests.py"])
+        self.assertEqual(self.robot(selection), ["MOD1/tests/mod1_tests.robot", "MOD1/tests/other_tests.robot"])
+        self.assertEqual(self.relative(selection.pytest),
+                         ["MOD1/tests/test_main.py", "MOD1/tests/test_other.py", "MOD2/tests/test_mod2.py",
+                          "MOD3/tests/test_mod3.py", "lib/pkg_a/tests/test_pkg_a.py", "lib/pkg_b/tests/test_pkg_b.py"])
+
+    def test_describe_lists_pytest_files(self):
+        description = self.select("MOD1/other.py").describe(self.root)
+        self.assertIn("MOD1/tests/other_tests.robot  <- MOD1/other.py", description)
+        self.assertIn("pytest files, not run by the Robot runners (2):", description)
+        self.assertIn("MOD1/tests/test_other.py  <- MOD1/other.py", description)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Publish/subscribe event bus for the server-sent events stream.
+
+Events are stored in a bounded ring buffer with monotonically increasing ids.
+Every subscriber keeps its own cursor into that buffer, so each browser tab
+sees the complete stream instead of competing for items on a shared queue.
+"""
+
+import asyncio
+import collections
+import itertools
+import threading
+
+
+class EventBus:
+    """Thread-safe ring buffer of events with per-subscriber cursors."""
+
+    def __init__(self, maxlen=2000):
+        self._buffer = collections.deque(maxlen=maxlen)
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        # Ids up to here were cleared on purpose and are not reported as dropped
+        self._cleared_id = 0
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, event):
+        """Append an event to the buffer and wake every subscriber.
+
+        Safe to call from worker threads; returns the id assigned to the event.
+        """
+        with self._lock:
+            event_id = next(self._ids)
+            self._buffer.append((event_id, event))
+            self._last_id = event_id
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.notify()
+        return event_id
+
+    def clear(self):
+        """Drop buffered history so new subscribers do not replay an old run.
+
+        Event ids keep increasing, so connected subscribers are unaffected, and
+        the cleared events are not reported to them as dropped.
+        """
+        with self._lock:
+            self._buffer.clear()
+            self._cleared_id = self._last_id
+
+    def subscribe(self, last_event_id=None, max_batch=200):
+        """Register a subscriber for the running event loop.
+
+        When ``last_event_id`` is given (from the ``Last-Event-ID`` header),
+        buffered events after that id are replayed; otherwise the subscriber
+        only receives events published from now on.
+        """
+        if last_event_id is None:
+            cursor = self._last_id
+        elif last_event_id > self._last_id:
+            # Id from before a server restart; replay whatever is buffered.
+            cursor = 0
+        else:
+            cursor = last_event_id
+        subscriber = Subscription(self, cursor, max_batch)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _read_after(self, cursor):
+        """Return ``(dropped, events)`` for everything newer than ``cursor``.
+
+        ``dropped`` counts events that already fell out of the ring buffer
+        before this subscriber read them; events removed by ``clear`` are not counted.
+        """
+        with self._lock:
+            events = [(event_id, event) for event_id, event in self._buffer if event_id > cursor]
+            oldest = self._buffer[0][0] if self._buffer else self._last_id + 1
+            counted_from = max(cursor, self._cleared_id)
+        dropped = max(0, min(oldest, self._last_id + 1) - counted_from - 1)
+        return dropped, events
+
+
+class Subscription:
+    """A single reader of an :class:`EventBus` bound to one asyncio loop."""
+
+    def __init__(self, bus, cursor, max_batch):
+        self._bus = bus
+        self._cursor = cursor
+        self._max_batch = max_batch
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+
+    def notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Event loop already closed; the subscriber is going away.
+            pass
+
+    async def next_batch(self, timeout=None):
+        """Wait for new events and return ``(dropped, [(id, event), ...])``.
+
+        Returns ``(0, [])`` if ``timeout`` expires first.
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return 0, []
+        self._wakeup.clear()
+
+        dropped, events = self._bus._read_after(self._cursor)
+        if not events:
+            self._cursor = max(self._cursor, self._bus.last_id)
+            return dropped, []
+
+        self._cursor = events[-1][0]
+        if len(events) > self._max_batch:
+            events = coalesce_events(events)
+        return dropped, events
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+def coalesce_events(events):
+    """Collapse superseded stage status events for a lagging subscriber.
+
+    Only the latest ``status`` event per job and stage is kept; log, summary and LLM
+    change events are kept in order because every one of them carries data.
+    """
+    def status_key(event):
+        return event.get("job_id"), event.get("stage")
+
+    latest_status = {}
+    for index, (_, event) in enumerate(events):
+        if event.get("type") == "status":
+            latest_status[status_key(event)] = index
+
+    return [
+        (event_id, event)
+        for index, (event_id, event) in enumerate(events)
+        if event.get("type") != "status" or latest_status.get(status_key(event)) == index
+    ]
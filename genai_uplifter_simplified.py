@@ -5,11 +5,15 @@ Focuses only on Python modernization for adaptation pod scripts.
 Removes all Java/JDK functionality.
 """
 
+import ast
+import io
 import subprocess
 import os
 import re
 import shutil
 import tempfile
+import tokenize
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import requests
 import json
@@ -25,6 +29,18 @@ LLM_API_URL = "https://gateway.eli.gaia.gic.ericsson.se/api/v1/llm/generate"
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
 LLM_API_TOKEN = os.getenv("LLM_API_TOKEN", "")
 
+# Token limit of an LLM request, and the part of it kept for the response
+LLM_TOKEN_LIMIT = 8192
+LLM_RESPONSE_TOKENS = 1500
+
+# Code tokens per chunk when the prompt is not known; chunk_token_budget()
+# sizes it from the actual prompt overhead instead
+CHUNK_TOKEN_BUDGET = LLM_TOKEN_LIMIT - LLM_RESPONSE_TOKENS - 500
+
+# Chunk requests sent to the LLM at the same time, and LLM retries per chunk
+LLM_CHUNK_CONCURRENCY = int(os.getenv("LLM_CHUNK_CONCURRENCY", "4"))
+LLM_CHUNK_RETRIES = int(os.getenv("LLM_CHUNK_RETRIES", "1"))
+
 def initialize_llm_api():
     """Check if LLM API token is available."""
     if not LLM_API_TOKEN:
@@ -655,8 +671,8 @@ def modernize_with_smart_chunking(code, analysis_findings, target_version, selec
     """Modernize large files by splitting them into API-compatible chunks."""
     print(f"🔄 Starting smart chunking for API compatibility...")
     
-    # Split code into chunks that fit within API limits
-    chunks = split_code_into_api_chunks(code)
+    # Split code at top-level definitions into chunks that fill the room the prompt leaves
+    chunks = split_code_into_ast_chunks(code, chunk_token_budget(analysis_findings, target_version))
     print(f"📦 Split code into {len(chunks)} API-compatible chunks")
     
     # Validate chunk structure and ensure imports are preserved
@@ -670,39 +686,29 @@ def modernize_with_smart_chunking(code, analysis_findings, target_version, selec
     print(f"🔍 Validating chunks for API compatibility...")
     chunks = ensure_chunks_fit_api(chunks, analysis_findings, target_version)
     
-    modernized_chunks = []
-    change_summary_parts = []
+    # Dispatch chunk requests concurrently; map() keeps results in chunk order
+    concurrency = max(1, min(LLM_CHUNK_CONCURRENCY, len(chunks)))
+    print(f"🚀 Modernizing {len(chunks)} chunks with up to {concurrency} concurrent requests")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda indexed_chunk: modernize_chunk_with_retry(indexed_chunk[0], indexed_chunk[1], analysis_findings, target_version),
+            enumerate(chunks)
+        ))
     
-    for i, chunk in enumerate(chunks):
-        print(f"🔄 Processing chunk {i+1}/{len(chunks)}: {len(chunk['code'])/1024:.1f}KB")
-        
-        # Create prompt for this chunk
-        chunk_prompt = create_python_prompt(chunk['code'], analysis_findings, target_version, "")
-        
-        # Process chunk normally (validation already ensured it fits)
-        chunk_result = modernize_single_chunk(chunk, analysis_findings, target_version)
-        if chunk_result:
-            # Validate chunk quality before adding
-            if validate_chunk_quality(chunk_result['code']):
-                modernized_chunks.append(chunk_result['code'])
-                change_summary_parts.append(f"Chunk {i+1}: {chunk_result['summary']}")
-            else:
-                print(f"⚠️  Chunk {i+1} corrupted, using fallback")
-                fallback_result = modernize_chunk_with_fallback(chunk, target_version)
-                modernized_chunks.append(fallback_result['code'])
-                change_summary_parts.append(f"Chunk {i+1}: Fallback modernization (corruption detected)")
-        else:
-            print(f"⚠️  Chunk {i+1} failed, using fallback")
-            fallback_result = modernize_chunk_with_fallback(chunk, target_version)
-            modernized_chunks.append(fallback_result['code'])
-            change_summary_parts.append(f"Chunk {i+1}: Fallback modernization")
+    modernized_chunks = [chunk_code for chunk_code, _ in results]
+    change_summary_parts = [f"Chunk {i+1}: {summary}" for i, (_, summary) in enumerate(results)]
     
-    # Reassemble the modernized chunks with structure validation
+    # Reassemble the modernized chunks; chunks with exact line spans are spliced
     print(f"🔧 Reassembling {len(modernized_chunks)} chunks...")
-    final_code = reassemble_chunks_intelligently(modernized_chunks, chunks)
+    if has_exact_spans(chunks):
+        final_code = splice_chunks(modernized_chunks)
+        structure_valid = is_valid_python(final_code)
+    else:
+        final_code = reassemble_chunks_intelligently(modernized_chunks, chunks)
+        structure_valid = validate_reassembled_code(final_code)
     
     # Validate the reassembled code
-    if validate_reassembled_code(final_code):
+    if structure_valid:
         print(f"✅ Code structure validation passed")
     else:
         print(f"⚠️  Code structure validation failed - manual review recommended")
@@ -782,6 +788,182 @@ def split_code_into_api_chunks(code):
     
     return chunks
 
+def find_top_level_boundaries(code):
+    """Return the 1-based start lines of top-level statements in ``code``.
+    
+    Uses ``ast`` when the code parses (decorators are kept with their
+    definition). Legacy code that only Python 2 accepts falls back to
+    ``tokenize``, which still sees where indentation returns to column 0.
+    Returns None if neither can make sense of the code.
+    """
+    try:
+        tree = ast.parse(code)
+        starts = []
+        for node in tree.body:
+            decorators = getattr(node, 'decorator_list', [])
+            starts.append(min([node.lineno] + [d.lineno for d in decorators]))
+        return starts
+    except SyntaxError:
+        pass
+    
+    try:
+        starts = []
+        depth = 0
+        at_statement_start = True
+        previous_decorator = False
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.INDENT:
+                depth += 1
+            elif token.type == tokenize.DEDENT:
+                depth -= 1
+            elif token.type == tokenize.NEWLINE:
+                at_statement_start = True
+            elif token.type in (tokenize.NL, tokenize.COMMENT, tokenize.ENDMARKER):
+                continue
+            elif at_statement_start:
+                at_statement_start = False
+                if depth == 0:
+                    # A decorator line starts the statement it decorates
+                    if not previous_decorator:
+                        starts.append(token.start[0])
+                    previous_decorator = token.string == '@'
+        return starts
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+
+def attach_leading_comments(code, starts):
+    """Move each boundary up over the comment lines directly above it,
+    so a comment block travels in the same chunk as the code it describes."""
+    try:
+        comment_lines = {
+            token.start[0]
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type == tokenize.COMMENT and token.start[1] == 0
+        }
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return starts
+    
+    adjusted = []
+    floor = 1
+    for start in starts:
+        line_number = start
+        while line_number - 1 > floor and (line_number - 1) in comment_lines:
+            line_number -= 1
+        adjusted.append(line_number)
+        floor = start
+    return adjusted
+
+def split_oversized_unit(lines, start_line, end_line, token_budget):
+    """Split a single top-level unit that exceeds the budget into line spans.
+    
+    Cuts after every blank line followed by a definition or decorator line, so
+    classes are split between methods, and the caller packs adjacent pieces
+    back up to the budget. A piece still over the budget is cut at the last
+    line that fits. Returns ``[(start, end), ...]``.
+    """
+    breaks = [
+        line_number for line_number in range(start_line, end_line)
+        if not lines[line_number - 1].strip()
+        and lines[line_number].lstrip().startswith(('def ', 'async def ', 'class ', '@'))
+    ]
+    spans = []
+    piece_start = start_line
+    for piece_end in breaks + [end_line]:
+        span_start = piece_start
+        for line_number in range(piece_start, piece_end + 1):
+            span_tokens = estimate_tokens_accurately('\n'.join(lines[span_start - 1:line_number]))
+            if span_tokens > token_budget and line_number > span_start:
+                spans.append((span_start, line_number - 1))
+                span_start = line_number
+        spans.append((span_start, piece_end))
+        piece_start = piece_end + 1
+    return spans
+
+def split_code_into_ast_chunks(code, token_budget=CHUNK_TOKEN_BUDGET):
+    """Split code at top-level definition boundaries, packed toward a token budget.
+    
+    Consecutive top-level statements are packed into a chunk until the next one
+    would exceed ``token_budget``. Only a statement over the budget on its own
+    is split, and its pieces pack with the statements around them; such chunks
+    have ``complete_structures`` False. Every chunk records its exact 1-based
+    ``start_line``/``end_line`` and the chunks cover the file without gaps, so
+    joining the chunk texts with newlines reproduces the file exactly
+    (see ``splice_chunks``). Falls back to ``split_code_into_api_chunks`` when
+    the code cannot be tokenized.
+    """
+    lines = code.split('\n')
+    starts = find_top_level_boundaries(code)
+    if starts is None:
+        print("⚠️  Could not parse code structure, using line-based chunking")
+        return split_code_into_api_chunks(code)
+    
+    # Units are contiguous line spans; leading lines (shebang, docstring,
+    # comments) belong to the first unit, trailing lines to the last one
+    starts = attach_leading_comments(code, starts)
+    starts = sorted(set([1] + [s for s in starts if s > 1]))
+    units = [(start, next_start - 1) for start, next_start in zip(starts, starts[1:] + [len(lines) + 1])]
+    
+    spans = []
+    for start, end in units:
+        unit_tokens = estimate_tokens_accurately('\n'.join(lines[start - 1:end]))
+        if unit_tokens > token_budget:
+            spans.extend((s, e, False) for s, e in split_oversized_unit(lines, start, end, token_budget))
+        else:
+            spans.append((start, end, True))
+    
+    chunks = []
+    chunk_start = None
+    chunk_end = None
+    chunk_complete = True
+    
+    def flush():
+        chunks.append({
+            'name': f'Chunk_{len(chunks) + 1}',
+            'code': '\n'.join(lines[chunk_start - 1:chunk_end]),
+            'start_line': chunk_start,
+            'end_line': chunk_end,
+            'complete_structures': chunk_complete
+        })
+    
+    # Pieces of a split unit pack with their neighbours like any other span,
+    # so only a unit over the budget on its own gets a chunk boundary inside it
+    for start, end, complete in spans:
+        if chunk_start is not None:
+            candidate_tokens = estimate_tokens_accurately('\n'.join(lines[chunk_start - 1:end]))
+            if candidate_tokens > token_budget:
+                flush()
+                chunk_start = None
+        if chunk_start is None:
+            chunk_start, chunk_complete = start, True
+        chunk_end = end
+        chunk_complete = chunk_complete and complete
+    if chunk_start is not None:
+        flush()
+    
+    return chunks
+
+def has_exact_spans(chunks):
+    """True if the chunks carry contiguous line spans covering the whole file."""
+    if not chunks or chunks[0].get('start_line') != 1:
+        return False
+    for previous, current in zip(chunks, chunks[1:]):
+        if current.get('start_line') != previous.get('end_line', 0) + 1:
+            return False
+    return all(chunk.get('end_line', 0) >= chunk.get('start_line', 1) for chunk in chunks)
+
+def splice_chunks(modernized_chunks):
+    """Reassemble chunks with exact line spans; they only need joining in order."""
+    return '\n'.join(modernized_chunks)
+
+def is_valid_python(code):
+    """Check that spliced code parses as Python 3."""
+    try:
+        ast.parse(code)
+        return True
+    except SyntaxError as e:
+        print(f"⚠️  Syntax error in reassembled code at line {e.lineno}: {e.msg}")
+        return False
+
 def analyze_code_structure(lines):
     """Analyze the structure of the code to identify functions, classes, and blocks."""
     structure = {
@@ -1101,14 +1283,46 @@ Apply changes, preserve everything else, return complete code.
 
 
 
-def modernize_single_chunk(chunk, chunk_prompt, target_version):
-    """Modernize a single chunk using the LLM API."""
+def modernize_chunk_with_retry(index, chunk, analysis_findings, target_version):
+    """Modernize one chunk, retrying the LLM before falling back.
+    
+    Tries the LLM up to ``1 + LLM_CHUNK_RETRIES`` times, then the regex
+    fallback from ``modernize_chunk_with_fallback``. If neither produces a
+    clean chunk, the chunk's original text is kept so reassembly never loses
+    code. Returns ``(code, summary)``.
+    """
+    print(f"🔄 Processing chunk {index+1}: {len(chunk['code'])/1024:.1f}KB")
+    chunk_prompt = create_python_prompt(chunk['code'], analysis_findings, target_version, "")
+    
+    for attempt in range(1 + LLM_CHUNK_RETRIES):
+        chunk_result = modernize_single_chunk(chunk, chunk_prompt, target_version, use_fallback=False)
+        if chunk_result and validate_chunk_quality(chunk_result['code']):
+            return chunk_result['code'], chunk_result['summary']
+        print(f"⚠️  Chunk {index+1} attempt {attempt+1} failed or corrupted")
+    
+    print(f"⚠️  Chunk {index+1} failed, using fallback")
+    try:
+        fallback_result = modernize_chunk_with_fallback(chunk, target_version)
+        if validate_chunk_quality(fallback_result['code']):
+            return fallback_result['code'], "Fallback modernization"
+    except Exception as e:
+        print(f"❌ Fallback failed for chunk {index+1}: {e}")
+    
+    print(f"⚠️  Chunk {index+1} kept unchanged")
+    return chunk['code'], "Original code kept (modernization failed)"
+
+def modernize_single_chunk(chunk, chunk_prompt, target_version, use_fallback=True):
+    """Modernize a single chunk using the LLM API.
+    
+    On failure returns the fallback modernization, or None when
+    ``use_fallback`` is False so the caller can retry.
+    """
     try:
         # Prepare payload for chunk modernization
         payload = {
             "prompt": chunk_prompt,
             "model": LLM_MODEL,
-            "max_new_tokens": 4096,  # Smaller for chunks
+            "max_new_tokens": LLM_TOKEN_LIMIT,  # The response repeats the whole chunk
             "temperature": 0.1,
             "max_suggestions": 1,
             "top_p": 0.85,
@@ -1152,12 +1366,15 @@ def modernize_single_chunk(chunk, chunk_prompt, target_version):
                     }
         
         # If LLM fails, use fallback for this chunk
-        print(f"⚠️  LLM failed for chunk, using fallback modernization")
-        return modernize_chunk_with_fallback(chunk, target_version)
+        print(f"⚠️  LLM failed for chunk")
         
     except Exception as e:
         print(f"❌ Error modernizing chunk: {e}")
-        return modernize_chunk_with_fallback(chunk, target_version)
+    
+    if not use_fallback:
+        return None
+    print(f"⚠️  Using fallback modernization for chunk")
+    return modernize_chunk_with_fallback(chunk, target_version)
 
 def modernize_chunk_with_fallback(chunk, target_version):
     """Apply fallback modernization to a single chunk."""
@@ -1880,23 +2097,28 @@ def estimate_tokens_accurately(code):
     
     return estimated_tokens
 
+def chunk_prompt_overhead(analysis_findings, target_version):
+    """Tokens the chunk prompt adds around the chunk code (findings and instructions)."""
+    return estimate_tokens_accurately(create_python_prompt("", analysis_findings, target_version, ""))
+
+def chunk_token_budget(analysis_findings, target_version):
+    """Code tokens per chunk: the token limit less the response and the measured prompt overhead."""
+    return int(LLM_TOKEN_LIMIT - LLM_RESPONSE_TOKENS - chunk_prompt_overhead(analysis_findings, target_version))
+
 def validate_chunk_for_api(chunk_code, prompt_template, analysis_findings, target_version):
-    """Validate that a chunk will fit within the 8192 token limit."""
-    # Create the full prompt for this chunk
-    full_prompt = create_python_prompt(chunk_code, analysis_findings, target_version, "")
-    
-    # Estimate tokens
-    prompt_tokens = estimate_tokens_accurately(full_prompt)
+    """Validate that a chunk will fit within the LLM token limit."""
+    # The prompt is the chunk code plus the overhead around it
     code_tokens = estimate_tokens_accurately(chunk_code)
+    prompt_tokens = chunk_prompt_overhead(analysis_findings, target_version) + code_tokens
     
     # Calculate total tokens needed
-    total_tokens = prompt_tokens + code_tokens + 1500  # +1500 for response
+    total_tokens = prompt_tokens + LLM_RESPONSE_TOKENS
     
     # Check if it fits
-    fits = total_tokens <= 8192
+    fits = total_tokens <= LLM_TOKEN_LIMIT
     
     if not fits:
-        print(f"⚠️  Chunk too large: {prompt_tokens:.0f} + {code_tokens:.0f} + 1500 = {total_tokens:.0f} > 8192")
+        print(f"⚠️  Chunk too large: {prompt_tokens:.0f} + {LLM_RESPONSE_TOKENS} = {total_tokens:.0f} > {LLM_TOKEN_LIMIT}")
     
     return fits, total_tokens, prompt_tokens, code_tokens
 
@@ -1914,8 +2136,12 @@ def ensure_chunks_fit_api(chunks, analysis_findings, target_version):
             print(f"✅ Chunk {i+1}: {total_tokens:.0f} tokens - fits API limit")
         else:
             print(f"⚠️  Chunk {i+1} too large ({total_tokens:.0f} tokens), subdividing...")
-            # Subdivide this chunk
-            sub_chunks = split_code_into_api_chunks(chunk['code'])
+            # Subdivide this chunk, keeping line spans relative to the whole file
+            sub_chunks = split_code_into_ast_chunks(chunk['code'], chunk_token_budget(analysis_findings, target_version) // 2)
+            if chunk.get('start_line', 0) > 0 and has_exact_spans(sub_chunks):
+                for sub_chunk in sub_chunks:
+                    sub_chunk['start_line'] += chunk['start_line'] - 1
+                    sub_chunk['end_line'] += chunk['start_line'] - 1
             for j, sub_chunk in enumerate(sub_chunks):
                 sub_fits, sub_total, _, _ = validate_chunk_for_api(
                     sub_chunk['code'], "", analysis_findings, target_version
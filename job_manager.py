@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Job subsystem for uplift runs.
+
+Each uplift gets a job ID, its own workspace under ``jobs/<job_id>/``, and a
+persisted ``job.json`` status record. Jobs run on a bounded worker pool so
+several repositories or library selections can be uplifted side by side, and
+a job that was interrupted can be resumed from its last completed step.
+"""
+
+import contextvars
+import datetime
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_DIR = os.getenv("UPLIFT_JOBS_DIR", "jobs")
+UPLIFT_WORKERS = int(os.getenv("UPLIFT_WORKERS", "2"))
+
+# Job states
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+FINISHED = "FINISHED"
+FAILED = "FAILED"
+CANCELED = "CANCELED"
+INTERRUPTED = "INTERRUPTED"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Internal status record in each job workspace, not served with the job files
+JOB_RECORD = "job.json"
+
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+def current_job():
+    """Return the job being processed in the calling context, if any."""
+    return _current_job.get()
+
+
+class UpliftJob:
+    """State of a single uplift run, persisted to ``<workspace>/job.json``.
+
+    The runner may end a run by setting FAILED or CANCELED itself; a run that
+    returns while still RUNNING is marked FINISHED.
+    """
+
+    def __init__(self, job_id, config, selected_libraries=None):
+        self.job_id = job_id
+        self.config = config
+        self.selected_libraries = list(selected_libraries or [])
+        self.status = QUEUED
+        self.current_stage = "idle"
+        self.completed_steps = []
+        self.results = {}
+        self.summary_log = []
+        self.error = None
+        self.created_at = datetime.datetime.now().isoformat()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    @property
+    def workspace(self):
+        return os.path.join(JOBS_DIR, self.job_id)
+
+    @property
+    def record_path(self):
+        return os.path.join(self.workspace, JOB_RECORD)
+
+    def path(self, *parts):
+        """Return a path inside the job workspace."""
+        return os.path.join(self.workspace, *parts)
+
+    def is_canceled(self):
+        return self.status == CANCELED
+
+    def is_step_completed(self, step):
+        return step in self.completed_steps
+
+    def complete_step(self, step, **results):
+        """Record a finished step and its results, then persist the job."""
+        with self._lock:
+            self.results.update(results)
+            if step not in self.completed_steps:
+                self.completed_steps.append(step)
+        self.save()
+
+    def set_status(self, status, error=None):
+        with self._lock:
+            self.status = status
+            if error is not None:
+                self.error = error
+        self.save()
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "config": self.config,
+            "selected_libraries": self.selected_libraries,
+            "status": self.status,
+            "current_stage": self.current_stage,
+            "completed_steps": self.completed_steps,
+            "results": self.results,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    def save(self):
+        """Atomically write the status record and summary log to the workspace."""
+        os.makedirs(self.workspace, exist_ok=True)
+        with self._lock:
+            self.updated_at = datetime.datetime.now().isoformat()
+            record = self.to_dict()
+            record["summary_log"] = list(self.summary_log)
+
+        tmp_path = self.record_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_path, self.record_path)
+
+    @classmethod
+    def load(cls, record_path):
+        with open(record_path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+
+        job = cls(record["job_id"], record.get("config", {}), record.get("selected_libraries"))
+        job.status = record.get("status", INTERRUPTED)
+        job.current_stage = record.get("current_stage", "idle")
+        job.completed_steps = record.get("completed_steps", [])
+        job.results = record.get("results", {})
+        job.summary_log = record.get("summary_log", [])
+        job.error = record.get("error")
+        job.created_at = record.get("created_at", job.created_at)
+        job.updated_at = record.get("updated_at", job.updated_at)
+        return job
+
+
+class JobManager:
+    """Runs uplift jobs on a fixed-size worker pool and tracks their records."""
+
+    def __init__(self, runner, max_workers=UPLIFT_WORKERS):
+        self._runner = runner
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="uplift-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._load_existing()
+
+    def _load_existing(self):
+        """Load persisted job records; jobs that were active when the server
+        stopped are marked INTERRUPTED so they can be resumed."""
+        if not os.path.isdir(JOBS_DIR):
+            return
+        for job_id in os.listdir(JOBS_DIR):
+            record_path = os.path.join(JOBS_DIR, job_id, JOB_RECORD)
+            if not os.path.exists(record_path):
+                continue
+            try:
+                job = UpliftJob.load(record_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Could not load job record {record_path}: {e}")
+                continue
+            if job.status in ACTIVE_STATES:
+                job.set_status(INTERRUPTED)
+            self._jobs[job.job_id] = job
+
+    def submit(self, config, selected_libraries=None):
+        """Create a new job and queue it for execution."""
+        job = UpliftJob(uuid.uuid4().hex[:12], config, selected_libraries)
+        job.save()
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def resume(self, job_id):
+        """Re-queue an interrupted, failed or canceled job; completed steps are skipped."""
+        job = self.get(job_id)
+        if job is None or job.status in ACTIVE_STATES:
+            return None
+        job.error = None
+        job.set_status(QUEUED)
+        self._executor.submit(self._run, job)
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATES:
+            return False
+        job.set_status(CANCELED)
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def active_jobs(self):
+        return [job for job in self.list() if job.status in ACTIVE_STATES]
+
+    def run_inline(self, config, selected_libraries=None):
+        """Create a job and run it on the calling thread (CLI mode)."""
+        job = UpliftJob(uuid.uuid4().hex[:12], config, selected_libraries)
+        job.save()
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._run(job)
+        return job
+
+    def _run(self, job):
+        if job.is_canceled():
+            return
+        token = _current_job.set(job)
+        try:
+            job.set_status(RUNNING)
+            self._runner(job)
+            if job.status == RUNNING:
+                job.set_status(FINISHED)
+        except Exception as e:
+            print(f"Error in uplift job {job.job_id}: {e}")
+            job.set_status(INTERRUPTED, error=str(e))
+        finally:
+            _current_job.reset(token)
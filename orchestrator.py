@@ -15,30 +15,29 @@ import json
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
 from sse_starlette.sse import EventSourceResponse
 import uvicorn
 import threading
-import queue
 import time
+from event_bus import EventBus
+from job_manager import JobManager, JOBS_DIR, JOB_RECORD, FAILED, current_job
+from stage_scheduler import Stage, run_stages, COMPLETED as STAGE_COMPLETED
 
 LLM_API_TOKEN = os.getenv("LLM_API_TOKEN", "")
 
-# Global summary log
+# Summary log for work done outside of a job (e.g. repository reset)
 summary_log = []
 
-# Global variables for process control
-process_running = False      # Add this if missing
-current_stage = "idle"       # Add this if missing  
-process_status = "IDLE"      # Should already exist
-event_queue = queue.Queue()  # Should already exist
-process_thread = None        # Should already exist
-selected_libraries = []      # Store selected library IDs for RAG context
-uplift_config = {}          # Store uplift configuration
+# Global variables for process control; per-run state lives on each UpliftJob
+event_bus = EventBus()       # Broadcast buffer read independently by every /stream client
+selected_libraries = []      # Library IDs used for RAG context by the next job
 
 # Create output directories if they don't exist
 os.makedirs("baseline_output", exist_ok=True)
 os.makedirs("essvt_output", exist_ok=True)
 os.makedirs("final_output", exist_ok=True)
+os.makedirs(JOBS_DIR, exist_ok=True)
 
 # FastAPI app
 app = FastAPI(title="GenAI JDK Uplift Tool")
@@ -56,19 +55,22 @@ app = FastAPI(title="GenAI JDK Uplift Tool")
 
 
 def log_summary(section, content):
-    """Add a section to the summary log."""
-    summary_log.append(f"\n{'=' * 50}")
-    summary_log.append(f"  {section}")
-    summary_log.append(f"{'=' * 50}")
-    summary_log.append(content)
+    """Add a section to the summary log of the current job."""
+    job = current_job()
+    log = job.summary_log if job else summary_log
+    # One extend call so sections from concurrent stages don't interleave
+    log.extend([f"\n{'=' * 50}", f"  {section}", f"{'=' * 50}", content])
 
 def save_summary():
-    """Save the summary log to a file."""
+    """Save the summary log to a file (inside the job workspace for jobs)."""
+    job = current_job()
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     summary_file = f"uplift_summary_{timestamp}.log"
+    if job:
+        summary_file = job.path(summary_file)
     
     with open(summary_file, 'w', encoding='utf-8') as f:
-        f.write("\n".join(summary_log))
+        f.write("\n".join(job.summary_log if job else summary_log))
     
     print(f"\n📝 Summary saved to: {summary_file}")
     return summary_file
@@ -170,18 +172,28 @@ def reset_repositories():
         log_summary("REPOSITORY RESET", "\n".join(reset_summary))
         return False
 
-def run_tests(environment, output_dir):
-    """Run tests in the specified environment."""
+def run_tests(environment, output_dir, repositories_dir="repositories"):
+    """Run tests in the specified environment.
+    
+    For jobs, ``output_dir`` and ``repositories_dir`` are resolved inside the
+    job workspace; the repositories directory is mounted at /app.
+    """
     print(f"\n=== Running tests in {environment} environment ===")
+    job = current_job()
+    uplift_config = job.config if job else {}
+    report_prefix = f"/job_files/{job.job_id}/{output_dir}" if job else f"/{output_dir}"
+    repositories_path = job.path(repositories_dir) if job else repositories_dir
+    if job:
+        output_dir = job.path(output_dir)
     test_summary = []
     test_summary.append(f"Environment: {environment}")
     test_summary.append(f"Output directory: {output_dir}")
     
     # Send status update to frontend
     stage_id = "baseline_tests"
-    if environment == "uplift_env" and output_dir == "essvt_output":
+    if environment == "uplift_env" and os.path.basename(output_dir) == "essvt_output":
         stage_id = "essvt_uplifted_tests"
-    elif environment == "uplift_env" and output_dir == "final_output":
+    elif environment == "uplift_env" and os.path.basename(output_dir) == "final_output":
         stage_id = "final_tests"
     
     send_event(stage_id, "status", "running")
@@ -223,6 +235,7 @@ def run_tests(environment, output_dir):
         try:
             command = [
                 "docker-compose", "run", "--rm",
+                "-v", f"{os.path.abspath(repositories_path)}:/app",
                 "-v", f"{os.path.abspath(output_dir)}:/app/output",
                 environment,
                 "python", "-m", "robot.run", "--outputdir", "/app/output", "/app/ESSVT/tests.robot"
@@ -267,8 +280,8 @@ def run_tests(environment, output_dir):
                     
                     # Create report links
                     report_links = {
-                        "report": f"/{output_dir}/report.html",
-                        "log": f"/{output_dir}/log.html"
+                        "report": f"{report_prefix}/report.html",
+                        "log": f"{report_prefix}/log.html"
                     }
                     send_event(stage_id, "report_link", json.dumps(report_links))
                     
@@ -297,6 +310,11 @@ def run_tests(environment, output_dir):
             send_event(stage_id, "status", "error")
             return None, "\n".join(test_summary)
 
+def get_job_libraries():
+    """Return the RAG libraries selected for the current job."""
+    job = current_job()
+    return job.selected_libraries if job else selected_libraries
+
 def find_files_by_extension(repo_path, extensions):
     """Find all files with specified extensions in the repository."""
     files = []
@@ -387,7 +405,7 @@ def uplift_adaptation_pod_modules(repo_path, uplift_config):
                     original_code, 
                     analysis_findings, 
                     uplift_config.get('target_version', '3.9'), 
-                    selected_libraries
+                    get_job_libraries()
                 )
                 
                 if updated_code:
@@ -519,7 +537,7 @@ def uplift_repository(repo_path, uplift_config):
                 original_code, 
                 modernizer_findings, 
                 uplift_config.get('target_version', 'latest'), 
-                selected_libraries,
+                get_job_libraries(),
                 file_type
             )
             
@@ -674,15 +692,16 @@ def compare_robot_outputs(baseline_output_path, new_output_path):
         return False, "\n".join(comparison_summary)
 
 def send_event(stage, event_type, payload):
-    """Send an event to the frontend via the event queue."""
+    """Publish an event to every connected frontend via the event bus."""
     event = {
         "stage": stage,
         "type": event_type,
         "payload": payload
     }
-    event_queue.put(event)
-    # Force a small delay to ensure events are processed in order
-    time.sleep(0.05)
+    job = current_job()
+    if job:
+        event["job_id"] = job.job_id
+    event_bus.publish(event)
 
 def send_llm_change_event(change_data):
     """Send an LLM change event to the frontend."""
@@ -691,147 +710,157 @@ def send_llm_change_event(change_data):
         "type": "llm_change",
         "payload": change_data
     }
-    event_queue.put(event)
-    # Force a small delay to ensure events are processed in order
-    time.sleep(0.05)
+    job = current_job()
+    if job:
+        event["job_id"] = job.job_id
+    event_bus.publish(event)
 
-def uplift_process():
-    """Run the complete uplift process with web interface support."""
-    global process_running, current_stage, process_status, uplift_config
+def prepare_job_workspace(job):
+    """Copy the repositories a job works on into its isolated workspace.
     
-    if process_running:
-        print("Process is already running")
-        return
+    Java jobs also get a pristine ``baseline_repositories`` copy so baseline
+    tests can run while the test code in ``repositories`` is being uplifted.
+    """
+    uplift_type = job.config.get('type', 'java')
+    source_path = job.config.get('source_path', 'repositories/ESSVT')
+    ignore = shutil.ignore_patterns('.git', '__pycache__', '*.class', 'output')
     
-    process_running = True
-    current_stage = "starting"
-    process_status = "RUNNING"
+    if uplift_type == 'python':
+        # Only the selected modules are needed for adaptation pod uplifts
+        workspace_source = job.path('repositories', os.path.basename(os.path.normpath(source_path)))
+        for module in job.config.get('selected_modules', []):
+            module_path = os.path.join(source_path, module)
+            if os.path.isdir(module_path):
+                shutil.copytree(module_path, os.path.join(workspace_source, module), ignore=ignore, dirs_exist_ok=True)
+        os.makedirs(workspace_source, exist_ok=True)
+        source_code_path = workspace_source
+    else:
+        shutil.copytree('repositories', job.path('repositories'), ignore=ignore, dirs_exist_ok=True)
+        shutil.copytree('repositories', job.path('baseline_repositories'), ignore=ignore, dirs_exist_ok=True)
+        workspace_source = job.path('repositories', os.path.relpath(source_path, 'repositories'))
+        source_code_path = job.path('repositories', 'source-code')
     
-    try:
-        # Clear any previous events
-        while not event_queue.empty():
-            event_queue.get()
-        
-        # Get uplift configuration
-        uplift_type = uplift_config.get('type', 'java')
-        target_version = uplift_config.get('target_version', '17')
-        source_path = uplift_config.get('source_path', 'repositories/ESSVT')
-        
-        # Define stages based on uplift type
-        if uplift_type == 'java':
-            stages = ["baseline_tests", "uplifting_essvt", "essvt_uplifted_tests", "uplifting_source", "final_tests"]
-        elif uplift_type == 'python':
-            stages = ["baseline_tests", "uplifting_python", "python_uplifted_tests", "uplifting_source", "final_tests"]
-        else:
-            stages = ["baseline_tests", f"uplifting_{uplift_type}", f"{uplift_type}_uplifted_tests", "uplifting_source", "final_tests"]
-        
-        # Send initial stage setup
-        for stage in stages:
-            send_event(stage, "status", "pending")
-        
-        # Step 1: Run baseline tests on production environment
+    for output_dir in ['baseline_output', 'essvt_output', 'final_output']:
+        os.makedirs(job.path(output_dir), exist_ok=True)
+    
+    return workspace_source, source_code_path
+
+def job_canceled(job):
+    """Log and announce cancellation if the job was canceled by the user."""
+    if not job.is_canceled():
+        return False
+    log_summary("UPLIFT SIMULATION", "Process was canceled by user")
+    send_event("system", "process_status", "finished")
+    return True
+
+def build_uplift_stages(job):
+    """Build the stage graph for a job's uplift pipeline.
+    
+    Baseline tests only read the pristine baseline copy, so they run alongside
+    the uplift chain. Within the chain each stage depends on the previous one:
+    uplifted tests need the uplifted test code, the source uplift must not
+    change the code under test while those tests run, and the final tests
+    need the uplifted source. Comparisons wait for the baseline output.
+    """
+    uplift_type = job.config.get('type', 'java')
+    target_version = job.config.get('target_version', '17')
+    source_path = job.results["source_path"]
+    source_code_path = job.results["source_code_path"]
+    
+    uplift_stage = "uplifting_essvt" if uplift_type == 'java' else f"uplifting_{uplift_type}"
+    uplifted_tests_stage = f"{uplift_type}_uplifted_tests" if uplift_type != 'java' else "essvt_uplifted_tests"
+    
+    def baseline_tests():
         print(f"\n📋 Step 1: Running baseline tests for {uplift_type}...")
         send_event("baseline_tests", "status", "running")
-        baseline_output, baseline_summary = run_tests("production_env", "baseline_output")
+        baseline_repositories = "baseline_repositories" if os.path.isdir(job.path("baseline_repositories")) else "repositories"
+        baseline_output, baseline_summary = run_tests("production_env", "baseline_output", baseline_repositories)
         log_summary("BASELINE TEST EXECUTION", baseline_summary)
         if not baseline_output:
             print("❌ Failed to run baseline tests")
             log_summary("UPLIFT SIMULATION ERROR", "Failed to run baseline tests.")
             send_event("baseline_tests", "status", "error")
-            process_status = "FINISHED"
-            return
+            return False
         
         # Explicitly mark baseline tests as completed
         send_event("baseline_tests", "status", "completed")
-        
-        # Check if process was canceled
-        if process_status == "CANCELED":
-            log_summary("UPLIFT SIMULATION", "Process was canceled by user")
-            send_event("system", "process_status", "finished")
-            return
-        
-        # Step 2: Uplift test code
+        job.complete_step("baseline_tests", baseline_output=baseline_output)
+        return True
+    
+    def uplift_test_code():
         print(f"\n🔧 Step 2: Uplifting {uplift_type} test code...")
-        test_stage = f"uplifting_{uplift_type}"
-        send_event(test_stage, "status", "running")
+        send_event(f"uplifting_{uplift_type}", "status", "running")
         
         test_config = {
             'type': uplift_type,
             'target_version': target_version,
-            'source_path': source_path
+            'source_path': source_path,
+            'selected_modules': job.config.get('selected_modules', [])
         }
         
         if not uplift_repository(source_path, test_config):
             print(f"❌ Failed to uplift {uplift_type} code")
             log_summary("UPLIFT SIMULATION ERROR", f"Failed to uplift {uplift_type} code.")
-            send_event(test_stage, "status", "error")
-            process_status = "FINISHED"
-            return
+            send_event(f"uplifting_{uplift_type}", "status", "error")
+            return False
         
         # Mark the appropriate stage as completed based on uplift type
-        if uplift_type == 'python':
-            send_event("uplifting_python", "status", "completed")
-        else:
-            send_event("uplifting_essvt", "status", "completed")
-        
-        # Check if process was canceled
-        if process_status == "CANCELED":
-            log_summary("UPLIFT SIMULATION", "Process was canceled by user")
-            send_event("system", "process_status", "finished")
-            return
-        
+        send_event(uplift_stage, "status", "completed")
+        job.complete_step(uplift_stage)
+        return True
+    
+    def uplifted_tests():
         # Step 3: Test uplifted code against original source code
         print(f"\n🧪 Step 3: Testing uplifted {uplift_type} code...")
-        test_stage = f"{uplift_type}_uplifted_tests" if uplift_type != 'java' else "essvt_uplifted_tests"
-        send_event(test_stage, "status", "running")
+        send_event(uplifted_tests_stage, "status", "running")
         essvt_output, essvt_test_summary = run_tests("uplift_env", "essvt_output")
         log_summary(f"{uplift_type.upper()} UPLIFTED TEST EXECUTION", essvt_test_summary)
         if not essvt_output:
             print(f"❌ Failed to run {uplift_type} tests")
             log_summary("UPLIFT SIMULATION ERROR", f"Failed to run {uplift_type} tests.")
-            send_event(test_stage, "status", "error")
-            process_status = "FINISHED"
-            return
-        
+            send_event(uplifted_tests_stage, "status", "error")
+            return False
+        job.complete_step("uplifted_tests_run", essvt_output=essvt_output)
+        return True
+    
+    def compare_uplifted_tests():
         # Step 4: Compare test results
         print(f"\n📊 Step 4: Comparing {uplift_type} test results...")
-        essvt_success, essvt_comparison = compare_robot_outputs(baseline_output, essvt_output)
+        essvt_success, essvt_comparison = compare_robot_outputs(job.results["baseline_output"], job.results["essvt_output"])
         log_summary(f"{uplift_type.upper()} TEST COMPARISON", essvt_comparison)
         
         # Mark the appropriate test stage as completed
-        test_stage = f"{uplift_type}_uplifted_tests" if uplift_type != 'java' else "essvt_uplifted_tests"
-        send_event(test_stage, "status", "completed")
-        
-        # Check if process was canceled
-        if process_status == "CANCELED":
-            log_summary("UPLIFT SIMULATION", "Process was canceled by user")
-            send_event("system", "process_status", "finished")
-            return
-        
+        send_event(uplifted_tests_stage, "status", "completed")
+        job.complete_step(uplifted_tests_stage, essvt_success=essvt_success)
+        return True
+    
+    def uplift_source():
         # Step 5: Uplift source code (only for Java mode)
-        if uplift_type == 'java':
-            print("\n🔧 Step 5: Uplifting source code...")
-            send_event("uplifting_source", "status", "running")
-            if not uplift_repository("repositories/source-code", "17"):
-                print("❌ Failed to uplift source code")
-                log_summary("UPLIFT SIMULATION ERROR", "Failed to uplift source code.")
-                send_event("uplifting_source", "status", "error")
-                process_status = "FINISHED"
-                return
-            
-            # Explicitly mark source code uplift as completed
-            send_event("uplifting_source", "status", "completed")
-        else:
+        if uplift_type != 'java':
             # For non-Java modes (like adaptation pod), skip source code uplift
             print(f"\n⏭️  Step 5: Skipping source code uplift for {uplift_type} mode")
             send_event("uplifting_source", "status", "skipped")
-
-        # Check if process was canceled
-        if process_status == "CANCELED":
-            log_summary("UPLIFT SIMULATION", "Process was canceled by user")
-            send_event("system", "process_status", "finished")
-            return
+            return True
         
+        print("\n🔧 Step 5: Uplifting source code...")
+        send_event("uplifting_source", "status", "running")
+        source_config = {
+            'type': 'java',
+            'target_version': target_version,
+            'source_path': source_code_path
+        }
+        if not uplift_repository(source_code_path, source_config):
+            print("❌ Failed to uplift source code")
+            log_summary("UPLIFT SIMULATION ERROR", "Failed to uplift source code.")
+            send_event("uplifting_source", "status", "error")
+            return False
+        
+        # Explicitly mark source code uplift as completed
+        send_event("uplifting_source", "status", "completed")
+        job.complete_step("uplifting_source")
+        return True
+    
+    def final_tests():
         # Step 6: Final test with uplifted ESSVT and uplifted source code
         print("\n🧪 Step 6: Final testing with uplifted code...")
         send_event("final_tests", "status", "running")
@@ -841,16 +870,84 @@ def uplift_process():
             print("❌ Failed to run final tests")
             log_summary("UPLIFT SIMULATION ERROR", "Failed to run final tests.")
             send_event("final_tests", "status", "error")
-            process_status = "FINISHED"
-            return
-        
+            return False
+        job.complete_step("final_tests_run", final_output=final_output)
+        return True
+    
+    def compare_final_tests():
         # Step 7: Compare final results
         print("\n📊 Step 7: Comparing final test results...")
-        final_success, final_comparison = compare_robot_outputs(baseline_output, final_output)
+        final_success, final_comparison = compare_robot_outputs(job.results["baseline_output"], job.results["final_output"])
         log_summary("FINAL TEST COMPARISON", final_comparison)
         
         # Explicitly mark final tests as completed
         send_event("final_tests", "status", "completed")
+        job.complete_step("final_tests", final_success=final_success)
+        return True
+    
+    stages = [
+        Stage("baseline_tests", baseline_tests),
+        Stage(uplift_stage, uplift_test_code),
+        Stage("uplifted_tests_run", uplifted_tests, depends_on=[uplift_stage]),
+        Stage(uplifted_tests_stage, compare_uplifted_tests, depends_on=["baseline_tests", "uplifted_tests_run"]),
+        Stage("uplifting_source", uplift_source, depends_on=["uplifted_tests_run"]),
+        Stage("final_tests_run", final_tests, depends_on=["uplifting_source"]),
+        Stage("final_tests", compare_final_tests, depends_on=["baseline_tests", "final_tests_run"]),
+    ]
+    
+    # Stages finished in an earlier run of a resumed job are not repeated
+    for stage in stages:
+        if job.is_step_completed(stage.name):
+            stage.func = lambda: True
+    return stages
+
+def uplift_process(job):
+    """Run the complete uplift process for a job with web interface support.
+    
+    Pipeline stages run through the stage scheduler, so baseline tests and the
+    uplift chain overlap and their progress events interleave on the stream.
+    Completed stages are recorded on the job, so a resumed job continues with
+    the stages that have not finished yet.
+    """
+    job.current_stage = "starting"
+    
+    try:
+        # Get uplift configuration
+        uplift_type = job.config.get('type', 'java')
+        
+        # Define stages based on uplift type
+        if uplift_type == 'java':
+            stages = ["baseline_tests", "uplifting_essvt", "essvt_uplifted_tests", "uplifting_source", "final_tests"]
+        elif uplift_type == 'python':
+            stages = ["baseline_tests", "uplifting_python", "python_uplifted_tests", "uplifting_source", "final_tests"]
+        else:
+            stages = ["baseline_tests", f"uplifting_{uplift_type}", f"{uplift_type}_uplifted_tests", "uplifting_source", "final_tests"]
+        
+        # Send initial stage setup
+        for stage in stages:
+            send_event(stage, "status", "completed" if job.is_step_completed(stage) else "pending")
+        
+        # Step 0: Copy repositories into the job workspace
+        if not job.is_step_completed("prepare_workspace"):
+            source_path, source_code_path = prepare_job_workspace(job)
+            job.complete_step("prepare_workspace", source_path=source_path, source_code_path=source_code_path)
+        
+        job.current_stage = "running_stages"
+        outcomes = run_stages(build_uplift_stages(job), should_stop=job.is_canceled)
+        
+        # Check if process was canceled
+        if job_canceled(job):
+            return
+        
+        failed = [name for name, outcome in outcomes.items() if outcome != STAGE_COMPLETED]
+        if failed:
+            log_summary("UPLIFT SIMULATION ERROR", f"Stages not completed: {', '.join(failed)}")
+            job.set_status(FAILED, error=f"Stages not completed: {', '.join(failed)}")
+            send_event("system", "process_status", "finished")
+            return
+        
+        essvt_success = job.results.get("essvt_success", False)
+        final_success = job.results.get("final_success", False)
         
         # Add ESSVT validation after ESSVT uplifted tests - COMMENTED OUT FOR LOCAL-ONLY MODE
         # if ESSVT_CONFIG["enabled"]:
@@ -921,8 +1018,7 @@ def uplift_process():
         # Save summary to file
         summary_file = save_summary()
         print(f"Review the detailed summary in {summary_file} for more information.")
-        
-        process_status = "FINISHED"
+        job.complete_step("report", summary_file=summary_file)
         
         # Send event to notify frontend that process is complete
         send_event("system", "process_status", "finished")
@@ -930,10 +1026,10 @@ def uplift_process():
     except Exception as e:
         print(f"Error in uplift process: {e}")
         log_summary("UPLIFT SIMULATION ERROR", f"Unexpected error: {e}")
-        process_status = "FINISHED"
         
         # Send event to notify frontend that process has errored
         send_event("system", "process_status", "finished")
+        raise
 
 # ESSVT Functions - COMMENTED OUT FOR LOCAL-ONLY MODE
 # def get_essvt_token():
@@ -1303,6 +1399,8 @@ def uplift_process():
 #     
 #     return False  # Timeout
 
+job_manager = JobManager(uplift_process)
+
 # Update the get_rag_context function to use the correct RAG query endpoint
 def get_rag_context_wrapper(query, selected_libraries):
     """Wrapper function to maintain backward compatibility with existing calls."""
@@ -1364,12 +1462,7 @@ async def get_favicon():
 
 @app.post("/start")
 async def start_process(request: Request):
-    """Start the uplift process."""
-    global process_status, process_thread, uplift_config
-    
-    if process_status == "RUNNING":
-        return JSONResponse(content={"success": False, "error": "Process already running"})
-    
+    """Queue a new uplift job and return its job ID."""
     try:
         # Get configuration from request
         data = await request.json()
@@ -1399,49 +1492,64 @@ async def start_process(request: Request):
                 'source_path': 'repositories/ESSVT'
             }
         
-        # Clear the event queue
-        while not event_queue.empty():
-            event_queue.get()
-        
-        # Start the process in a separate thread
-        process_thread = threading.Thread(target=uplift_process)
-        process_thread.daemon = True
-        process_thread.start()
-        
-        return JSONResponse(content={"success": True})
+        job = job_manager.submit(uplift_config, data.get('selected_libraries', selected_libraries))
+        return JSONResponse(content={"success": True, "job_id": job.job_id})
         
     except Exception as e:
         return JSONResponse(content={"success": False, "error": f"Failed to start process: {str(e)}"})
 
 @app.post("/cancel")
-async def cancel_process():
-    """Cancel the uplift process."""
-    global process_status
+async def cancel_process(request: Request):
+    """Cancel one uplift job, or every active job if no job_id is given."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    job_id = (data or {}).get('job_id')
     
-    if process_status != "RUNNING":
+    job_ids = [job_id] if job_id else [job.job_id for job in job_manager.active_jobs()]
+    canceled = [job_id for job_id in job_ids if job_manager.cancel(job_id)]
+    if not canceled:
         # If no process is running, send event to update UI state
         send_event("system", "process_status", "finished")
         return JSONResponse(content={"success": False, "error": "No process running"})
     
-    process_status = "CANCELED"
-    return JSONResponse(content={"success": True})
+    return JSONResponse(content={"success": True, "canceled": canceled})
 
 @app.post("/reset")
 async def reset_process():
     """Reset the uplift environment."""
-    global process_status
-    
-    if process_status == "RUNNING":
+    if job_manager.active_jobs():
         return JSONResponse(content={"success": False, "error": "Cannot reset while process is running"})
     
     success = reset_repositories()
-    process_status = "IDLE"
     
     # Send event to reset UI
     send_event("system", "reset", "Environment reset completed")
     
     return JSONResponse(content={"success": success})
 
+@app.get("/jobs")
+async def list_jobs():
+    """List uplift jobs, newest first."""
+    return JSONResponse(content={"jobs": [job.to_dict() for job in job_manager.list()]})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status record of a single uplift job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"Unknown job: {job_id}"}, status_code=404)
+    return JSONResponse(content=job.to_dict())
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Resume a job from the step after its last completed step."""
+    job = job_manager.resume(job_id)
+    if job is None:
+        return JSONResponse(content={"success": False, "error": f"Job {job_id} not found or still active"})
+    return JSONResponse(content={"success": True, "job_id": job.job_id})
+
 @app.get("/api/libraries")
 async def get_libraries():
     """Get available libraries from RAG API."""
@@ -1489,39 +1597,59 @@ async def get_selected_libraries():
     return JSONResponse(content={"libraries": selected_libraries})
 
 @app.get("/stream")
-async def event_stream(request: Request):
-    """Server-sent events stream."""
+async def event_stream(request: Request, last_event_id: str = None, job_id: str = None):
+    """Server-sent events stream.
+
+    Each client reads the shared event bus with its own cursor. Reconnecting
+    clients resume after ``Last-Event-ID`` (header or ``last_event_id`` query
+    parameter) as long as those events are still buffered. With ``job_id``
+    only that job's events (plus global ones) are sent.
+    """
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    try:
+        resume_from = int(resume_from) if resume_from else None
+    except ValueError:
+        resume_from = None
+
     async def event_generator():
-        # Send initial connection established event
-        yield json.dumps({"type": "connection", "payload": "established"})
-        
-        # Keep track of last event time to detect stalled connections
-        last_event_time = asyncio.get_event_loop().time()
-        
-        while True:
-            if await request.is_disconnected():
-                break
-                
-            # Check for new events
-            if not event_queue.empty():
-                event = event_queue.get()
-                yield json.dumps(event)
-                last_event_time = asyncio.get_event_loop().time()
-            else:
-                # Send heartbeat every 5 seconds if no events to keep connection alive
-                current_time = asyncio.get_event_loop().time()
-                if current_time - last_event_time > 5:
-                    yield json.dumps({"type": "heartbeat", "payload": str(current_time)})
-                    last_event_time = current_time
-            
-            await asyncio.sleep(0.1)
-    
+        subscription = event_bus.subscribe(resume_from)
+        try:
+            # Send initial connection established event
+            yield {"data": json.dumps({"type": "connection", "payload": "established"})}
+
+            while True:
+                if await request.is_disconnected():
+                    break
+
+                # Wait for new events; send a heartbeat after 5 idle seconds
+                dropped, events = await subscription.next_batch(timeout=5)
+                if dropped:
+                    yield {"data": json.dumps({"type": "events_dropped", "payload": str(dropped)})}
+                for event_id, event in events:
+                    if job_id and event.get("job_id", job_id) != job_id:
+                        continue
+                    yield {"id": str(event_id), "data": json.dumps(event)}
+                if not events and not dropped:
+                    current_time = asyncio.get_event_loop().time()
+                    yield {"data": json.dumps({"type": "heartbeat", "payload": str(current_time)})}
+        finally:
+            subscription.close()
+
     return EventSourceResponse(event_generator())
 
+class JobFiles(StaticFiles):
+    """Job workspace files, without the internal job records; those are served by /jobs."""
+    
+    async def get_response(self, path, scope):
+        if os.path.basename(path) in (JOB_RECORD, JOB_RECORD + ".tmp"):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
 # Serve static files from directories
 app.mount("/baseline_output", StaticFiles(directory="baseline_output"), name="baseline_output")
 app.mount("/essvt_output", StaticFiles(directory="essvt_output"), name="essvt_output")
 app.mount("/final_output", StaticFiles(directory="final_output"), name="final_output")
+app.mount("/job_files", JobFiles(directory=JOBS_DIR), name="job_files")
 
 def main():
     """Legacy CLI entry point."""
@@ -1532,7 +1660,12 @@ def main():
         if sys.argv[1] == "--cli":
             # Run in CLI mode
             reset_repositories()
-            uplift_process()
+            job = job_manager.run_inline({
+                'type': 'java',
+                'target_version': '17',
+                'source_path': 'repositories/ESSVT'
+            }, selected_libraries)
+            print(f"Job {job.job_id} {job.status.lower()}; workspace: {job.workspace}")
         elif sys.argv[1] == "--web":
             # Run in web mode - this is handled by the if __name__ == "__main__" block
             pass
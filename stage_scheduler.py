@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware scheduler for uplift pipeline stages.
+
+Stages with no unfinished dependencies run concurrently on a thread pool, so
+independent work (e.g. baseline tests on ``production_env`` and the uplift
+of the test code) overlaps. A stage only waits for the stages it depends on.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Stage outcomes
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+CANCELED = "canceled"
+
+
+class Stage:
+    """A named unit of work; ``func`` returns a truthy value on success."""
+
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+def run_stages(stages, max_workers=None, should_stop=None):
+    """Run stages as soon as their dependencies complete.
+
+    A stage whose dependency did not complete is skipped. Once ``should_stop``
+    returns true no new stages are started. Each stage runs in a copy of the
+    caller's context, so context variables such as the current job are visible
+    to the worker threads.
+
+    Returns a dict mapping stage name to its outcome.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.depends_on if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(unknown)}")
+
+    outcomes = {}
+    pending = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1, thread_name_prefix="stage") as executor:
+        while pending or running:
+            stop = should_stop is not None and should_stop()
+
+            for stage in list(pending):
+                dep_outcomes = [outcomes.get(dep) for dep in stage.depends_on]
+                if any(outcome not in (None, COMPLETED) for outcome in dep_outcomes):
+                    outcomes[stage.name] = SKIPPED
+                    pending.remove(stage)
+                elif stop:
+                    outcomes[stage.name] = CANCELED
+                    pending.remove(stage)
+                elif all(outcome == COMPLETED for outcome in dep_outcomes):
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, stage.func)] = stage
+                    pending.remove(stage)
+
+            if not running:
+                if pending:
+                    # Remaining stages wait on each other (dependency cycle)
+                    for stage in pending:
+                        outcomes[stage.name] = SKIPPED
+                    pending = []
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    outcomes[stage.name] = COMPLETED if future.result() else FAILED
+                except Exception as e:
+                    print(f"Error in stage {stage.name}: {e}")
+                    outcomes[stage.name] = FAILED
+
+    return outcomes
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for AST-aware chunking and splice reassembly of large Python files.
+"""
+
+import threading
+import time
+
+import genai_uplifter_simplified
+from genai_uplifter_simplified import (
+    split_code_into_ast_chunks,
+    has_exact_spans,
+    splice_chunks,
+    modernize_with_smart_chunking,
+    estimate_tokens_accurately,
+    chunk_token_budget,
+    validate_chunk_for_api,
+)
+
+
+def build_sample_code(function_count=60):
+    """Build a module with a docstring, imports, a decorated class and many functions."""
+    parts = [
+        '#!/usr/bin/env python',
+        '"""Sample module for chunking."""',
+        '',
+        'import os',
+        'import sys',
+        '',
+        '',
+        'class Worker(object):',
+        '    """Worker with a few methods."""',
+        '',
+        '    def run(self):',
+        '        return os.getcwd()',
+        '',
+    ]
+    for i in range(function_count):
+        parts.extend([
+            '',
+            f'# Helper number {i}',
+            '@staticmethod',
+            f'def helper_{i}(value):',
+            f'    """Return value scaled by {i}."""',
+            '    result = []',
+            '    for item in range(value):',
+            f'        result.append(item * {i})',
+            '    return result',
+        ])
+    return '\n'.join(parts) + '\n'
+
+
+def test_chunks_cover_file_exactly():
+    """Chunks are contiguous, carry line spans, and splice back to the original."""
+    code = build_sample_code()
+    chunks = split_code_into_ast_chunks(code, token_budget=400)
+
+    assert len(chunks) > 1
+    assert has_exact_spans(chunks)
+    assert splice_chunks([chunk['code'] for chunk in chunks]) == code
+    print(f"✅ {len(chunks)} chunks splice back to the original file")
+
+
+def test_chunks_split_only_at_top_level_boundaries():
+    """Every chunk after the first starts at a comment, decorator or definition."""
+    code = build_sample_code()
+    chunks = split_code_into_ast_chunks(code, token_budget=400)
+
+    for chunk in chunks[1:]:
+        first_line = chunk['code'].split('\n')[0]
+        assert first_line.startswith(('# Helper', '@', 'def ', 'class ')), first_line
+        assert chunk['complete_structures']
+    print("✅ Chunks start at top-level definitions with their comments and decorators")
+
+
+def test_small_units_are_packed_up_to_the_budget():
+    """Adjacent definitions share a chunk; a chunk only closes when the next one would not fit."""
+    code = build_sample_code()
+    chunks = split_code_into_ast_chunks(code, token_budget=400)
+    lines = code.split('\n')
+
+    for chunk, following in zip(chunks, chunks[1:]):
+        # Every chunk but the last holds at least 75% of the budget
+        assert 0.75 * 400 <= estimate_tokens_accurately(chunk['code']) <= 400
+        # The next chunk's first statement would have pushed this one over the budget
+        next_unit_end = following['start_line'] + following['code'].split('\n')[1:].index('') + 1
+        assert estimate_tokens_accurately('\n'.join(lines[chunk['start_line'] - 1:next_unit_end])) > 400
+    print(f"✅ {len(chunks)} packed chunks, none over the budget")
+
+
+def test_oversized_unit_pieces_pack_with_neighbours():
+    """Only a class over the budget on its own is split, and its pieces share chunks with the code around them."""
+    methods = ''.join(f'    def method_{i}(self):\n        return {i} * 1234567890\n\n' for i in range(40))
+    code = build_sample_code(function_count=20).replace('class Worker(object):\n', 'class Worker(object):\n' + methods)
+    chunks = split_code_into_ast_chunks(code, token_budget=400)
+
+    assert has_exact_spans(chunks)
+    assert splice_chunks([chunk['code'] for chunk in chunks]) == code
+    split_class = [chunk for chunk in chunks if not chunk['complete_structures']]
+    assert len(split_class) > 1
+    assert 'import sys' in split_class[0]['code'] and 'class Worker' in split_class[0]['code']
+    for chunk in chunks[:-1]:
+        assert 0.75 * 400 <= estimate_tokens_accurately(chunk['code']) <= 400
+    print(f"✅ Oversized class split into {len(split_class)} chunks, packed with the code around it")
+
+
+def test_budget_is_sized_from_the_prompt_overhead():
+    """Chunks packed to the budget fit the token limit, with the chunk counted once."""
+    findings = "- Replace print statements\n- Use f-strings\n" * 20
+    budget = chunk_token_budget(findings, "3.9")
+    assert budget == int(genai_uplifter_simplified.LLM_TOKEN_LIMIT - genai_uplifter_simplified.LLM_RESPONSE_TOKENS
+                         - estimate_tokens_accurately(genai_uplifter_simplified.create_python_prompt("", findings, "3.9", "")))
+
+    code = build_sample_code(function_count=300)
+    chunks = split_code_into_ast_chunks(code, budget)
+    assert len(chunks) > 1
+    for chunk in chunks[:-1]:
+        assert estimate_tokens_accurately(chunk['code']) >= 0.75 * budget
+    for chunk in chunks:
+        fits, total_tokens, prompt_tokens, code_tokens = validate_chunk_for_api(chunk['code'], "", findings, "3.9")
+        assert fits, total_tokens
+    print(f"✅ {len(chunks)} chunks of up to {budget} tokens fit the token limit")
+
+
+def test_python2_code_is_chunked_with_tokenize():
+    """Legacy Python 2 code that ast cannot parse still gets exact spans."""
+    code = '\n'.join(
+        f'def legacy_{i}():\n    print "value %d" % {i}\n    return {i}\n' for i in range(80)
+    )
+    chunks = split_code_into_ast_chunks(code, token_budget=200)
+
+    assert len(chunks) > 1
+    assert has_exact_spans(chunks)
+    assert splice_chunks([chunk['code'] for chunk in chunks]) == code
+    for chunk in chunks:
+        assert chunk['code'].startswith('def legacy_')
+    print("✅ Python 2 code chunked at definition boundaries")
+
+
+def test_concurrent_chunks_reassemble_in_order():
+    """Chunks are modernized concurrently; failed chunks keep their original text."""
+    code = build_sample_code(function_count=120)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_modernize_single_chunk(chunk, chunk_prompt, target_version, use_fallback=True):
+        with lock:
+            in_flight.append(chunk['name'])
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(chunk['name'])
+        if 'helper_100(' in chunk['code']:
+            return None  # Simulate an LLM failure for this chunk
+        return {'code': chunk['code'].replace('result.append', 'result += '), 'summary': 'ok'}
+
+    original = genai_uplifter_simplified.modernize_single_chunk
+    genai_uplifter_simplified.modernize_single_chunk = fake_modernize_single_chunk
+    try:
+        final_code, summary = modernize_with_smart_chunking(code, "findings", "3.9")
+    finally:
+        genai_uplifter_simplified.modernize_single_chunk = original
+
+    expected = splice_chunks([
+        chunk['code'] if 'helper_100(' in chunk['code'] else chunk['code'].replace('result.append', 'result += ')
+        for chunk in split_code_into_ast_chunks(code, chunk_token_budget("findings", "3.9"))
+    ])
+    assert max(peak) > 1
+    assert final_code == expected
+    assert 'helper_100(' in final_code and 'result.append' in final_code
+    assert 'Fallback' in summary or 'Original code kept' in summary
+    print(f"✅ Chunks modernized with up to {max(peak)} concurrent requests and reassembled in order")
+
+
+if __name__ == "__main__":
+    test_chunks_cover_file_exactly()
+    test_chunks_split_only_at_top_level_boundaries()
+    test_small_units_are_packed_up_to_the_budget()
+    test_oversized_unit_pieces_pack_with_neighbours()
+    test_budget_is_sized_from_the_prompt_overhead()
+    test_python2_code_is_chunked_with_tokenize()
+    test_concurrent_chunks_reassemble_in_order()
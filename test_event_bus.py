@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the broadcast event bus behind the /stream endpoint.
+"""
+
+import asyncio
+import threading
+
+from event_bus import EventBus
+
+
+def test_every_subscriber_sees_every_event():
+    """Two viewers must both receive the full stream."""
+
+    async def scenario():
+        bus = EventBus()
+        first = bus.subscribe()
+        second = bus.subscribe()
+
+        publisher = threading.Thread(
+            target=lambda: [bus.publish({"stage": "baseline_tests", "type": "log", "payload": str(i)}) for i in range(5)]
+        )
+        publisher.start()
+        publisher.join()
+
+        _, first_events = await first.next_batch(timeout=1)
+        _, second_events = await second.next_batch(timeout=1)
+        return first_events, second_events
+
+    first_events, second_events = asyncio.run(scenario())
+    assert [event["payload"] for _, event in first_events] == ["0", "1", "2", "3", "4"]
+    assert first_events == second_events
+    print("✅ Both subscribers received all events")
+
+
+def test_resume_from_last_event_id():
+    """A reconnecting client only gets events after its Last-Event-ID."""
+
+    async def scenario():
+        bus = EventBus()
+        ids = [bus.publish({"stage": "system", "type": "log", "payload": str(i)}) for i in range(4)]
+        subscription = bus.subscribe(last_event_id=ids[1])
+        return await subscription.next_batch(timeout=1)
+
+    dropped, events = asyncio.run(scenario())
+    assert dropped == 0
+    assert [event["payload"] for _, event in events] == ["2", "3"]
+    print("✅ Resume after Last-Event-ID works")
+
+
+def test_slow_subscriber_drops_and_coalesces():
+    """Overflowing the ring buffer reports a gap and collapses stale statuses."""
+
+    async def scenario():
+        bus = EventBus(maxlen=10)
+        subscription = bus.subscribe(max_batch=3)
+        for i in range(15):
+            bus.publish({"stage": "final_tests", "type": "status", "payload": f"step-{i}"})
+        return await subscription.next_batch(timeout=1)
+
+    dropped, events = asyncio.run(scenario())
+    assert dropped == 5
+    assert [event["payload"] for _, event in events] == ["step-14"]
+    print("✅ Slow subscriber sees gap count and latest status only")
+
+
+def test_clear_is_not_reported_as_dropped():
+    """Events removed by clear() are not counted as dropped; later overflow still is."""
+
+    async def scenario():
+        bus = EventBus(maxlen=10)
+        subscription = bus.subscribe()
+        for i in range(5):
+            bus.publish({"stage": "baseline_tests", "type": "log", "payload": f"old-{i}"})
+        bus.clear()
+        bus.publish({"stage": "baseline_tests", "type": "log", "payload": "new-0"})
+        after_clear = await subscription.next_batch(timeout=1)
+        for i in range(1, 13):
+            bus.publish({"stage": "baseline_tests", "type": "log", "payload": f"new-{i}"})
+        after_overflow = await subscription.next_batch(timeout=1)
+        return after_clear, after_overflow
+
+    (dropped, events), (overflow_dropped, overflow_events) = asyncio.run(scenario())
+    assert dropped == 0
+    assert [event["payload"] for _, event in events] == ["new-0"]
+    assert overflow_dropped == 2
+    assert overflow_events[0][1]["payload"] == "new-3"
+    print("✅ Cleared history is not reported as dropped")
+
+
+if __name__ == "__main__":
+    test_every_subscriber_sees_every_event()
+    test_resume_from_last_event_id()
+    test_slow_subscriber_drops_and_coalesces()
+    test_clear_is_not_reported_as_dropped()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the uplift job subsystem (job records, resume, concurrency).
+"""
+
+import os
+import tempfile
+import threading
+
+import job_manager
+from job_manager import JobManager, UpliftJob, current_job
+
+DEFAULT_JOBS_DIR = job_manager.JOBS_DIR
+
+
+def test_jobs_run_side_by_side_with_isolated_state():
+    """Two jobs run concurrently, each seeing only its own state."""
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        job_manager.JOBS_DIR = jobs_dir
+        both_started = threading.Barrier(2, timeout=5)
+        seen = {}
+
+        def runner(job):
+            both_started.wait()
+            seen[job.job_id] = current_job().config["name"]
+            job.complete_step("baseline_tests", baseline_output=job.path("baseline_output", "output.xml"))
+
+        manager = JobManager(runner, max_workers=2)
+        first = manager.submit({"name": "first"})
+        second = manager.submit({"name": "second"})
+        manager._executor.shutdown(wait=True)
+
+        assert seen == {first.job_id: "first", second.job_id: "second"}
+        assert first.status == job_manager.FINISHED and second.status == job_manager.FINISHED
+        assert os.path.exists(first.record_path) and os.path.exists(second.record_path)
+        print("✅ Jobs ran concurrently with isolated state")
+    job_manager.JOBS_DIR = DEFAULT_JOBS_DIR
+
+
+def test_interrupted_job_resumes_after_last_completed_step():
+    """A job that failed mid-way is reloaded from disk and skips finished steps."""
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        job_manager.JOBS_DIR = jobs_dir
+        executed = []
+
+        def runner(job):
+            for step in ["baseline_tests", "uplifting_essvt", "final_tests"]:
+                if job.is_step_completed(step):
+                    continue
+                if step == "uplifting_essvt" and "crash" not in executed:
+                    executed.append("crash")
+                    raise RuntimeError("LLM unavailable")
+                executed.append(step)
+                job.complete_step(step)
+
+        manager = JobManager(runner, max_workers=1)
+        job = manager.submit({"type": "java"})
+        manager._executor.shutdown(wait=True)
+        assert job.status == job_manager.INTERRUPTED
+
+        reloaded = UpliftJob.load(job.record_path)
+        assert reloaded.completed_steps == ["baseline_tests"]
+
+        manager = JobManager(runner, max_workers=1)
+        manager.resume(job.job_id)
+        manager._executor.shutdown(wait=True)
+
+        assert executed == ["baseline_tests", "crash", "uplifting_essvt", "final_tests"]
+        assert manager.get(job.job_id).status == job_manager.FINISHED
+        print("✅ Interrupted job resumed from its last completed step")
+    job_manager.JOBS_DIR = DEFAULT_JOBS_DIR
+
+
+def test_runner_failure_state_is_kept():
+    """A runner that gives up early marks the job FAILED; it is not reported FINISHED and can be resumed."""
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        job_manager.JOBS_DIR = jobs_dir
+        attempts = []
+
+        def runner(job):
+            attempts.append(job.job_id)
+            if len(attempts) == 1:
+                job.set_status(job_manager.FAILED, error="Stages not completed: final_tests")
+                return
+            job.complete_step("final_tests")
+
+        manager = JobManager(runner, max_workers=1)
+        job = manager.submit({"type": "python"})
+        manager._executor.shutdown(wait=True)
+        assert job.status == job_manager.FAILED
+        assert UpliftJob.load(job.record_path).error == "Stages not completed: final_tests"
+
+        manager = JobManager(runner, max_workers=1)
+        assert manager.resume(job.job_id) is not None
+        manager._executor.shutdown(wait=True)
+        assert manager.get(job.job_id).status == job_manager.FINISHED
+        print("✅ Failed job kept its FAILED state and was resumed")
+    job_manager.JOBS_DIR = DEFAULT_JOBS_DIR
+
+
+if __name__ == "__main__":
+    test_jobs_run_side_by_side_with_isolated_state()
+    test_interrupted_job_resumes_after_last_completed_step()
+    test_runner_failure_state_is_kept()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for the dependency-aware uplift stage scheduler.
+"""
+
+import threading
+import time
+
+from stage_scheduler import Stage, run_stages, COMPLETED, FAILED, SKIPPED
+
+
+def test_independent_stages_overlap():
+    """Baseline and uplift chains run at the same time."""
+    both_running = threading.Barrier(2, timeout=5)
+
+    def baseline():
+        both_running.wait()
+        return True
+
+    def uplift():
+        both_running.wait()
+        return True
+
+    start = time.time()
+    outcomes = run_stages([Stage("baseline_tests", baseline), Stage("uplifting_essvt", uplift)])
+    assert outcomes == {"baseline_tests": COMPLETED, "uplifting_essvt": COMPLETED}
+    assert time.time() - start < 5
+    print("✅ Independent stages ran concurrently")
+
+
+def test_dependencies_are_respected():
+    """A stage starts only after its dependencies finish."""
+    order = []
+
+    def record(name):
+        def run():
+            order.append(name)
+            return True
+        return run
+
+    outcomes = run_stages([
+        Stage("compare", record("compare"), depends_on=["baseline", "uplifted_tests"]),
+        Stage("uplifted_tests", record("uplifted_tests"), depends_on=["uplift"]),
+        Stage("uplift", record("uplift")),
+        Stage("baseline", record("baseline")),
+    ])
+    assert all(outcome == COMPLETED for outcome in outcomes.values())
+    assert order.index("uplift") < order.index("uplifted_tests") < order.index("compare")
+    assert order.index("baseline") < order.index("compare")
+    print("✅ Dependencies respected")
+
+
+def test_failure_skips_dependents():
+    """Dependents of a failed stage are skipped; other branches still run."""
+    outcomes = run_stages([
+        Stage("uplift", lambda: False),
+        Stage("uplifted_tests", lambda: True, depends_on=["uplift"]),
+        Stage("baseline", lambda: True),
+    ])
+    assert outcomes == {"uplift": FAILED, "uplifted_tests": SKIPPED, "baseline": COMPLETED}
+    print("✅ Failed stage skips its dependents")
+
+
+if __name__ == "__main__":
+    test_independent_stages_overlap()
+    test_dependencies_are_respected()
+    test_failure_skips_dependents()